@@ -1,24 +1,38 @@
-import boto3
-import botocore
-import pkg_resources
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+try:
+    from importlib.metadata import version as _distribution_version
+except ImportError:  # Python < 3.8
+    import pkg_resources
+
+    def _distribution_version(distribution_name: str) -> str:
+        return str(pkg_resources.get_distribution(distribution_name).version)
+
+
+if TYPE_CHECKING:
+    from aws_emr_launch.clients import boto3_client as boto3_client  # noqa: F401
+    from aws_emr_launch.clients import boto3_resource as boto3_resource  # noqa: F401
+    from aws_emr_launch.clients import reset_boto3_clients as reset_boto3_clients  # noqa: F401
 
 __product__ = "aws-emr-launch"
-__version__ = pkg_resources.get_distribution(__product__).version
+__version__ = _distribution_version(__product__)
 __package__ = f"{__product__}-{__version__}"
 
-
-def _get_botocore_config() -> botocore.config.Config:
-    return botocore.config.Config(
-        retries={"max_attempts": 5},
-        connect_timeout=10,
-        max_pool_connections=10,
-        user_agent_extra=f"{__product__}/{__version__}",
-    )
+# Importing aws_emr_launch doesn't import boto3 or aws_cdk: the subpackages, and the boto3 client
+# factory of aws_emr_launch.clients, are imported when first accessed. aws_emr_launch.runtime reads
+# the stored Profiles, Configurations and Launch Functions without importing aws_cdk.
+_SUBMODULES = ["clients", "constructs", "control_plane", "runtime"]
+_CLIENT_ATTRIBUTES = ["boto3_client", "boto3_resource", "reset_boto3_clients"]
 
 
-def boto3_client(service_name: str) -> boto3.client:
-    return boto3.Session().client(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _CLIENT_ATTRIBUTES:
+        return getattr(importlib.import_module(f"{__name__}.clients"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def boto3_resource(service_name: str) -> boto3.client:
-    return boto3.Session().resource(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + _SUBMODULES + _CLIENT_ATTRIBUTES)
@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+import botocore
+
+from aws_emr_launch import __product__, __version__
+
+# Creating a Session loads the service models again, so Sessions and clients are created once per
+# process and shared. Clients are keyed by service, region, profile, endpoint URL and retry mode; a
+# region or profile that isn't given is resolved from the environment (AWS_REGION/AWS_DEFAULT_REGION
+# and AWS_PROFILE) when the client is requested. boto3 clients are thread safe, resources are not, so
+# resources are shared within a thread only.
+#
+# The retry mode defaults to the AWS_EMR_LAUNCH_RETRY_MODE environment variable ("legacy",
+# "standard" or "adaptive"), as in the Lambda Functions. When neither is set, botocore resolves it
+# (AWS_RETRY_MODE, the retry_mode of ~/.aws/config, or its own default).
+RETRY_MODES = ["legacy", "standard", "adaptive"]
+
+_sessions: Dict[Tuple[Optional[str], Optional[str]], boto3.Session] = {}
+_clients: Dict[Tuple[Any, ...], boto3.client] = {}
+_resources = threading.local()
+_resources_generation = 0
+_lock = threading.Lock()
+
+
+def _retry_mode(retry_mode: Optional[str]) -> Optional[str]:
+    return os.environ.get("AWS_EMR_LAUNCH_RETRY_MODE", None) if retry_mode is None else retry_mode
+
+
+def _get_botocore_config(retry_mode: Optional[str] = None) -> botocore.config.Config:
+    retries: Dict[str, Any] = {"max_attempts": 5}
+    if retry_mode is not None:
+        if retry_mode not in RETRY_MODES:
+            raise ValueError(f"Unsupported retry mode: {retry_mode}, expected one of {RETRY_MODES}")
+        retries["mode"] = retry_mode
+    return botocore.config.Config(
+        retries=retries,
+        connect_timeout=10,
+        max_pool_connections=10,
+        user_agent_extra=f"{__product__}/{__version__}",
+    )
+
+
+def _key(
+    service_name: str,
+    region_name: Optional[str],
+    profile_name: Optional[str],
+    endpoint_url: Optional[str],
+    retry_mode: Optional[str],
+) -> Tuple[Any, ...]:
+    return (
+        service_name,
+        region_name or os.environ.get("AWS_REGION", os.environ.get("AWS_DEFAULT_REGION", None)),
+        profile_name or os.environ.get("AWS_PROFILE", None),
+        endpoint_url,
+        _retry_mode(retry_mode),
+    )
+
+
+def _get_session(region_name: Optional[str], profile_name: Optional[str]) -> boto3.Session:
+    # Called with the _lock held, Sessions are not thread safe
+    session = _sessions.get((region_name, profile_name), None)
+    if session is None:
+        session = boto3.Session(region_name=region_name, profile_name=profile_name)
+        _sessions[(region_name, profile_name)] = session
+    return session
+
+
+def boto3_client(
+    service_name: str,
+    region_name: Optional[str] = None,
+    profile_name: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    retry_mode: Optional[str] = None,
+) -> boto3.client:
+    key = _key(service_name, region_name, profile_name, endpoint_url, retry_mode)
+    client = _clients.get(key, None)
+    if client is None:
+        with _lock:
+            client = _clients.get(key, None)
+            if client is None:
+                client = _get_session(key[1], key[2]).client(
+                    service_name=service_name,
+                    use_ssl=True,
+                    endpoint_url=endpoint_url,
+                    config=_get_botocore_config(key[4]),
+                )
+                _clients[key] = client
+    return client
+
+
+def boto3_resource(
+    service_name: str,
+    region_name: Optional[str] = None,
+    profile_name: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    retry_mode: Optional[str] = None,
+) -> boto3.client:
+    key = _key(service_name, region_name, profile_name, endpoint_url, retry_mode)
+    if getattr(_resources, "generation", None) != _resources_generation:
+        _resources.generation = _resources_generation
+        _resources.resources = {}
+    resources: Dict[Tuple[Any, ...], Any] = _resources.resources
+    resource = resources.get(key, None)
+    if resource is None:
+        with _lock:
+            resource = _get_session(key[1], key[2]).resource(
+                service_name=service_name,
+                use_ssl=True,
+                endpoint_url=endpoint_url,
+                config=_get_botocore_config(key[4]),
+            )
+        resources[key] = resource
+    return resource
+
+
+# Drops the shared Sessions and clients, e.g. after the credentials in the environment changed
+def reset_boto3_clients() -> None:
+    global _resources_generation
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+        _resources_generation += 1
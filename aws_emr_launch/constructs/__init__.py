@@ -0,0 +1,27 @@
+import importlib
+from typing import Any, List
+
+# The construct subpackages (and aws_cdk) are imported when first accessed
+_SUBMODULES = [
+    "base",
+    "emr_constructs",
+    "iam_roles",
+    "lambdas",
+    "managed_configurations",
+    "parameter_store",
+    "registry",
+    "security_groups",
+    "step_functions",
+    "synth_cache",
+    "tables",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + _SUBMODULES)
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Optional, cast
+
+import aws_cdk
+
+import constructs
+
+
+class AdmissionPolicyError(Exception):
+    pass
+
+
+class AdmissionLimits:
+    def __init__(self, *, max_concurrent_launches: Optional[int] = 10, max_vcpus: Optional[int] = None) -> None:
+        self._max_concurrent_launches = max_concurrent_launches
+        self._max_vcpus = max_vcpus
+
+    @property
+    def max_concurrent_launches(self) -> Optional[int]:
+        return self._max_concurrent_launches
+
+    @property
+    def max_vcpus(self) -> Optional[int]:
+        return self._max_vcpus
+
+    def configuration(self) -> Dict[str, Any]:
+        return {"MaxConcurrentLaunches": self._max_concurrent_launches, "MaxVCpus": self._max_vcpus}
+
+
+# The limits of the launch admission of the EMRLaunchFunctions of a Stack with use_admission_control.
+# Launches in flight are admitted launches that haven't completed (or failed) within the startup_timeout
+class AdmissionPolicy:
+    def __init__(
+        self,
+        *,
+        default_limits: Optional[AdmissionLimits] = None,
+        namespaces: Optional[Dict[str, AdmissionLimits]] = None,
+        launch_rate: float = 0.5,
+        launch_burst: int = 5,
+        startup_timeout: aws_cdk.Duration = aws_cdk.Duration.hours(1),
+    ) -> None:
+        if launch_rate <= 0 or launch_burst < 1:
+            raise AdmissionPolicyError("The launch_rate must be positive and the launch_burst at least 1")
+
+        self._default_limits = default_limits if default_limits is not None else AdmissionLimits()
+        self._namespaces = namespaces if namespaces is not None else {}
+        self._launch_rate = launch_rate
+        self._launch_burst = launch_burst
+        self._startup_timeout = startup_timeout
+
+    @property
+    def default_limits(self) -> AdmissionLimits:
+        return self._default_limits
+
+    @property
+    def namespaces(self) -> Dict[str, AdmissionLimits]:
+        return self._namespaces
+
+    @property
+    def launch_rate(self) -> float:
+        return self._launch_rate
+
+    @property
+    def launch_burst(self) -> int:
+        return self._launch_burst
+
+    @property
+    def startup_timeout(self) -> aws_cdk.Duration:
+        return self._startup_timeout
+
+    # The ADMISSION_POLICY of the AdmissionControl Lambda, documented in emr_config_utils/admission.py
+    def configuration(self) -> Dict[str, Any]:
+        return {
+            "LaunchRate": self._launch_rate,
+            "LaunchBurst": self._launch_burst,
+            "StartupTimeout": self._startup_timeout.to_seconds(),
+            "Default": self._default_limits.configuration(),
+            "Namespaces": {n: limits.configuration() for n, limits in self._namespaces.items()},
+        }
+
+    def apply_to(self, scope: constructs.Construct) -> None:
+        stack = aws_cdk.Stack.of(scope)
+        if stack.node.try_find_child("AdmissionPolicy") is not None:
+            raise AdmissionPolicyError(
+                f"The AdmissionPolicy of Stack {stack.stack_name} must be applied once, "
+                "before any EMRLaunchFunctions with use_admission_control are built"
+            )
+        _AdmissionPolicyConstruct(stack, "AdmissionPolicy", self)
+
+    @staticmethod
+    def of(scope: constructs.Construct) -> "AdmissionPolicy":
+        stack = aws_cdk.Stack.of(scope)
+        policy_construct = stack.node.try_find_child("AdmissionPolicy")
+        if policy_construct is None:
+            # Pin the default so a policy applied later can't be silently ignored
+            policy_construct = _AdmissionPolicyConstruct(stack, "AdmissionPolicy", AdmissionPolicy())
+        return cast(_AdmissionPolicyConstruct, policy_construct).policy
+
+
+class _AdmissionPolicyConstruct(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, policy: AdmissionPolicy) -> None:
+        super().__init__(scope, id)
+        self.policy = policy
@@ -1,21 +1,20 @@
 import base64
 import hashlib
-import json
 import os
 from enum import Enum
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Dict, Iterator, List, Optional, cast
 
 import boto3
 from aws_cdk import aws_secretsmanager as secretsmanager
-from aws_cdk import aws_ssm as ssm
-from botocore.exceptions import ClientError
 
 import constructs
-from aws_emr_launch import boto3_client
+from aws_emr_launch import runtime
+from aws_emr_launch.constructs import parameter_store, registry
 from aws_emr_launch.constructs.base import BaseConstruct
 from aws_emr_launch.constructs.emr_constructs import emr_code
+from aws_emr_launch.constructs.synth_cache import SynthCache
 
-SSM_PARAMETER_PREFIX = "/emr_launch/cluster_configurations"
+SSM_PARAMETER_PREFIX = runtime.CLUSTER_CONFIGURATIONS_PREFIX
 
 
 class ClusterConfigurationNotFoundError(Exception):
@@ -127,21 +126,17 @@ class ClusterConfiguration(BaseConstruct):
                         }
                     )
 
-        self._ssm_parameter = ssm.CfnParameter(
-            self,
-            "SSMParameter",
-            type="String",
-            value=json.dumps(self.to_json()),
-            tier="Intelligent-Tiering",
-            name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{configuration_name}",
-        )
-
         self._override_interfaces["default"] = {
             "ClusterName": {"JsonPath": "Name", "Default": configuration_name},
             "ReleaseLabel": {"JsonPath": "ReleaseLabel", "Default": release_label},
             "StepConcurrencyLevel": {"JsonPath": "StepConcurrencyLevel", "Default": step_concurrency_level},
         }
 
+        self._parameter_name = f"{SSM_PARAMETER_PREFIX}/{namespace}/{configuration_name}"
+        self._content_version: Optional[str] = registry.RegistryConfiguration.of(self).store(
+            self, self._parameter_name, self.to_json()
+        )
+
         self._rehydrated = False
 
     def to_json(self) -> Dict[str, Any]:
@@ -164,6 +159,7 @@ class ClusterConfiguration(BaseConstruct):
         self._description = property_values.get("Description", None)
         self._override_interfaces = property_values["OverrideInterfaces"]
         self._configuration_artifacts = property_values["ConfigurationArtifacts"]
+        self._content_version = property_values.get(registry.CONTENT_VERSION_KEY, None)
 
         secret_configurations = property_values.get("SecretConfigurations", None)
         self._secret_configurations = (
@@ -178,7 +174,9 @@ class ClusterConfiguration(BaseConstruct):
     def update_config(self, new_config: Optional[Dict[str, Any]] = None) -> None:
         if new_config is not None:
             self._config = new_config
-        self._ssm_parameter.value = json.dumps(self.to_json())
+        self._content_version = registry.RegistryConfiguration.of(self).store(
+            self, self._parameter_name, self.to_json()
+        )
 
     @staticmethod
     def _get_applications(applications: Optional[List[str]]) -> List[Dict[str, Any]]:
@@ -276,6 +274,24 @@ class ClusterConfiguration(BaseConstruct):
     def namespace(self) -> str:
         return self._namespace
 
+    @property
+    def content_version(self) -> Optional[str]:
+        return self._content_version
+
+    # Publishes the current value as an immutable version, returning the version. Rehydrated Configurations
+    # are published by the Stack defining them
+    def publish_version(self) -> Optional[str]:
+        if self._rehydrated:
+            return self._content_version
+        self._content_version = registry.RegistryConfiguration.of(self).publish(
+            self, self._parameter_name, self.to_json()
+        )
+        return self._content_version
+
+    @property
+    def rehydrated(self) -> bool:
+        return self._rehydrated
+
     @property
     def description(self) -> Optional[str]:
         return self._description
@@ -298,40 +314,51 @@ class ClusterConfiguration(BaseConstruct):
 
     @staticmethod
     def get_configurations(
-        namespace: str = "default", next_token: Optional[str] = None, ssm_client: Optional[boto3.client] = None
+        namespace: str = "default",
+        next_token: Optional[str] = None,
+        ssm_client: Optional[boto3.client] = None,
+        max_results: Optional[int] = None,
+        recursive: bool = False,
+        names_only: bool = False,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        params = {"Path": f"{SSM_PARAMETER_PREFIX}/{namespace}/"}
-        if next_token:
-            params["NextToken"] = next_token
-        result = ssm_client.get_parameters_by_path(**params)
-
-        configurations = {"ClusterConfigurations": [json.loads(p["Value"]) for p in result["Parameters"]]}
-        if "NextToken" in result:
-            configurations["NextToken"] = result["NextToken"]
-        return configurations
+        return runtime.get_configurations(namespace, next_token, ssm_client, max_results, recursive, names_only)
+
+    @staticmethod
+    def iter_configurations(
+        namespace: str = "default",
+        recursive: bool = False,
+        names_only: bool = False,
+        page_size: int = runtime.MAX_PAGE_SIZE,
+        ssm_client: Optional[boto3.client] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        return runtime.iter_configurations(namespace, recursive, names_only, page_size, ssm_client)
 
     @staticmethod
     def get_configuration(
-        configuration_name: str, namespace: str = "default", ssm_client: Optional[boto3.client] = None
+        configuration_name: str,
+        namespace: str = "default",
+        ssm_client: Optional[boto3.client] = None,
+        version: Optional[str] = None,
+        synth_cache: Optional[SynthCache] = None,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        try:
-            configuration_json = ssm_client.get_parameter(
-                Name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{configuration_name}"
-            )["Parameter"]["Value"]
-            return cast(Dict[str, Any], json.loads(configuration_json))
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ParameterNotFound":
-                raise ClusterConfigurationNotFoundError()
-            else:
-                raise e
+        stored_value = parameter_store.get_stored_value(
+            f"{SSM_PARAMETER_PREFIX}/{namespace}/{configuration_name}", ssm_client, version, synth_cache
+        )
+        if stored_value is None:
+            raise ClusterConfigurationNotFoundError()
+        return stored_value
 
     @staticmethod
     def from_stored_configuration(
-        scope: constructs.Construct, id: str, configuration_name: str, namespace: str = "default"
+        scope: constructs.Construct,
+        id: str,
+        configuration_name: str,
+        namespace: str = "default",
+        version: Optional[str] = None,
     ) -> "ClusterConfiguration":
-        stored_config = ClusterConfiguration.get_configuration(configuration_name, namespace)
+        stored_config = ClusterConfiguration.get_configuration(
+            configuration_name, namespace, version=version, synth_cache=SynthCache.of(scope)
+        )
         cluster_config = ClusterConfiguration(scope, id, configuration_name=None)  # type: ignore
         cluster_config.from_json(stored_config)
         cluster_config._rehydrated = True
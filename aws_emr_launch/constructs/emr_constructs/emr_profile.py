@@ -1,6 +1,5 @@
-import json
 from enum import Enum
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Dict, Iterator, List, Optional, cast
 
 import boto3
 from aws_cdk import aws_ec2 as ec2
@@ -9,20 +8,20 @@ from aws_cdk import aws_iam as iam
 from aws_cdk import aws_kms as kms
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_secretsmanager as secretsmanager
-from aws_cdk import aws_ssm as ssm
-from botocore.exceptions import ClientError
 from logzero import logger
 
 import constructs
-from aws_emr_launch import boto3_client
+from aws_emr_launch import runtime
+from aws_emr_launch.constructs import parameter_store, registry
 from aws_emr_launch.constructs.base import BaseConstruct
 from aws_emr_launch.constructs.emr_constructs import emr_code
 from aws_emr_launch.constructs.iam_roles.emr_roles import EMRRoles
 from aws_emr_launch.constructs.security_groups.emr import EMRSecurityGroups
+from aws_emr_launch.constructs.synth_cache import SynthCache
 
 __all__ = ["EMRRoles"]
 
-SSM_PARAMETER_PREFIX = "/emr_launch/emr_profiles"
+SSM_PARAMETER_PREFIX = runtime.EMR_PROFILES_PREFIX
 
 
 class ReadOnlyEMRProfileError(Exception):
@@ -98,13 +97,9 @@ class EMRProfile(BaseConstruct):
         self._security_configuration: Optional[emr.CfnSecurityConfiguration] = None
         self._security_configuration_name: Optional[str] = None
 
-        self._ssm_parameter = ssm.CfnParameter(
-            self,
-            "SSMParameter",
-            type="String",
-            value=json.dumps(self.to_json()),
-            tier="Intelligent-Tiering",
-            name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{profile_name}",
+        self._parameter_name = f"{SSM_PARAMETER_PREFIX}/{namespace}/{profile_name}"
+        self._content_version: Optional[str] = registry.RegistryConfiguration.of(self).store(
+            self, self._parameter_name, self.to_json()
         )
 
         self._construct_security_configuration()
@@ -202,6 +197,7 @@ class EMRProfile(BaseConstruct):
         self._lake_formation_configuration = property_values.get("LakeFormationConfiguration", None)
         self._security_configuration_name = property_values.get("SecurityConfiguration", None)
         self._description = property_values.get("Description", None)
+        self._content_version = property_values.get(registry.CONTENT_VERSION_KEY, None)
         self._rehydrated = True
         return self
 
@@ -213,7 +209,9 @@ class EMRProfile(BaseConstruct):
             )
             self._security_configuration_name = self._security_configuration.ref
 
-        self._ssm_parameter.value = json.dumps(self.to_json())
+        self._content_version = registry.RegistryConfiguration.of(self).store(
+            self, self._parameter_name, self.to_json()
+        )
 
         if custom_security_configuration is not None:
             self._security_configuration.security_configuration = custom_security_configuration
@@ -271,6 +269,24 @@ class EMRProfile(BaseConstruct):
     def namespace(self) -> str:
         return self._namespace
 
+    @property
+    def content_version(self) -> Optional[str]:
+        return self._content_version
+
+    # Publishes the current value as an immutable version, returning the version. Rehydrated Profiles
+    # are published by the Stack defining them
+    def publish_version(self) -> Optional[str]:
+        if self._rehydrated:
+            return self._content_version
+        self._content_version = registry.RegistryConfiguration.of(self).publish(
+            self, self._parameter_name, self.to_json()
+        )
+        return self._content_version
+
+    @property
+    def rehydrated(self) -> bool:
+        return self._rehydrated
+
     @property
     def mutable_instance_role(self) -> bool:
         return self._mutable_instance_role
@@ -599,39 +615,50 @@ class EMRProfile(BaseConstruct):
 
     @staticmethod
     def get_profiles(
-        namespace: str = "default", next_token: Optional[str] = None, ssm_client: Optional[boto3.client] = None
+        namespace: str = "default",
+        next_token: Optional[str] = None,
+        ssm_client: Optional[boto3.client] = None,
+        max_results: Optional[int] = None,
+        recursive: bool = False,
+        names_only: bool = False,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        params = {"Path": f"{SSM_PARAMETER_PREFIX}/{namespace}/"}
-        if next_token:
-            params["NextToken"] = next_token
-        result = ssm_client.get_parameters_by_path(**params)
+        return runtime.get_profiles(namespace, next_token, ssm_client, max_results, recursive, names_only)
 
-        profiles = {"EMRProfiles": [json.loads(p["Value"]) for p in result["Parameters"]]}
-        if "NextToken" in result:
-            profiles["NextToken"] = result["NextToken"]
-        return profiles
+    @staticmethod
+    def iter_profiles(
+        namespace: str = "default",
+        recursive: bool = False,
+        names_only: bool = False,
+        page_size: int = runtime.MAX_PAGE_SIZE,
+        ssm_client: Optional[boto3.client] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        return runtime.iter_profiles(namespace, recursive, names_only, page_size, ssm_client)
 
     @staticmethod
     def get_profile(
-        profile_name: str, namespace: str = "default", ssm_client: Optional[boto3.client] = None
+        profile_name: str,
+        namespace: str = "default",
+        ssm_client: Optional[boto3.client] = None,
+        version: Optional[str] = None,
+        synth_cache: Optional[SynthCache] = None,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        try:
-            profile_json = ssm_client.get_parameter(Name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{profile_name}")[
-                "Parameter"
-            ]["Value"]
-            return cast(Dict[str, Any], json.loads(profile_json))
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ParameterNotFound":
-                raise EMRProfileNotFoundError()
-            else:
-                raise e
+        stored_value = parameter_store.get_stored_value(
+            f"{SSM_PARAMETER_PREFIX}/{namespace}/{profile_name}", ssm_client, version, synth_cache
+        )
+        if stored_value is None:
+            raise EMRProfileNotFoundError()
+        return stored_value
 
     @staticmethod
     def from_stored_profile(
-        scope: constructs.Construct, id: str, profile_name: str, namespace: str = "default"
+        scope: constructs.Construct,
+        id: str,
+        profile_name: str,
+        namespace: str = "default",
+        version: Optional[str] = None,
     ) -> "EMRProfile":
-        stored_profile = EMRProfile.get_profile(profile_name, namespace)
+        stored_profile = EMRProfile.get_profile(
+            profile_name, namespace, version=version, synth_cache=SynthCache.of(scope)
+        )
         profile = EMRProfile(scope, id, profile_name=None)  # type: ignore
         return profile.from_json(stored_profile)
@@ -1,6 +1,10 @@
 import os
 
 LAMBDA_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../lambda_sources/"))
+# The emr_config_utils package, deployed in the EMRConfigUtilsLayer
+EMR_CONFIG_UTILS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../emr_config_utils/")
+)
 
 
 def _lambda_path(path: str) -> str:
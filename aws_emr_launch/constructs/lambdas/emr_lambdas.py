@@ -1,16 +1,36 @@
-from typing import cast
+import json
+import os
+import shutil
+from typing import Any, List, Optional, cast
 
 import aws_cdk
+import jsii
 from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda
-from aws_cdk.aws_lambda_python_alpha import PythonLayerVersion
 
 import constructs
 from aws_emr_launch import __product__, __version__
+from aws_emr_launch.constructs.admission import AdmissionPolicy
 from aws_emr_launch.constructs.base import BaseBuilder
 from aws_emr_launch.constructs.iam_roles import emr_roles
-from aws_emr_launch.constructs.lambdas import _lambda_path
+from aws_emr_launch.constructs.lambdas import EMR_CONFIG_UTILS_DIR, _lambda_path
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
+from aws_emr_launch.constructs.parameter_store import ParameterStorage
+from aws_emr_launch.constructs.registry import RegistryConfiguration
+from aws_emr_launch.constructs.tables import emr_tables
+
+# Idle pooled Clusters are terminated within this interval of their idle timeout
+CLUSTER_POOL_REAPER_INTERVAL = aws_cdk.Duration.minutes(5)
+
+# Queued launches are also dispatched on this interval, as launch rate tokens and startup timeouts accrue
+LAUNCH_ADMISSION_DISPATCH_INTERVAL = aws_cdk.Duration.minutes(1)
+
+# The scheduled dispatch sends the heartbeats of queued launches, which fail after this heartbeat timeout
+# without one, or after the admission timeout in the queue
+LAUNCH_ADMISSION_HEARTBEAT_TIMEOUT = aws_cdk.Duration.minutes(10)
+LAUNCH_ADMISSION_TIMEOUT = aws_cdk.Duration.hours(6)
 
 
 class FailIfClusterRunningBuilder(BaseBuilder):
@@ -28,13 +48,14 @@ class FailIfClusterRunningBuilder(BaseBuilder):
                 "FailIfClusterRunning",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
                 environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
                 initial_policy=[
                     iam.PolicyStatement(
-                        effect=iam.Effect.ALLOW, actions=["elasticmapreduce:ListClusters"], resources=["*"]
+                        effect=iam.Effect.ALLOW,
+                        actions=["elasticmapreduce:ListClusters", "elasticmapreduce:DescribeCluster"],
+                        resources=["*"],
                     )
                 ],
             )
@@ -42,6 +63,25 @@ class FailIfClusterRunningBuilder(BaseBuilder):
         return cast(aws_lambda.Function, lambda_function)
 
 
+# The Profile and Configuration parameters, including their published versions
+def _configuration_parameter_arns(
+    stack: aws_cdk.Stack,
+    profile_namespace: str,
+    profile_name: str,
+    configuration_namespace: str,
+    configuration_name: str,
+) -> List[str]:
+    names = [
+        f"cluster_configurations/{configuration_namespace}/{configuration_name}",
+        f"cluster_configuration_versions/{configuration_namespace}/{configuration_name}/*",
+        f"emr_profiles/{profile_namespace}/{profile_name}",
+        f"emr_profile_versions/{profile_namespace}/{profile_name}/*",
+    ]
+    return [
+        stack.format_arn(partition=stack.partition, service="ssm", resource=f"parameter/emr_launch/{n}") for n in names
+    ]
+
+
 class LoadClusterConfigurationBuilder(BaseBuilder):
     @staticmethod
     def build(
@@ -61,30 +101,64 @@ class LoadClusterConfigurationBuilder(BaseBuilder):
             "LoadClusterConfiguration",
             code=code,
             handler="lambda_source.handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **LambdaRuntimeProfile.of(scope).function_props(),
             layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
                     effect=iam.Effect.ALLOW,
-                    actions=["ssm:GetParameter"],
-                    resources=[
-                        stack.format_arn(
-                            partition=stack.partition,
-                            service="ssm",
-                            resource="parameter/emr_launch/cluster_configurations/"
-                            f"{configuration_namespace}/{configuration_name}",
-                        ),
-                        stack.format_arn(
-                            partition=stack.partition,
-                            service="ssm",
-                            resource="parameter/emr_launch/emr_profiles/" f"{profile_namespace}/{profile_name}",
-                        ),
-                    ],
+                    actions=["ssm:GetParameters"],
+                    resources=_configuration_parameter_arns(
+                        stack, profile_namespace, profile_name, configuration_namespace, configuration_name
+                    ),
                 )
             ],
         )
+        ParameterStorage.of(scope).grant_read(lambda_function)
+        RegistryConfiguration.of(scope).configure_function(lambda_function)
+        BaseBuilder.tag_construct(lambda_function)
+        return lambda_function
+
+
+class PrepareClusterLaunchBuilder(BaseBuilder):
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        profile_namespace: str,
+        profile_name: str,
+        configuration_namespace: str,
+        configuration_name: str,
+    ) -> aws_lambda.Function:
+        code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/prepare_cluster_launch"))
+        stack = aws_cdk.Stack.of(scope)
+
+        layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+
+        lambda_function = aws_lambda.Function(
+            scope,
+            "PrepareClusterLaunch",
+            code=code,
+            handler="lambda_source.handler",
+            **LambdaRuntimeProfile.of(scope).function_props(),
+            layers=[layer],
+            environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
+            initial_policy=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameters"],
+                    resources=_configuration_parameter_arns(
+                        stack, profile_namespace, profile_name, configuration_namespace, configuration_name
+                    ),
+                ),
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["elasticmapreduce:ListClusters", "elasticmapreduce:DescribeCluster"],
+                    resources=["*"],
+                ),
+            ],
+        )
+        ParameterStorage.of(scope).grant_read(lambda_function)
+        RegistryConfiguration.of(scope).configure_function(lambda_function)
         BaseBuilder.tag_construct(lambda_function)
         return lambda_function
 
@@ -104,8 +178,7 @@ class OverrideClusterConfigsBuilder(BaseBuilder):
                 "OverrideClusterConfigs",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
                 environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             )
@@ -128,8 +201,7 @@ class UpdateClusterTagsBuilder(BaseBuilder):
                 "UpdateClusterTags",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
                 environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             )
@@ -152,8 +224,7 @@ class ParseJsonStringBuilder(BaseBuilder):
                 "ParseJsonString",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
                 environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             )
@@ -176,8 +247,7 @@ class OverrideStepArgsBuilder(BaseBuilder):
                 "OverrideStepArgs",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
                 environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             )
@@ -185,15 +255,24 @@ class OverrideStepArgsBuilder(BaseBuilder):
         return cast(aws_lambda.Function, lambda_function)
 
 
+class _SecretCacheTtl(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, ttl_seconds: int) -> None:
+        super().__init__(scope, id)
+        self.ttl_seconds = ttl_seconds
+
+
 class RunJobFlowBuilder(BaseBuilder):
     @staticmethod
     def get_or_build(
-        scope: constructs.Construct, roles: emr_roles.EMRRoles, event_rule: events.Rule
+        scope: constructs.Construct,
+        roles: emr_roles.EMRRoles,
+        secret_cache_ttl: Optional[aws_cdk.Duration] = None,
     ) -> aws_lambda.Function:
         code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/run_job_flow"))
         stack = aws_cdk.Stack.of(scope)
 
         layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+        pending_launches_table = emr_tables.PendingLaunchesTableBuilder.get_or_build(scope)
 
         lambda_function = stack.node.try_find_child("RunJobFlow")
         if lambda_function is None:
@@ -202,10 +281,13 @@ class RunJobFlowBuilder(BaseBuilder):
                 "RunJobFlow",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
-                environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
+                environment={
+                    "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                    "AWS_EMR_LAUNCH_VERSION": __version__,
+                    "PENDING_LAUNCHES_TABLE": pending_launches_table.table_name,
+                },
                 initial_policy=[
                     iam.PolicyStatement(
                         effect=iam.Effect.ALLOW, actions=["elasticmapreduce:RunJobFlow"], resources=["*"]
@@ -220,24 +302,34 @@ class RunJobFlowBuilder(BaseBuilder):
                         ],
                     ),
                     iam.PolicyStatement(effect=iam.Effect.ALLOW, actions=["states:SendTaskSuccess"], resources=["*"]),
-                    iam.PolicyStatement(
-                        effect=iam.Effect.ALLOW,
-                        actions=["events:EnableRule", "events:PutTargets"],
-                        resources=[event_rule.rule_arn],
-                    ),
                 ],
             )
+            pending_launches_table.grant_read_write_data(lambda_function)
             BaseBuilder.tag_construct(lambda_function)
-        return cast(aws_lambda.Function, lambda_function)
+
+        run_job_flow = cast(aws_lambda.Function, lambda_function)
+        if secret_cache_ttl is not None:
+            # The RunJobFlow Lambda is shared by the Stack, so its launches must agree on the secret cache TTL
+            ttl_seconds = int(secret_cache_ttl.to_seconds())
+            secret_cache = cast(Optional[_SecretCacheTtl], run_job_flow.node.try_find_child("SecretCacheTtl"))
+            if secret_cache is None:
+                _SecretCacheTtl(run_job_flow, "SecretCacheTtl", ttl_seconds)
+                run_job_flow.add_environment("SECRET_CACHE_TTL_SECONDS", str(ttl_seconds))
+            elif secret_cache.ttl_seconds != ttl_seconds:
+                raise ValueError(
+                    f"The secret_cache_ttl of the RunJobFlow Lambda is already {secret_cache.ttl_seconds} seconds"
+                )
+        return run_job_flow
 
 
 class CheckClusterStatusBuilder(BaseBuilder):
     @staticmethod
-    def get_or_build(scope: constructs.Construct, event_rule: events.Rule) -> aws_lambda.Function:
+    def get_or_build(scope: constructs.Construct) -> aws_lambda.Function:
         code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/check_cluster_status"))
         stack = aws_cdk.Stack.of(scope)
 
         layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+        pending_launches_table = emr_tables.PendingLaunchesTableBuilder.get_or_build(scope)
 
         lambda_function = stack.node.try_find_child("CheckClusterStatus")
         if lambda_function is None:
@@ -246,10 +338,13 @@ class CheckClusterStatusBuilder(BaseBuilder):
                 "CheckClusterStatus",
                 code=code,
                 handler="lambda_source.handler",
-                runtime=aws_lambda.Runtime.PYTHON_3_7,
-                timeout=aws_cdk.Duration.minutes(1),
+                **LambdaRuntimeProfile.of(scope).function_props(),
                 layers=[layer],
-                environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
+                environment={
+                    "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                    "AWS_EMR_LAUNCH_VERSION": __version__,
+                    "PENDING_LAUNCHES_TABLE": pending_launches_table.table_name,
+                },
                 initial_policy=[
                     iam.PolicyStatement(
                         effect=iam.Effect.ALLOW,
@@ -257,40 +352,212 @@ class CheckClusterStatusBuilder(BaseBuilder):
                         resources=["*"],
                     ),
                     iam.PolicyStatement(
-                        effect=iam.Effect.ALLOW, actions=["elasticmapreduce:DescribeCluster"], resources=["*"]
+                        effect=iam.Effect.ALLOW,
+                        actions=["elasticmapreduce:DescribeCluster", "elasticmapreduce:ListClusters"],
+                        resources=["*"],
                     ),
+                ],
+            )
+            pending_launches_table.grant_read_write_data(lambda_function)
+            BaseBuilder.tag_construct(lambda_function)
+
+        return cast(aws_lambda.Function, lambda_function)
+
+
+class ClusterPoolBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> aws_lambda.Function:
+        code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/cluster_pool"))
+        stack = aws_cdk.Stack.of(scope)
+
+        layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+        cluster_pool_table = emr_tables.ClusterPoolTableBuilder.get_or_build(scope)
+
+        lambda_function = stack.node.try_find_child("ClusterPool")
+        if lambda_function is None:
+            lambda_function = aws_lambda.Function(
+                stack,
+                "ClusterPool",
+                code=code,
+                handler="lambda_source.handler",
+                **LambdaRuntimeProfile.of(scope).function_props(),
+                layers=[layer],
+                environment={
+                    "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                    "AWS_EMR_LAUNCH_VERSION": __version__,
+                    "CLUSTER_POOL_TABLE": cluster_pool_table.table_name,
+                },
+                initial_policy=[
                     iam.PolicyStatement(
                         effect=iam.Effect.ALLOW,
-                        actions=["events:ListTargetsByRule", "events:DisableRule", "events:RemoveTargets"],
-                        resources=[event_rule.rule_arn],
+                        actions=[
+                            "elasticmapreduce:DescribeCluster",
+                            "elasticmapreduce:TerminateJobFlows",
+                            "elasticmapreduce:AddTags",
+                            "elasticmapreduce:RemoveTags",
+                        ],
+                        resources=["*"],
+                    ),
+                ],
+            )
+            cluster_pool_table.grant_read_write_data(lambda_function)
+            BaseBuilder.tag_construct(lambda_function)
+
+            # Idle Clusters are terminated by a scheduled sweep of the ClusterPoolTable
+            reaper_rule = events.Rule(
+                stack, "ClusterPoolReaperRule", schedule=events.Schedule.rate(CLUSTER_POOL_REAPER_INTERVAL)
+            )
+            reaper_rule.add_target(
+                events_targets.LambdaFunction(
+                    lambda_function, event=events.RuleTargetInput.from_object({"Action": "Reap"})
+                )
+            )
+            BaseBuilder.tag_construct(reaper_rule)
+        return cast(aws_lambda.Function, lambda_function)
+
+
+class AdmissionControlBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> aws_lambda.Function:
+        code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/admission_control"))
+        stack = aws_cdk.Stack.of(scope)
+
+        layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+        admission_table = emr_tables.LaunchAdmissionTableBuilder.get_or_build(scope)
+
+        lambda_function = stack.node.try_find_child("AdmissionControl")
+        if lambda_function is None:
+            lambda_function = aws_lambda.Function(
+                stack,
+                "AdmissionControl",
+                code=code,
+                handler="lambda_source.handler",
+                **LambdaRuntimeProfile.of(scope).function_props(),
+                layers=[layer],
+                environment={
+                    "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                    "AWS_EMR_LAUNCH_VERSION": __version__,
+                    "LAUNCH_ADMISSION_TABLE": admission_table.table_name,
+                    "ADMISSION_POLICY": json.dumps(AdmissionPolicy.of(scope).configuration()),
+                },
+                initial_policy=[
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=["states:SendTaskSuccess", "states:SendTaskHeartbeat", "states:SendTaskFailure"],
+                        resources=["*"],
+                    ),
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=["ec2:DescribeInstanceTypes"],
+                        resources=["*"],
                     ),
                 ],
             )
+            admission_table.grant_read_write_data(lambda_function)
             BaseBuilder.tag_construct(lambda_function)
-            lambda_function.add_permission(
-                "EventRulePermission",
-                principal=iam.ServicePrincipal("events.amazonaws.com"),
-                action="lambda:InvokeFunction",
-                source_arn=event_rule.rule_arn,
+
+            dispatch_rule = events.Rule(
+                stack,
+                "LaunchAdmissionDispatchRule",
+                schedule=events.Schedule.rate(LAUNCH_ADMISSION_DISPATCH_INTERVAL),
             )
+            dispatch_rule.add_target(
+                events_targets.LambdaFunction(
+                    lambda_function, event=events.RuleTargetInput.from_object({"Action": "Dispatch"})
+                )
+            )
+            BaseBuilder.tag_construct(dispatch_rule)
+        return cast(aws_lambda.Function, lambda_function)
+
+
+class IdempotencyBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> aws_lambda.Function:
+        code = aws_lambda.Code.from_asset(_lambda_path("emr_utilities/idempotency"))
+        stack = aws_cdk.Stack.of(scope)
+
+        layer = EMRConfigUtilsLayerBuilder.get_or_build(scope)
+        idempotency_table = emr_tables.IdempotencyTableBuilder.get_or_build(scope)
 
+        lambda_function = stack.node.try_find_child("Idempotency")
+        if lambda_function is None:
+            lambda_function = aws_lambda.Function(
+                stack,
+                "Idempotency",
+                code=code,
+                handler="lambda_source.handler",
+                **LambdaRuntimeProfile.of(scope).function_props(),
+                layers=[layer],
+                environment={
+                    "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                    "AWS_EMR_LAUNCH_VERSION": __version__,
+                    "IDEMPOTENCY_TABLE": idempotency_table.table_name,
+                },
+                initial_policy=[
+                    # A key claimed by a stopped execution is claimed again
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=["states:DescribeExecution"],
+                        resources=["*"],
+                    ),
+                ],
+            )
+            idempotency_table.grant_read_write_data(lambda_function)
+            BaseBuilder.tag_construct(lambda_function)
         return cast(aws_lambda.Function, lambda_function)
 
 
+# Python layers are extracted to /opt, with /opt/python on the path
+LAYER_PACKAGE_PATH = "python/emr_config_utils"
+
+
+# Bundles the layer without Docker by copying the package
+@jsii.implements(aws_cdk.ILocalBundling)
+class _LayerPackageBundling:
+    def try_bundle(self, output_dir: str, *, image: aws_cdk.DockerImage, **kwargs: Any) -> bool:
+        shutil.copytree(
+            EMR_CONFIG_UTILS_DIR,
+            os.path.join(output_dir, LAYER_PACKAGE_PATH),
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        return True
+
+
 class EMRConfigUtilsLayerBuilder(BaseBuilder):
     @staticmethod
-    def get_or_build(scope: constructs.Construct) -> aws_lambda.LayerVersion:
+    def get_or_build(scope: constructs.Construct) -> aws_lambda.ILayerVersion:
         stack = aws_cdk.Stack.of(scope)
+        profile = LambdaRuntimeProfile.of(scope)
 
         layer = stack.node.try_find_child("EMRConfigUtilsLayer")
         if layer is None:
-            layer = PythonLayerVersion(
+            if profile.emr_config_utils_layer_arn is not None:
+                return aws_lambda.LayerVersion.from_layer_version_arn(
+                    stack, "EMRConfigUtilsLayer", profile.emr_config_utils_layer_arn
+                )
+
+            # The layer only contains the emr_config_utils package, boto3 is provided by the Lambda runtime
+            layer = aws_lambda.LayerVersion(
                 stack,
                 "EMRConfigUtilsLayer",
                 layer_version_name="EMRLaunch_EMRUtilities_EMRConfigUtilsLayer",
-                compatible_runtimes=[aws_lambda.Runtime.PYTHON_3_7],
                 description="EMR configuration utility functions",
-                entry=_lambda_path("layers/emr_config_utils"),
+                code=aws_lambda.Code.from_asset(
+                    EMR_CONFIG_UTILS_DIR,
+                    exclude=["__pycache__"],
+                    bundling=aws_cdk.BundlingOptions(
+                        image=profile.runtime.bundling_image,
+                        command=[
+                            "bash",
+                            "-c",
+                            f"mkdir -p /asset-output/{LAYER_PACKAGE_PATH} && "
+                            f"cp -r /asset-input/. /asset-output/{LAYER_PACKAGE_PATH} && "
+                            "find /asset-output -name __pycache__ -prune -exec rm -rf {} +",
+                        ],
+                        local=_LayerPackageBundling(),
+                    ),
+                ),
+                **profile.layer_props(),
             )
             BaseBuilder.tag_construct(layer)
-        return cast(aws_lambda.LayerVersion, layer)
+        return cast(aws_lambda.ILayerVersion, layer)
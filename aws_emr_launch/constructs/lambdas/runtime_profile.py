@@ -0,0 +1,98 @@
+from typing import Any, Dict, Optional, cast
+
+import aws_cdk
+from aws_cdk import aws_lambda
+
+import constructs
+
+
+class LambdaRuntimeProfileError(Exception):
+    pass
+
+
+class LambdaRuntimeProfile:
+    def __init__(
+        self,
+        *,
+        runtime: aws_lambda.Runtime = aws_lambda.Runtime.PYTHON_3_7,
+        architecture: Optional[aws_lambda.Architecture] = None,
+        memory_size: Optional[int] = None,
+        ephemeral_storage_size: Optional[aws_cdk.Size] = None,
+        timeout: aws_cdk.Duration = aws_cdk.Duration.minutes(1),
+        emr_config_utils_layer_arn: Optional[str] = None,
+    ) -> None:
+        if runtime.family != aws_lambda.RuntimeFamily.PYTHON:
+            raise LambdaRuntimeProfileError(f"The EMR Launch Lambda Functions require a Python runtime: {runtime.name}")
+
+        self._runtime = runtime
+        self._architecture = architecture
+        self._memory_size = memory_size
+        self._ephemeral_storage_size = ephemeral_storage_size
+        self._timeout = timeout
+        self._emr_config_utils_layer_arn = emr_config_utils_layer_arn
+
+    @property
+    def runtime(self) -> aws_lambda.Runtime:
+        return self._runtime
+
+    @property
+    def architecture(self) -> Optional[aws_lambda.Architecture]:
+        return self._architecture
+
+    @property
+    def memory_size(self) -> Optional[int]:
+        return self._memory_size
+
+    @property
+    def ephemeral_storage_size(self) -> Optional[aws_cdk.Size]:
+        return self._ephemeral_storage_size
+
+    @property
+    def timeout(self) -> aws_cdk.Duration:
+        return self._timeout
+
+    # An existing EMRConfigUtilsLayer version shared by Stacks, rather than one built in every Stack
+    @property
+    def emr_config_utils_layer_arn(self) -> Optional[str]:
+        return self._emr_config_utils_layer_arn
+
+    # Keyword arguments for aws_lambda.Function
+    def function_props(self) -> Dict[str, Any]:
+        return {
+            "runtime": self._runtime,
+            "architecture": self._architecture,
+            "memory_size": self._memory_size,
+            "ephemeral_storage_size": self._ephemeral_storage_size,
+            "timeout": self._timeout,
+        }
+
+    # Keyword arguments for aws_lambda.LayerVersion
+    def layer_props(self) -> Dict[str, Any]:
+        return {
+            "compatible_runtimes": [self._runtime],
+            "compatible_architectures": [self._architecture] if self._architecture else None,
+        }
+
+    def apply_to(self, scope: constructs.Construct) -> None:
+        stack = aws_cdk.Stack.of(scope)
+        if stack.node.try_find_child("LambdaRuntimeProfile") is not None:
+            raise LambdaRuntimeProfileError(
+                f"The LambdaRuntimeProfile of Stack {stack.stack_name} must be applied once, "
+                "before any EMR Launch Lambda Functions are built"
+            )
+        _LambdaRuntimeProfileConstruct(stack, "LambdaRuntimeProfile", self)
+
+    @staticmethod
+    def of(scope: constructs.Construct) -> "LambdaRuntimeProfile":
+        stack = aws_cdk.Stack.of(scope)
+        profile_construct = stack.node.try_find_child("LambdaRuntimeProfile")
+        if profile_construct is None:
+            # Pin the default so a profile applied later can't leave the Stack's Functions inconsistent
+            profile_construct = _LambdaRuntimeProfileConstruct(stack, "LambdaRuntimeProfile", LambdaRuntimeProfile())
+        return cast(_LambdaRuntimeProfileConstruct, profile_construct).profile
+
+
+class _LambdaRuntimeProfileConstruct(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, profile: LambdaRuntimeProfile) -> None:
+        super().__init__(scope, id)
+        self.profile = profile
@@ -1,5 +1,8 @@
+import copy
+from enum import Enum
 from typing import Any, Dict, List, Optional
 
+import aws_cdk
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_secretsmanager as secretsmanager
 
@@ -7,6 +10,91 @@ import constructs
 from aws_emr_launch.constructs.emr_constructs import emr_code
 from aws_emr_launch.constructs.emr_constructs.cluster_configuration import ClusterConfiguration, InstanceMarketType
 
+DEFAULT_EBS_CONFIGURATION = {
+    "EbsBlockDeviceConfigs": [{"VolumeSpecification": {"SizeInGB": 500, "VolumeType": "st1"}, "VolumesPerInstance": 1}],
+    "EbsOptimized": True,
+}
+
+# Fleets with a Spot allocation strategy accept up to 30 instance types, others up to 5
+MAX_INSTANCE_TYPES = 5
+MAX_ALLOCATION_STRATEGY_INSTANCE_TYPES = 30
+
+# Spot capacity not provisioned within this long falls back to the spot_timeout_action
+DEFAULT_SPOT_TIMEOUT = aws_cdk.Duration.minutes(20)
+
+
+class SpotAllocationStrategy(Enum):
+    CAPACITY_OPTIMIZED = "capacity-optimized"
+    PRICE_CAPACITY_OPTIMIZED = "price-capacity-optimized"
+    CAPACITY_OPTIMIZED_PRIORITIZED = "capacity-optimized-prioritized"
+    LOWEST_PRICE = "lowest-price"
+    DIVERSIFIED = "diversified"
+
+
+class SpotTimeoutAction(Enum):
+    SWITCH_TO_ON_DEMAND = "SWITCH_TO_ON_DEMAND"
+    TERMINATE_CLUSTER = "TERMINATE_CLUSTER"
+
+
+class FleetInstanceType:
+    def __init__(
+        self,
+        instance_type: str,
+        *,
+        weighted_capacity: Optional[int] = None,
+        bid_price_as_percentage_of_on_demand_price: Optional[float] = None,
+        ebs_configuration: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if weighted_capacity is not None and weighted_capacity < 1:
+            raise ValueError("The weighted_capacity must be at least 1")
+        if bid_price_as_percentage_of_on_demand_price is not None and not (
+            0 < bid_price_as_percentage_of_on_demand_price <= 100
+        ):
+            raise ValueError("The bid_price_as_percentage_of_on_demand_price must be greater than 0 and at most 100")
+
+        self._instance_type = instance_type
+        self._weighted_capacity = weighted_capacity
+        self._bid_price_as_percentage_of_on_demand_price = bid_price_as_percentage_of_on_demand_price
+        self._ebs_configuration = ebs_configuration if ebs_configuration is not None else DEFAULT_EBS_CONFIGURATION
+
+    @property
+    def instance_type(self) -> str:
+        return self._instance_type
+
+    @property
+    def weighted_capacity(self) -> Optional[int]:
+        return self._weighted_capacity
+
+    @property
+    def bid_price_as_percentage_of_on_demand_price(self) -> Optional[float]:
+        return self._bid_price_as_percentage_of_on_demand_price
+
+    @property
+    def ebs_configuration(self) -> Dict[str, Any]:
+        return self._ebs_configuration
+
+    def configuration(self) -> Dict[str, Any]:
+        config: Dict[str, Any] = {
+            "InstanceType": self._instance_type,
+            "EbsConfiguration": copy.deepcopy(self._ebs_configuration),
+        }
+        if self._weighted_capacity is not None:
+            config["WeightedCapacity"] = self._weighted_capacity
+        if self._bid_price_as_percentage_of_on_demand_price is not None:
+            config["BidPriceAsPercentageOfOnDemandPrice"] = self._bid_price_as_percentage_of_on_demand_price
+        return config
+
+
+def _instance_type_configs(
+    fleet_name: str, instance_types: List[FleetInstanceType], spot_allocation_strategy: Optional[SpotAllocationStrategy]
+) -> List[Dict[str, Any]]:
+    max_instance_types = (
+        MAX_INSTANCE_TYPES if spot_allocation_strategy is None else MAX_ALLOCATION_STRATEGY_INSTANCE_TYPES
+    )
+    if not 0 < len(instance_types) <= max_instance_types:
+        raise ValueError(f"The {fleet_name} fleet must have 1 to {max_instance_types} instance types")
+    return [t.configuration() for t in instance_types]
+
 
 class InstanceFleetConfiguration(ClusterConfiguration):
     def __init__(
@@ -23,6 +111,13 @@ class InstanceFleetConfiguration(ClusterConfiguration):
         core_instance_type: str = "m5.xlarge",
         core_instance_on_demand_count: int = 2,
         core_instance_spot_count: int = 0,
+        core_instance_types: Optional[List[FleetInstanceType]] = None,
+        task_instance_types: Optional[List[FleetInstanceType]] = None,
+        task_instance_on_demand_count: int = 0,
+        task_instance_spot_count: int = 0,
+        spot_allocation_strategy: Optional[SpotAllocationStrategy] = None,
+        spot_timeout: Optional[aws_cdk.Duration] = None,
+        spot_timeout_action: SpotTimeoutAction = SpotTimeoutAction.SWITCH_TO_ON_DEMAND,
         applications: Optional[List[str]] = None,
         bootstrap_actions: Optional[List[emr_code.EMRBootstrapAction]] = None,
         configurations: Optional[List[Dict[str, Any]]] = None,
@@ -47,42 +142,53 @@ class InstanceFleetConfiguration(ClusterConfiguration):
             secret_configurations=secret_configurations,
         )
 
+        if core_instance_types is None:
+            core_instance_types = [FleetInstanceType(core_instance_type)]
+
         config = self.config
         config["Instances"]["Ec2SubnetIds"] = [s.subnet_id for s in subnets]
         config["Instances"]["InstanceFleets"] = [
             {
                 "Name": "Master",
                 "InstanceFleetType": "MASTER",
-                "InstanceTypeConfigs": [
-                    {
-                        "InstanceType": master_instance_type,
-                        "EbsConfiguration": {
-                            "EbsBlockDeviceConfigs": [
-                                {"VolumeSpecification": {"SizeInGB": 500, "VolumeType": "st1"}, "VolumesPerInstance": 1}
-                            ],
-                            "EbsOptimized": True,
-                        },
-                    }
-                ],
+                "InstanceTypeConfigs": [FleetInstanceType(master_instance_type).configuration()],
             },
             {
                 "Name": "Core",
                 "InstanceFleetType": "CORE",
                 "TargetOnDemandCapacity": core_instance_on_demand_count,
                 "TargetSpotCapacity": core_instance_spot_count,
-                "InstanceTypeConfigs": [
-                    {
-                        "InstanceType": core_instance_type,
-                        "EbsConfiguration": {
-                            "EbsBlockDeviceConfigs": [
-                                {"VolumeSpecification": {"SizeInGB": 500, "VolumeType": "st1"}, "VolumesPerInstance": 1}
-                            ],
-                            "EbsOptimized": True,
-                        },
-                    }
-                ],
+                "InstanceTypeConfigs": _instance_type_configs("Core", core_instance_types, spot_allocation_strategy),
             },
         ]
+        if task_instance_types is not None:
+            config["Instances"]["InstanceFleets"].append(
+                {
+                    "Name": "Task",
+                    "InstanceFleetType": "TASK",
+                    "TargetOnDemandCapacity": task_instance_on_demand_count,
+                    "TargetSpotCapacity": task_instance_spot_count,
+                    "InstanceTypeConfigs": _instance_type_configs(
+                        "Task", task_instance_types, spot_allocation_strategy
+                    ),
+                }
+            )
+
+        # Spot capacity not provisioned within the spot_timeout falls back to On-Demand (by default)
+        # rather than stalling the launch
+        spot_specification: Optional[Dict[str, Any]] = None
+        if spot_allocation_strategy is not None or spot_timeout is not None:
+            spot_timeout_minutes = (spot_timeout or DEFAULT_SPOT_TIMEOUT).to_minutes()
+            if not 5 <= spot_timeout_minutes <= 1440:
+                raise ValueError("The spot_timeout must be between 5 minutes and 24 hours")
+            spot_specification = {
+                "TimeoutDurationMinutes": spot_timeout_minutes,
+                "TimeoutAction": spot_timeout_action.value,
+            }
+            if spot_allocation_strategy is not None:
+                spot_specification["AllocationStrategy"] = spot_allocation_strategy.value
+            for fleet in config["Instances"]["InstanceFleets"][1:]:
+                fleet["LaunchSpecifications"] = {"SpotSpecification": copy.deepcopy(spot_specification)}
 
         if master_instance_market == InstanceMarketType.ON_DEMAND:
             config["Instances"]["InstanceFleets"][0]["TargetOnDemandCapacity"] = 1
@@ -97,7 +203,7 @@ class InstanceFleetConfiguration(ClusterConfiguration):
                 },
                 "CoreInstanceType": {
                     "JsonPath": "Instances.InstanceFleets.1.InstanceTypeConfigs.0.InstanceType",
-                    "Default": core_instance_type,
+                    "Default": core_instance_types[0].instance_type,
                 },
                 "CoreInstanceOnDemandCount": {
                     "JsonPath": "Instances.InstanceFleets.1.TargetOnDemandCapacity",
@@ -110,6 +216,40 @@ class InstanceFleetConfiguration(ClusterConfiguration):
             }
         )
 
+        # Overrides of the weighted instance types, and of the fleets and launch specifications that are configured
+        fleet_indexes = {"Core": 1, "Task": 2} if task_instance_types is not None else {"Core": 1}
+        for fleet_name, index in fleet_indexes.items():
+            fleet = config["Instances"]["InstanceFleets"][index]
+            self.override_interfaces["default"][f"{fleet_name}InstanceTypeConfigs"] = {
+                "JsonPath": f"Instances.InstanceFleets.{index}.InstanceTypeConfigs",
+                "Default": copy.deepcopy(fleet["InstanceTypeConfigs"]),
+            }
+            if fleet_name == "Task":
+                self.override_interfaces["default"].update(
+                    {
+                        "TaskInstanceOnDemandCount": {
+                            "JsonPath": "Instances.InstanceFleets.2.TargetOnDemandCapacity",
+                            "Default": task_instance_on_demand_count,
+                        },
+                        "TaskInstanceSpotCount": {
+                            "JsonPath": "Instances.InstanceFleets.2.TargetSpotCapacity",
+                            "Default": task_instance_spot_count,
+                        },
+                    }
+                )
+            if spot_specification is not None:
+                spot_path = f"Instances.InstanceFleets.{index}.LaunchSpecifications.SpotSpecification"
+                for key, name in [
+                    ("AllocationStrategy", "SpotAllocationStrategy"),
+                    ("TimeoutDurationMinutes", "SpotTimeoutMinutes"),
+                    ("TimeoutAction", "SpotTimeoutAction"),
+                ]:
+                    if key in spot_specification:
+                        self.override_interfaces["default"][f"{fleet_name}{name}"] = {
+                            "JsonPath": f"{spot_path}.{key}",
+                            "Default": spot_specification[key],
+                        }
+
         self.update_config(config)
 
 
@@ -128,6 +268,13 @@ class ManagedScalingConfiguration(InstanceFleetConfiguration):
         core_instance_type: str = "m5.xlarge",
         core_instance_on_demand_count: int = 2,
         core_instance_spot_count: int = 0,
+        core_instance_types: Optional[List[FleetInstanceType]] = None,
+        task_instance_types: Optional[List[FleetInstanceType]] = None,
+        task_instance_on_demand_count: int = 0,
+        task_instance_spot_count: int = 0,
+        spot_allocation_strategy: Optional[SpotAllocationStrategy] = None,
+        spot_timeout: Optional[aws_cdk.Duration] = None,
+        spot_timeout_action: SpotTimeoutAction = SpotTimeoutAction.SWITCH_TO_ON_DEMAND,
         applications: Optional[List[str]] = None,
         bootstrap_actions: Optional[List[emr_code.EMRBootstrapAction]] = None,
         configurations: Optional[List[Dict[str, Any]]] = None,
@@ -151,6 +298,13 @@ class ManagedScalingConfiguration(InstanceFleetConfiguration):
             core_instance_type=core_instance_type,
             core_instance_on_demand_count=core_instance_on_demand_count,
             core_instance_spot_count=core_instance_spot_count,
+            core_instance_types=core_instance_types,
+            task_instance_types=task_instance_types,
+            task_instance_on_demand_count=task_instance_on_demand_count,
+            task_instance_spot_count=task_instance_spot_count,
+            spot_allocation_strategy=spot_allocation_strategy,
+            spot_timeout=spot_timeout,
+            spot_timeout_action=spot_timeout_action,
             applications=applications,
             bootstrap_actions=bootstrap_actions,
             configurations=configurations,
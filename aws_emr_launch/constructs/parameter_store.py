@@ -0,0 +1,151 @@
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Dict, Optional, cast
+
+import aws_cdk
+import boto3
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_s3_deployment as s3_deployment
+from aws_cdk import aws_ssm as ssm
+
+import constructs
+from aws_emr_launch import runtime
+from aws_emr_launch.emr_config_utils.registry import version_name
+
+# The stored value codec and the registry reads are implemented in the CDK-free aws_emr_launch.runtime
+from aws_emr_launch.runtime import GZIP_MAGIC as GZIP_MAGIC  # noqa: F401
+from aws_emr_launch.runtime import MAX_PAGE_SIZE as MAX_PAGE_SIZE  # noqa: F401
+from aws_emr_launch.runtime import STORAGE_FORMAT_KEY as STORAGE_FORMAT_KEY  # noqa: F401
+from aws_emr_launch.runtime import StoredValueError as StoredValueError  # noqa: F401
+from aws_emr_launch.runtime import compress_value as compress_value  # noqa: F401
+from aws_emr_launch.runtime import decode_stored_value as decode_stored_value  # noqa: F401
+from aws_emr_launch.runtime import get_parameter_values as get_parameter_values  # noqa: F401
+from aws_emr_launch.runtime import get_registry as get_registry  # noqa: F401
+from aws_emr_launch.runtime import iter_parameter_values as iter_parameter_values  # noqa: F401
+from aws_emr_launch.runtime import parameter_item as parameter_item  # noqa: F401
+from aws_emr_launch.runtime import prefetch as prefetch  # noqa: F401
+
+if TYPE_CHECKING:
+    from aws_emr_launch.constructs.synth_cache import SynthCache
+
+# Intelligent-Tiering Parameters are Standard up to 4 KB and Advanced up to 8 KB
+STANDARD_TIER_MAX_SIZE = 4096
+ADVANCED_TIER_MAX_SIZE = 8192
+
+
+class ParameterStorageError(Exception):
+    pass
+
+
+def get_stored_value(
+    name: str,
+    ssm_client: Optional[boto3.client] = None,
+    version: Optional[str] = None,
+    synth_cache: Optional["SynthCache"] = None,
+) -> Optional[Dict[str, Any]]:
+    if synth_cache is not None:
+        return synth_cache.lookup(name if version is None else version_name(name, version))
+    return runtime.get_stored_value(name, ssm_client, version)
+
+
+class ParameterStorage:
+    def __init__(
+        self,
+        *,
+        compression_threshold: Optional[int] = None,
+        offload_bucket: Optional[s3.IBucket] = None,
+        offload_prefix: str = "emr_launch/",
+    ) -> None:
+        self._compression_threshold = compression_threshold
+        self._offload_bucket = offload_bucket
+        self._offload_prefix = offload_prefix
+
+    @property
+    def compression_threshold(self) -> Optional[int]:
+        return self._compression_threshold
+
+    @property
+    def offload_bucket(self) -> Optional[s3.IBucket]:
+        return self._offload_bucket
+
+    @property
+    def offload_prefix(self) -> str:
+        return self._offload_prefix
+
+    def stored_value(self, parameter: ssm.CfnParameter, value: Dict[str, Any]) -> str:
+        stored_value = self.encode(cast(constructs.Construct, parameter.node.scope), cast(str, parameter.name), value)
+        self.add_dependency(parameter)
+        return stored_value
+
+    # Encodes the value stored in the Parameter name by a resource of the scope
+    def encode(self, scope: constructs.Construct, name: str, value: Dict[str, Any]) -> str:
+        value_json = json.dumps(value)
+        stored_value = value_json
+        # Compression is opt-in, and values with deploy-time Tokens (e.g. Bucket names) can't be compressed at synth
+        # time
+        if (
+            self._compression_threshold is not None
+            and len(value_json) > self._compression_threshold
+            and not aws_cdk.Token.is_unresolved(value_json)
+        ):
+            stored_value = compress_value(value_json)
+
+        if len(stored_value) <= ADVANCED_TIER_MAX_SIZE or self._offload_bucket is None:
+            return stored_value
+        return self._offload(scope, name, value, value_json)
+
+    # Readers must never see a pointer to an object that is not deployed yet
+    def add_dependency(self, resource: constructs.Construct) -> None:
+        deployment = cast(constructs.Construct, resource.node.scope).node.try_find_child("StoredValue")
+        if deployment is not None:
+            resource.node.add_dependency(deployment)
+
+    def _offload(self, scope: constructs.Construct, name: str, value: Dict[str, Any], value_json: str) -> str:
+        bucket = cast(s3.IBucket, self._offload_bucket)
+
+        # Keys are content addressed, so a Parameter never points to an object that is later overwritten
+        digest = hashlib.sha256(value_json.encode("utf-8")).hexdigest()
+        key = f"{self._offload_prefix}{name.lstrip('/')}/{digest}.json"
+        source = s3_deployment.Source.json_data(key, value)
+
+        deployment = scope.node.try_find_child("StoredValue")
+        if deployment is None:
+            s3_deployment.BucketDeployment(
+                scope, "StoredValue", sources=[source], destination_bucket=bucket, prune=False
+            )
+        else:
+            cast(s3_deployment.BucketDeployment, deployment).add_source(source)
+
+        return json.dumps({STORAGE_FORMAT_KEY: "s3", "Bucket": bucket.bucket_name, "Key": key})
+
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        if self._offload_bucket is not None:
+            self._offload_bucket.grant_read(grantee, f"{self._offload_prefix}*")
+
+    def apply_to(self, scope: constructs.Construct) -> None:
+        stack = aws_cdk.Stack.of(scope)
+        if stack.node.try_find_child("ParameterStorage") is not None:
+            raise ParameterStorageError(
+                f"The ParameterStorage of Stack {stack.stack_name} must be applied once, "
+                "before any EMR Launch Parameters are stored"
+            )
+        _ParameterStorageConstruct(stack, "ParameterStorage", self)
+
+    @staticmethod
+    def of(scope: constructs.Construct) -> "ParameterStorage":
+        stack = aws_cdk.Stack.of(scope)
+        storage_construct = stack.node.try_find_child("ParameterStorage")
+        if storage_construct is None:
+            storage_construct = _ParameterStorageConstruct(stack, "ParameterStorage", ParameterStorage())
+        return cast(_ParameterStorageConstruct, storage_construct).storage
+
+
+class _ParameterStorageConstruct(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, storage: ParameterStorage) -> None:
+        super().__init__(scope, id)
+        self.storage = storage
+
+
+def set_stored_value(parameter: ssm.CfnParameter, value: Dict[str, Any]) -> None:
+    parameter.value = ParameterStorage.of(parameter).stored_value(parameter, value)
@@ -0,0 +1,377 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, cast
+
+import aws_cdk
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_ssm as ssm
+from aws_cdk import custom_resources
+
+import constructs
+from aws_emr_launch.constructs import parameter_store
+from aws_emr_launch.constructs.lambdas import _lambda_path
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
+from aws_emr_launch.emr_config_utils import registry as runtime
+
+# The runtime Registry (shared with the Lambda Functions through the EMRConfigUtilsLayer)
+Registry = runtime.Registry
+ParameterNotFoundError = runtime.ParameterNotFoundError
+REGISTRY_CONFIGURATION_ENV = runtime.REGISTRY_CONFIGURATION_ENV
+version_name = runtime.version_name
+
+# Stored values record the version they were published as
+CONTENT_VERSION_KEY = "ContentVersion"
+CONTENT_VERSION_LENGTH = 16
+
+
+class RegistryConfigurationError(Exception):
+    pass
+
+
+def content_version(scope: constructs.Construct, value: Dict[str, Any]) -> str:
+    # Deploy-time values are hashed as the CloudFormation expressions they resolve to
+    resolved = aws_cdk.Stack.of(scope).resolve(value)
+    digest = hashlib.sha256(json.dumps(resolved, sort_keys=True).encode("utf-8")).hexdigest()
+    return digest[:CONTENT_VERSION_LENGTH]
+
+
+def _has_intrinsics(resolved: Any) -> bool:
+    if isinstance(resolved, dict):
+        if any(k == "Ref" or k.startswith("Fn::") for k in resolved):
+            return True
+        return any(_has_intrinsics(v) for v in resolved.values())
+    if isinstance(resolved, list):
+        return any(_has_intrinsics(v) for v in resolved)
+    return False
+
+
+# The version a value is published as. Values with deploy-time values are hashed once they are resolved, so a
+# replaced resource the value references is published as a new version rather than under an existing one
+def published_version(scope: constructs.Construct, value: Dict[str, Any]) -> str:
+    if not _has_intrinsics(aws_cdk.Stack.of(scope).resolve(value)):
+        return content_version(scope, value)
+    return _ContentVersion.of(scope, value)
+
+
+class _ContentVersion(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, value: Dict[str, Any], fingerprint: str) -> None:
+        super().__init__(scope, id)
+        stack = aws_cdk.Stack.of(scope)
+        provider = cast(Optional[custom_resources.Provider], stack.node.try_find_child("ContentVersionProvider"))
+        if provider is None:
+            function = aws_lambda.Function(
+                stack,
+                "ContentVersion",
+                code=aws_lambda.Code.from_asset(_lambda_path("emr_utilities/content_version")),
+                handler="lambda_source.handler",
+                **LambdaRuntimeProfile.of(scope).function_props(),
+            )
+            provider = custom_resources.Provider(stack, "ContentVersionProvider", on_event_handler=function)
+
+        resource = aws_cdk.CustomResource(
+            self,
+            "Resource",
+            service_token=provider.service_token,
+            resource_type="Custom::ContentVersion",
+            properties={"Value": stack.to_json_string(value)},
+        )
+        self.fingerprint = fingerprint
+        self.version = resource.get_att_string("Version")
+
+    # The version of the value, shared by the calls for the same value so a pinned version can be compared
+    @staticmethod
+    def of(scope: constructs.Construct, value: Dict[str, Any]) -> str:
+        fingerprint = content_version(scope, value)
+        existing = cast(Optional[_ContentVersion], scope.node.try_find_child("ContentVersion"))
+        if existing is not None and existing.fingerprint == fingerprint:
+            return existing.version
+        scope.node.try_remove_child("ContentVersion")
+        return _ContentVersion(scope, "ContentVersion", value, fingerprint).version
+
+
+class RegistryBackend(ABC):
+    _item_id = "RegistryItem"
+
+    @abstractmethod
+    def configuration(self) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def _put(
+        self, scope: constructs.Construct, id: str, name: str, value: Dict[str, Any], retain: bool
+    ) -> constructs.Construct: ...
+
+    # Stores the value under the name, replacing the value stored by an earlier call for the same scope
+    def store(self, scope: constructs.Construct, name: str, value: Dict[str, Any]) -> constructs.Construct:
+        return self._put(scope, self._item_id, name, value, False)
+
+    # Publishes an immutable version, which is retained when a later deployment publishes another.
+    # Publishing a version that already exists fails the deployment
+    def publish(self, scope: constructs.Construct, name: str, value: Dict[str, Any]) -> constructs.Construct:
+        return self._put(scope, f"{self._item_id}Version", name, value, True)
+
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        pass
+
+
+class SSMRegistryBackend(RegistryBackend):
+    _item_id = "SSMParameter"
+
+    def configuration(self) -> Dict[str, Any]:
+        return {"Backend": "ssm"}
+
+    def _put(
+        self, scope: constructs.Construct, id: str, name: str, value: Dict[str, Any], retain: bool
+    ) -> constructs.Construct:
+        if retain:
+            # An existing version is never overwritten
+            scope.node.try_remove_child(id)
+            storage = parameter_store.ParameterStorage.of(scope)
+            put_call = custom_resources.AwsSdkCall(
+                service="SSM",
+                action="putParameter",
+                parameters={
+                    "Name": name,
+                    "Value": storage.encode(scope, name, value),
+                    "Type": "String",
+                    "Tier": "Intelligent-Tiering",
+                    "Overwrite": False,
+                },
+                physical_resource_id=custom_resources.PhysicalResourceId.of(name),
+            )
+            version = custom_resources.AwsCustomResource(
+                scope,
+                id,
+                on_create=put_call,
+                on_update=put_call,
+                policy=custom_resources.AwsCustomResourcePolicy.from_sdk_calls(
+                    resources=[
+                        aws_cdk.Stack.of(scope).format_arn(
+                            service="ssm", resource="parameter", resource_name=name.lstrip("/")
+                        )
+                    ]
+                ),
+                install_latest_aws_sdk=False,
+            )
+            storage.add_dependency(version)
+            return version
+
+        parameter = cast(Optional[ssm.CfnParameter], scope.node.try_find_child(id))
+        if parameter is None:
+            parameter = ssm.CfnParameter(
+                scope, id, type="String", value=json.dumps(value), tier="Intelligent-Tiering", name=name
+            )
+        parameter.name = name
+        parameter_store.set_stored_value(parameter, value)
+        return parameter
+
+
+class _CustomResourceRegistryBackend(RegistryBackend):
+    # Items are written with an AwsCustomResource, which is replaced whenever the value is updated
+    @abstractmethod
+    def _calls(self, name: str, value_json: str, exclusive: bool) -> List[custom_resources.AwsSdkCall]: ...
+
+    @abstractmethod
+    def _resources(self) -> List[str]: ...
+
+    def _put(
+        self, scope: constructs.Construct, id: str, name: str, value: Dict[str, Any], retain: bool
+    ) -> constructs.Construct:
+        scope.node.try_remove_child(id)
+        put_call, delete_call = self._calls(name, json.dumps(value), retain)
+        return custom_resources.AwsCustomResource(
+            scope,
+            id,
+            on_create=put_call,
+            on_update=put_call,
+            on_delete=None if retain else delete_call,
+            policy=custom_resources.AwsCustomResourcePolicy.from_sdk_calls(resources=self._resources()),
+            install_latest_aws_sdk=False,
+        )
+
+
+class DynamoDBRegistryBackend(_CustomResourceRegistryBackend):
+    def __init__(self, table: dynamodb.ITable) -> None:
+        self._table = table
+
+    @property
+    def table(self) -> dynamodb.ITable:
+        return self._table
+
+    @staticmethod
+    def build_table(scope: constructs.Construct, id: str) -> dynamodb.Table:
+        return dynamodb.Table(
+            scope,
+            id,
+            partition_key=dynamodb.Attribute(name="Kind", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="Name", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+        )
+
+    def configuration(self) -> Dict[str, Any]:
+        return {"Backend": "dynamodb", "TableName": self._table.table_name}
+
+    def _calls(self, name: str, value_json: str, exclusive: bool) -> List[custom_resources.AwsSdkCall]:
+        key = runtime.DynamoDBBackend.key(name)
+        return [
+            custom_resources.AwsSdkCall(
+                service="DynamoDB",
+                action="updateItem",
+                parameters={
+                    "TableName": self._table.table_name,
+                    "Key": key,
+                    "UpdateExpression": "SET #value = :value ADD #version :one",
+                    "ExpressionAttributeNames": {"#value": "Value", "#version": "Version"},
+                    "ExpressionAttributeValues": {":value": {"S": value_json}, ":one": {"N": "1"}},
+                    **({"ConditionExpression": "attribute_not_exists(#value)"} if exclusive else {}),
+                },
+                physical_resource_id=custom_resources.PhysicalResourceId.of(name),
+            ),
+            custom_resources.AwsSdkCall(
+                service="DynamoDB",
+                action="deleteItem",
+                parameters={"TableName": self._table.table_name, "Key": key},
+            ),
+        ]
+
+    def _resources(self) -> List[str]:
+        return [self._table.table_arn]
+
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        self._table.grant_read_data(grantee)
+
+
+class S3RegistryBackend(_CustomResourceRegistryBackend):
+    def __init__(self, bucket: s3.IBucket, prefix: str = "emr_launch/") -> None:
+        self._bucket = bucket
+        self._prefix = prefix
+
+    @property
+    def bucket(self) -> s3.IBucket:
+        return self._bucket
+
+    @property
+    def prefix(self) -> str:
+        return self._prefix
+
+    def configuration(self) -> Dict[str, Any]:
+        return {"Backend": "s3", "Bucket": self._bucket.bucket_name, "Prefix": self._prefix}
+
+    def _calls(self, name: str, value_json: str, exclusive: bool) -> List[custom_resources.AwsSdkCall]:
+        key = runtime.S3Backend("", self._prefix).key(name)
+        return [
+            custom_resources.AwsSdkCall(
+                service="S3",
+                action="putObject",
+                parameters={
+                    "Bucket": self._bucket.bucket_name,
+                    "Key": key,
+                    "Body": value_json,
+                    "ContentType": "application/json",
+                    **({"IfNoneMatch": "*"} if exclusive else {}),
+                },
+                physical_resource_id=custom_resources.PhysicalResourceId.of(name),
+            ),
+            custom_resources.AwsSdkCall(
+                service="S3", action="deleteObject", parameters={"Bucket": self._bucket.bucket_name, "Key": key}
+            ),
+        ]
+
+    def _resources(self) -> List[str]:
+        return [self._bucket.arn_for_objects(f"{self._prefix}*")]
+
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        self._bucket.grant_read(grantee, f"{self._prefix}*")
+
+
+class RegistryConfiguration:
+    def __init__(
+        self,
+        *,
+        default: Optional[RegistryBackend] = None,
+        namespaces: Optional[Dict[str, RegistryBackend]] = None,
+    ) -> None:
+        self._default = SSMRegistryBackend() if default is None else default
+        self._namespaces = namespaces if namespaces else {}
+
+    @property
+    def default(self) -> RegistryBackend:
+        return self._default
+
+    @property
+    def namespaces(self) -> Dict[str, RegistryBackend]:
+        return self._namespaces
+
+    def backend(self, namespace: str) -> RegistryBackend:
+        return self._namespaces.get(namespace, self._default)
+
+    def _backends(self) -> List[RegistryBackend]:
+        return list(dict.fromkeys([self._default] + list(self._namespaces.values())))
+
+    def is_default(self) -> bool:
+        return isinstance(self._default, SSMRegistryBackend) and not self._namespaces
+
+    # The value of the AWS_EMR_LAUNCH_REGISTRY environment variable read by Registry.from_environment()
+    def configuration(self) -> Dict[str, Any]:
+        return {
+            "Default": self._default.configuration(),
+            "Namespaces": {k: v.configuration() for k, v in self._namespaces.items()},
+        }
+
+    # Stores the value, returning its version
+    def store(self, scope: constructs.Construct, name: str, value: Dict[str, Any]) -> str:
+        _, namespace, _ = runtime.split_name(name)
+        version = content_version(scope, value)
+        self.backend(namespace).store(scope, name, dict(value, **{CONTENT_VERSION_KEY: version}))
+        return version
+
+    # Publishes the value as an immutable version, returning the version. The stored value records the version,
+    # which is pinned by the Stacks rehydrating it
+    def publish(self, scope: constructs.Construct, name: str, value: Dict[str, Any]) -> str:
+        _, namespace, _ = runtime.split_name(name)
+        version = published_version(scope, value)
+        backend = self.backend(namespace)
+        backend.publish(scope, runtime.version_name(name, version), dict(value, **{CONTENT_VERSION_KEY: version}))
+        backend.store(scope, name, dict(value, **{CONTENT_VERSION_KEY: version}))
+        return version
+
+    def grant_read(self, grantee: iam.IGrantable) -> None:
+        for backend in self._backends():
+            backend.grant_read(grantee)
+
+    # Configures a Lambda Function reading the registry with Registry.from_environment()
+    def configure_function(self, function: aws_lambda.Function) -> None:
+        if self.is_default():
+            return
+        function.add_environment(
+            REGISTRY_CONFIGURATION_ENV, aws_cdk.Stack.of(function).to_json_string(self.configuration())
+        )
+        self.grant_read(function)
+
+    def apply_to(self, scope: constructs.Construct) -> None:
+        stack = aws_cdk.Stack.of(scope)
+        if stack.node.try_find_child("RegistryConfiguration") is not None:
+            raise RegistryConfigurationError(
+                f"The RegistryConfiguration of Stack {stack.stack_name} must be applied once, "
+                "before any EMR Launch constructs are added"
+            )
+        _RegistryConfigurationConstruct(stack, "RegistryConfiguration", self)
+
+    @staticmethod
+    def of(scope: constructs.Construct) -> "RegistryConfiguration":
+        stack = aws_cdk.Stack.of(scope)
+        configuration_construct = stack.node.try_find_child("RegistryConfiguration")
+        if configuration_construct is None:
+            configuration_construct = _RegistryConfigurationConstruct(
+                stack, "RegistryConfiguration", RegistryConfiguration()
+            )
+        return cast(_RegistryConfigurationConstruct, configuration_construct).configuration
+
+
+class _RegistryConfigurationConstruct(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str, configuration: RegistryConfiguration) -> None:
+        super().__init__(scope, id)
+        self.configuration = configuration
@@ -1,29 +1,84 @@
-import json
-from typing import Any, Dict, List, Optional, Union, cast
+import copy
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import aws_cdk
 import boto3
+import jsii
 from aws_cdk import aws_lambda
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_sns as sns
-from aws_cdk import aws_ssm as ssm
 from aws_cdk import aws_stepfunctions as sfn
-from botocore.exceptions import ClientError
+from aws_cdk import aws_stepfunctions_tasks as sfn_tasks
 from logzero import logger
 
 import constructs
-from aws_emr_launch import __product__, __version__, boto3_client
+from aws_emr_launch import __product__, __version__, runtime
+from aws_emr_launch.constructs import parameter_store, registry
 from aws_emr_launch.constructs.base import BaseConstruct
 from aws_emr_launch.constructs.emr_constructs import cluster_configuration, emr_profile
 from aws_emr_launch.constructs.step_functions import emr_chains, emr_tasks
+from aws_emr_launch.constructs.synth_cache import SynthCache
+from aws_emr_launch.emr_config_utils.cluster_requests import build_cluster_request
+from aws_emr_launch.emr_config_utils.idempotency import LAUNCH_NOT_RECORDED_ERROR
 
-SSM_PARAMETER_PREFIX = "/emr_launch/emr_launch_functions"
+SSM_PARAMETER_PREFIX = runtime.EMR_LAUNCH_FUNCTIONS_PREFIX
+
+# Pooled Clusters are terminated after staying idle in the pool for this long
+DEFAULT_CLUSTER_POOL_IDLE_TIMEOUT = aws_cdk.Duration.minutes(30)
+# Leased pooled Clusters that are never released are terminated after this long
+DEFAULT_CLUSTER_POOL_LEASE_TIMEOUT = aws_cdk.Duration.hours(24)
+
+# Launches repeating an IdempotencyKey within this long return the Cluster of the first launch
+DEFAULT_IDEMPOTENCY_WINDOW = aws_cdk.Duration.hours(24)
+# How often a launch repeating the IdempotencyKey of a launch in progress checks its result
+IDEMPOTENCY_POLL_INTERVAL = aws_cdk.Duration.seconds(30)
 
 
 class EMRLaunchFunctionNotFoundError(Exception):
     pass
 
 
+@jsii.implements(constructs.IValidation)
+class _PinnedVersionsValidation:
+    def __init__(self, launch_function: "EMRLaunchFunction", profile: bool, configuration: bool) -> None:
+        self._launch_function = launch_function
+        self._profile = profile
+        self._configuration = configuration
+
+    # Pins taken from the EMRProfile and ClusterConfiguration must still match them when the App is synthesized
+    def validate(self) -> List[str]:
+        errors = []
+        launch_function = self._launch_function
+        if self._profile and launch_function.emr_profile_version != launch_function.emr_profile.content_version:
+            errors.append(
+                f"EMRProfile {launch_function.emr_profile.profile_name} was modified after it was pinned "
+                f"by EMRLaunchFunction {launch_function.launch_function_name}"
+            )
+        if (
+            self._configuration
+            and launch_function.cluster_configuration_version != launch_function.cluster_configuration.content_version
+        ):
+            errors.append(
+                f"ClusterConfiguration {launch_function.cluster_configuration.configuration_name} was modified "
+                f"after it was pinned by EMRLaunchFunction {launch_function.launch_function_name}"
+            )
+        return errors
+
+
+@jsii.implements(aws_cdk.IStableStringProducer)
+class _ClusterRequestProducer:
+    def __init__(self, launch_function: "EMRLaunchFunction", key: Optional[str] = None) -> None:
+        self._launch_function = launch_function
+        self._key = key
+
+    # The request is built when the App is synthesized, after any later changes to the Profile and Configuration
+    def produce(self) -> Optional[str]:
+        cluster_request = self._launch_function.cluster_request()
+        return aws_cdk.Stack.of(self._launch_function).to_json_string(
+            cluster_request if self._key is None else cluster_request[self._key]
+        )
+
+
 class EMRLaunchFunction(BaseConstruct):
     def __init__(
         self,
@@ -36,6 +91,7 @@ class EMRLaunchFunction(BaseConstruct):
         cluster_name: str,
         namespace: str = "default",
         default_fail_if_cluster_running: bool = False,
+        fail_if_cluster_running_window: Optional[aws_cdk.Duration] = None,
         success_topic: Optional[sns.ITopic] = None,
         failure_topic: Optional[sns.ITopic] = None,
         override_cluster_configs_lambda: Optional[aws_lambda.IFunction] = None,
@@ -43,12 +99,38 @@ class EMRLaunchFunction(BaseConstruct):
         description: Optional[str] = None,
         cluster_tags: Union[List[aws_cdk.Tag], Dict[str, str], None] = None,
         wait_for_cluster_start: bool = True,
+        use_cluster_state_change_events: bool = False,
+        secret_cache_ttl: Optional[aws_cdk.Duration] = None,
+        use_prepare_cluster_launch: bool = False,
+        pin_versions: bool = False,
+        emr_profile_version: Optional[str] = None,
+        cluster_configuration_version: Optional[str] = None,
+        inline_configuration: bool = False,
+        use_cluster_pool: bool = False,
+        cluster_pool_idle_timeout: Optional[aws_cdk.Duration] = None,
+        cluster_pool_lease_timeout: Optional[aws_cdk.Duration] = None,
+        use_admission_control: bool = False,
+        launch_priority: int = 0,
+        use_idempotency_keys: bool = False,
+        idempotency_window: Optional[aws_cdk.Duration] = None,
     ) -> None:
         super().__init__(scope, id)
 
         if launch_function_name is None:
             return
 
+        if use_prepare_cluster_launch and override_cluster_configs_lambda is not None:
+            raise ValueError("override_cluster_configs_lambda is not supported with use_prepare_cluster_launch")
+        # Rehydrated Profiles and Configurations are only known at launch time
+        if inline_configuration and (emr_profile.rehydrated or cluster_configuration.rehydrated):
+            raise ValueError("inline_configuration is not supported with rehydrated Profiles and Configurations")
+        # Pooled Clusters share the Name of the launch, and would always be found running
+        if use_cluster_pool and default_fail_if_cluster_running:
+            raise ValueError("default_fail_if_cluster_running is not supported with use_cluster_pool")
+        # Admitted launches count against the limits until the Cluster started, so the launch must wait for it
+        if use_admission_control and not wait_for_cluster_start:
+            raise ValueError("use_admission_control requires wait_for_cluster_start")
+
         self._launch_function_name = launch_function_name
         self._namespace = namespace
         self._emr_profile = emr_profile
@@ -60,6 +142,30 @@ class EMRLaunchFunction(BaseConstruct):
         self._override_cluster_configs_lambda = override_cluster_configs_lambda
         self._description = description
         self._wait_for_cluster_start = wait_for_cluster_start
+        self._cluster_pool_idle_timeout = (
+            (cluster_pool_idle_timeout or DEFAULT_CLUSTER_POOL_IDLE_TIMEOUT) if use_cluster_pool else None
+        )
+        self._cluster_pool_lease_timeout = (
+            (cluster_pool_lease_timeout or DEFAULT_CLUSTER_POOL_LEASE_TIMEOUT) if use_cluster_pool else None
+        )
+        self._launch_priority = launch_priority if use_admission_control else None
+        self._idempotency_window = (
+            (idempotency_window or DEFAULT_IDEMPOTENCY_WINDOW) if use_idempotency_keys else None
+        )
+        self._inline_configuration = inline_configuration
+
+        # Pinned versions are loaded instead of the latest EMRProfile and ClusterConfiguration,
+        # so rolling back is a matter of pinning an earlier version. Versions are only published when pinned
+        self._emr_profile_version = emr_profile_version
+        self._cluster_configuration_version = cluster_configuration_version
+        if pin_versions:
+            self.node.add_validation(
+                _PinnedVersionsValidation(self, emr_profile_version is None, cluster_configuration_version is None)
+            )
+            self._emr_profile_version = emr_profile_version or emr_profile.publish_version()
+            self._cluster_configuration_version = (
+                cluster_configuration_version or cluster_configuration.publish_version()
+            )
 
         if allowed_cluster_config_overrides is None:
             self._allowed_cluster_config_overrides = cluster_configuration.override_interfaces.get("default", None)
@@ -105,53 +211,106 @@ class EMRLaunchFunction(BaseConstruct):
             cause='See Execution Event "FailStateEntered" for complete error cause',
         )
 
-        # Create Task for loading the cluster configuration from Parameter Store
-        load_cluster_configuration = emr_tasks.LoadClusterConfigurationBuilder.build(
-            self,
-            "LoadClusterConfigurationTask",
-            cluster_name=cluster_name,
-            cluster_tags=self._cluster_tags,
-            profile_namespace=emr_profile.namespace,
-            profile_name=emr_profile.profile_name,
-            configuration_namespace=cluster_configuration.namespace,
-            configuration_name=cluster_configuration.configuration_name,
-            result_path="$.ClusterConfiguration",
-        )
-        load_cluster_configuration.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+        if use_prepare_cluster_launch:
+            # Create a single Task to load the cluster configuration, apply the overrides,
+            # conditionally fail if the cluster is running, and update the cluster tags
+            prepare_cluster_launch = emr_tasks.PrepareClusterLaunchBuilder.build(
+                self,
+                "PrepareClusterLaunchTask",
+                cluster_name=cluster_name,
+                cluster_tags=self._cluster_tags,
+                profile_namespace=emr_profile.namespace,
+                profile_name=emr_profile.profile_name,
+                configuration_namespace=cluster_configuration.namespace,
+                configuration_name=cluster_configuration.configuration_name,
+                profile_version=self._emr_profile_version,
+                configuration_version=self._cluster_configuration_version,
+                cluster_request=(
+                    aws_cdk.Lazy.string(_ClusterRequestProducer(self)) if self._inline_configuration else None
+                ),
+                default_fail_if_cluster_running=default_fail_if_cluster_running,
+                fail_if_cluster_running_window=fail_if_cluster_running_window,
+                use_cluster_pool=use_cluster_pool,
+                allowed_cluster_config_overrides=self._allowed_cluster_config_overrides,
+                result_path="$.ClusterConfiguration",
+            )
+            # Attach an error catch to the Task
+            prepare_cluster_launch.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
 
-        # Create Task for overriding cluster configurations
-        override_cluster_configs = emr_tasks.OverrideClusterConfigsBuilder.build(
-            self,
-            "OverrideClusterConfigsTask",
-            override_cluster_configs_lambda=override_cluster_configs_lambda,
-            allowed_cluster_config_overrides=self._allowed_cluster_config_overrides,
-            input_path="$.ClusterConfiguration.Cluster",
-            result_path="$.ClusterConfiguration.Cluster",
-        )
-        # Attach an error catch to the Task
-        override_cluster_configs.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+            prepare_chain = sfn.Chain.start(prepare_cluster_launch)
+        else:
+            load_cluster_configuration: sfn.IChainable
+            if self._inline_configuration:
+                # Embed the cluster configuration in the State Machine, rather than loading it at launch time
+                load_cluster_configuration = emr_tasks.InlineClusterConfigurationBuilder.build(
+                    self,
+                    "InlineClusterConfiguration",
+                    cluster_request={
+                        k: aws_cdk.Lazy.string(_ClusterRequestProducer(self, k))
+                        for k in ["Cluster", "SecretConfigurations", "KerberosAttributesSecret"]
+                    },
+                    result_path="$.ClusterConfiguration",
+                )
+            else:
+                # Create Task for loading the cluster configuration from Parameter Store
+                load_cluster_configuration_task = emr_tasks.LoadClusterConfigurationBuilder.build(
+                    self,
+                    "LoadClusterConfigurationTask",
+                    cluster_name=cluster_name,
+                    cluster_tags=self._cluster_tags,
+                    profile_namespace=emr_profile.namespace,
+                    profile_name=emr_profile.profile_name,
+                    configuration_namespace=cluster_configuration.namespace,
+                    configuration_name=cluster_configuration.configuration_name,
+                    profile_version=self._emr_profile_version,
+                    configuration_version=self._cluster_configuration_version,
+                    result_path="$.ClusterConfiguration",
+                )
+                load_cluster_configuration_task.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+                load_cluster_configuration = load_cluster_configuration_task
+
+            # Create Task for overriding cluster configurations
+            override_cluster_configs = emr_tasks.OverrideClusterConfigsBuilder.build(
+                self,
+                "OverrideClusterConfigsTask",
+                override_cluster_configs_lambda=override_cluster_configs_lambda,
+                allowed_cluster_config_overrides=self._allowed_cluster_config_overrides,
+                input_path="$.ClusterConfiguration.Cluster",
+                result_path="$.ClusterConfiguration.Cluster",
+            )
+            # Attach an error catch to the Task
+            override_cluster_configs.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
 
-        # Create Task to conditionally fail if a cluster with this name is already
-        # running, based on user input
-        fail_if_cluster_running = emr_tasks.FailIfClusterRunningBuilder.build(
-            self,
-            "FailIfClusterRunningTask",
-            default_fail_if_cluster_running=default_fail_if_cluster_running,
-            input_path="$.ClusterConfiguration.Cluster",
-            result_path="$.ClusterConfiguration.Cluster",
-        )
-        # Attach an error catch to the task
-        fail_if_cluster_running.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+            # Create Task to conditionally fail if a cluster with this name is already
+            # running, based on user input
+            fail_if_cluster_running = emr_tasks.FailIfClusterRunningBuilder.build(
+                self,
+                "FailIfClusterRunningTask",
+                default_fail_if_cluster_running=default_fail_if_cluster_running,
+                fail_if_cluster_running_window=fail_if_cluster_running_window,
+                use_cluster_pool=use_cluster_pool,
+                input_path="$.ClusterConfiguration.Cluster",
+                result_path="$.ClusterConfiguration.Cluster",
+            )
+            # Attach an error catch to the task
+            fail_if_cluster_running.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
 
-        # Create a Task for updating the cluster tags at runtime
-        update_cluster_tags = emr_tasks.UpdateClusterTagsBuilder.build(
-            self,
-            "UpdateClusterTagsTask",
-            input_path="$.ClusterConfiguration.Cluster",
-            result_path="$.ClusterConfiguration.Cluster",
-        )
-        # Attach an error catch to the Task
-        update_cluster_tags.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+            # Create a Task for updating the cluster tags at runtime
+            update_cluster_tags = emr_tasks.UpdateClusterTagsBuilder.build(
+                self,
+                "UpdateClusterTagsTask",
+                input_path="$.ClusterConfiguration.Cluster",
+                result_path="$.ClusterConfiguration.Cluster",
+            )
+            # Attach an error catch to the Task
+            update_cluster_tags.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+
+            prepare_chain = (
+                sfn.Chain.start(load_cluster_configuration)
+                .next(override_cluster_configs)
+                .next(fail_if_cluster_running)
+                .next(update_cluster_tags)
+            )
 
         # Create a Task to create the cluster
         if cluster_configuration.secret_configurations is None and emr_profile.kerberos_attributes_secret is None:
@@ -164,6 +323,7 @@ class EMRLaunchFunction(BaseConstruct):
                 result_path="$.LaunchClusterResult",
                 wait_for_cluster_start=wait_for_cluster_start,
             )
+            result_shape = "CreateCluster"
         else:
             # Use the RunJobFlow Lambda to create the cluster to avoid exposing the
             # SecretConfigurations and KerberosAttributes values
@@ -176,10 +336,10 @@ class EMRLaunchFunction(BaseConstruct):
                 input_path="$.ClusterConfiguration",
                 result_path="$.LaunchClusterResult",
                 wait_for_cluster_start=wait_for_cluster_start,
+                use_cluster_state_change_events=use_cluster_state_change_events,
+                secret_cache_ttl=secret_cache_ttl,
             )
-
-        # Attach an error catch to the Task
-        create_cluster.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+            result_shape = "DescribeCluster" if wait_for_cluster_start else "RunJobFlow"
 
         success = emr_chains.Success(
             self,
@@ -190,26 +350,166 @@ class EMRLaunchFunction(BaseConstruct):
             output_path="$",
         )
 
-        definition = (
-            sfn.Chain.start(load_cluster_configuration)
-            .next(override_cluster_configs)
-            .next(fail_if_cluster_running)
-            .next(update_cluster_tags)
-            .next(create_cluster)
-            .next(success)
-        )
+        # Launched Clusters are recorded against the IdempotencyKey of the execution input, if any
+        idempotency_key_prefix = f"{namespace}/{launch_function_name}"
+        launch_succeeded: sfn.IChainable = success
+        if self._idempotency_window is not None:
+            record_idempotent_launch = emr_tasks.RecordIdempotentLaunchBuilder.build(
+                self, "RecordIdempotentLaunchTask", key_prefix=idempotency_key_prefix
+            )
+            # The claim stays in place when the launch can't be recorded: later launches with the key fail rather
+            # than launch a second Cluster
+            record_failed: sfn.IChainable = sfn.Fail(
+                self,
+                "Launch Not Recorded",
+                error=LAUNCH_NOT_RECORDED_ERROR,
+                cause="The Cluster was launched but not recorded against the IdempotencyKey",
+            )
+            if failure_topic is not None:
+                record_failed = sfn_tasks.SnsPublish(
+                    self,
+                    "Launch Not Recorded Notification",
+                    result_path="$.PublishResult",
+                    topic=failure_topic,
+                    message=sfn.TaskInput.from_json_path_at("$.Error"),
+                    subject="EMR Launch Function Failure",
+                ).next(record_failed)
+            # Launches whose claim was lost can't be recorded however often they retry
+            record_idempotent_launch.add_retry(errors=[LAUNCH_NOT_RECORDED_ERROR], max_attempts=0)
+            record_idempotent_launch.add_retry(
+                errors=["States.ALL"], interval=aws_cdk.Duration.seconds(2), max_attempts=5, backoff_rate=2
+            )
+            record_idempotent_launch.add_catch(record_failed, errors=["States.ALL"], result_path="$.Error")
+            launch_succeeded = record_idempotent_launch.next(success)
+
+        start_cluster: sfn.IChainable
+        if self._launch_priority is not None:
+            # Wait in the launch admission queue, and free the admission once the Cluster launched or failed
+            admit_cluster_launch = emr_tasks.AdmitClusterLaunchBuilder.build(
+                self,
+                "AdmitClusterLaunchTask",
+                namespace=namespace,
+                priority=self._launch_priority,
+                input_path="$.ClusterConfiguration",
+                result_path="$.LaunchAdmission",
+            )
+            admit_cluster_launch.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+
+            complete_cluster_launch = emr_tasks.CompleteClusterLaunchBuilder.build(self, "CompleteClusterLaunchTask")
+            cluster_launch_failed = (
+                sfn.Choice(self, "Cluster Launch Failed?")
+                .when(sfn.Condition.is_present("$.Error"), fail)
+                .otherwise(launch_succeeded)
+            )
+            complete_cluster_launch.add_catch(
+                cluster_launch_failed, errors=["States.ALL"], result_path=sfn.JsonPath.DISCARD
+            )
+            create_cluster.add_catch(complete_cluster_launch, errors=["States.ALL"], result_path="$.Error")
+            start_cluster = (
+                sfn.Chain.start(admit_cluster_launch)
+                .next(create_cluster)
+                .next(complete_cluster_launch)
+                .next(cluster_launch_failed)
+            )
+        else:
+            # Attach an error catch to the Task
+            create_cluster.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+            start_cluster = create_cluster.next(launch_succeeded)
+
+        definition: sfn.IChainable
+        if self._cluster_pool_idle_timeout is not None:
+            # Lease an idle pooled Cluster launched from the same request, rather than launching a new one
+            acquire_pooled_cluster = emr_tasks.AcquirePooledClusterBuilder.build(
+                self,
+                "AcquirePooledClusterTask",
+                idle_timeout=self._cluster_pool_idle_timeout,
+                lease_timeout=self._cluster_pool_lease_timeout,
+                result_shape=result_shape,
+                input_path="$.ClusterConfiguration",
+                result_path="$.ClusterConfiguration",
+            )
+            acquire_pooled_cluster.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+
+            use_pooled_cluster = sfn.Pass(
+                self,
+                "Use Pooled Cluster",
+                input_path="$.ClusterConfiguration.PooledCluster",
+                result_path="$.LaunchClusterResult",
+            )
+            launch_cluster = (
+                sfn.Choice(self, "Pooled Cluster Leased?")
+                .when(
+                    sfn.Condition.is_present("$.ClusterConfiguration.PooledCluster"),
+                    use_pooled_cluster.next(launch_succeeded),
+                )
+                .otherwise(start_cluster)
+            )
+            definition = prepare_chain.next(acquire_pooled_cluster).next(launch_cluster)
+        else:
+            definition = prepare_chain.next(start_cluster)
+
+        if self._idempotency_window is not None:
+            # A launch repeating an IdempotencyKey returns the Cluster of the first launch, or waits for it
+            claim_idempotency_key = emr_tasks.ClaimIdempotencyKeyBuilder.build(
+                self,
+                "ClaimIdempotencyKeyTask",
+                key_prefix=idempotency_key_prefix,
+                window=self._idempotency_window,
+                result_path="$.Idempotency",
+            )
+            claim_idempotency_key.add_catch(fail, errors=["States.ALL"], result_path="$.Error")
+
+            use_existing_cluster = sfn.Pass(
+                self,
+                "Use Existing Cluster",
+                input_path="$.Idempotency.LaunchClusterResult",
+                result_path="$.LaunchClusterResult",
+            )
+            wait_for_launch = sfn.Wait(
+                self, "Wait For Launch In Progress", time=sfn.WaitTime.duration(IDEMPOTENCY_POLL_INTERVAL)
+            )
+            duplicate_launch = (
+                sfn.Choice(self, "Duplicate Launch?")
+                .when(
+                    sfn.Condition.string_equals("$.Idempotency.Status", "DUPLICATE"),
+                    use_existing_cluster.next(success),
+                )
+                .when(
+                    sfn.Condition.string_equals("$.Idempotency.Status", "IN_PROGRESS"),
+                    wait_for_launch.next(claim_idempotency_key),
+                )
+                .otherwise(definition)
+            )
+            definition = sfn.Chain.start(claim_idempotency_key).next(duplicate_launch)
 
         self._state_machine: sfn.IStateMachine = sfn.StateMachine(
             self, "StateMachine", state_machine_name=f"{namespace}_{launch_function_name}", definition=definition
         )
 
-        self._ssm_parameter = ssm.CfnParameter(
-            self,
-            "SSMParameter",
-            type="String",
-            value=json.dumps(self.to_json()),
-            tier="Intelligent-Tiering",
-            name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{launch_function_name}",
+        self._parameter_name = f"{SSM_PARAMETER_PREFIX}/{namespace}/{launch_function_name}"
+        self._content_version: Optional[str] = registry.RegistryConfiguration.of(self).store(
+            self, self._parameter_name, self.to_json()
+        )
+        if pin_versions:
+            self._content_version = registry.RegistryConfiguration.of(self).publish(
+                self, self._parameter_name, self.to_json()
+            )
+
+    # The RunJobFlow request built by the LoadClusterConfiguration Lambda, from the Profile and Configuration
+    def cluster_request(self) -> Dict[str, Any]:
+        profile = copy.deepcopy(self._emr_profile.to_json())
+        # The Lambda takes the Role names from the stored Role ARNs, which are Tokens here
+        roles = self._emr_profile.roles
+        profile["Roles"] = {
+            "InstanceRole": roles.instance_role.role_name,
+            "ServiceRole": roles.service_role.role_name,
+            "AutoScalingRole": roles.autoscaling_role.role_name,
+        }
+        return build_cluster_request(
+            profile,
+            copy.deepcopy(self._cluster_configuration.to_json()),
+            self._cluster_name,
+            [{"Key": t.key, "Value": t.value} for t in self._cluster_tags],
         )
 
     def to_json(self) -> Dict[str, Any]:
@@ -220,6 +520,8 @@ class EMRLaunchFunction(BaseConstruct):
             "ClusterConfiguration": (
                 f"{self._cluster_configuration.namespace}/{self._cluster_configuration.configuration_name}"
             ),
+            "EMRProfileVersion": self._emr_profile_version,
+            "ClusterConfigurationVersion": self._cluster_configuration_version,
             "ClusterName": self._cluster_name,
             "DefaultFailIfClusterRunning": self._default_fail_if_cluster_running,
             "SuccessTopic": self._success_topic.topic_arn if self._success_topic is not None else None,
@@ -232,19 +534,35 @@ class EMRLaunchFunction(BaseConstruct):
             "Description": self._description,
             "ClusterTags": [{"Key": t.key, "Value": t.value} for t in self._cluster_tags],
             "WaitForClusterStart": self._wait_for_cluster_start,
+            "ClusterPool": {
+                "IdleTimeout": self._cluster_pool_idle_timeout.to_seconds(),
+                "LeaseTimeout": self._cluster_pool_lease_timeout.to_seconds(),
+            }
+            if self._cluster_pool_idle_timeout is not None and self._cluster_pool_lease_timeout is not None
+            else None,
+            "AdmissionControl": {"LaunchPriority": self._launch_priority}
+            if self._launch_priority is not None
+            else None,
+            "Idempotency": {"Window": self._idempotency_window.to_seconds()}
+            if self._idempotency_window is not None
+            else None,
         }
 
     def from_json(self, property_values: Dict[str, Any]) -> "EMRLaunchFunction":
         self._launch_function_name = property_values["LaunchFunctionName"]
         self._namespace = property_values["Namespace"]
 
+        self._emr_profile_version = property_values.get("EMRProfileVersion", None)
+        self._cluster_configuration_version = property_values.get("ClusterConfigurationVersion", None)
+        self._content_version = property_values.get(registry.CONTENT_VERSION_KEY, None)
+
         profile_parts = property_values["EMRProfile"].split("/")
         self._emr_profile = emr_profile.EMRProfile.from_stored_profile(
-            self, "EMRProfile", profile_parts[1], profile_parts[0]
+            self, "EMRProfile", profile_parts[1], profile_parts[0], self._emr_profile_version
         )
         config_parts = property_values["ClusterConfiguration"].split("/")
         self._cluster_configuration = cluster_configuration.ClusterConfiguration.from_stored_configuration(
-            self, "ClusterConfiguration", config_parts[1], config_parts[0]
+            self, "ClusterConfiguration", config_parts[1], config_parts[0], self._cluster_configuration_version
         )
 
         self._cluster_name = property_values["ClusterName"]
@@ -271,6 +589,24 @@ class EMRLaunchFunction(BaseConstruct):
         self._state_machine = sfn.StateMachine.from_state_machine_arn(self, "StateMachine", state_machine)
 
         self._wait_for_cluster_start = property_values.get("WaitForClusterStart", None)
+        cluster_pool = property_values.get("ClusterPool", None)
+        self._cluster_pool_idle_timeout = (
+            aws_cdk.Duration.seconds(cluster_pool["IdleTimeout"]) if cluster_pool is not None else None
+        )
+        self._cluster_pool_lease_timeout = (
+            aws_cdk.Duration.seconds(
+                cluster_pool.get("LeaseTimeout", DEFAULT_CLUSTER_POOL_LEASE_TIMEOUT.to_seconds())
+            )
+            if cluster_pool is not None
+            else None
+        )
+        admission_control = property_values.get("AdmissionControl", None)
+        self._launch_priority = admission_control["LaunchPriority"] if admission_control is not None else None
+        idempotency = property_values.get("Idempotency", None)
+        self._idempotency_window = (
+            aws_cdk.Duration.seconds(idempotency["Window"]) if idempotency is not None else None
+        )
+        self._inline_configuration = False
         return self
 
     @property
@@ -289,6 +625,42 @@ class EMRLaunchFunction(BaseConstruct):
     def cluster_configuration(self) -> cluster_configuration.ClusterConfiguration:
         return self._cluster_configuration
 
+    @property
+    def emr_profile_version(self) -> Optional[str]:
+        return self._emr_profile_version
+
+    @property
+    def cluster_configuration_version(self) -> Optional[str]:
+        return self._cluster_configuration_version
+
+    @property
+    def content_version(self) -> Optional[str]:
+        return self._content_version
+
+    @property
+    def inline_configuration(self) -> bool:
+        return self._inline_configuration
+
+    @property
+    def wait_for_cluster_start(self) -> bool:
+        return self._wait_for_cluster_start
+
+    @property
+    def launch_priority(self) -> Optional[int]:
+        return self._launch_priority
+
+    @property
+    def idempotency_window(self) -> Optional[aws_cdk.Duration]:
+        return self._idempotency_window
+
+    @property
+    def cluster_pool_idle_timeout(self) -> Optional[aws_cdk.Duration]:
+        return self._cluster_pool_idle_timeout
+
+    @property
+    def cluster_pool_lease_timeout(self) -> Optional[aws_cdk.Duration]:
+        return self._cluster_pool_lease_timeout
+
     @property
     def cluster_name(self) -> str:
         return self._cluster_name
@@ -323,40 +695,56 @@ class EMRLaunchFunction(BaseConstruct):
 
     @staticmethod
     def get_functions(
-        namespace: str = "default", next_token: Optional[str] = None, ssm_client: Optional[boto3.client] = None
+        namespace: str = "default",
+        next_token: Optional[str] = None,
+        ssm_client: Optional[boto3.client] = None,
+        max_results: Optional[int] = None,
+        recursive: bool = False,
+        names_only: bool = False,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        params = {"Path": f"{SSM_PARAMETER_PREFIX}/{namespace}/"}
-        if next_token:
-            params["NextToken"] = next_token
-        result = ssm_client.get_parameters_by_path(**params)
+        return runtime.get_functions(namespace, next_token, ssm_client, max_results, recursive, names_only)
 
-        functions = {"EMRLaunchFunctions": [json.loads(p["Value"]) for p in result["Parameters"]]}
-        if "NextToken" in result:
-            functions["NextToken"] = result["NextToken"]
-        return functions
+    @staticmethod
+    def iter_functions(
+        namespace: str = "default",
+        recursive: bool = False,
+        names_only: bool = False,
+        page_size: int = runtime.MAX_PAGE_SIZE,
+        ssm_client: Optional[boto3.client] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        return runtime.iter_functions(namespace, recursive, names_only, page_size, ssm_client)
 
     @staticmethod
     def get_function(
-        launch_function_name: str, namespace: str = "default", ssm_client: Optional[boto3.client] = None
+        launch_function_name: str,
+        namespace: str = "default",
+        ssm_client: Optional[boto3.client] = None,
+        version: Optional[str] = None,
+        synth_cache: Optional[SynthCache] = None,
     ) -> Dict[str, Any]:
-        ssm_client = boto3_client("ssm") if ssm_client is None else ssm_client
-        try:
-            function_json = ssm_client.get_parameter(Name=f"{SSM_PARAMETER_PREFIX}/{namespace}/{launch_function_name}")[
-                "Parameter"
-            ]["Value"]
-            return cast(Dict[str, Any], json.loads(function_json))
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ParameterNotFound":
-                raise EMRLaunchFunctionNotFoundError()
-            else:
-                raise e
+        stored_value = parameter_store.get_stored_value(
+            f"{SSM_PARAMETER_PREFIX}/{namespace}/{launch_function_name}", ssm_client, version, synth_cache
+        )
+        if stored_value is None:
+            raise EMRLaunchFunctionNotFoundError()
+        return stored_value
 
     @staticmethod
     def from_stored_function(
-        scope: constructs.Construct, id: str, launch_function_name: str, namespace: str = "default"
+        scope: constructs.Construct,
+        id: str,
+        launch_function_name: str,
+        namespace: str = "default",
+        version: Optional[str] = None,
     ) -> "EMRLaunchFunction":
-        stored_function = EMRLaunchFunction.get_function(launch_function_name, namespace)
+        synth_cache = SynthCache.of(scope)
+        if synth_cache is not None:
+            # Reads the Function, and the Profile and Configuration it references, in batched concurrent calls
+            name = f"{SSM_PARAMETER_PREFIX}/{namespace}/{launch_function_name}"
+            synth_cache.prefetch([name if version is None else registry.version_name(name, version)])
+        stored_function = EMRLaunchFunction.get_function(
+            launch_function_name, namespace, version=version, synth_cache=synth_cache
+        )
         launch_function = EMRLaunchFunction(
             scope,
             id,
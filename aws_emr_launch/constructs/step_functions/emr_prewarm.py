@@ -0,0 +1,146 @@
+from typing import Any, Dict, Optional
+
+import aws_cdk
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
+from aws_cdk import aws_stepfunctions as sfn
+from aws_cdk import aws_stepfunctions_tasks as sfn_tasks
+
+import constructs
+from aws_emr_launch.constructs.base import BaseConstruct
+from aws_emr_launch.constructs.step_functions import emr_launch_function, emr_tasks
+
+# Pre-warmed Clusters not leased by the pipeline within this long of its scheduled start are terminated
+DEFAULT_PREWARM_DEADLINE = aws_cdk.Duration.hours(1)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _is_wildcard(field: Optional[str]) -> bool:
+    return field is None or field in ["*", "?"]
+
+
+# The schedule starting lead_time before the pipeline_schedule. The pipeline_schedule must start at a single
+# minute and hour (UTC), and a lead_time crossing midnight is only supported for daily schedules
+def prewarm_schedule(pipeline_schedule: events.CronOptions, lead_time: aws_cdk.Duration) -> events.CronOptions:
+    minute, hour = pipeline_schedule.minute, pipeline_schedule.hour
+    if minute is None or hour is None or not (minute.isdigit() and hour.isdigit()):
+        raise ValueError("The pipeline_schedule must start at a single minute and hour")
+    lead_minutes = int(lead_time.to_minutes())
+    if not 0 < lead_minutes < MINUTES_PER_DAY:
+        raise ValueError("The lead_time must be at least a minute and less than a day")
+
+    start = int(hour) * 60 + int(minute) - lead_minutes
+    day_fields = [pipeline_schedule.day, pipeline_schedule.month, pipeline_schedule.week_day, pipeline_schedule.year]
+    if start < 0:
+        if not all(_is_wildcard(f) for f in day_fields):
+            raise ValueError("A lead_time crossing midnight is only supported for daily pipeline_schedules")
+        start += MINUTES_PER_DAY
+
+    return events.CronOptions(
+        minute=str(start % 60),
+        hour=str(start // 60),
+        day=pipeline_schedule.day,
+        month=pipeline_schedule.month,
+        week_day=pipeline_schedule.week_day,
+        year=pipeline_schedule.year,
+    )
+
+
+class EMRClusterPrewarm(BaseConstruct):
+    def __init__(
+        self,
+        scope: constructs.Construct,
+        id: str,
+        *,
+        launch_function: emr_launch_function.EMRLaunchFunction,
+        pipeline_schedule: events.CronOptions,
+        lead_time: aws_cdk.Duration,
+        deadline: aws_cdk.Duration = DEFAULT_PREWARM_DEADLINE,
+        input: Optional[Dict[str, Any]] = None,
+        enabled: bool = True,
+    ) -> None:
+        super().__init__(scope, id)
+
+        # The pipeline receives the pre-warmed Cluster by leasing it from the Cluster Pool
+        if launch_function.cluster_pool_idle_timeout is None:
+            raise ValueError("Pre-warming requires an EMRLaunchFunction with use_cluster_pool")
+        if not launch_function.wait_for_cluster_start:
+            raise ValueError("Pre-warming requires an EMRLaunchFunction with wait_for_cluster_start")
+        # Pre-warmed Clusters share the Name of the pipeline's launch, and would fail it (e.g. from_stored_function
+        # Launch Functions aren't checked when they are created)
+        if launch_function.default_fail_if_cluster_running or (input or {}).get("FailIfClusterRunning", False):
+            raise ValueError("Pre-warming requires an EMRLaunchFunction without default_fail_if_cluster_running")
+
+        self._launch_function = launch_function
+        self._prewarm_schedule = prewarm_schedule(pipeline_schedule, lead_time)
+        self._deadline = deadline
+
+        launch_cluster = sfn_tasks.StepFunctionsStartExecution(
+            self,
+            "Launch Cluster",
+            state_machine=launch_function.state_machine,
+            integration_pattern=sfn.IntegrationPattern.RUN_JOB,
+            input=sfn.TaskInput.from_json_path_at("$"),
+            result_selector={
+                "ExecutionArn": sfn.JsonPath.string_at("$.ExecutionArn"),
+                "ClusterId": sfn.JsonPath.string_at("$.Output.LaunchClusterResult.ClusterId"),
+            },
+            result_path="$.PrewarmedCluster",
+        )
+
+        # The Launch Function execution holds the lease of the Cluster it launched (or leased)
+        hand_off_cluster = emr_tasks.HandOffPrewarmedClusterBuilder.build(
+            self,
+            "HandOffPrewarmedClusterTask",
+            cluster_id=sfn.JsonPath.string_at("$.PrewarmedCluster.ClusterId"),
+            lease_id=sfn.JsonPath.string_at("$.PrewarmedCluster.ExecutionArn"),
+            deadline=lead_time.plus(deadline),
+            result_path="$.PrewarmedCluster",
+        )
+
+        self._state_machine = sfn.StateMachine(
+            self,
+            "StateMachine",
+            state_machine_name=f"{launch_function.namespace}_{launch_function.launch_function_name}_prewarm",
+            definition=launch_cluster.next(hand_off_cluster),
+        )
+
+        self._schedule_rule = events.Rule(
+            self,
+            "ScheduleRule",
+            schedule=events.Schedule.cron(
+                minute=self._prewarm_schedule.minute,
+                hour=self._prewarm_schedule.hour,
+                day=self._prewarm_schedule.day,
+                month=self._prewarm_schedule.month,
+                week_day=self._prewarm_schedule.week_day,
+                year=self._prewarm_schedule.year,
+            ),
+            enabled=enabled,
+        )
+        self._schedule_rule.add_target(
+            events_targets.SfnStateMachine(
+                self._state_machine, input=events.RuleTargetInput.from_object(input if input is not None else {})
+            )
+        )
+
+    @property
+    def launch_function(self) -> emr_launch_function.EMRLaunchFunction:
+        return self._launch_function
+
+    @property
+    def prewarm_schedule(self) -> events.CronOptions:
+        return self._prewarm_schedule
+
+    @property
+    def deadline(self) -> aws_cdk.Duration:
+        return self._deadline
+
+    @property
+    def state_machine(self) -> sfn.StateMachine:
+        return self._state_machine
+
+    @property
+    def schedule_rule(self) -> events.Rule:
+        return self._schedule_rule
@@ -2,6 +2,7 @@ from typing import Any, Dict, List, Mapping, Optional, cast
 
 import aws_cdk
 from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda
 from aws_cdk import aws_secretsmanager as secretsmanager
@@ -427,6 +428,43 @@ class EmrAddStepTask(BaseTask):
         return task
 
 
+class ClaimIdempotencyKeyBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        key_prefix: str,
+        window: aws_cdk.Duration,
+        output_path: Optional[str] = None,
+        result_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        idempotency_lambda = emr_lambdas.IdempotencyBuilder.get_or_build(construct)
+
+        # Claims the IdempotencyKey of the execution input, if any. A key launched within the window is
+        # a DUPLICATE with the recorded LaunchClusterResult, or IN_PROGRESS while its launch runs
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Claim Idempotency Key",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=idempotency_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "Action": "Claim",
+                    "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
+                    "ExecutionId": sfn.JsonPath.string_at("$$.Execution.Id"),
+                    "KeyPrefix": key_prefix,
+                    "Window": window.to_seconds(),
+                }
+            ),
+        )
+
+
 class LoadClusterConfigurationBuilder:
     @staticmethod
     def build(
@@ -439,6 +477,8 @@ class LoadClusterConfigurationBuilder:
         profile_name: str,
         configuration_namespace: str,
         configuration_name: str,
+        profile_version: Optional[str] = None,
+        configuration_version: Optional[str] = None,
         output_path: Optional[str] = None,
         result_path: Optional[str] = None,
     ) -> sfn_tasks.LambdaInvoke:
@@ -453,6 +493,19 @@ class LoadClusterConfigurationBuilder:
             configuration_name=configuration_name,
         )
 
+        payload = {
+            "ClusterName": cluster_name,
+            "ClusterTags": [{"Key": t.key, "Value": t.value} for t in cluster_tags],
+            "ProfileNamespace": profile_namespace,
+            "ProfileName": profile_name,
+            "ConfigurationNamespace": configuration_namespace,
+            "ConfigurationName": configuration_name,
+        }
+        if profile_version is not None:
+            payload["ProfileVersion"] = profile_version
+        if configuration_version is not None:
+            payload["ConfigurationVersion"] = configuration_version
+
         return sfn_tasks.LambdaInvoke(
             construct,
             "Load Cluster Configuration",
@@ -460,16 +513,105 @@ class LoadClusterConfigurationBuilder:
             result_path=result_path,
             lambda_function=load_cluster_configuration_lambda,
             payload_response_only=True,
-            payload=sfn.TaskInput.from_object(
-                {
-                    "ClusterName": cluster_name,
-                    "ClusterTags": [{"Key": t.key, "Value": t.value} for t in cluster_tags],
-                    "ProfileNamespace": profile_namespace,
-                    "ProfileName": profile_name,
-                    "ConfigurationNamespace": configuration_namespace,
-                    "ConfigurationName": configuration_name,
-                }
-            ),
+            payload=sfn.TaskInput.from_object(payload),
+        )
+
+
+class InlineClusterConfigurationBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        cluster_request: Dict[str, str],
+        result_path: str,
+    ) -> sfn.Chain:
+        # We use a nested Construct to avoid collisions with State ids
+        construct = constructs.Construct(scope, id)
+
+        # The parts of the request are embedded as JSON strings and parsed by a second Pass State, as the
+        # null values read by the CreateCluster Task can't be expressed in the Result of a Pass State
+        inline_cluster_configuration = sfn.Pass(
+            construct,
+            "Inline Cluster Configuration",
+            result=sfn.Result.from_object(cluster_request),
+            result_path=result_path,
+        )
+        parse_cluster_configuration = sfn.Pass(
+            construct,
+            "Parse Cluster Configuration",
+            parameters={
+                k: sfn.JsonPath.string_to_json(sfn.JsonPath.string_at(f"{result_path}.{k}")) for k in cluster_request
+            },
+            result_path=result_path,
+        )
+        return sfn.Chain.start(inline_cluster_configuration).next(parse_cluster_configuration)
+
+
+class PrepareClusterLaunchBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        cluster_name: str,
+        cluster_tags: List[aws_cdk.Tag],
+        profile_namespace: str,
+        profile_name: str,
+        configuration_namespace: str,
+        configuration_name: str,
+        default_fail_if_cluster_running: bool,
+        profile_version: Optional[str] = None,
+        configuration_version: Optional[str] = None,
+        cluster_request: Optional[str] = None,
+        fail_if_cluster_running_window: Optional[aws_cdk.Duration] = None,
+        use_cluster_pool: bool = False,
+        allowed_cluster_config_overrides: Optional[Dict[str, Dict[str, str]]] = None,
+        output_path: Optional[str] = None,
+        result_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        prepare_cluster_launch_lambda = emr_lambdas.PrepareClusterLaunchBuilder.build(
+            construct,
+            profile_namespace=profile_namespace,
+            profile_name=profile_name,
+            configuration_namespace=configuration_namespace,
+            configuration_name=configuration_name,
+        )
+
+        payload = {
+            "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
+            "ClusterName": cluster_name,
+            "ClusterTags": [{"Key": t.key, "Value": t.value} for t in cluster_tags],
+            "ProfileNamespace": profile_namespace,
+            "ProfileName": profile_name,
+            "ConfigurationNamespace": configuration_namespace,
+            "ConfigurationName": configuration_name,
+            "AllowedClusterConfigOverrides": allowed_cluster_config_overrides,
+            "DefaultFailIfClusterRunning": default_fail_if_cluster_running,
+        }
+        if fail_if_cluster_running_window is not None:
+            payload["FailIfClusterRunningWindowSeconds"] = fail_if_cluster_running_window.to_seconds()
+        if use_cluster_pool:
+            payload["UseClusterPool"] = True
+        if profile_version is not None:
+            payload["ProfileVersion"] = profile_version
+        if configuration_version is not None:
+            payload["ConfigurationVersion"] = configuration_version
+        # An inline request (a JSON string) is used instead of the stored Profile and Configuration
+        if cluster_request is not None:
+            payload["ClusterRequest"] = cluster_request
+
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Prepare Cluster Launch",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=prepare_cluster_launch_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(payload),
         )
 
 
@@ -518,6 +660,8 @@ class FailIfClusterRunningBuilder:
         id: str,
         *,
         default_fail_if_cluster_running: bool,
+        fail_if_cluster_running_window: Optional[aws_cdk.Duration] = None,
+        use_cluster_pool: bool = False,
         input_path: str = "$",
         output_path: Optional[str] = None,
         result_path: Optional[str] = None,
@@ -527,6 +671,18 @@ class FailIfClusterRunningBuilder:
 
         fail_if_cluster_running_lambda = emr_lambdas.FailIfClusterRunningBuilder.get_or_build(construct)
 
+        payload = {
+            "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
+            "DefaultFailIfClusterRunning": default_fail_if_cluster_running,
+            "Input": sfn.TaskInput.from_json_path_at(input_path).value,
+        }
+        if fail_if_cluster_running_window is not None:
+            # Only Clusters created within the window are checked
+            payload["FailIfClusterRunningWindowSeconds"] = fail_if_cluster_running_window.to_seconds()
+        if use_cluster_pool:
+            # FailIfClusterRunning is rejected, as pooled Clusters share the Name of the launch
+            payload["UseClusterPool"] = True
+
         return sfn_tasks.LambdaInvoke(
             construct,
             "Fail If Cluster Running",
@@ -534,22 +690,50 @@ class FailIfClusterRunningBuilder:
             result_path=result_path,
             lambda_function=fail_if_cluster_running_lambda,
             payload_response_only=True,
+            payload=sfn.TaskInput.from_object(payload),
+        )
+
+
+class UpdateClusterTagsBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        input_path: str = "$",
+        output_path: Optional[str] = None,
+        result_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        update_cluster_tags_lambda = emr_lambdas.UpdateClusterTagsBuilder.get_or_build(construct)
+
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Update Cluster Tags",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=update_cluster_tags_lambda,
+            payload_response_only=True,
             payload=sfn.TaskInput.from_object(
                 {
                     "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
-                    "DefaultFailIfClusterRunning": default_fail_if_cluster_running,
                     "Input": sfn.TaskInput.from_json_path_at(input_path).value,
                 }
             ),
         )
 
 
-class UpdateClusterTagsBuilder:
+class AcquirePooledClusterBuilder:
     @staticmethod
     def build(
         scope: constructs.Construct,
         id: str,
         *,
+        idle_timeout: aws_cdk.Duration,
+        lease_timeout: Optional[aws_cdk.Duration] = None,
+        result_shape: str = "CreateCluster",
         input_path: str = "$",
         output_path: Optional[str] = None,
         result_path: Optional[str] = None,
@@ -557,19 +741,69 @@ class UpdateClusterTagsBuilder:
         # We use a nested Construct to avoid collisions with Lambda and Task ids
         construct = constructs.Construct(scope, id)
 
-        update_cluster_tags_lambda = emr_lambdas.UpdateClusterTagsBuilder.get_or_build(construct)
+        cluster_pool_lambda = emr_lambdas.ClusterPoolBuilder.get_or_build(construct)
+
+        payload = {
+            "Action": "Acquire",
+            "LeaseId": sfn.JsonPath.string_at("$$.Execution.Id"),
+            "IdleTimeout": idle_timeout.to_seconds(),
+            "ResultShape": result_shape,
+            "Input": sfn.TaskInput.from_json_path_at(input_path).value,
+        }
+        if lease_timeout is not None:
+            # Leased Clusters that are never released are terminated after the lease timeout
+            payload["LeaseTimeout"] = lease_timeout.to_seconds()
 
+        # Tags the Cluster request with its fingerprint and, when a pooled Cluster is leased, adds the
+        # "PooledCluster" result in the shape (result_shape) of the CreateCluster Task it replaces
         return sfn_tasks.LambdaInvoke(
             construct,
-            "Update Cluster Tags",
+            "Acquire Pooled Cluster",
             output_path=output_path,
             result_path=result_path,
-            lambda_function=update_cluster_tags_lambda,
+            lambda_function=cluster_pool_lambda,
             payload_response_only=True,
+            payload=sfn.TaskInput.from_object(payload),
+        )
+
+
+class AdmitClusterLaunchBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        namespace: str,
+        priority: int = 0,
+        timeout: Optional[aws_cdk.Duration] = None,
+        input_path: str = "$",
+        output_path: Optional[str] = None,
+        result_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        admission_control_lambda = emr_lambdas.AdmissionControlBuilder.get_or_build(construct)
+
+        # Queues the launch, the Task completes when the AdmissionControl Lambda admits it
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Admit Cluster Launch",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=admission_control_lambda,
+            integration_pattern=sfn.IntegrationPattern.WAIT_FOR_TASK_TOKEN,
+            task_timeout=sfn.Timeout.duration(timeout or emr_lambdas.LAUNCH_ADMISSION_TIMEOUT),
+            heartbeat_timeout=sfn.Timeout.duration(emr_lambdas.LAUNCH_ADMISSION_HEARTBEAT_TIMEOUT),
             payload=sfn.TaskInput.from_object(
                 {
+                    "Action": "Enqueue",
                     "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
                     "Input": sfn.TaskInput.from_json_path_at(input_path).value,
+                    "RequestId": sfn.JsonPath.string_at("$$.Execution.Id"),
+                    "TaskToken": sfn.JsonPath.task_token,
+                    "Namespace": namespace,
+                    "Priority": priority,
                 }
             ),
         )
@@ -618,19 +852,74 @@ class RunJobFlowBuilder(BaseBuilder):
         result_path: Optional[str] = None,
         output_path: Optional[str] = None,
         wait_for_cluster_start: bool = True,
+        use_cluster_state_change_events: bool = False,
+        secret_cache_ttl: Optional[aws_cdk.Duration] = None,
     ) -> sfn_tasks.LambdaInvoke:
         # We use a nested Construct to avoid collisions with Lambda and Task ids
         construct = constructs.Construct(scope, id)
 
+        # When EMR Cluster State Change events are used the scheduled EventRule is only
+        # a safety net for missed events, so it polls much less frequently
+        poll_interval = aws_cdk.Duration.minutes(10 if use_cluster_state_change_events else 1)
+
+        run_job_flow_lambda = emr_lambdas.RunJobFlowBuilder.get_or_build(construct, roles, secret_cache_ttl)
+        check_cluster_status_lambda = emr_lambdas.CheckClusterStatusBuilder.get_or_build(construct)
+
+        # The EventRule has a single Target that sweeps the PendingLaunchesTable for the
+        # Clusters launched by this Task, so it is not limited by the EventBridge Targets quota
         event_rule = cast(Optional[events.Rule], aws_cdk.Stack.of(scope).node.try_find_child("EventRule"))
         if event_rule is None:
             event_rule = events.Rule(
-                construct, "EventRule", enabled=False, schedule=events.Schedule.rate(aws_cdk.Duration.minutes(1))
+                construct, "EventRule", enabled=False, schedule=events.Schedule.rate(poll_interval)
             )
+            event_rule.add_target(events_targets.LambdaFunction(check_cluster_status_lambda))
             BaseBuilder.tag_construct(event_rule)
 
-        run_job_flow_lambda = emr_lambdas.RunJobFlowBuilder.get_or_build(construct, roles, event_rule)
-        check_cluster_status_lambda = emr_lambdas.CheckClusterStatusBuilder.get_or_build(construct, event_rule)
+        # The RunJobFlow and CheckClusterStatus Lambdas are shared by the Stack, so they
+        # must also be authorized on the EventRule of this Task
+        run_job_flow_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["events:EnableRule"],
+                resources=[event_rule.rule_arn],
+            )
+        )
+        # The EventRule targets the CheckClusterStatus Lambda, a separate Policy avoids
+        # a circular dependency through the Lambda's default Policy
+        iam.Policy(
+            construct,
+            "CheckClusterStatusPolicy",
+            roles=[cast(iam.IRole, check_cluster_status_lambda.role)],
+            statements=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["events:EnableRule", "events:DisableRule"],
+                    resources=[event_rule.rule_arn],
+                )
+            ],
+        )
+
+        if use_cluster_state_change_events:
+            # React to the native EMR Cluster State Change events. The CheckClusterStatus Lambda
+            # looks up the pending TaskToken from the PendingLaunchesTable by ClusterId
+            state_change_rule = events.Rule(
+                construct,
+                "ClusterStateChangeRule",
+                event_pattern=events.EventPattern(
+                    source=["aws.emr"],
+                    detail_type=["EMR Cluster State Change"],
+                    detail={"state": ["WAITING", "TERMINATED", "TERMINATED_WITH_ERRORS"]},
+                ),
+            )
+            state_change_rule.add_target(
+                events_targets.LambdaFunction(
+                    check_cluster_status_lambda,
+                    event=events.RuleTargetInput.from_object(
+                        {"ClusterId": events.EventField.from_path("$.detail.clusterId")}
+                    ),
+                )
+            )
+            BaseBuilder.tag_construct(state_change_rule)
 
         if kerberos_attributes_secret:
             run_job_flow_lambda.add_to_role_policy(
@@ -663,7 +952,6 @@ class RunJobFlowBuilder(BaseBuilder):
                     "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
                     "Input": sfn.TaskInput.from_json_path_at(input_path).value,
                     "TaskToken": sfn.JsonPath.task_token,
-                    "CheckStatusLambda": check_cluster_status_lambda.function_arn,
                     "RuleName": event_rule.rule_name,
                     "FireAndForget": not wait_for_cluster_start,
                 }
@@ -724,3 +1012,134 @@ class TerminateClusterBuilder:
             cluster_id=cluster_id,
             integration_pattern=sfn.IntegrationPattern.RUN_JOB,
         )
+
+
+class ReleasePooledClusterBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        cluster_id: str,
+        lease_id: Optional[str] = None,
+        result_path: Optional[str] = None,
+        output_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        cluster_pool_lambda = emr_lambdas.ClusterPoolBuilder.get_or_build(construct)
+
+        payload = {"Action": "Release", "ClusterId": cluster_id}
+        if lease_id is not None:
+            payload["LeaseId"] = lease_id
+
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Release Pooled Cluster",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=cluster_pool_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(payload),
+        )
+
+
+class HandOffPrewarmedClusterBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        cluster_id: str,
+        lease_id: str,
+        deadline: aws_cdk.Duration,
+        result_path: Optional[str] = None,
+        output_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        cluster_pool_lambda = emr_lambdas.ClusterPoolBuilder.get_or_build(construct)
+
+        # Pools the Cluster until the deadline (after the start of this execution), or terminates it
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Hand Off Pre-warmed Cluster",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=cluster_pool_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "Action": "Prewarm",
+                    "ClusterId": cluster_id,
+                    "LeaseId": lease_id,
+                    "StartTime": sfn.JsonPath.string_at("$$.Execution.StartTime"),
+                    "Deadline": deadline.to_seconds(),
+                }
+            ),
+        )
+
+
+class CompleteClusterLaunchBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        result_path: Optional[str] = sfn.JsonPath.DISCARD,
+        output_path: Optional[str] = None,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        admission_control_lambda = emr_lambdas.AdmissionControlBuilder.get_or_build(construct)
+
+        # Frees the admission of this execution's launch for the queued launches
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Complete Cluster Launch",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=admission_control_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(
+                {"Action": "Complete", "RequestId": sfn.JsonPath.string_at("$$.Execution.Id")}
+            ),
+        )
+
+
+class RecordIdempotentLaunchBuilder:
+    @staticmethod
+    def build(
+        scope: constructs.Construct,
+        id: str,
+        *,
+        key_prefix: str,
+        launch_cluster_result_path: str = "$.LaunchClusterResult",
+        output_path: Optional[str] = None,
+        result_path: Optional[str] = sfn.JsonPath.DISCARD,
+    ) -> sfn_tasks.LambdaInvoke:
+        # We use a nested Construct to avoid collisions with Lambda and Task ids
+        construct = constructs.Construct(scope, id)
+
+        idempotency_lambda = emr_lambdas.IdempotencyBuilder.get_or_build(construct)
+
+        return sfn_tasks.LambdaInvoke(
+            construct,
+            "Record Idempotent Launch",
+            output_path=output_path,
+            result_path=result_path,
+            lambda_function=idempotency_lambda,
+            payload_response_only=True,
+            payload=sfn.TaskInput.from_object(
+                {
+                    "Action": "Complete",
+                    "ExecutionInput": sfn.TaskInput.from_json_path_at("$$.Execution.Input").value,
+                    "ExecutionId": sfn.JsonPath.string_at("$$.Execution.Id"),
+                    "KeyPrefix": key_prefix,
+                    "LaunchClusterResult": sfn.TaskInput.from_json_path_at(launch_cluster_result_path).value,
+                }
+            ),
+        )
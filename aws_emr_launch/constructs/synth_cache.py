@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
+
+import aws_cdk
+import boto3
+
+import constructs
+from aws_emr_launch import runtime
+from aws_emr_launch.clients import boto3_client
+from aws_emr_launch.emr_config_utils.registry import Registry, version_name
+
+# The stored Profiles, Configurations and Launch Functions rehydrated by the from_stored_* constructors are
+# cached in a file kept next to cdk.context.json, so repeated synths make no registry calls and always
+# synthesize the same values. The cache is enabled with the "@aws-emr-launch/synthCache" context key (true
+# for the default file, or the path of the file), or the AWS_EMR_LAUNCH_SYNTH_CACHE environment variable,
+# and refreshed with:
+#
+#   python -m aws_emr_launch.constructs.synth_cache refresh [--file emr-launch.context.json]
+#
+# Like the lookups in cdk.context.json, entries are keyed by the registry name (including the version of
+# pinned versions) and the account and region of the Stack, and record the registry Version they were read at:
+#   {"<name>:account=<account>:region=<region>": {"Version": <version>, "Value": {<stored value>}}}
+# The account and region of environment-agnostic Stacks are those of the credentials used to read the registry.
+SYNTH_CACHE_CONTEXT_KEY = "@aws-emr-launch/synthCache"
+SYNTH_CACHE_ENV = "AWS_EMR_LAUNCH_SYNTH_CACHE"
+DEFAULT_SYNTH_CACHE_FILE = "emr-launch.context.json"
+
+# Names are read in batches of 10 (a single GetParameters call with SSM)
+BATCH_SIZE = 10
+MAX_WORKERS = 8
+
+
+class SynthCacheError(Exception):
+    pass
+
+
+# The Profile and Configuration referenced by a stored Launch Function
+def referenced_names(name: str, value: Dict[str, Any]) -> List[str]:
+    if not name.startswith(f"{runtime.EMR_LAUNCH_FUNCTIONS_PREFIX}/"):
+        return []
+    names = []
+    for prefix, key, version_key in [
+        (runtime.EMR_PROFILES_PREFIX, "EMRProfile", "EMRProfileVersion"),
+        (runtime.CLUSTER_CONFIGURATIONS_PREFIX, "ClusterConfiguration", "ClusterConfigurationVersion"),
+    ]:
+        if value.get(key):
+            referenced = f"{prefix}/{value[key]}"
+            version = value.get(version_key, None)
+            names.append(version_name(referenced, version) if version else referenced)
+    return names
+
+
+def synth_cache_path(setting: Any) -> Optional[str]:
+    if setting is None or str(setting).lower() in ("false", "0", ""):
+        return None
+    if setting is True or str(setting).lower() in ("true", "1"):
+        return DEFAULT_SYNTH_CACHE_FILE
+    return str(setting)
+
+
+class _SynthCacheFile:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                raise SynthCacheError(f"Invalid synth cache file: {path}")
+            self.entries = entries
+
+    def save(self) -> None:
+        with self.lock:
+            content = json.dumps(self.entries, indent=2, sort_keys=True)
+        # Written atomically, as concurrent synths may share the file
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(content + "\n")
+        os.replace(temporary_path, self.path)
+
+
+class SynthCache:
+    _files: Dict[str, _SynthCacheFile] = {}
+    _caches: Dict[Tuple[str, Optional[str], Optional[str]], "SynthCache"] = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str,
+        ssm_client: Optional[boto3.client] = None,
+        account: Optional[str] = None,
+        region: Optional[str] = None,
+        cache_file: Optional[_SynthCacheFile] = None,
+    ) -> None:
+        self._file = _SynthCacheFile(path) if cache_file is None else cache_file
+        self._ssm_client = ssm_client
+        self._account = account
+        self._region = region
+        self._environment: Optional[str] = None
+        self._registry: Optional[Registry] = None
+        self._lock = self._file.lock
+
+    @property
+    def path(self) -> str:
+        return self._file.path
+
+    @property
+    def environment(self) -> str:
+        with self._lock:
+            if self._environment is None:
+                region = self._region or self._get_ssm_client().meta.region_name
+                account = self._account or boto3_client("sts", region_name=region).get_caller_identity()["Account"]
+                self._environment = f"account={account}:region={region}"
+            return self._environment
+
+    def _key(self, name: str) -> str:
+        return f"{name}:{self.environment}"
+
+    @property
+    def names(self) -> List[str]:
+        suffix = f":{self.environment}"
+        with self._lock:
+            return sorted(k[: -len(suffix)] for k in self._file.entries if k.endswith(suffix))
+
+    def _get_ssm_client(self) -> boto3.client:
+        return boto3_client("ssm", region_name=self._region) if self._ssm_client is None else self._ssm_client
+
+    def _get_registry(self) -> Registry:
+        with self._lock:
+            if self._registry is None:
+                self._registry = runtime.get_registry(self._get_ssm_client())
+            return self._registry
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._file.entries.get(self._key(name), None)
+            return None if entry is None else cast(Dict[str, Any], entry["Value"])
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        value = self.get(name)
+        if value is None:
+            self._fetch([name])
+            self.save()
+            value = self.get(name)
+        return value
+
+    def _fetch(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        registry = self._get_registry()
+
+        def fetch_batch(batch: List[str]) -> Dict[str, Dict[str, Any]]:
+            return {
+                name: {"Version": item["Version"], "Value": runtime.decode_stored_value(item["Value"])}
+                for name, item in registry.get_many(batch).items()
+            }
+
+        batches = [names[i : i + BATCH_SIZE] for i in range(0, len(names), BATCH_SIZE)]
+        fetched: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, max(len(batches), 1))) as executor:
+            for entries in executor.map(fetch_batch, batches):
+                fetched.update(entries)
+        with self._lock:
+            self._file.entries.update({self._key(name): entry for name, entry in fetched.items()})
+        return fetched
+
+    # Reads the names missing from the cache, and the Profiles and Configurations their Launch Functions reference
+    def prefetch(self, names: Iterable[str]) -> None:
+        pending = list(dict.fromkeys(names))
+        seen: Set[str] = set()
+        while pending:
+            seen.update(pending)
+            missing = [n for n in pending if self.get(n) is None]
+            self._fetch(missing)
+            referenced = [r for n in pending for r in referenced_names(n, self.get(n) or {})]
+            pending = [r for r in dict.fromkeys(referenced) if r not in seen]
+        self.save()
+
+    def _pop_entries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: self._file.entries.pop(self._key(name)) for name in self.names}
+
+    # Reads every name cached for the account and region again, returning the names whose Version changed.
+    # Names no longer stored are removed
+    def refresh(self) -> List[str]:
+        previous = self._pop_entries()
+        self.prefetch(previous)
+        with self._lock:
+            current = {name: self._file.entries[self._key(name)] for name in self.names}
+        return sorted(
+            n
+            for n in set(previous) | set(current)
+            if previous.get(n, {}).get("Version") != current.get(n, {}).get("Version")
+        )
+
+    def clear(self) -> None:
+        self._pop_entries()
+        self.save()
+
+    def save(self) -> None:
+        self._file.save()
+
+    @staticmethod
+    def from_file(path: str, account: Optional[str] = None, region: Optional[str] = None) -> "SynthCache":
+        # The constructs of an App share a single SynthCache for each file and environment
+        path = os.path.abspath(path)
+        key = (path, account, region)
+        with SynthCache._caches_lock:
+            if key not in SynthCache._caches:
+                if path not in SynthCache._files:
+                    SynthCache._files[path] = _SynthCacheFile(path)
+                SynthCache._caches[key] = SynthCache(
+                    path, account=account, region=region, cache_file=SynthCache._files[path]
+                )
+            return SynthCache._caches[key]
+
+    @staticmethod
+    def of(scope: constructs.Construct) -> Optional["SynthCache"]:
+        setting = scope.node.try_get_context(SYNTH_CACHE_CONTEXT_KEY)
+        path = synth_cache_path(os.environ.get(SYNTH_CACHE_ENV, None) if setting is None else setting)
+        if path is None:
+            return None
+        stack = aws_cdk.Stack.of(scope)
+        account = None if aws_cdk.Token.is_unresolved(stack.account) else stack.account
+        region = None if aws_cdk.Token.is_unresolved(stack.region) else stack.region
+        return SynthCache.from_file(path, account, region)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m aws_emr_launch.constructs.synth_cache")
+    parser.add_argument("command", choices=["refresh", "prefetch", "clear"])
+    parser.add_argument("names", nargs="*", help="Registry names to prefetch")
+    parser.add_argument("--file", default=synth_cache_path(os.environ.get(SYNTH_CACHE_ENV, None)))
+    parser.add_argument("--region", help="Region of the cached entries (default: the region of the credentials)")
+    args = parser.parse_args(argv)
+
+    cache = SynthCache.from_file(args.file or DEFAULT_SYNTH_CACHE_FILE, region=args.region)
+    if args.command == "refresh":
+        for name in cache.refresh():
+            print(f"Updated {name}")
+    elif args.command == "prefetch":
+        cache.prefetch(args.names)
+    else:
+        cache.clear()
+    print(f"{len(cache.names)} cached values for {cache.environment} in {cache.path}")
+
+
+if __name__ == "__main__":
+    main()
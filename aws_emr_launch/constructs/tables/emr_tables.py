@@ -0,0 +1,95 @@
+from typing import cast
+
+import aws_cdk
+from aws_cdk import aws_dynamodb as dynamodb
+
+import constructs
+from aws_emr_launch.constructs.base import BaseBuilder
+
+
+class PendingLaunchesTableBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> dynamodb.Table:
+        stack = aws_cdk.Stack.of(scope)
+
+        table = stack.node.try_find_child("PendingLaunchesTable")
+        if table is None:
+            table = dynamodb.Table(
+                stack,
+                "PendingLaunchesTable",
+                partition_key=dynamodb.Attribute(name="RuleName", type=dynamodb.AttributeType.STRING),
+                sort_key=dynamodb.Attribute(name="ClusterId", type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                time_to_live_attribute="ExpiresAt",
+                removal_policy=aws_cdk.RemovalPolicy.DESTROY,
+            )
+            # Sweeps query the pending launches of their Rule, Cluster State Change events look them up by Cluster
+            table.add_global_secondary_index(
+                index_name="ClusterId",
+                partition_key=dynamodb.Attribute(name="ClusterId", type=dynamodb.AttributeType.STRING),
+            )
+            BaseBuilder.tag_construct(table)
+        return cast(dynamodb.Table, table)
+
+
+class ClusterPoolTableBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> dynamodb.Table:
+        stack = aws_cdk.Stack.of(scope)
+
+        table = stack.node.try_find_child("ClusterPoolTable")
+        if table is None:
+            table = dynamodb.Table(
+                stack,
+                "ClusterPoolTable",
+                partition_key=dynamodb.Attribute(name="ClusterId", type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                time_to_live_attribute="ExpiresAt",
+                removal_policy=aws_cdk.RemovalPolicy.DESTROY,
+            )
+            # Available Clusters are looked up by the fingerprint of their launch request
+            table.add_global_secondary_index(
+                index_name="Fingerprint",
+                partition_key=dynamodb.Attribute(name="Fingerprint", type=dynamodb.AttributeType.STRING),
+                sort_key=dynamodb.Attribute(name="ReleasedAt", type=dynamodb.AttributeType.NUMBER),
+            )
+            BaseBuilder.tag_construct(table)
+        return cast(dynamodb.Table, table)
+
+
+class LaunchAdmissionTableBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> dynamodb.Table:
+        stack = aws_cdk.Stack.of(scope)
+
+        table = stack.node.try_find_child("LaunchAdmissionTable")
+        if table is None:
+            table = dynamodb.Table(
+                stack,
+                "LaunchAdmissionTable",
+                partition_key=dynamodb.Attribute(name="RequestId", type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                time_to_live_attribute="ExpiresAt",
+                removal_policy=aws_cdk.RemovalPolicy.DESTROY,
+            )
+            BaseBuilder.tag_construct(table)
+        return cast(dynamodb.Table, table)
+
+
+class IdempotencyTableBuilder(BaseBuilder):
+    @staticmethod
+    def get_or_build(scope: constructs.Construct) -> dynamodb.Table:
+        stack = aws_cdk.Stack.of(scope)
+
+        table = stack.node.try_find_child("IdempotencyTable")
+        if table is None:
+            table = dynamodb.Table(
+                stack,
+                "IdempotencyTable",
+                partition_key=dynamodb.Attribute(name="IdempotencyKey", type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                time_to_live_attribute="ExpiresAt",
+                removal_policy=aws_cdk.RemovalPolicy.DESTROY,
+            )
+            BaseBuilder.tag_construct(table)
+        return cast(dynamodb.Table, table)
@@ -1,3 +1,14 @@
-from aws_emr_launch.control_plane.constructs.control_plane_stack import ControlPlaneStack
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from aws_emr_launch.control_plane.constructs.control_plane_stack import ControlPlaneStack  # noqa: F401
 
 __all__ = ["ControlPlaneStack"]
+
+
+# ControlPlaneStack (and aws_cdk) is imported when first accessed
+def __getattr__(name: str) -> Any:
+    if name == "ControlPlaneStack":
+        return importlib.import_module(f"{__name__}.constructs.control_plane_stack").ControlPlaneStack
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
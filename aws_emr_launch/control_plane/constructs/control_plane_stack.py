@@ -1,14 +1,31 @@
-from typing import Any
+from typing import Any, Optional
 
 import aws_cdk
 
 from aws_emr_launch import __product__, __version__
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
+from aws_emr_launch.constructs.parameter_store import ParameterStorage
+from aws_emr_launch.constructs.registry import RegistryConfiguration
 from aws_emr_launch.control_plane.constructs.lambdas import apis
 
 
 class ControlPlaneStack(aws_cdk.Stack):
-    def __init__(self, app: aws_cdk.App, name: str = "aws-emr-launch-control-plane", **kwargs: Any) -> None:
+    def __init__(
+        self,
+        app: aws_cdk.App,
+        name: str = "aws-emr-launch-control-plane",
+        lambda_runtime_profile: Optional[LambdaRuntimeProfile] = None,
+        parameter_storage: Optional[ParameterStorage] = None,
+        registry: Optional[RegistryConfiguration] = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(app, name, **kwargs)
+        if lambda_runtime_profile is not None:
+            lambda_runtime_profile.apply_to(self)
+        if parameter_storage is not None:
+            parameter_storage.apply_to(self)
+        if registry is not None:
+            registry.apply_to(self)
         self.tags.set_tag("deployment:product:name", __product__)
         self.tags.set_tag("deployment:product:version", __version__)
         self._apis = apis.Apis(self, "Apis")
@@ -4,7 +4,12 @@ from aws_cdk import aws_lambda
 
 import constructs
 from aws_emr_launch import __package__, __product__, __version__
+from aws_emr_launch.constructs.lambdas.emr_lambdas import EMRConfigUtilsLayerBuilder
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
+from aws_emr_launch.constructs.parameter_store import ParameterStorage
+from aws_emr_launch.constructs.registry import RegistryConfiguration
 from aws_emr_launch.control_plane.constructs.lambdas import _lambda_path
+from aws_emr_launch.control_plane.constructs.registry_index import RegistryIndex
 
 
 class Apis(constructs.Construct):
@@ -13,6 +18,8 @@ class Apis(constructs.Construct):
 
         stack = aws_cdk.Stack.of(scope)
         code = aws_lambda.Code.from_asset(_lambda_path("apis"))
+        profile = LambdaRuntimeProfile.of(stack)
+        layer = EMRConfigUtilsLayerBuilder.get_or_build(stack)
 
         self._get_profile = aws_lambda.Function(
             self,
@@ -21,8 +28,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_profile_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -44,8 +51,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_profiles_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -67,8 +74,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_configuration_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -92,8 +99,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_configurations_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -117,8 +124,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_function_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -142,8 +149,8 @@ class Apis(constructs.Construct):
             description=f"Version: {__package__}",
             code=code,
             handler="get_list_apis.get_functions_handler",
-            runtime=aws_lambda.Runtime.PYTHON_3_7,
-            timeout=aws_cdk.Duration.minutes(1),
+            **profile.function_props(),
+            layers=[layer],
             environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
             initial_policy=[
                 iam.PolicyStatement(
@@ -160,6 +167,103 @@ class Apis(constructs.Construct):
             ],
         )
 
+        self._describe_function = aws_lambda.Function(
+            self,
+            "DescribeFunction",
+            function_name="EMRLaunch_APIs_DescribeFunction",
+            description=f"Version: {__package__}",
+            code=code,
+            handler="get_list_apis.describe_function_handler",
+            **profile.function_props(),
+            layers=[layer],
+            environment={"AWS_EMR_LAUNCH_PRODUCT": __product__, "AWS_EMR_LAUNCH_VERSION": __version__},
+            initial_policy=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameter"],
+                    resources=[
+                        stack.format_arn(
+                            partition=stack.partition,
+                            service="ssm",
+                            resource="parameter/emr_launch/emr_launch_functions/*",
+                        )
+                    ],
+                ),
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameters"],
+                    resources=[
+                        stack.format_arn(
+                            partition=stack.partition, service="ssm", resource="parameter/emr_launch/emr_profiles/*"
+                        ),
+                        stack.format_arn(
+                            partition=stack.partition,
+                            service="ssm",
+                            resource="parameter/emr_launch/cluster_configurations/*",
+                        ),
+                        stack.format_arn(
+                            partition=stack.partition,
+                            service="ssm",
+                            resource="parameter/emr_launch/emr_profile_versions/*",
+                        ),
+                        stack.format_arn(
+                            partition=stack.partition,
+                            service="ssm",
+                            resource="parameter/emr_launch/cluster_configuration_versions/*",
+                        ),
+                    ],
+                ),
+            ],
+        )
+
+        # Stored values offloaded to S3, or stored in another registry backend, are read by the APIs returning them
+        storage = ParameterStorage.of(stack)
+        registry = RegistryConfiguration.of(stack)
+        for function in [
+            self._get_profile,
+            self._get_profiles,
+            self._get_configuration,
+            self._get_configurations,
+            self._get_function,
+            self._get_functions,
+            self._describe_function,
+        ]:
+            storage.grant_read(function)
+            registry.configure_function(function)
+
+        self._registry_index = RegistryIndex(self, "RegistryIndex")
+        self._find_profiles = self._find_function("FindProfiles", "find_profiles_handler", code, profile, layer)
+        self._find_configurations = self._find_function(
+            "FindConfigurations", "find_configurations_handler", code, profile, layer
+        )
+        self._find_functions = self._find_function("FindFunctions", "find_functions_handler", code, profile, layer)
+
+    def _find_function(
+        self,
+        id: str,
+        handler: str,
+        code: aws_lambda.Code,
+        profile: LambdaRuntimeProfile,
+        layer: aws_lambda.ILayerVersion,
+    ) -> aws_lambda.Function:
+        function = aws_lambda.Function(
+            self,
+            id,
+            function_name=f"EMRLaunch_APIs_{id}",
+            description=f"Version: {__package__}",
+            code=code,
+            handler=f"get_list_apis.{handler}",
+            **profile.function_props(),
+            layers=[layer],
+            environment={
+                "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                "AWS_EMR_LAUNCH_VERSION": __version__,
+                "REGISTRY_INDEX_TABLE": self._registry_index.table.table_name,
+            },
+        )
+        self._registry_index.table.grant_read_data(function)
+        return function
+
     @property
     def get_profile(self) -> aws_lambda.Function:
         return self._get_profile
@@ -183,3 +287,23 @@ class Apis(constructs.Construct):
     @property
     def get_functions(self) -> aws_lambda.Function:
         return self._get_functions
+
+    @property
+    def describe_function(self) -> aws_lambda.Function:
+        return self._describe_function
+
+    @property
+    def registry_index(self) -> RegistryIndex:
+        return self._registry_index
+
+    @property
+    def find_profiles(self) -> aws_lambda.Function:
+        return self._find_profiles
+
+    @property
+    def find_configurations(self) -> aws_lambda.Function:
+        return self._find_configurations
+
+    @property
+    def find_functions(self) -> aws_lambda.Function:
+        return self._find_functions
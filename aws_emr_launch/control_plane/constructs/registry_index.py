@@ -0,0 +1,80 @@
+import aws_cdk
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda
+
+import constructs
+from aws_emr_launch import __package__, __product__, __version__
+from aws_emr_launch.constructs.lambdas.emr_lambdas import EMRConfigUtilsLayerBuilder
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
+from aws_emr_launch.constructs.parameter_store import ParameterStorage
+from aws_emr_launch.control_plane.constructs.lambdas import _lambda_path
+
+
+class RegistryIndex(constructs.Construct):
+    def __init__(self, scope: constructs.Construct, id: str) -> None:
+        super().__init__(scope, id)
+
+        stack = aws_cdk.Stack.of(scope)
+
+        # Derived from the Parameter Store and rebuilt by invoking the Lambda with {"Rebuild": true}
+        self._table = dynamodb.Table(
+            self,
+            "Table",
+            partition_key=dynamodb.Attribute(name="IndexKey", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="IndexValue", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=aws_cdk.RemovalPolicy.DESTROY,
+        )
+
+        self._indexer = aws_lambda.Function(
+            self,
+            "Indexer",
+            function_name="EMRLaunch_RegistryIndex",
+            description=f"Version: {__package__}",
+            code=aws_lambda.Code.from_asset(_lambda_path("registry_index")),
+            handler="registry_index.handler",
+            **dict(
+                LambdaRuntimeProfile.of(stack).function_props(),
+                # A rebuild indexes the whole registry
+                timeout=aws_cdk.Duration.minutes(15),
+            ),
+            layers=[EMRConfigUtilsLayerBuilder.get_or_build(stack)],
+            environment={
+                "AWS_EMR_LAUNCH_PRODUCT": __product__,
+                "AWS_EMR_LAUNCH_VERSION": __version__,
+                "REGISTRY_INDEX_TABLE": self._table.table_name,
+            },
+            initial_policy=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameter", "ssm:GetParametersByPath"],
+                    resources=[
+                        stack.format_arn(partition=stack.partition, service="ssm", resource="parameter/emr_launch/*")
+                    ],
+                )
+            ],
+        )
+        self._table.grant_read_write_data(self._indexer)
+        ParameterStorage.of(stack).grant_read(self._indexer)
+
+        events.Rule(
+            self,
+            "ParameterChangeRule",
+            event_pattern=events.EventPattern(
+                source=["aws.ssm"],
+                detail_type=["Parameter Store Change"],
+                detail={"name": [{"prefix": "/emr_launch/"}]},
+            ),
+            targets=[events_targets.LambdaFunction(self._indexer)],
+        )
+
+    @property
+    def table(self) -> dynamodb.Table:
+        return self._table
+
+    @property
+    def indexer(self) -> aws_lambda.Function:
+        return self._indexer
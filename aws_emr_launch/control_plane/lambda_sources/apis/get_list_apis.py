@@ -1,12 +1,13 @@
+import hashlib
 import json
 import logging
 import os
 import traceback
-from typing import Any, Dict, Optional, cast
+from typing import Any, Dict, List, Optional, Set, cast
 
-import boto3
-import botocore
-from botocore.exceptions import ClientError
+from emr_config_utils.clients import LazyClient
+from emr_config_utils.registry import ParameterNotFoundError, Registry, version_name
+from emr_config_utils.stored_values import decode_stored_value
 
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
@@ -16,6 +17,15 @@ PROFILES_SSM_PARAMETER_PREFIX = "/emr_launch/emr_profiles"
 CONFIGURATIONS_SSM_PARAMETER_PREFIX = "/emr_launch/cluster_configurations"
 FUNCTIONS_SSM_PARAMETER_PREFIX = "/emr_launch/emr_launch_functions"
 
+# get_parameters_by_path returns at most 10 Parameters per page
+MAX_PAGE_SIZE = 10
+# Listings without MaxResults return this many items and a NextToken, keeping the responses well
+# under the 6MB Lambda response limit
+DEFAULT_MAX_RESULTS = 50
+
+# Populated from Parameter Store Change events by the RegistryIndex Lambda
+REGISTRY_INDEX_TABLE = os.environ.get("REGISTRY_INDEX_TABLE", "")
+
 
 class EMRProfileNotFoundError(Exception):
     pass
@@ -29,41 +39,74 @@ class EMRLaunchFunctionNotFoundError(Exception):
     pass
 
 
-def _get_botocore_config() -> botocore.config.Config:
-    product = os.environ.get("AWS_EMR_LAUNCH_PRODUCT", "")
-    version = os.environ.get("AWS_EMR_LAUNCH_VERSION", "")
-    return botocore.config.Config(
-        retries={"max_attempts": 5},
-        connect_timeout=10,
-        max_pool_connections=10,
-        user_agent_extra=f"{product}/{version}",
-    )
+# A client error in the request (HTTP 400)
+class BadRequestError(Exception):
+    pass
+
+
+ssm = LazyClient("ssm")
+dynamodb = LazyClient("dynamodb")
 
 
-def _boto3_client(service_name: str) -> boto3.client:
-    return boto3.Session().client(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+def _registry() -> Registry:
+    # Each namespace is read from its registry backend (SSM by default)
+    return Registry.from_environment(ssm)
 
 
-ssm = _boto3_client("ssm")
+def _parameter_item(parameter: Dict[str, Any], ssm_parameter_prefix: str, names_only: bool) -> Dict[str, Any]:
+    if not names_only:
+        return cast(Dict[str, Any], decode_stored_value(parameter["Value"]))
+
+    # Summary projection from the Parameter metadata, without decoding the stored JSON
+    namespace, _, name = parameter["Name"][len(ssm_parameter_prefix) + 1 :].rpartition("/")
+    return {"Namespace": namespace, "Name": name, "Version": parameter.get("Version")}
 
 
 def _get_parameter_values(
-    ssm_parameter_prefix: str, top_level_return: str, namespace: str = "default", next_token: Optional[str] = None
+    ssm_parameter_prefix: str,
+    top_level_return: str,
+    namespace: str = "default",
+    next_token: Optional[str] = None,
+    max_results: Optional[int] = None,
+    recursive: bool = False,
+    names_only: bool = False,
 ) -> Dict[str, Any]:
-    params = {"Path": f"{ssm_parameter_prefix}/{namespace}/"}
-    if next_token:
-        params["NextToken"] = next_token
-    result = ssm.get_parameters_by_path(**params)
+    path = f"{ssm_parameter_prefix}/" if recursive else f"{ssm_parameter_prefix}/{namespace}/"
+    items: List[Dict[str, Any]] = []
+    registry = _registry()
+
+    while True:
+        # Never request more than remain, so the NextToken returned resumes exactly after the last item
+        remaining = None if max_results is None else max_results - len(items)
+        parameters, next_token = registry.list(
+            path,
+            recursive,
+            max_results=MAX_PAGE_SIZE if remaining is None else min(MAX_PAGE_SIZE, remaining),
+            next_token=next_token,
+        )
+
+        items.extend(_parameter_item(p, ssm_parameter_prefix, names_only) for p in parameters)
+        if not next_token or (max_results is not None and len(items) >= max_results):
+            break
 
-    return_val: Dict[str, Any] = {top_level_return: [json.loads(p["Value"]) for p in result["Parameters"]]}
-    if "NextToken" in result:
-        return_val["NextToken"] = result["NextToken"]
+    return_val: Dict[str, Any] = {top_level_return: items}
+    if next_token:
+        return_val["NextToken"] = next_token
     return return_val
 
 
+def _max_results(event: Dict[str, Any]) -> int:
+    max_results = event.get("MaxResults", None)
+    if max_results is None:
+        return DEFAULT_MAX_RESULTS
+    if isinstance(max_results, bool) or not isinstance(max_results, int) or max_results < 1:
+        raise BadRequestError(f"MaxResults must be a positive integer: {max_results}")
+    return max_results
+
+
 def _get_parameter_value(ssm_parameter_prefix: str, name: str, namespace: str = "default") -> Dict[str, Any]:
-    configuration_json = ssm.get_parameter(Name=f"{ssm_parameter_prefix}/{namespace}/{name}")["Parameter"]["Value"]
-    return cast(Dict[str, Any], json.loads(configuration_json))
+    configuration_json = _registry().get_item(f"{ssm_parameter_prefix}/{namespace}/{name}")["Value"]
+    return cast(Dict[str, Any], decode_stored_value(configuration_json))
 
 
 def _log_exception(e: Exception, event: Dict[str, Any]) -> None:
@@ -76,10 +119,18 @@ def get_profiles_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]
     LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
     namespace = event.get("Namespace", "default")
     next_token = event.get("NextToken", None)
+    recursive = event.get("Recursive", False)
+    names_only = event.get("NamesOnly", False)
 
     try:
-        return _get_parameter_values(PROFILES_SSM_PARAMETER_PREFIX, "EMRProfiles", namespace, next_token)
+        max_results = _max_results(event)
+        return _get_parameter_values(
+            PROFILES_SSM_PARAMETER_PREFIX, "EMRProfiles", namespace, next_token, max_results, recursive, names_only
+        )
 
+    except BadRequestError as e:
+        LOGGER.error(str(e))
+        raise e
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -93,13 +144,9 @@ def get_profile_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]
     try:
         return _get_parameter_value(PROFILES_SSM_PARAMETER_PREFIX, profile_name, namespace)
 
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ParameterNotFound":
-            LOGGER.error(f"ProfileNotFound: {namespace}/{profile_name}")
-            raise EMRProfileNotFoundError(f"ProfileNotFound: {namespace}/{profile_name}")
-        else:
-            _log_exception(e, event)
-            raise e
+    except ParameterNotFoundError:
+        LOGGER.error(f"ProfileNotFound: {namespace}/{profile_name}")
+        raise EMRProfileNotFoundError(f"ProfileNotFound: {namespace}/{profile_name}")
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -109,12 +156,24 @@ def get_configurations_handler(event: Dict[str, Any], context: Optional[Dict[str
     LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
     namespace = event.get("Namespace", "default")
     next_token = event.get("NextToken", None)
+    recursive = event.get("Recursive", False)
+    names_only = event.get("NamesOnly", False)
 
     try:
+        max_results = _max_results(event)
         return _get_parameter_values(
-            CONFIGURATIONS_SSM_PARAMETER_PREFIX, "ClusterConfigurations", namespace, next_token
+            CONFIGURATIONS_SSM_PARAMETER_PREFIX,
+            "ClusterConfigurations",
+            namespace,
+            next_token,
+            max_results,
+            recursive,
+            names_only,
         )
 
+    except BadRequestError as e:
+        LOGGER.error(str(e))
+        raise e
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -128,13 +187,9 @@ def get_configuration_handler(event: Dict[str, Any], context: Optional[Dict[str,
     try:
         return _get_parameter_value(CONFIGURATIONS_SSM_PARAMETER_PREFIX, configuration_name, namespace)
 
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ParameterNotFound":
-            LOGGER.error(f"ConfigurationNotFound: {namespace}/{configuration_name}")
-            raise ClusterConfigurationNotFoundError(f"ConfigurationNotFound: {namespace}/{configuration_name}")
-        else:
-            _log_exception(e, event)
-            raise e
+    except ParameterNotFoundError:
+        LOGGER.error(f"ConfigurationNotFound: {namespace}/{configuration_name}")
+        raise ClusterConfigurationNotFoundError(f"ConfigurationNotFound: {namespace}/{configuration_name}")
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -144,10 +199,24 @@ def get_functions_handler(event: Dict[str, Any], context: Optional[Dict[str, Any
     LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
     namespace = event.get("Namespace", "default")
     next_token = event.get("NextToken", None)
+    recursive = event.get("Recursive", False)
+    names_only = event.get("NamesOnly", False)
 
     try:
-        return _get_parameter_values(FUNCTIONS_SSM_PARAMETER_PREFIX, "EMRLaunchFunctions", namespace, next_token)
+        max_results = _max_results(event)
+        return _get_parameter_values(
+            FUNCTIONS_SSM_PARAMETER_PREFIX,
+            "EMRLaunchFunctions",
+            namespace,
+            next_token,
+            max_results,
+            recursive,
+            names_only,
+        )
 
+    except BadRequestError as e:
+        LOGGER.error(str(e))
+        raise e
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -161,13 +230,137 @@ def get_function_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]
     try:
         return _get_parameter_value(FUNCTIONS_SSM_PARAMETER_PREFIX, function_name, namespace)
 
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ParameterNotFound":
-            LOGGER.error(f"FunctionNotFound: {namespace}/{function_name}")
-            raise EMRLaunchFunctionNotFoundError(f"FunctionNotFound: {namespace}/{function_name}")
-        else:
-            _log_exception(e, event)
-            raise e
+    except ParameterNotFoundError:
+        LOGGER.error(f"FunctionNotFound: {namespace}/{function_name}")
+        raise EMRLaunchFunctionNotFoundError(f"FunctionNotFound: {namespace}/{function_name}")
+    except Exception as e:
+        _log_exception(e, event)
+        raise e
+
+
+def _parameters_etag(parameters: List[Dict[str, Any]]) -> str:
+    # Changes whenever any of the Parameters is updated, as every update increments its Version
+    versions = ",".join(f'{p["Name"]}:{p["Version"]}' for p in sorted(parameters, key=lambda p: p["Name"]))
+    return hashlib.sha256(versions.encode("utf-8")).hexdigest()
+
+
+def _describe_function(function_name: str, namespace: str, if_none_match: Optional[str] = None) -> Dict[str, Any]:
+    registry = _registry()
+    function_parameter = registry.get_item(f"{FUNCTIONS_SSM_PARAMETER_PREFIX}/{namespace}/{function_name}")
+    function = decode_stored_value(function_parameter["Value"])
+
+    # The referenced Profile and Configuration are fetched together (a single GetParameters call with SSM),
+    # reading the versions the function pins, if any
+    profile_name = f'{PROFILES_SSM_PARAMETER_PREFIX}/{function["EMRProfile"]}'
+    if function.get("EMRProfileVersion"):
+        profile_name = version_name(profile_name, function["EMRProfileVersion"])
+    configuration_name = f'{CONFIGURATIONS_SSM_PARAMETER_PREFIX}/{function["ClusterConfiguration"]}'
+    if function.get("ClusterConfigurationVersion"):
+        configuration_name = version_name(configuration_name, function["ClusterConfigurationVersion"])
+    parameters = registry.get_many([profile_name, configuration_name])
+
+    if profile_name not in parameters:
+        raise EMRProfileNotFoundError(f'ProfileNotFound: {function["EMRProfile"]}')
+    if configuration_name not in parameters:
+        raise ClusterConfigurationNotFoundError(f'ConfigurationNotFound: {function["ClusterConfiguration"]}')
+
+    etag = _parameters_etag([function_parameter] + list(parameters.values()))
+    if if_none_match == etag:
+        return {"ETag": etag, "NotModified": True}
+
+    return {
+        "EMRLaunchFunction": function,
+        "EMRProfile": decode_stored_value(parameters[profile_name]["Value"]),
+        "ClusterConfiguration": decode_stored_value(parameters[configuration_name]["Value"]),
+        "ETag": etag,
+        "NotModified": False,
+    }
+
+
+def describe_function_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
+    function_name = event.get("FunctionName", "")
+    namespace = event.get("Namespace", "default")
+    if_none_match = event.get("IfNoneMatch", None)
+
+    try:
+        return _describe_function(function_name, namespace, if_none_match)
+
+    except ParameterNotFoundError:
+        LOGGER.error(f"FunctionNotFound: {namespace}/{function_name}")
+        raise EMRLaunchFunctionNotFoundError(f"FunctionNotFound: {namespace}/{function_name}")
+    except (EMRProfileNotFoundError, ClusterConfigurationNotFoundError) as e:
+        LOGGER.error(str(e))
+        raise e
+    except Exception as e:
+        _log_exception(e, event)
+        raise e
+
+
+def _find_names(kind: str, attribute: str, value: str) -> Set[str]:
+    # A value ending with "*" matches by prefix, e.g. {"ReleaseLabel": "emr-6.*"}
+    value_prefix = value[:-1] if value.endswith("*") else f"{value}#"
+    names: Set[str] = set()
+    paginator = dynamodb.get_paginator("query")
+    for page in paginator.paginate(
+        TableName=REGISTRY_INDEX_TABLE,
+        KeyConditionExpression="IndexKey = :index_key AND begins_with(IndexValue, :value_prefix)",
+        ExpressionAttributeValues={":index_key": {"S": f"{kind}#{attribute}"}, ":value_prefix": {"S": value_prefix}},
+    ):
+        names.update(item["IndexValue"]["S"].rpartition("#")[2] for item in page["Items"])
+    return names
+
+
+def _find_parameters(kind: str, top_level_return: str, filters: Dict[str, str]) -> Dict[str, Any]:
+    if not filters:
+        raise ValueError("At least one Filter is required")
+
+    names: Optional[Set[str]] = None
+    for attribute, value in filters.items():
+        matches = _find_names(kind, attribute, value)
+        names = matches if names is None else names & matches
+        if not names:
+            break
+
+    return {
+        top_level_return: [
+            {"Namespace": namespace, "Name": name}
+            for namespace, _, name in sorted(n.partition("/") for n in (names or set()))
+        ]
+    }
+
+
+def find_profiles_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
+    filters = event.get("Filters", {})
+
+    try:
+        return _find_parameters("emr_profiles", "EMRProfiles", filters)
+
+    except Exception as e:
+        _log_exception(e, event)
+        raise e
+
+
+def find_configurations_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
+    filters = event.get("Filters", {})
+
+    try:
+        return _find_parameters("cluster_configurations", "ClusterConfigurations", filters)
+
+    except Exception as e:
+        _log_exception(e, event)
+        raise e
+
+
+def find_functions_handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
+    filters = event.get("Filters", {})
+
+    try:
+        return _find_parameters("emr_launch_functions", "EMRLaunchFunctions", filters)
+
     except Exception as e:
         _log_exception(e, event)
         raise e
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import boto3
+import botocore
+from botocore.exceptions import ClientError
+from emr_config_utils.stored_values import decode_stored_value
+
+LOGGER = logging.getLogger()
+LOGGER.setLevel(logging.INFO)
+
+SSM_PARAMETER_ROOT = "/emr_launch"
+REGISTRY_INDEX_TABLE = os.environ.get("REGISTRY_INDEX_TABLE", "")
+
+# Each indexed value is stored as an item keyed by IndexKey "<kind>#<attribute>" and IndexValue
+# "<value>#<namespace>/<name>", so a search is a Query on a single IndexKey (exact value or value
+# prefix) whose cost depends on the number of matches, not on the size of the registry. A
+# "Parameter" item per parameter records its Version and the items indexed for it.
+PARAMETER_INDEX_KEY = "Parameter"
+
+# TransactWriteItems accepts at most 100 items per call
+MAX_TRANSACT_ITEMS = 100
+# A rebuild returns a continuation when less time than this remains in the invocation
+REBUILD_TIME_MARGIN_MS = 60000
+
+
+def _get_botocore_config() -> botocore.config.Config:
+    product = os.environ.get("AWS_EMR_LAUNCH_PRODUCT", "")
+    version = os.environ.get("AWS_EMR_LAUNCH_VERSION", "")
+    return botocore.config.Config(
+        retries={"max_attempts": 5},
+        connect_timeout=10,
+        max_pool_connections=10,
+        user_agent_extra=f"{product}/{version}",
+    )
+
+
+def _boto3_client(service_name: str) -> boto3.client:
+    return boto3.Session().client(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+
+
+ssm = _boto3_client("ssm")
+dynamodb = _boto3_client("dynamodb")
+
+
+def _profile_attributes(profile: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+    roles = profile.get("Roles", None) or {}
+    return [
+        ("Vpc", profile.get("Vpc", None)),
+        ("ServiceRole", roles.get("ServiceRole", None)),
+        ("InstanceRole", roles.get("InstanceRole", None)),
+        ("ArtifactsBucket", profile.get("ArtifactsBucket", None)),
+        ("LogsBucket", profile.get("LogsBucket", None)),
+    ]
+
+
+def _configuration_attributes(configuration: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+    cluster_configuration = configuration.get("ClusterConfiguration", None) or {}
+    attributes = [("ReleaseLabel", cluster_configuration.get("ReleaseLabel", None))]
+    attributes.extend(("Application", a.get("Name", None)) for a in cluster_configuration.get("Applications", []))
+    return attributes
+
+
+def _function_attributes(function: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+    return [
+        ("EMRProfile", function.get("EMRProfile", None)),
+        ("ClusterConfiguration", function.get("ClusterConfiguration", None)),
+        ("ClusterName", function.get("ClusterName", None)),
+    ]
+
+
+INDEXED_ATTRIBUTES: Dict[str, Callable[[Dict[str, Any]], List[Tuple[str, Optional[str]]]]] = {
+    "emr_profiles": _profile_attributes,
+    "cluster_configurations": _configuration_attributes,
+    "emr_launch_functions": _function_attributes,
+}
+
+
+def parse_parameter_name(parameter_name: str) -> Optional[Tuple[str, str, str]]:
+    parts = parameter_name[len(SSM_PARAMETER_ROOT) + 1 :].split("/")
+    if not parameter_name.startswith(f"{SSM_PARAMETER_ROOT}/") or len(parts) != 3 or parts[0] not in INDEXED_ATTRIBUTES:
+        return None
+    kind, namespace, name = parts
+    return kind, namespace, name
+
+
+def index_entries(parameter_name: str, value: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    parsed = parse_parameter_name(parameter_name)
+    if parsed is None:
+        return set()
+    kind, namespace, name = parsed
+    return {
+        (f"{kind}#{attribute}", f"{attribute_value}#{namespace}/{name}")
+        for attribute, attribute_value in INDEXED_ATTRIBUTES[kind](value)
+        if attribute_value
+    }
+
+
+def _get_indexed_parameter(parameter_name: str) -> Tuple[int, Set[Tuple[str, str]]]:
+    item = dynamodb.get_item(
+        TableName=REGISTRY_INDEX_TABLE,
+        Key={"IndexKey": {"S": PARAMETER_INDEX_KEY}, "IndexValue": {"S": parameter_name}},
+        ConsistentRead=True,
+    ).get("Item", None)
+    if item is None:
+        return 0, set()
+    entries = {(e["M"]["IndexKey"]["S"], e["M"]["IndexValue"]["S"]) for e in item["Entries"]["L"]}
+    return int(item["Version"]["N"]), entries
+
+
+def _entry_key(entry: Tuple[str, str]) -> Dict[str, Any]:
+    return {"IndexKey": {"S": entry[0]}, "IndexValue": {"S": entry[1]}}
+
+
+def index_parameter(parameter_name: str) -> None:
+    try:
+        parameter = ssm.get_parameter(Name=parameter_name)["Parameter"]
+        version = parameter["Version"]
+        entries = index_entries(parameter_name, decode_stored_value(parameter["Value"]))
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ParameterNotFound":
+            raise e
+        # Deleted parameters are removed from the index
+        version, entries = None, set()
+
+    indexed_version, indexed_entries = _get_indexed_parameter(parameter_name)
+    if version is not None and version <= indexed_version:
+        LOGGER.info(f"Parameter {parameter_name} version {version} is already indexed")
+        return
+
+    parameter_key = _entry_key((PARAMETER_INDEX_KEY, parameter_name))
+    items: List[Dict[str, Any]] = []
+    if version is None:
+        items.append({"Delete": {"TableName": REGISTRY_INDEX_TABLE, "Key": parameter_key}})
+    else:
+        # Guards against a concurrent invocation that has already indexed a newer version
+        items.append(
+            {
+                "Put": {
+                    "TableName": REGISTRY_INDEX_TABLE,
+                    "Item": dict(
+                        parameter_key,
+                        Version={"N": str(version)},
+                        Entries={"L": [{"M": _entry_key(e)} for e in sorted(entries)]},
+                    ),
+                    "ConditionExpression": "attribute_not_exists(Version) OR Version < :version",
+                    "ExpressionAttributeValues": {":version": {"N": str(version)}},
+                }
+            }
+        )
+    items.extend(
+        {"Delete": {"TableName": REGISTRY_INDEX_TABLE, "Key": _entry_key(e)}} for e in indexed_entries - entries
+    )
+    items.extend({"Put": {"TableName": REGISTRY_INDEX_TABLE, "Item": _entry_key(e)}} for e in entries - indexed_entries)
+
+    # The Parameter item goes in the first transaction, so nothing is written when a newer version is already
+    # indexed; the entries of a parameter with more items than a transaction accepts follow in further transactions
+    try:
+        dynamodb.transact_write_items(TransactItems=items[:MAX_TRANSACT_ITEMS])
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise e
+        LOGGER.info(f"Parameter {parameter_name} was indexed concurrently")
+        return
+    for i in range(MAX_TRANSACT_ITEMS, len(items), MAX_TRANSACT_ITEMS):
+        dynamodb.transact_write_items(TransactItems=items[i : i + MAX_TRANSACT_ITEMS])
+    LOGGER.info(f"Indexed {parameter_name} version {version}: {len(entries)} entries")
+
+
+def _remaining_time_ms(context: Any) -> Optional[int]:
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+    return None if get_remaining_time is None else int(get_remaining_time())
+
+
+# Indexes the stored parameters page by page, starting from the Kind and NextToken of a previous continuation, and
+# returns a continuation for the remaining pages when the invocation runs short of time
+def rebuild_index(
+    context: Any = None, kind: Optional[str] = None, next_token: Optional[str] = None
+) -> Tuple[int, Optional[Dict[str, Any]]]:
+    count = 0
+    kinds = list(INDEXED_ATTRIBUTES)
+    for kind in kinds[kinds.index(kind) if kind else 0 :]:
+        while True:
+            kwargs = {"NextToken": next_token} if next_token else {}
+            page = ssm.get_parameters_by_path(Path=f"{SSM_PARAMETER_ROOT}/{kind}/", Recursive=True, **kwargs)
+            for parameter in page["Parameters"]:
+                index_parameter(parameter["Name"])
+                count += 1
+            next_token = page.get("NextToken", None)
+            if not next_token:
+                break
+            remaining = _remaining_time_ms(context)
+            if remaining is not None and remaining < REBUILD_TIME_MARGIN_MS:
+                return count, {"Rebuild": True, "Kind": kind, "NextToken": next_token}
+    return count, None
+
+
+def _log_exception(e: Exception, event: Dict[str, Any]) -> None:
+    trc = traceback.format_exc()
+    s = "Error processing event {}: {}\n\n{}".format(str(event), str(e), trc)
+    LOGGER.error(s)
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    LOGGER.info("Lambda metadata: {} (type = {})".format(json.dumps(event), type(event)))
+
+    try:
+        # Invoked with {"Rebuild": true} to (re)index every stored parameter, e.g. after deployment. An unfinished
+        # rebuild returns a Continuation, the payload of the next invocation
+        if event.get("Rebuild", False):
+            count, continuation = rebuild_index(context, event.get("Kind", None), event.get("NextToken", None))
+            response: Dict[str, Any] = {"IndexedParameters": count}
+            if continuation is not None:
+                response["Continuation"] = continuation
+            return response
+
+        # Parameter Store Change event
+        parameter_name = event["detail"]["name"]
+        if parse_parameter_name(parameter_name) is None:
+            return {"IndexedParameters": 0}
+        index_parameter(parameter_name)
+        return {"IndexedParameters": 1}
+
+    except Exception as e:
+        _log_exception(e, event)
+        raise e
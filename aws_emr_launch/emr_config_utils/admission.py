@@ -0,0 +1,380 @@
+import copy
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .clients import LazyClient
+
+# Cluster launches of EMRLaunchFunctions with use_admission_control wait in a queue until they are admitted.
+# Requests are admitted within the limits of their namespace's launches in flight (admitted, but not yet
+# completed) and requested vCPUs, and at most LaunchRate launches per second (with bursts of LaunchBurst)
+# across all namespaces. The highest Priority is admitted first, and namespaces with fewer launches in
+# flight first among requests of the same Priority. The policy is configured with ADMISSION_POLICY:
+#   {"LaunchRate": 0.5, "LaunchBurst": 5, "StartupTimeout": 3600,
+#    "Default": {"MaxConcurrentLaunches": 10, "MaxVCpus": null},
+#    "Namespaces": {"<namespace>": {"MaxConcurrentLaunches": 2, "MaxVCpus": 512}}}
+# Admitted launches not completed within StartupTimeout seconds no longer count as in flight.
+ADMISSION_POLICY_ENV = "ADMISSION_POLICY"
+ADMISSION_TABLE_ENV = "LAUNCH_ADMISSION_TABLE"
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "LaunchRate": 0.5,
+    "LaunchBurst": 5,
+    "StartupTimeout": 3600,
+    "Default": {"MaxConcurrentLaunches": 10, "MaxVCpus": None},
+    "Namespaces": {},
+}
+
+QUEUED = "QUEUED"
+ADMITTED = "ADMITTED"
+
+# Dispatches are serialized by a lease on the dispatcher item, which also holds the token bucket
+DISPATCHER_ID = "#dispatcher"
+DISPATCHER_LEASE_SECONDS = 60
+
+# Records of requests that are never admitted or completed expire with the table TTL
+RECORD_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# The tokens of the launch rate token bucket and when they were counted, (None, None) before the first dispatch
+Bucket = Tuple[Optional[float], Optional[float]]
+
+# Notifies the launch of a request, returning False when the launch is no longer waiting for admission
+Notify = Callable[[Dict[str, Any]], bool]
+
+
+class AdmissionError(Exception):
+    pass
+
+
+def load_policy(policy_json: Optional[str] = None) -> Dict[str, Any]:
+    policy_json = os.environ.get(ADMISSION_POLICY_ENV, None) if policy_json is None else policy_json
+    policy = copy.deepcopy(DEFAULT_POLICY)
+    if policy_json:
+        policy.update(json.loads(policy_json))
+    return policy
+
+
+def namespace_limits(policy: Dict[str, Any], namespace: str) -> Dict[str, Any]:
+    limits = dict(policy["Default"])
+    limits.update(policy["Namespaces"].get(namespace, {}))
+    return limits
+
+
+# An upper bound of the vCPUs of the Cluster request: Instance Fleets are assumed to reach their target
+# capacity with the instance type with the most vCPUs per unit of capacity
+def requested_vcpus(cluster: Dict[str, Any], instance_vcpus: Callable[[str], int]) -> int:
+    instances = cluster["Instances"]
+    if instances.get("InstanceGroups", None):
+        return sum(g["InstanceCount"] * instance_vcpus(g["InstanceType"]) for g in instances["InstanceGroups"])
+    if instances.get("InstanceFleets", None):
+        vcpus = 0
+        for fleet in instances["InstanceFleets"]:
+            capacity = fleet.get("TargetOnDemandCapacity", 0) + fleet.get("TargetSpotCapacity", 0)
+            per_unit = max(
+                instance_vcpus(c["InstanceType"]) / c.get("WeightedCapacity", 1) for c in fleet["InstanceTypeConfigs"]
+            )
+            vcpus += math.ceil(capacity * per_unit)
+        return vcpus
+    count = instances.get("InstanceCount", 1)
+    vcpus = instance_vcpus(instances["MasterInstanceType"])
+    if count > 1:
+        vcpus += (count - 1) * instance_vcpus(instances["SlaveInstanceType"])
+    return vcpus
+
+
+class AdmissionStore(ABC):
+    @abstractmethod
+    def put_request(self, request: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def list_requests(self) -> List[Dict[str, Any]]: ...
+
+    # Admits a QUEUED request, returning False when it was admitted or removed since it was listed
+    @abstractmethod
+    def admit(self, request_id: str, admitted_at: float, admitted_until: float) -> bool: ...
+
+    @abstractmethod
+    def delete(self, request_id: str) -> None: ...
+
+    # Leases the dispatcher, returning its token bucket, or None when it is leased
+    @abstractmethod
+    def lease_dispatcher(self, owner: str, now: float) -> Optional[Bucket]: ...
+
+    @abstractmethod
+    def release_dispatcher(self, owner: str, tokens: float, updated_at: float) -> None: ...
+
+
+class LocalAdmissionStore(AdmissionStore):
+    # An in-memory stand-in for the DynamoDB store, e.g. for tests and local runs
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self._dispatcher: Dict[str, Any] = {}
+
+    def put_request(self, request: Dict[str, Any]) -> None:
+        with self._lock:
+            self._requests[request["RequestId"]] = dict(request)
+
+    def list_requests(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._requests.values()]
+
+    def admit(self, request_id: str, admitted_at: float, admitted_until: float) -> bool:
+        with self._lock:
+            request = self._requests.get(request_id, None)
+            if request is None or request["State"] != QUEUED:
+                return False
+            request.update({"State": ADMITTED, "AdmittedAt": admitted_at, "AdmittedUntil": admitted_until})
+            return True
+
+    def delete(self, request_id: str) -> None:
+        with self._lock:
+            self._requests.pop(request_id, None)
+
+    def lease_dispatcher(self, owner: str, now: float) -> Optional[Bucket]:
+        with self._lock:
+            if self._dispatcher.get("LeasedUntil", 0) > now:
+                return None
+            self._dispatcher.update({"Owner": owner, "LeasedUntil": now + DISPATCHER_LEASE_SECONDS})
+            return self._dispatcher.get("Tokens", None), self._dispatcher.get("UpdatedAt", None)
+
+    def release_dispatcher(self, owner: str, tokens: float, updated_at: float) -> None:
+        with self._lock:
+            if self._dispatcher.get("Owner", None) == owner:
+                self._dispatcher.update({"Owner": None, "LeasedUntil": 0, "Tokens": tokens, "UpdatedAt": updated_at})
+
+
+class DynamoDBAdmissionStore(AdmissionStore):
+    # Requests are keyed by RequestId (the Step Functions execution), the dispatcher by DISPATCHER_ID
+
+    def __init__(self, table_name: str, client: Any = None) -> None:
+        self._table_name = table_name
+        self._client = LazyClient("dynamodb") if client is None else client
+
+    @staticmethod
+    def _number(value: float) -> Dict[str, str]:
+        return {"N": str(value)}
+
+    def put_request(self, request: Dict[str, Any]) -> None:
+        item = {
+            "RequestId": {"S": request["RequestId"]},
+            "State": {"S": request["State"]},
+            "Namespace": {"S": request["Namespace"]},
+            "Priority": self._number(request["Priority"]),
+            "VCpus": self._number(request["VCpus"]),
+            "TaskToken": {"S": request["TaskToken"]},
+            "EnqueuedAt": self._number(request["EnqueuedAt"]),
+            "ExpiresAt": self._number(int(request["EnqueuedAt"]) + RECORD_TTL_SECONDS),
+        }
+        self._client.put_item(TableName=self._table_name, Item=item)
+
+    def list_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        paginator = self._client.get_paginator("scan")
+        for page in paginator.paginate(
+            TableName=self._table_name,
+            FilterExpression="RequestId <> :dispatcher",
+            ExpressionAttributeValues={":dispatcher": {"S": DISPATCHER_ID}},
+            ConsistentRead=True,
+        ):
+            for item in page["Items"]:
+                request: Dict[str, Any] = {
+                    "RequestId": item["RequestId"]["S"],
+                    "State": item["State"]["S"],
+                    "Namespace": item["Namespace"]["S"],
+                    "Priority": int(item["Priority"]["N"]),
+                    "VCpus": int(item["VCpus"]["N"]),
+                    "TaskToken": item["TaskToken"]["S"],
+                    "EnqueuedAt": float(item["EnqueuedAt"]["N"]),
+                }
+                if "AdmittedUntil" in item:
+                    request["AdmittedAt"] = float(item["AdmittedAt"]["N"])
+                    request["AdmittedUntil"] = float(item["AdmittedUntil"]["N"])
+                requests.append(request)
+        return requests
+
+    def admit(self, request_id: str, admitted_at: float, admitted_until: float) -> bool:
+        try:
+            self._client.update_item(
+                TableName=self._table_name,
+                Key={"RequestId": {"S": request_id}},
+                UpdateExpression="SET #state = :admitted, AdmittedAt = :admitted_at, AdmittedUntil = :admitted_until",
+                ConditionExpression="#state = :queued",
+                ExpressionAttributeNames={"#state": "State"},
+                ExpressionAttributeValues={
+                    ":admitted": {"S": ADMITTED},
+                    ":queued": {"S": QUEUED},
+                    ":admitted_at": self._number(admitted_at),
+                    ":admitted_until": self._number(admitted_until),
+                },
+            )
+            return True
+        except self._client.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def delete(self, request_id: str) -> None:
+        self._client.delete_item(TableName=self._table_name, Key={"RequestId": {"S": request_id}})
+
+    def lease_dispatcher(self, owner: str, now: float) -> Optional[Bucket]:
+        try:
+            result = self._client.update_item(
+                TableName=self._table_name,
+                Key={"RequestId": {"S": DISPATCHER_ID}},
+                UpdateExpression="SET #owner = :owner, LeasedUntil = :leased_until",
+                ConditionExpression="attribute_not_exists(LeasedUntil) OR LeasedUntil <= :now",
+                ExpressionAttributeNames={"#owner": "Owner"},
+                ExpressionAttributeValues={
+                    ":owner": {"S": owner},
+                    ":now": self._number(now),
+                    ":leased_until": self._number(now + DISPATCHER_LEASE_SECONDS),
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except self._client.exceptions.ConditionalCheckFailedException:
+            return None
+        attributes = result["Attributes"]
+        if "Tokens" not in attributes:
+            return None, None
+        return float(attributes["Tokens"]["N"]), float(attributes["UpdatedAt"]["N"])
+
+    def release_dispatcher(self, owner: str, tokens: float, updated_at: float) -> None:
+        try:
+            self._client.update_item(
+                TableName=self._table_name,
+                Key={"RequestId": {"S": DISPATCHER_ID}},
+                UpdateExpression="SET LeasedUntil = :zero, Tokens = :tokens, UpdatedAt = :updated_at",
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "Owner"},
+                ExpressionAttributeValues={
+                    ":owner": {"S": owner},
+                    ":zero": {"N": "0"},
+                    ":tokens": self._number(tokens),
+                    ":updated_at": self._number(updated_at),
+                },
+            )
+        except self._client.exceptions.ConditionalCheckFailedException:
+            pass
+
+
+def store_from_environment() -> AdmissionStore:
+    table_name = os.environ.get(ADMISSION_TABLE_ENV, None)
+    if not table_name:
+        raise AdmissionError(f"{ADMISSION_TABLE_ENV} is not set")
+    return DynamoDBAdmissionStore(table_name)
+
+
+class AdmissionScheduler:
+    def __init__(self, store: AdmissionStore, policy: Optional[Dict[str, Any]] = None) -> None:
+        self._store = store
+        self._policy = load_policy() if policy is None else policy
+
+    @property
+    def policy(self) -> Dict[str, Any]:
+        return self._policy
+
+    def enqueue(
+        self,
+        request_id: str,
+        namespace: str,
+        task_token: str,
+        vcpus: int,
+        priority: int = 0,
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        max_vcpus = namespace_limits(self._policy, namespace).get("MaxVCpus", None)
+        if max_vcpus is not None and vcpus > max_vcpus:
+            raise AdmissionError(f"The launch requests {vcpus} vCPUs, more than the {max_vcpus} of {namespace}")
+        request = {
+            "RequestId": request_id,
+            "State": QUEUED,
+            "Namespace": namespace,
+            "Priority": priority,
+            "VCpus": vcpus,
+            "TaskToken": task_token,
+            "EnqueuedAt": time.time() if now is None else now,
+        }
+        self._store.put_request(request)
+        return request
+
+    def complete(self, request_id: str) -> None:
+        self._store.delete(request_id)
+
+    def _refill(self, bucket: Bucket, now: float) -> float:
+        burst = float(self._policy["LaunchBurst"])
+        tokens, updated_at = bucket
+        if tokens is None or updated_at is None:
+            return burst
+        return min(burst, tokens + max(0.0, now - updated_at) * float(self._policy["LaunchRate"]))
+
+    # Admits the queued requests within the limits, returning them. Returns no requests when another
+    # dispatch is in progress, which admits the requests queued before it listed them.
+    # Requests are notified before they are admitted, and removed when their launch is no longer waiting.
+    # When notify raises, the requests not yet admitted stay queued for the next dispatch. The requests
+    # left queued are passed to heartbeat, and removed the same way
+    def dispatch(
+        self, now: Optional[float] = None, notify: Optional[Notify] = None, heartbeat: Optional[Notify] = None
+    ) -> List[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        owner = f"{os.getpid()}-{threading.get_ident()}-{now}"
+        bucket = self._store.lease_dispatcher(owner, now)
+        if bucket is None:
+            return []
+
+        tokens = self._refill(bucket, now)
+        admitted: List[Dict[str, Any]] = []
+        try:
+            queues: Dict[str, List[Dict[str, Any]]] = {}
+            in_flight: Dict[str, int] = {}
+            vcpus: Dict[str, int] = {}
+            for request in self._store.list_requests():
+                namespace = request["Namespace"]
+                if request["State"] == QUEUED:
+                    queues.setdefault(namespace, []).append(request)
+                elif request["AdmittedUntil"] > now:
+                    in_flight[namespace] = in_flight.get(namespace, 0) + 1
+                    vcpus[namespace] = vcpus.get(namespace, 0) + request["VCpus"]
+                else:
+                    # The launch didn't complete within the StartupTimeout
+                    self._store.delete(request["RequestId"])
+            for queue in queues.values():
+                queue.sort(key=lambda r: (-r["Priority"], r["EnqueuedAt"]))
+
+            def fits(namespace: str) -> bool:
+                limits = namespace_limits(self._policy, namespace)
+                max_launches, max_vcpus = limits.get("MaxConcurrentLaunches", None), limits.get("MaxVCpus", None)
+                if max_launches is not None and in_flight.get(namespace, 0) >= max_launches:
+                    return False
+                return max_vcpus is None or vcpus.get(namespace, 0) + queues[namespace][0]["VCpus"] <= max_vcpus
+
+            while tokens >= 1:
+                candidates = [n for n in queues if queues[n] and fits(n)]
+                if not candidates:
+                    break
+                namespace = min(
+                    candidates,
+                    key=lambda n: (-queues[n][0]["Priority"], in_flight.get(n, 0), queues[n][0]["EnqueuedAt"]),
+                )
+                request = dict(queues[namespace].pop(0), State=ADMITTED, AdmittedAt=now)
+                if notify is not None and not notify(request):
+                    self._store.delete(request["RequestId"])
+                    continue
+                # A notified launch can complete, removing its request, before it is admitted
+                self._store.admit(request["RequestId"], now, now + float(self._policy["StartupTimeout"]))
+                tokens -= 1
+                in_flight[namespace] = in_flight.get(namespace, 0) + 1
+                vcpus[namespace] = vcpus.get(namespace, 0) + request["VCpus"]
+                admitted.append(request)
+
+            if heartbeat is not None:
+                for queue in queues.values():
+                    for request in queue:
+                        if not heartbeat(request):
+                            self._store.delete(request["RequestId"])
+        finally:
+            self._store.release_dispatcher(owner, tokens, now)
+        return admitted
@@ -0,0 +1,63 @@
+import os
+import threading
+from typing import Any, Dict
+
+# Clients are created on first use and shared by all the invocations of a Lambda container.
+# boto3 is only imported when the first client is created, so handlers that never call an
+# AWS API do not pay for it on cold start.
+#
+# The botocore configuration can be tuned with environment variables:
+#   AWS_EMR_LAUNCH_MAX_ATTEMPTS          (default 5)
+#   AWS_EMR_LAUNCH_RETRY_MODE            ("legacy", "standard" or "adaptive", by default botocore's, which
+#                                        follows AWS_RETRY_MODE)
+#   AWS_EMR_LAUNCH_MAX_POOL_CONNECTIONS  (default 10)
+#   AWS_EMR_LAUNCH_CONNECT_TIMEOUT       (default 10 seconds)
+#   AWS_EMR_LAUNCH_READ_TIMEOUT          (default 60 seconds)
+
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_botocore_config() -> Any:
+    import botocore.config
+
+    product = os.environ.get("AWS_EMR_LAUNCH_PRODUCT", "")
+    version = os.environ.get("AWS_EMR_LAUNCH_VERSION", "")
+    retries: Dict[str, Any] = {"max_attempts": int(os.environ.get("AWS_EMR_LAUNCH_MAX_ATTEMPTS", "5"))}
+    if "AWS_EMR_LAUNCH_RETRY_MODE" in os.environ:
+        retries["mode"] = os.environ["AWS_EMR_LAUNCH_RETRY_MODE"]
+    return botocore.config.Config(
+        retries=retries,
+        connect_timeout=int(os.environ.get("AWS_EMR_LAUNCH_CONNECT_TIMEOUT", "10")),
+        read_timeout=int(os.environ.get("AWS_EMR_LAUNCH_READ_TIMEOUT", "60")),
+        max_pool_connections=int(os.environ.get("AWS_EMR_LAUNCH_MAX_POOL_CONNECTIONS", "10")),
+        user_agent_extra=f"{product}/{version}",
+    )
+
+
+def get_client(service_name: str) -> Any:
+    client = _clients.get(service_name, None)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name, None)
+            if client is None:
+                import boto3
+
+                client = boto3.Session().client(
+                    service_name=service_name, use_ssl=True, config=get_botocore_config()
+                )
+                _clients[service_name] = client
+    return client
+
+
+def reset_clients() -> None:
+    with _lock:
+        _clients.clear()
+
+
+class LazyClient:
+    def __init__(self, service_name: str) -> None:
+        self._service_name = service_name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_client(self._service_name), name)
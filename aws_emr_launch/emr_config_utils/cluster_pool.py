@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .clients import LazyClient
+
+# Idle Clusters launched by EMRLaunchFunctions with use_cluster_pool are reused by later launches of an
+# identical Cluster request. Launched Clusters are tagged with the fingerprint of their request and the
+# idle timeout of the pool, and are added to the ClusterPoolTable when they are released:
+#   {"ClusterId": ..., "Fingerprint": ..., "PoolState": "AVAILABLE", "ReleasedAt": <epoch>, "IdleUntil": <epoch>}
+# Launches lease an AVAILABLE Cluster with a conditional write, so a Cluster is only leased once, and tag it
+# with the tags of their request:
+#   {"ClusterId": ..., "PoolState": "LEASED", "LeaseId": <execution id>, "LeasedAt": <epoch>, "LeaseUntil": <epoch>}
+# Clusters still AVAILABLE after IdleUntil, or still LEASED after LeaseUntil, are terminated by the reaper, which
+# marks them TERMINATING (at TerminatingAt) until the Cluster is terminated.
+CLUSTER_POOL_TABLE_ENV = "CLUSTER_POOL_TABLE"
+FINGERPRINT_TAG = "aws-emr-launch:pool-fingerprint"
+IDLE_TIMEOUT_TAG = "aws-emr-launch:pool-idle-timeout"
+FINGERPRINT_INDEX = "Fingerprint"
+
+AVAILABLE = "AVAILABLE"
+LEASED = "LEASED"
+TERMINATING = "TERMINATING"
+
+# Leased Clusters that are never released are terminated after this long
+DEFAULT_LEASE_TIMEOUT_SECONDS = 24 * 60 * 60
+# Clusters the reaper failed to terminate are retried by a later reap after this long
+TERMINATE_RETRY_SECONDS = 15 * 60
+# Records expire with the table TTL this long after the reaper could terminate their Cluster
+RECORD_TTL_SECONDS = 24 * 60 * 60
+
+
+class ClusterPoolError(Exception):
+    pass
+
+
+def _canonical(value: Any) -> Any:
+    # None values are removed from the request by RunJobFlow, so they don't change the fingerprint
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+
+# The fingerprint of the launch request built by the LoadClusterConfiguration (or PrepareClusterLaunch) Task:
+# {"Cluster": ..., "SecretConfigurations": ..., "KerberosAttributesSecret": ...}. Tags are set per launch and
+# are excluded.
+def cluster_fingerprint(cluster_configuration: Dict[str, Any]) -> str:
+    cluster = {k: v for k, v in cluster_configuration["Cluster"].items() if k != "Tags"}
+    canonical = _canonical(
+        {
+            "Cluster": cluster,
+            "SecretConfigurations": cluster_configuration.get("SecretConfigurations", None),
+            "KerberosAttributesSecret": cluster_configuration.get("KerberosAttributesSecret", None),
+        }
+    )
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def pool_tags(fingerprint: str, idle_timeout: int) -> List[Dict[str, str]]:
+    return [{"Key": FINGERPRINT_TAG, "Value": fingerprint}, {"Key": IDLE_TIMEOUT_TAG, "Value": str(idle_timeout)}]
+
+
+class ClusterPool:
+    def __init__(self, table_name: str, dynamodb_client: Any = None, emr_client: Any = None) -> None:
+        self._table_name = table_name
+        self._dynamodb = LazyClient("dynamodb") if dynamodb_client is None else dynamodb_client
+        self._emr = LazyClient("emr") if emr_client is None else emr_client
+
+    def _available(self, fingerprint: str) -> List[str]:
+        # The most recently released Clusters first, they have the longest to live
+        cluster_ids = []
+        paginator = self._dynamodb.get_paginator("query")
+        for page in paginator.paginate(
+            TableName=self._table_name,
+            IndexName=FINGERPRINT_INDEX,
+            KeyConditionExpression="Fingerprint = :fingerprint",
+            FilterExpression="PoolState = :available",
+            ExpressionAttributeValues={":fingerprint": {"S": fingerprint}, ":available": {"S": AVAILABLE}},
+            ScanIndexForward=False,
+        ):
+            cluster_ids.extend([item["ClusterId"]["S"] for item in page["Items"]])
+        return cluster_ids
+
+    def _lease(self, cluster_id: str, lease_id: str, lease_timeout: int) -> bool:
+        now = int(time.time())
+        try:
+            self._dynamodb.update_item(
+                TableName=self._table_name,
+                Key={"ClusterId": {"S": cluster_id}},
+                UpdateExpression=(
+                    "SET PoolState = :leased, LeaseId = :lease_id, LeasedAt = :now, LeaseUntil = :lease_until, "
+                    "ExpiresAt = :expires_at"
+                ),
+                ConditionExpression="PoolState = :available",
+                ExpressionAttributeValues={
+                    ":leased": {"S": LEASED},
+                    ":available": {"S": AVAILABLE},
+                    ":lease_id": {"S": lease_id},
+                    ":now": {"N": str(now)},
+                    ":lease_until": {"N": str(now + lease_timeout)},
+                    ":expires_at": {"N": str(now + lease_timeout + RECORD_TTL_SECONDS)},
+                },
+            )
+            return True
+        except self._dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def _remove(self, cluster_id: str, state: str, lease_id: Optional[str] = None) -> None:
+        condition = "PoolState = :state" + (" AND LeaseId = :lease_id" if lease_id is not None else "")
+        values = {":state": {"S": state}}
+        if lease_id is not None:
+            values[":lease_id"] = {"S": lease_id}
+        try:
+            self._dynamodb.delete_item(
+                TableName=self._table_name,
+                Key={"ClusterId": {"S": cluster_id}},
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values,
+            )
+        except self._dynamodb.exceptions.ConditionalCheckFailedException:
+            pass
+
+    # Replaces the tags of an earlier launch with the tags of the launch leasing the Cluster
+    def _tag(self, description: Dict[str, Any], tags: List[Dict[str, str]]) -> None:
+        cluster = description["Cluster"]
+        stale_keys = {t["Key"] for t in cluster.get("Tags", [])} - {t["Key"] for t in tags}
+        if tags:
+            self._emr.add_tags(ResourceId=cluster["Id"], Tags=tags)
+        if stale_keys:
+            self._emr.remove_tags(ResourceId=cluster["Id"], TagKeys=sorted(stale_keys))
+        cluster["Tags"] = tags
+
+    # Leases an AVAILABLE, WAITING Cluster with the fingerprint, returning its DescribeCluster response. With tags,
+    # the leased Cluster is tagged with them
+    def acquire(
+        self,
+        fingerprint: str,
+        lease_id: str,
+        tags: Optional[List[Dict[str, str]]] = None,
+        lease_timeout: int = DEFAULT_LEASE_TIMEOUT_SECONDS,
+    ) -> Optional[Dict[str, Any]]:
+        for cluster_id in self._available(fingerprint):
+            if not self._lease(cluster_id, lease_id, lease_timeout):
+                continue
+            description: Dict[str, Any] = self._emr.describe_cluster(ClusterId=cluster_id)
+            if description["Cluster"]["Status"]["State"] == "WAITING":
+                if tags is not None:
+                    self._tag(description, tags)
+                return description
+            # The Cluster was terminated, or is running Steps not submitted through the pool
+            self._remove(cluster_id, LEASED, lease_id)
+        return None
+
+    # Returns a WAITING Cluster tagged by the pool to the pool. With a lease_id, only the lease holder can
+    # release a leased Cluster. idle_until (epoch seconds) overrides the idle timeout the Cluster is tagged with
+    def release(self, cluster_id: str, lease_id: Optional[str] = None, idle_until: Optional[int] = None) -> bool:
+        cluster = self._emr.describe_cluster(ClusterId=cluster_id)["Cluster"]
+        tags = {t["Key"]: t["Value"] for t in cluster.get("Tags", [])}
+        if cluster["Status"]["State"] != "WAITING" or FINGERPRINT_TAG not in tags:
+            return False
+
+        now = int(time.time())
+        if idle_until is None:
+            idle_until = now + int(tags.get(IDLE_TIMEOUT_TAG, "0"))
+        condition = "attribute_not_exists(ClusterId) OR (PoolState = :leased"
+        values = {":leased": {"S": LEASED}}
+        if lease_id is not None:
+            condition += " AND LeaseId = :lease_id"
+            values[":lease_id"] = {"S": lease_id}
+        try:
+            self._dynamodb.put_item(
+                TableName=self._table_name,
+                Item={
+                    "ClusterId": {"S": cluster_id},
+                    "Fingerprint": {"S": tags[FINGERPRINT_TAG]},
+                    "PoolState": {"S": AVAILABLE},
+                    "ReleasedAt": {"N": str(now)},
+                    "IdleUntil": {"N": str(idle_until)},
+                    "ExpiresAt": {"N": str(idle_until + RECORD_TTL_SECONDS)},
+                },
+                ConditionExpression=f"{condition})",
+                ExpressionAttributeValues=values,
+            )
+            return True
+        except self._dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def terminate(self, cluster_id: str) -> None:
+        self._emr.terminate_job_flows(JobFlowIds=[cluster_id])
+
+    # Terminates the Clusters that stayed AVAILABLE past their idle timeout, or LEASED past their lease timeout,
+    # returning their ids. Clusters that fail to terminate stay TERMINATING, and are retried by a later reap
+    def reap(self, now: Optional[int] = None) -> List[str]:
+        now = int(time.time()) if now is None else now
+        values = {
+            ":available": {"S": AVAILABLE},
+            ":leased": {"S": LEASED},
+            ":terminating": {"S": TERMINATING},
+            ":now": {"N": str(now)},
+            ":retry_before": {"N": str(now - TERMINATE_RETRY_SECONDS)},
+        }
+        expired_condition = (
+            "(PoolState = :available AND IdleUntil < :now) OR (PoolState = :leased AND LeaseUntil < :now) "
+            "OR (PoolState = :terminating AND TerminatingAt < :retry_before)"
+        )
+        expired = []
+        paginator = self._dynamodb.get_paginator("scan")
+        for page in paginator.paginate(
+            TableName=self._table_name,
+            FilterExpression=expired_condition,
+            ExpressionAttributeValues=values,
+        ):
+            expired.extend([item["ClusterId"]["S"] for item in page["Items"]])
+
+        terminated = []
+        for cluster_id in expired:
+            # A Cluster leased or released since the scan is not terminated
+            try:
+                self._dynamodb.update_item(
+                    TableName=self._table_name,
+                    Key={"ClusterId": {"S": cluster_id}},
+                    UpdateExpression="SET PoolState = :terminating, TerminatingAt = :now",
+                    ConditionExpression=expired_condition,
+                    ExpressionAttributeValues=values,
+                )
+            except self._dynamodb.exceptions.ConditionalCheckFailedException:
+                continue
+            try:
+                self.terminate(cluster_id)
+            except self._emr.exceptions.ClientError:
+                continue
+            self._remove(cluster_id, TERMINATING)
+            terminated.append(cluster_id)
+        return terminated
+
+
+def pool_from_environment() -> ClusterPool:
+    table_name = os.environ.get(CLUSTER_POOL_TABLE_ENV, None)
+    if not table_name:
+        raise ClusterPoolError(f"{CLUSTER_POOL_TABLE_ENV} is not set")
+    return ClusterPool(table_name)
@@ -0,0 +1,41 @@
+import posixpath
+from typing import Any, Dict, List
+
+
+# Builds the RunJobFlow request of a Cluster from a stored EMRProfile and ClusterConfiguration. The
+# LoadClusterConfiguration and PrepareClusterLaunch Lambdas build it at launch time, and EMRLaunchFunctions
+# with inline_configuration build it when the App is synthesized. The stored values are updated in place.
+def build_cluster_request(
+    emr_profile: Dict[str, Any], cluster_configuration: Dict[str, Any], cluster_name: str, tags: List[Dict[str, str]]
+) -> Dict[str, Any]:
+    logs_bucket = emr_profile.get("LogsBucket", None)
+    logs_path = emr_profile.get("LogsPath", "")
+
+    kerberos_attributes_secret = emr_profile.get("KerberosAttributesSecret", None)
+    secret_configurations = cluster_configuration.get("SecretConfigurations", None)
+    cluster = cluster_configuration["ClusterConfiguration"]
+
+    cluster["Name"] = cluster_name
+    cluster["LogUri"] = posixpath.join(f"s3://{logs_bucket}", logs_path, cluster_name) if logs_bucket else None
+    cluster["JobFlowRole"] = emr_profile["Roles"]["InstanceRole"].split("/")[-1]
+    cluster["ServiceRole"] = emr_profile["Roles"]["ServiceRole"].split("/")[-1]
+    cluster["AutoScalingRole"] = (
+        emr_profile["Roles"]["AutoScalingRole"].split("/")[-1]
+        if cluster["Instances"].get("InstanceGroups", []) and len(cluster["Instances"].get("InstanceGroups", [])) > 0
+        else None
+    )
+    cluster["Tags"] = tags
+    cluster["Instances"]["EmrManagedMasterSecurityGroup"] = emr_profile["SecurityGroups"]["MasterGroup"]
+    cluster["Instances"]["EmrManagedSlaveSecurityGroup"] = emr_profile["SecurityGroups"]["WorkersGroup"]
+    cluster["Instances"]["ServiceAccessSecurityGroup"] = emr_profile["SecurityGroups"].get("ServiceGroup", None)
+    cluster["SecurityConfiguration"] = emr_profile.get("SecurityConfiguration", None)
+
+    # Set a default for new Parameters added to the RunJobFlow API that may
+    # not be stored on existing ClusterConfigurations
+    cluster["ManagedScalingPolicy"] = cluster.get("ManagedScalingPolicy", None)
+
+    return {
+        "Cluster": cluster,
+        "SecretConfigurations": secret_configurations,
+        "KerberosAttributesSecret": kerberos_attributes_secret,
+    }
@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from .clients import LazyClient
+
+# Launches with an IdempotencyKey in their execution input claim the key in the IdempotencyTable with a
+# conditional write, keyed by "<namespace>/<launch function name>/<IdempotencyKey>":
+#   {"IdempotencyKey": ..., "ExecutionId": <execution ARN>, "ClaimedAt": <epoch>, "ExpiresAt": <epoch>}
+# and record their LaunchClusterResult (JSON) once the Cluster is launched. Until ExpiresAt (the end of the
+# idempotency window) a launch with the same key is a DUPLICATE returning the recorded LaunchClusterResult, or
+# is IN_PROGRESS while the claiming execution runs. The key of an execution that stopped without recording a
+# result is claimed by the next launch, unless it failed with LAUNCH_NOT_RECORDED_ERROR after launching a Cluster
+# it couldn't record: that key stays claimed until the end of the window.
+IDEMPOTENCY_TABLE_ENV = "IDEMPOTENCY_TABLE"
+
+CLAIMED = "CLAIMED"
+DUPLICATE = "DUPLICATE"
+IN_PROGRESS = "IN_PROGRESS"
+
+IDEMPOTENCY_KEY_INPUT = "IdempotencyKey"
+MAX_KEY_LENGTH = 256
+LAUNCH_NOT_RECORDED_ERROR = "IdempotentLaunchNotRecorded"
+# Attempts to claim a key whose record keeps expiring or disappearing between the write and the read
+MAX_CLAIM_ATTEMPTS = 3
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+class IdempotencyKeyError(Exception):
+    pass
+
+
+class IdempotencyClaimError(Exception):
+    pass
+
+
+# Lambda errors are named after their exception class, so a launch failing to record fails with
+# LAUNCH_NOT_RECORDED_ERROR
+class IdempotentLaunchNotRecorded(Exception):
+    pass
+
+
+def idempotency_key(execution_input: Dict[str, Any]) -> Optional[str]:
+    key = execution_input.get(IDEMPOTENCY_KEY_INPUT, None)
+    if key is None:
+        return None
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f"The {IDEMPOTENCY_KEY_INPUT} must be a string of 1 to {MAX_KEY_LENGTH} characters")
+    return key
+
+
+class IdempotencyRecords:
+    def __init__(self, table_name: str, dynamodb_client: Any = None, sfn_client: Any = None) -> None:
+        self._table_name = table_name
+        self._dynamodb = LazyClient("dynamodb") if dynamodb_client is None else dynamodb_client
+        self._sfn = LazyClient("stepfunctions") if sfn_client is None else sfn_client
+
+    def _put(self, key: str, execution_id: str, window: int, now: int, condition: str, values: Dict[str, Any]) -> bool:
+        try:
+            self._dynamodb.put_item(
+                TableName=self._table_name,
+                Item={
+                    "IdempotencyKey": {"S": key},
+                    "ExecutionId": {"S": execution_id},
+                    "ClaimedAt": {"N": str(now)},
+                    "ExpiresAt": {"N": str(now + window)},
+                },
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values,
+            )
+            return True
+        except self._dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+    # The DescribeExecution response of an execution, or None when it no longer exists
+    def _describe_execution(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            execution: Dict[str, Any] = self._sfn.describe_execution(executionArn=execution_id)
+        except self._sfn.exceptions.ExecutionDoesNotExist:
+            return None
+        return execution
+
+    def claim(self, key: str, execution_id: str, window: int, now: Optional[int] = None) -> Dict[str, Any]:
+        now = int(time.time()) if now is None else now
+        for _ in range(MAX_CLAIM_ATTEMPTS):
+            if self._put(
+                key,
+                execution_id,
+                window,
+                now,
+                "attribute_not_exists(IdempotencyKey) OR ExpiresAt <= :now",
+                {":now": {"N": str(now)}},
+            ):
+                return {"Status": CLAIMED}
+
+            item = self._dynamodb.get_item(
+                TableName=self._table_name, Key={"IdempotencyKey": {"S": key}}, ConsistentRead=True
+            ).get("Item", None)
+            if item is not None:
+                break
+            # The record expired since the claim, claim it again
+        else:
+            raise IdempotencyClaimError(f"Unable to claim the IdempotencyKey {key} in {MAX_CLAIM_ATTEMPTS} attempts")
+
+        claimed_by = item["ExecutionId"]["S"]
+        if claimed_by == execution_id:
+            return {"Status": CLAIMED}
+        if "LaunchClusterResult" in item:
+            return {
+                "Status": DUPLICATE,
+                "ExecutionId": claimed_by,
+                "LaunchClusterResult": json.loads(item["LaunchClusterResult"]["S"]),
+            }
+        execution = self._describe_execution(claimed_by)
+        if execution is not None and execution.get("error", None) == LAUNCH_NOT_RECORDED_ERROR:
+            raise IdempotencyClaimError(
+                f"The execution {claimed_by} launched a Cluster for the IdempotencyKey {key} that it failed to record"
+            )
+        if (execution is None or execution["status"] != "RUNNING") and self._put(
+            key, execution_id, window, now, "ExecutionId = :claimed_by", {":claimed_by": {"S": claimed_by}}
+        ):
+            return {"Status": CLAIMED}
+        return {"Status": IN_PROGRESS, "ExecutionId": claimed_by}
+
+    # Records the LaunchClusterResult of the execution holding the key
+    def complete(self, key: str, execution_id: str, launch_cluster_result: Dict[str, Any]) -> bool:
+        try:
+            self._dynamodb.update_item(
+                TableName=self._table_name,
+                Key={"IdempotencyKey": {"S": key}},
+                UpdateExpression="SET LaunchClusterResult = :result",
+                ConditionExpression="ExecutionId = :execution_id",
+                ExpressionAttributeValues={
+                    ":result": {"S": json.dumps(launch_cluster_result)},
+                    ":execution_id": {"S": execution_id},
+                },
+            )
+            return True
+        except self._dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+
+def records_from_environment() -> IdempotencyRecords:
+    table_name = os.environ.get(IDEMPOTENCY_TABLE_ENV, None)
+    if not table_name:
+        raise IdempotencyError(f"{IDEMPOTENCY_TABLE_ENV} is not set")
+    return IdempotencyRecords(table_name)
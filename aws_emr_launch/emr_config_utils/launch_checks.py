@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, cast
+
+from .paths import resolve_path
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_CLUSTER_STATES = ["STARTING", "BOOTSTRAPPING", "RUNNING", "WAITING"]
+
+
+class InvalidOverrideError(Exception):
+    pass
+
+
+class ClusterRunningError(Exception):
+    pass
+
+
+def parse_bool(v: str) -> bool:
+    return str(v).lower() in ("yes", "true", "t", "1")
+
+
+def override_cluster_configs(event: Dict[str, Any], cluster_config: Dict[str, Any]) -> Dict[str, Any]:
+    # This will work with ClusterConfigurationOverrides or ClusterConfigOverrides
+    overrides = event.get("ExecutionInput", {}).get("ClusterConfigurationOverrides", None)
+    if overrides is None:
+        overrides = event.get("ExecutionInput", {}).get("ClusterConfigOverrides", {})
+
+    allowed_overrides: Dict[str, Any] = event.get("AllowedClusterConfigOverrides", None) or {}
+
+    if overrides and not allowed_overrides:
+        raise InvalidOverrideError("Cluster configuration overrides are not allowed")
+
+    for path, new_value in overrides.items():
+        minimum = None
+        maximum = None
+
+        new_path = allowed_overrides.get(path, None)
+        if new_path is None:
+            raise InvalidOverrideError(f'Value "{path}" is not an allowed cluster configuration override')
+        else:
+            path = new_path["JsonPath"]
+            minimum = new_path.get("Minimum", None)
+            maximum = new_path.get("Maximum", None)
+
+        path_parts = path.split(".")
+        key_path = ".".join(path_parts[0:-1])
+
+        update_key: Any = int(path_parts[-1]) if path_parts[-1].isdigit() else path_parts[-1]
+        update_attr: Any = cluster_config if key_path == "" else resolve_path(cluster_config, key_path)
+
+        if update_attr is None or update_attr.get(update_key, None) is None:
+            raise InvalidOverrideError(f'The update path "{path}" was not found in the cluster configuration')
+
+        logger.info(f'Path: "{key_path}" CurrentValue: "{update_attr[update_key]}" NewValue: "{new_value}"')
+        if (minimum or maximum) and (isinstance(new_value, int) or isinstance(new_value, float)):
+            if minimum and new_value < minimum:
+                raise InvalidOverrideError(
+                    f"The Override Value ({new_value}) " f"is less than the Minimum allowed ({minimum})"
+                )
+            if maximum and new_value > maximum:
+                raise InvalidOverrideError(
+                    f"The Override Value ({new_value}) " f"is greater than the Maximum allowed ({maximum})"
+                )
+
+        update_attr[update_key] = new_value
+
+    return cluster_config
+
+
+def list_active_clusters(emr: Any, created_after: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+    list_args: Dict[str, Any] = {"ClusterStates": ACTIVE_CLUSTER_STATES}
+    if created_after is not None:
+        list_args["CreatedAfter"] = created_after
+
+    paginator = emr.get_paginator("list_clusters")
+    for page in paginator.paginate(**list_args):
+        for cluster in page["Clusters"]:
+            yield cluster
+
+
+def find_running_cluster(emr: Any, cluster_name: str, created_after: Optional[datetime] = None) -> Optional[str]:
+    # Stop listing at the first matching Cluster
+    for cluster in list_active_clusters(emr, created_after):
+        if cluster["Name"] == cluster_name:
+            return cast(str, cluster["Id"])
+    return None
+
+
+def get_created_after(event: Dict[str, Any]) -> Optional[datetime]:
+    window_seconds = event.get("FailIfClusterRunningWindowSeconds", None)
+    if window_seconds is None:
+        return None
+    return datetime.now(timezone.utc) - timedelta(seconds=int(window_seconds))
+
+
+def fail_if_cluster_running(emr: Any, event: Dict[str, Any], cluster_config: Dict[str, Any]) -> Dict[str, Any]:
+    default_fail_if_cluster_running = parse_bool(event.get("DefaultFailIfClusterRunning", False))
+
+    # This will work for {"JobInput": {"FailIfClusterRunning": true}} or {"FailIfClusterRunning": true}
+    fail_if_cluster_running = parse_bool(
+        event.get("ExecutionInput", event).get("FailIfClusterRunning", default_fail_if_cluster_running)
+    )
+
+    # Pooled Clusters share the Name of the launch, and would always be found running
+    if fail_if_cluster_running and parse_bool(event.get("UseClusterPool", False)):
+        raise InvalidOverrideError("FailIfClusterRunning is not supported by Launch Functions using a cluster pool")
+
+    if fail_if_cluster_running:
+        cluster_name = cluster_config.get("Name", "")
+        logger.info(f'Checking if job flow "{cluster_name}" is running already')
+        cluster_id = find_running_cluster(emr, cluster_name, get_created_after(event))
+        if cluster_id is not None:
+            raise ClusterRunningError(
+                f"Found running Cluster with name {cluster_name}. "
+                f"ClusterId: {cluster_id}. FailIfClusterRunning is {fail_if_cluster_running}"
+            )
+
+    return cluster_config
+
+
+def update_cluster_tags(event: Dict[str, Any], cluster_config: Dict[str, Any]) -> Dict[str, Any]:
+    new_tags = event.get("ExecutionInput", {}).get("Tags", [])
+    current_tags = cluster_config.get("Tags", [])
+
+    new_tags_dict = {tag["Key"]: tag["Value"] for tag in new_tags}
+    current_tags_dict = {tag["Key"]: tag["Value"] for tag in current_tags}
+
+    merged_tags_dict = dict(current_tags_dict, **new_tags_dict)
+    cluster_config["Tags"] = [{"Key": k, "Value": v} for k, v in merged_tags_dict.items()]
+    return cluster_config
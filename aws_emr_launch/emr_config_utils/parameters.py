@@ -0,0 +1,122 @@
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from .cluster_requests import build_cluster_request
+from .registry import Registry, is_version_name, version_name
+from .stored_values import decode_stored_value
+
+logger = logging.getLogger(__name__)
+
+PROFILES_SSM_PARAMETER_PREFIX = "/emr_launch/emr_profiles"
+CONFIGURATIONS_SSM_PARAMETER_PREFIX = "/emr_launch/cluster_configurations"
+
+
+class EMRProfileNotFoundError(Exception):
+    pass
+
+
+class ClusterConfigurationNotFoundError(Exception):
+    pass
+
+
+class ParameterCache:
+    def __init__(self, ttl_seconds: int, max_size: int) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(name, None)
+        if entry is None:
+            return None
+        # Pinned versions are immutable, so they never need revalidating
+        if time.monotonic() - entry[1] > self._ttl_seconds and not is_version_name(name):
+            return None
+        return entry[2]
+
+    def get_version(self, name: str, version: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(name, None)
+        return entry[2] if entry is not None and entry[0] == version else None
+
+    def put(self, name: str, version: int, value: Dict[str, Any]) -> None:
+        self._entries[name] = (version, time.monotonic(), value)
+        self._entries.move_to_end(name)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Values are served from the cache until they expire, then revalidated with the registry and only
+# decoded again if their Version has changed
+def get_parameter_values(
+    registry: Registry, parameter_cache: ParameterCache, names: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    values = {}
+    expired = []
+    for name in names:
+        value = parameter_cache.get(name)
+        if value is None:
+            expired.append(name)
+        else:
+            values[name] = value
+
+    if expired:
+        for parameter in registry.get_many(expired).values():
+            name = parameter["Name"]
+            version = parameter["Version"]
+            value = parameter_cache.get_version(name, version)
+            if value is None:
+                value = decode_stored_value(parameter["Value"])
+            parameter_cache.put(name, version, value)
+            values[name] = value
+
+    # Callers update the values in place, so the cached values are never returned
+    return {name: copy.deepcopy(value) for name, value in values.items()}
+
+
+# Builds the RunJobFlow request of a LoadClusterConfiguration or PrepareClusterLaunch event
+def load_cluster_request(
+    event: Dict[str, Any], registry: Registry, parameter_cache: ParameterCache
+) -> Dict[str, Any]:
+    cluster_name = event.get("ClusterName", "")
+    tags = event.get("ClusterTags", [])
+    profile_namespace = event.get("ProfileNamespace", "")
+    profile_name = event.get("ProfileName", "")
+    configuration_namespace = event.get("ConfigurationNamespace", "")
+    configuration_name = event.get("ConfigurationName", "")
+    profile_version = event.get("ProfileVersion", None)
+    configuration_version = event.get("ConfigurationVersion", None)
+
+    if not cluster_name:
+        cluster_name = configuration_name
+
+    profile_parameter = f"{PROFILES_SSM_PARAMETER_PREFIX}/{profile_namespace}/{profile_name}"
+    configuration_parameter = f"{CONFIGURATIONS_SSM_PARAMETER_PREFIX}/{configuration_namespace}/{configuration_name}"
+    # Launch Functions pinning versions read those instead of the latest values
+    if profile_version:
+        profile_parameter = version_name(profile_parameter, profile_version)
+        profile_name = f"{profile_name}/{profile_version}"
+    if configuration_version:
+        configuration_parameter = version_name(configuration_parameter, configuration_version)
+        configuration_name = f"{configuration_name}/{configuration_version}"
+    parameters = get_parameter_values(registry, parameter_cache, [profile_parameter, configuration_parameter])
+
+    emr_profile = parameters.get(profile_parameter, None)
+    if emr_profile is None:
+        raise EMRProfileNotFoundError(f"ProfileNotFound: {profile_namespace}/{profile_name}")
+    logger.info(f"ProfileFound: {json.dumps(emr_profile)}")
+
+    cluster_configuration = parameters.get(configuration_parameter, None)
+    if cluster_configuration is None:
+        raise ClusterConfigurationNotFoundError(
+            f"ConfigurationNotFound: {configuration_namespace}/{configuration_name}"
+        )
+    logger.info(f"ConfigurationFound: {json.dumps(cluster_configuration)}")
+
+    return cast(Dict[str, Any], build_cluster_request(emr_profile, cluster_configuration, cluster_name, tags))
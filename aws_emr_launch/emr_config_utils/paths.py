@@ -0,0 +1,17 @@
+from typing import Any
+
+
+# Resolves a "."-separated path into nested dicts and lists, e.g. "Instances.InstanceGroups.1.InstanceCount".
+# Digit segments index into lists, and "\." escapes a "." inside a key. Returns the default if any segment
+# is missing.
+def resolve_path(data: Any, path: str, default: Any = None) -> Any:
+    for key in path.replace("\\.", "\0").split("."):
+        key = key.replace("\0", ".")
+        try:
+            if isinstance(data, list) and key.isdigit():
+                data = data[int(key)]
+            else:
+                data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return data
@@ -0,0 +1,418 @@
+import base64
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from .clients import LazyClient
+
+# Profiles, Configurations and Launch Functions are stored under names like
+# "/emr_launch/<kind>/<namespace>/<name>", in a backend chosen per namespace. Items are returned
+# in the shape of SSM Parameters: {"Name": ..., "Value": <stored JSON>, "Version": ...}.
+#
+# The backends are configured with the AWS_EMR_LAUNCH_REGISTRY environment variable (JSON):
+#   {"Default": {"Backend": "ssm"},
+#    "Namespaces": {"team-a": {"Backend": "dynamodb", "TableName": "..."},
+#                   "team-b": {"Backend": "s3", "Bucket": "...", "Prefix": "emr_launch/"}}}
+#
+# Pinned values are also published as immutable, content addressed versions under
+# "/emr_launch/<kind>_versions/<namespace>/<name>/<version>" (e.g. "cluster_configuration_versions"),
+# which is never updated or deleted.
+REGISTRY_ROOT = "/emr_launch"
+REGISTRY_CONFIGURATION_ENV = "AWS_EMR_LAUNCH_REGISTRY"
+VERSIONS_SUFFIX = "_versions"
+
+# GetParameters and GetParametersByPath accept at most 10 names/results
+SSM_MAX_RESULTS = 10
+# BatchGetItem accepts at most 100 keys
+DYNAMODB_MAX_KEYS = 100
+S3_MAX_WORKERS = 10
+
+
+class RegistryError(Exception):
+    pass
+
+
+class ParameterNotFoundError(RegistryError):
+    pass
+
+
+def split_name(name: str) -> Tuple[str, str, str]:
+    # The name of a version is returned as "<name>/<version>"
+    parts = name[len(REGISTRY_ROOT) + 1 :].split("/") if name.startswith(f"{REGISTRY_ROOT}/") else []
+    if len(parts) == 4 and parts[0].endswith(VERSIONS_SUFFIX):
+        parts = [parts[0], parts[1], f"{parts[2]}/{parts[3]}"]
+    if len(parts) != 3 or not all(parts) or parts[2].startswith("/") or parts[2].endswith("/"):
+        raise RegistryError(f"Invalid registry name: {name}")
+    return parts[0], parts[1], parts[2]
+
+
+def versions_kind(kind: str) -> str:
+    # "cluster_configurations" -> "cluster_configuration_versions"
+    return f"{kind[:-1] if kind.endswith('s') else kind}{VERSIONS_SUFFIX}"
+
+
+def version_name(name: str, version: str) -> str:
+    kind, namespace, item_name = split_name(name)
+    if kind.endswith(VERSIONS_SUFFIX):
+        raise RegistryError(f"Invalid registry name: {name} is a version")
+    return f"{REGISTRY_ROOT}/{versions_kind(kind)}/{namespace}/{item_name}/{version}"
+
+
+def is_version_name(name: str) -> bool:
+    return split_name(name)[0].endswith(VERSIONS_SUFFIX)
+
+
+def split_path(path: str) -> Tuple[str, Optional[str]]:
+    # "/emr_launch/<kind>/" or "/emr_launch/<kind>/<namespace>/"
+    parts = [p for p in path[len(REGISTRY_ROOT) + 1 :].split("/") if p] if path.startswith(f"{REGISTRY_ROOT}/") else []
+    if len(parts) not in (1, 2):
+        raise RegistryError(f"Invalid registry path: {path}")
+    return parts[0], parts[1] if len(parts) == 2 else None
+
+
+# botocore is only imported with the first client, so ClientErrors are matched by their code
+def _error_code(e: Exception) -> Optional[str]:
+    return cast(Optional[str], getattr(e, "response", {}).get("Error", {}).get("Code", None))
+
+
+def _encode_token(token: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(token).encode("utf-8")).decode("ascii")
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    return cast(Dict[str, Any], json.loads(base64.urlsafe_b64decode(token.encode("ascii"))))
+
+
+class RegistryBackend(ABC):
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([name]).get(name, None)
+
+    @abstractmethod
+    def get_many(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    # Returns one page of at most max_results items under the path and the token of the next page
+    @abstractmethod
+    def list(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_results: Optional[int] = None,
+        next_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        ...
+
+    @abstractmethod
+    def put(self, name: str, value: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        ...
+
+
+class SSMBackend(RegistryBackend):
+    # Names are validated like the other backends', although Parameter Store could store any name
+
+    def __init__(self, client: Any = None) -> None:
+        self._client = LazyClient("ssm") if client is None else client
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        split_name(name)
+        try:
+            return cast(Dict[str, Any], self._client.get_parameter(Name=name)["Parameter"])
+        except Exception as e:
+            if _error_code(e) != "ParameterNotFound":
+                raise e
+            return None
+
+    def get_many(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        for name in names:
+            split_name(name)
+        items: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(names), SSM_MAX_RESULTS):
+            for parameter in self._client.get_parameters(Names=names[i : i + SSM_MAX_RESULTS])["Parameters"]:
+                items[parameter["Name"]] = parameter
+        return items
+
+    def list(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_results: Optional[int] = None,
+        next_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        split_path(path)
+        params: Dict[str, Any] = {
+            "Path": path,
+            "Recursive": recursive,
+            "MaxResults": SSM_MAX_RESULTS if max_results is None else min(SSM_MAX_RESULTS, max_results),
+        }
+        if next_token:
+            params["NextToken"] = next_token
+        result = self._client.get_parameters_by_path(**params)
+        return result["Parameters"], result.get("NextToken", None)
+
+    def put(self, name: str, value: str) -> Dict[str, Any]:
+        split_name(name)
+        result = self._client.put_parameter(
+            Name=name, Value=value, Type="String", Tier="Intelligent-Tiering", Overwrite=True
+        )
+        return {"Name": name, "Value": value, "Version": result["Version"]}
+
+    def delete(self, name: str) -> None:
+        split_name(name)
+        try:
+            self._client.delete_parameter(Name=name)
+        except Exception as e:
+            if _error_code(e) != "ParameterNotFound":
+                raise e
+
+
+class DynamoDBBackend(RegistryBackend):
+    # Items are keyed by Kind (partition key) and "<namespace>/<name>" (sort key), so a namespace is listed
+    # with a single Query. Every put increments the item's Version.
+
+    def __init__(self, table_name: str, client: Any = None) -> None:
+        self._table_name = table_name
+        self._client = LazyClient("dynamodb") if client is None else client
+
+    @staticmethod
+    def key(name: str) -> Dict[str, Any]:
+        kind, namespace, item_name = split_name(name)
+        return {"Kind": {"S": kind}, "Name": {"S": f"{namespace}/{item_name}"}}
+
+    @staticmethod
+    def _item(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "Name": f'{REGISTRY_ROOT}/{item["Kind"]["S"]}/{item["Name"]["S"]}',
+            "Value": item["Value"]["S"],
+            "Version": int(item["Version"]["N"]),
+        }
+
+    def get_many(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        items: Dict[str, Dict[str, Any]] = {}
+        unique_names = list(dict.fromkeys(names))
+        for i in range(0, len(unique_names), DYNAMODB_MAX_KEYS):
+            request: Dict[str, Any] = {
+                self._table_name: {
+                    "Keys": [self.key(n) for n in unique_names[i : i + DYNAMODB_MAX_KEYS]],
+                    "ConsistentRead": True,
+                }
+            }
+            while request:
+                result = self._client.batch_get_item(RequestItems=request)
+                for item in result["Responses"].get(self._table_name, []):
+                    parsed = self._item(item)
+                    items[parsed["Name"]] = parsed
+                request = result.get("UnprocessedKeys", None)
+        return items
+
+    def list(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_results: Optional[int] = None,
+        next_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        kind, namespace = split_path(path)
+        params: Dict[str, Any] = {"TableName": self._table_name, "ConsistentRead": True}
+        # Names are never nested below a namespace, so recursive only matters for listing all namespaces
+        if namespace is None:
+            params["KeyConditionExpression"] = "Kind = :kind"
+            params["ExpressionAttributeValues"] = {":kind": {"S": kind}}
+        else:
+            params["KeyConditionExpression"] = "Kind = :kind AND begins_with(#name, :prefix)"
+            params["ExpressionAttributeNames"] = {"#name": "Name"}
+            params["ExpressionAttributeValues"] = {":kind": {"S": kind}, ":prefix": {"S": f"{namespace}/"}}
+        if max_results is not None:
+            params["Limit"] = max_results
+        if next_token:
+            params["ExclusiveStartKey"] = _decode_token(next_token)
+
+        result = self._client.query(**params)
+        items = [self._item(i) for i in result["Items"]]
+        last_key = result.get("LastEvaluatedKey", None)
+        return items, _encode_token(last_key) if last_key else None
+
+    def put(self, name: str, value: str) -> Dict[str, Any]:
+        result = self._client.update_item(
+            TableName=self._table_name,
+            Key=self.key(name),
+            UpdateExpression="SET #value = :value ADD #version :one",
+            ExpressionAttributeNames={"#value": "Value", "#version": "Version"},
+            ExpressionAttributeValues={":value": {"S": value}, ":one": {"N": "1"}},
+            ReturnValues="UPDATED_NEW",
+        )
+        return {"Name": name, "Value": value, "Version": int(result["Attributes"]["Version"]["N"])}
+
+    def delete(self, name: str) -> None:
+        self._client.delete_item(TableName=self._table_name, Key=self.key(name))
+
+
+class S3Backend(RegistryBackend):
+    # Items are stored as "<prefix><kind>/<namespace>/<name>.json" objects, versioned by their ETag
+
+    def __init__(self, bucket: str, prefix: str = "emr_launch/", client: Any = None) -> None:
+        self._bucket = bucket
+        self._prefix = prefix
+        self._client = LazyClient("s3") if client is None else client
+
+    def key(self, name: str) -> str:
+        kind, namespace, item_name = split_name(name)
+        return f"{self._prefix}{kind}/{namespace}/{item_name}.json"
+
+    def _name(self, key: str) -> str:
+        return f"{REGISTRY_ROOT}/{key[len(self._prefix) : -len('.json')]}"
+
+    def _get_object(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = self._client.get_object(Bucket=self._bucket, Key=self.key(name))
+        except Exception as e:
+            if _error_code(e) != "NoSuchKey":
+                raise e
+            return None
+        return {"Name": name, "Value": result["Body"].read().decode("utf-8"), "Version": result["ETag"].strip('"')}
+
+    def get_many(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        unique_names = list(dict.fromkeys(names))
+        if len(unique_names) <= 1:
+            items = [self._get_object(n) for n in unique_names]
+        else:
+            # Objects are fetched concurrently, one GetObject each
+            with ThreadPoolExecutor(max_workers=min(len(unique_names), S3_MAX_WORKERS)) as executor:
+                items = list(executor.map(self._get_object, unique_names))
+        return {i["Name"]: i for i in items if i is not None}
+
+    def list(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_results: Optional[int] = None,
+        next_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        kind, namespace = split_path(path)
+        params: Dict[str, Any] = {"Bucket": self._bucket, "Prefix": f"{self._prefix}{kind}/"}
+        if namespace is not None:
+            params["Prefix"] += f"{namespace}/"
+        if not recursive:
+            params["Delimiter"] = "/"
+        if max_results is not None:
+            params["MaxKeys"] = max_results
+        if next_token:
+            params["ContinuationToken"] = next_token
+
+        result = self._client.list_objects_v2(**params)
+        names = [self._name(o["Key"]) for o in result.get("Contents", []) if o["Key"].endswith(".json")]
+        items = self.get_many(names)
+        return [items[n] for n in names if n in items], result.get("NextContinuationToken", None)
+
+    def put(self, name: str, value: str) -> Dict[str, Any]:
+        result = self._client.put_object(
+            Bucket=self._bucket, Key=self.key(name), Body=value.encode("utf-8"), ContentType="application/json"
+        )
+        return {"Name": name, "Value": value, "Version": result["ETag"].strip('"')}
+
+    def delete(self, name: str) -> None:
+        self._client.delete_object(Bucket=self._bucket, Key=self.key(name))
+
+
+def backend_from_configuration(configuration: Dict[str, Any], ssm_client: Any = None) -> RegistryBackend:
+    backend = configuration.get("Backend", "ssm")
+    if backend == "ssm":
+        return SSMBackend(ssm_client)
+    if backend == "dynamodb":
+        return DynamoDBBackend(configuration["TableName"])
+    if backend == "s3":
+        return S3Backend(configuration["Bucket"], configuration.get("Prefix", "emr_launch/"))
+    raise RegistryError(f"Unsupported registry Backend: {backend}")
+
+
+class Registry(RegistryBackend):
+    # Routes every name to the backend of its namespace
+    def __init__(
+        self, default: Optional[RegistryBackend] = None, namespaces: Optional[Dict[str, RegistryBackend]] = None
+    ) -> None:
+        self._default = SSMBackend() if default is None else default
+        self._namespaces = namespaces if namespaces else {}
+        self._backends = [self._default] + [
+            b for b in dict.fromkeys(self._namespaces.values()) if b is not self._default
+        ]
+
+    def backend(self, namespace: str) -> RegistryBackend:
+        return self._namespaces.get(namespace, self._default)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.backend(split_name(name)[1]).get(name)
+
+    # Raises ParameterNotFoundError rather than returning None
+    def get_item(self, name: str) -> Dict[str, Any]:
+        item = self.get(name)
+        if item is None:
+            raise ParameterNotFoundError(f"ParameterNotFound: {name}")
+        return item
+
+    def get_many(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        grouped: Dict[int, List[str]] = {}
+        for name in names:
+            grouped.setdefault(id(self.backend(split_name(name)[1])), []).append(name)
+
+        items: Dict[str, Dict[str, Any]] = {}
+        for backend in self._backends:
+            if id(backend) in grouped:
+                items.update(backend.get_many(grouped[id(backend)]))
+        return items
+
+    def list(
+        self,
+        path: str,
+        recursive: bool = False,
+        max_results: Optional[int] = None,
+        next_token: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        kind, namespace = split_path(path)
+        if namespace is not None:
+            return self.backend(namespace).list(path, recursive, max_results, next_token)
+        if len(self._backends) == 1:
+            return self._default.list(path, recursive, max_results, next_token)
+
+        # All namespaces: each backend is listed in turn, keeping only the namespaces it stores
+        token: Dict[str, Any] = _decode_token(next_token) if next_token else {"Backend": 0, "Token": None}
+        index: int = token["Backend"]
+        backend = self._backends[index]
+        items, backend_token = backend.list(path, recursive, max_results, token["Token"])
+        items = [i for i in items if self.backend(split_name(i["Name"])[1]) is backend]
+
+        if backend_token:
+            return items, _encode_token({"Backend": index, "Token": backend_token})
+        if index + 1 < len(self._backends):
+            return items, _encode_token({"Backend": index + 1, "Token": None})
+        return items, None
+
+    def put(self, name: str, value: str) -> Dict[str, Any]:
+        return self.backend(split_name(name)[1]).put(name, value)
+
+    def delete(self, name: str) -> None:
+        self.backend(split_name(name)[1]).delete(name)
+
+    @staticmethod
+    def from_configuration(configuration: Optional[Dict[str, Any]], ssm_client: Any = None) -> "Registry":
+        configuration = configuration if configuration else {}
+        default = backend_from_configuration(configuration.get("Default", {}), ssm_client)
+
+        # Namespaces with the same configuration share one backend
+        backends: Dict[str, RegistryBackend] = {}
+        namespaces: Dict[str, RegistryBackend] = {}
+        for namespace, backend_configuration in configuration.get("Namespaces", {}).items():
+            key = json.dumps(backend_configuration, sort_keys=True)
+            if key not in backends:
+                backends[key] = backend_from_configuration(backend_configuration, ssm_client)
+            namespaces[namespace] = backends[key]
+        return Registry(default, namespaces)
+
+    @staticmethod
+    def from_environment(ssm_client: Any = None) -> "Registry":
+        configuration = os.environ.get(REGISTRY_CONFIGURATION_ENV, "")
+        return Registry.from_configuration(json.loads(configuration) if configuration else None, ssm_client)
@@ -0,0 +1,42 @@
+import base64
+import gzip
+import json
+from typing import Any, Dict, cast
+
+from .clients import get_client
+
+# Stored Profiles, Configurations and Launch Functions are JSON documents. Large documents are
+# stored as a pointer document instead, identified by its StorageFormat:
+#   {"StorageFormat": "gzip", "Value": "<base64 of the gzip compressed document>"}
+#   {"StorageFormat": "s3", "Bucket": "<bucket>", "Key": "<key of the (optionally gzip compressed) document>"}
+STORAGE_FORMAT_KEY = "StorageFormat"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class StoredValueError(Exception):
+    pass
+
+
+def is_pointer(value: Any) -> bool:
+    return isinstance(value, dict) and STORAGE_FORMAT_KEY in value
+
+
+def _read_object(bucket: str, key: str, s3_client: Any = None) -> bytes:
+    s3_client = get_client("s3") if s3_client is None else s3_client
+    return cast(bytes, s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+
+
+def decode_stored_value(stored_value: str, s3_client: Any = None) -> Dict[str, Any]:
+    value = json.loads(stored_value)
+    if not is_pointer(value):
+        return cast(Dict[str, Any], value)
+
+    storage_format = value[STORAGE_FORMAT_KEY]
+    if storage_format == "gzip":
+        return cast(Dict[str, Any], json.loads(gzip.decompress(base64.b64decode(value["Value"]))))
+    if storage_format == "s3":
+        body = _read_object(value["Bucket"], value["Key"], s3_client)
+        if body[:2] == GZIP_MAGIC:
+            body = gzip.decompress(body)
+        return cast(Dict[str, Any], json.loads(body))
+    raise StoredValueError(f"Unsupported StorageFormat: {storage_format}")
@@ -0,0 +1,105 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from emr_config_utils.admission import AdmissionScheduler, requested_vcpus, store_from_environment
+from emr_config_utils.clients import LazyClient
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+ec2 = LazyClient("ec2")
+sfn = LazyClient("stepfunctions")
+
+# The scheduler is created on first use, as the store requires the LAUNCH_ADMISSION_TABLE
+scheduler: Optional[AdmissionScheduler] = None
+
+# The vCPUs of instance types are cached for the life of the container
+instance_type_vcpus: Dict[str, int] = {}
+
+
+def log_and_raise(e: Exception, event: Dict[str, Any]) -> None:
+    logger.error(f"Error processing event {json.dumps(event)}")
+    logger.exception(e)
+    raise e
+
+
+def instance_vcpus(instance_type: str) -> int:
+    if instance_type not in instance_type_vcpus:
+        result = ec2.describe_instance_types(InstanceTypes=[instance_type])
+        instance_type_vcpus[instance_type] = int(result["InstanceTypes"][0]["VCpuInfo"]["DefaultVCpus"])
+    return instance_type_vcpus[instance_type]
+
+
+def get_scheduler() -> AdmissionScheduler:
+    global scheduler
+    if scheduler is None:
+        scheduler = AdmissionScheduler(store_from_environment())
+    return scheduler
+
+
+# Sends the launch the Task result, returning False when its execution has stopped
+def notify(request: Dict[str, Any]) -> bool:
+    output = {k: request[k] for k in ["RequestId", "Namespace", "Priority", "VCpus", "AdmittedAt"]}
+    try:
+        sfn.send_task_success(taskToken=request["TaskToken"], output=json.dumps(output))
+        return True
+    except (sfn.exceptions.TaskDoesNotExist, sfn.exceptions.TaskTimedOut, sfn.exceptions.InvalidToken):
+        logger.warning(f"Launch no longer waiting for admission: {request['RequestId']}")
+        return False
+
+
+# Keeps the Task of a queued launch from timing out on its heartbeat, returning False when its execution has stopped
+def heartbeat(request: Dict[str, Any]) -> bool:
+    try:
+        sfn.send_task_heartbeat(taskToken=request["TaskToken"])
+        return True
+    except (sfn.exceptions.TaskDoesNotExist, sfn.exceptions.TaskTimedOut, sfn.exceptions.InvalidToken):
+        logger.warning(f"Launch no longer waiting for admission: {request['RequestId']}")
+        return False
+
+
+def dispatch(heartbeats: bool = False) -> List[str]:
+    requests = get_scheduler().dispatch(notify=notify, heartbeat=heartbeat if heartbeats else None)
+    admitted = [r["RequestId"] for r in requests]
+    if admitted:
+        logger.info(f"Admitted launches: {admitted}")
+    return admitted
+
+
+# Launches that fail to be dispatched stay queued for the scheduled Dispatch
+def try_dispatch() -> List[str]:
+    try:
+        return dispatch()
+    except Exception as e:
+        logger.warning(f"Dispatch failed, the queued launches wait for the next Dispatch: {e}")
+        return []
+
+
+def enqueue(event: Dict[str, Any]) -> Dict[str, Any]:
+    # The LaunchPriority of the execution input overrides the priority of the EMRLaunchFunction
+    priority = int(event.get("ExecutionInput", {}).get("LaunchPriority", event.get("Priority", 0)))
+    vcpus = requested_vcpus(event["Input"]["Cluster"], instance_vcpus)
+    request = get_scheduler().enqueue(event["RequestId"], event["Namespace"], event["TaskToken"], vcpus, priority)
+    logger.info(f"Queued launch: {request['RequestId']} ({request['Namespace']}, {vcpus} vCPUs)")
+    try_dispatch()
+    return {"RequestId": request["RequestId"], "VCpus": vcpus, "Priority": priority}
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+        action = event.get("Action", None)
+        if action == "Enqueue":
+            return enqueue(event)
+        if action == "Complete":
+            get_scheduler().complete(event["RequestId"])
+            return {"RequestId": event["RequestId"], "Admitted": try_dispatch()}
+        if action == "Dispatch":
+            # The scheduled Dispatch also sends the heartbeats of the queued launches
+            return {"Admitted": dispatch(heartbeats=True)}
+        raise ValueError(f"Unsupported Action: {action}")
+    except Exception as e:
+        log_and_raise(e, event)
+        raise e
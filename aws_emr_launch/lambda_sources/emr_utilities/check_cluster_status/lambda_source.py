@@ -1,34 +1,44 @@
 import json
 import logging
 import os
-from datetime import date, datetime
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
 
-import boto3
-import botocore
+from boto3.dynamodb.types import TypeDeserializer
+from emr_config_utils.clients import LazyClient
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def _get_botocore_config() -> botocore.config.Config:
-    product = os.environ.get("AWS_EMR_LAUNCH_PRODUCT", "")
-    version = os.environ.get("AWS_EMR_LAUNCH_VERSION", "")
-    return botocore.config.Config(
-        retries={"max_attempts": 5},
-        connect_timeout=10,
-        max_pool_connections=10,
-        user_agent_extra=f"{product}/{version}",
-    )
+emr = LazyClient("emr")
+events = LazyClient("events")
+sfn = LazyClient("stepfunctions")
+dynamodb = LazyClient("dynamodb")
+
+deserializer = TypeDeserializer()
 
+CLUSTER_STATES = [
+    "STARTING",
+    "BOOTSTRAPPING",
+    "RUNNING",
+    "WAITING",
+    "TERMINATING",
+    "TERMINATED",
+    "TERMINATED_WITH_ERRORS",
+]
+TERMINAL_STATES = ["TERMINATING", "TERMINATED", "TERMINATED_WITH_ERRORS"]
 
-def _boto3_client(service_name: str) -> boto3.client:
-    return boto3.Session().client(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+# Pending launches are registered after RunJobFlow returns, so Clusters are listed from a
+# little before the oldest launch to allow for clock skew
+CREATED_AFTER_MARGIN = timedelta(minutes=15)
 
+# Pending launches are keyed by RuleName and ClusterId, and indexed by ClusterId
+CLUSTER_ID_INDEX = "ClusterId"
 
-emr = _boto3_client("emr")
-events = _boto3_client("events")
-sfn = _boto3_client("stepfunctions")
+# Matches the botocore max_pool_connections
+SWEEP_WORKERS = 10
 
 
 def json_serial(obj: object) -> str:
@@ -42,22 +52,100 @@ def log_exception(e: Exception, event: Dict[str, Any]) -> None:
     logger.exception(e)
 
 
-def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
-    logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
-    cluster_id = event["ClusterId"]
-    task_token = event["TaskToken"]
-    rule_name = event["RuleName"]
-    expected_state = event["ExpectedState"]
+def _deserialize(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+def _key(pending_launch: Dict[str, Any]) -> Dict[str, Any]:
+    return {"RuleName": {"S": pending_launch["RuleName"]}, "ClusterId": {"S": pending_launch["ClusterId"]}}
+
+
+# The index is eventually consistent: a launch registered moments before the event can be missed, and is
+# left to the sweep of its Rule
+def get_pending_launch(table_name: str, cluster_id: str) -> Optional[Dict[str, Any]]:
+    response = dynamodb.query(
+        TableName=table_name,
+        IndexName=CLUSTER_ID_INDEX,
+        KeyConditionExpression="ClusterId = :cluster_id",
+        ExpressionAttributeValues={":cluster_id": {"S": cluster_id}},
+    )
+    return _deserialize(response["Items"][0]) if response["Items"] else None
+
+
+def list_pending_launches(table_name: str, rule_name: str) -> List[Dict[str, Any]]:
+    pending_launches = []
+    paginator = dynamodb.get_paginator("query")
+    for page in paginator.paginate(
+        TableName=table_name,
+        KeyConditionExpression="RuleName = :rule_name",
+        ExpressionAttributeValues={":rule_name": {"S": rule_name}},
+        ConsistentRead=True,
+    ):
+        pending_launches.extend([_deserialize(item) for item in page["Items"]])
+    return pending_launches
+
+
+def claim_pending_launch(table_name: str, pending_launch: Dict[str, Any]) -> bool:
+    # The Cluster can be checked concurrently by the sweep and the State Change events,
+    # only the invocation that deletes the pending launch sends the Task result
+    try:
+        dynamodb.delete_item(
+            TableName=table_name,
+            Key=_key(pending_launch),
+            ConditionExpression="attribute_exists(ClusterId)",
+        )
+        return True
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        logger.info(f"Pending launch already claimed: {pending_launch['ClusterId']}")
+        return False
+
+
+def list_cluster_states(pending_launches: List[Dict[str, Any]]) -> Dict[str, str]:
+    created_at = [int(p["CreatedAt"]) for p in pending_launches if "CreatedAt" in p]
+    list_args: Dict[str, Any] = {"ClusterStates": CLUSTER_STATES}
+    if created_at and len(created_at) == len(pending_launches):
+        list_args["CreatedAfter"] = datetime.fromtimestamp(min(created_at), timezone.utc) - CREATED_AFTER_MARGIN
+
+    cluster_states = {}
+    paginator = emr.get_paginator("list_clusters")
+    for page in paginator.paginate(**list_args):
+        for cluster in page["Clusters"]:
+            cluster_states[cluster["Id"]] = cluster["Status"]["State"]
+    return cluster_states
+
+
+def update_last_state(table_name: str, pending_launch: Dict[str, Any], state: str) -> None:
+    try:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=_key(pending_launch),
+            UpdateExpression="SET LastState = :state",
+            ConditionExpression="attribute_exists(ClusterId)",
+            ExpressionAttributeValues={":state": {"S": state}},
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        logger.info(f"Pending launch already claimed: {pending_launch['ClusterId']}")
+
+
+def check_pending_launch(table_name: str, pending_launch: Dict[str, Any], state: Optional[str] = None) -> None:
+    cluster_id = pending_launch["ClusterId"]
+    task_token = pending_launch["TaskToken"]
+    expected_state = pending_launch["ExpectedState"]
+    last_state = pending_launch.get("LastState", None)
 
     try:
-        cluster_description = emr.describe_cluster(ClusterId=cluster_id)
-        state = cluster_description["Cluster"]["Status"]["State"]
+        cluster_description = None
+        if state is None:
+            cluster_description = emr.describe_cluster(ClusterId=cluster_id)
+            state = cluster_description["Cluster"]["Status"]["State"]
 
         if state == expected_state:
             success = True
-        elif state in ["TERMINATING", "TERMINATED", "TERMINATED_WITH_ERRORS"]:
+        elif state in TERMINAL_STATES:
             success = False
         else:
+            if state != last_state:
+                update_last_state(table_name, pending_launch, state)
             heartbeat = {
                 "ClusterId": cluster_id,
                 "TaskToken": task_token,
@@ -68,6 +156,12 @@ def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
             sfn.send_task_heartbeat(taskToken=task_token)
             return
 
+        if not claim_pending_launch(table_name, pending_launch):
+            return
+
+        # Only Clusters reaching a final state are described, for the Task output
+        if cluster_description is None:
+            cluster_description = emr.describe_cluster(ClusterId=cluster_id)
         cluster_description["ClusterId"] = cluster_id
 
         if success:
@@ -87,28 +181,68 @@ def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
                 cause=json.dumps(cluster_description, default=json_serial),
             )
 
-        task_token = None
-
-        logger.info(f"Removing Rule Targets: {cluster_id}")
-        failed_targets = events.remove_targets(Rule=rule_name, Ids=[cluster_id])
-
-        if failed_targets["FailedEntryCount"] > 0:
-            failed_entries = failed_targets["FailedEntries"]
-            raise Exception(f"Failed Removing Targets: {json.dumps(failed_entries)}")
-
-        targets = events.list_targets_by_rule(Rule=rule_name)["Targets"]
-        if len(targets) == 0:
-            logger.info(f"Disabling Rule with no Targets: {rule_name}")
-            events.disable_rule(Name=rule_name)
-
     except Exception as e:
         try:
-            if task_token:
+            logger.error(f"Removing Pending Launch: {cluster_id}")
+            if claim_pending_launch(table_name, pending_launch):
                 logger.error(f"Sending TaskFailure: {task_token}")
                 sfn.send_task_failure(taskToken=task_token, error="States.TaskFailed", cause=str(e))
-            logger.error(f"Removing Rule Targets: {cluster_id}")
-            events.remove_targets(Rule=rule_name, Ids=[cluster_id])
         except Exception as ee:
             logger.exception(ee)
+        raise e
+
+
+def sweep_pending_launches(table_name: str, rule_name: str) -> None:
+    pending_launches = list_pending_launches(table_name, rule_name)
+    logger.info(f"Checking {len(pending_launches)} Pending Launches for Rule: {rule_name}")
+
+    errors = []
+    if pending_launches:
+        cluster_states = list_cluster_states(pending_launches)
+
+        def check(pending_launch: Dict[str, Any]) -> Optional[Exception]:
+            try:
+                # Clusters missing from the listing are described individually
+                check_pending_launch(table_name, pending_launch, cluster_states.get(pending_launch["ClusterId"]))
+                return None
+            except Exception as e:
+                logger.exception(e)
+                return e
+
+        with ThreadPoolExecutor(max_workers=SWEEP_WORKERS) as executor:
+            errors = [e for e in executor.map(check, pending_launches) if e is not None]
+
+    if len(list_pending_launches(table_name, rule_name)) == 0:
+        logger.info(f"Disabling Rule with no Pending Launches: {rule_name}")
+        events.disable_rule(Name=rule_name)
+
+        # A launch registered while the Rule was being disabled would never be swept
+        if len(list_pending_launches(table_name, rule_name)) > 0:
+            logger.info(f"Re-enabling Rule with new Pending Launches: {rule_name}")
+            events.enable_rule(Name=rule_name)
+
+    if errors:
+        raise Exception(f"Failed checking {len(errors)} of {len(pending_launches)} Pending Launches")
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
+    logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+    table_name = os.environ["PENDING_LAUNCHES_TABLE"]
+
+    try:
+        if "ClusterId" in event:
+            # Invoked by an EMR Cluster State Change event
+            cluster_id = event["ClusterId"]
+            pending_launch = get_pending_launch(table_name, cluster_id)
+            if pending_launch is None:
+                logger.info(f"No pending launch found for Cluster: {cluster_id}")
+                return
+            check_pending_launch(table_name, pending_launch)
+        else:
+            # Invoked by the scheduled EventRule, the Rule is the only resource of the event
+            rule_name = event["resources"][0].split("/")[-1]
+            sweep_pending_launches(table_name, rule_name)
+
+    except Exception as e:
         log_exception(e, event)
         raise e
@@ -0,0 +1,114 @@
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional, cast
+
+from emr_config_utils.cluster_pool import (
+    DEFAULT_LEASE_TIMEOUT_SECONDS,
+    FINGERPRINT_TAG,
+    IDLE_TIMEOUT_TAG,
+    ClusterPool,
+    cluster_fingerprint,
+    pool_from_environment,
+    pool_tags,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+# The pool is created on first use, as it requires the CLUSTER_POOL_TABLE
+cluster_pool: Optional[ClusterPool] = None
+
+
+def get_cluster_pool() -> ClusterPool:
+    global cluster_pool
+    if cluster_pool is None:
+        cluster_pool = pool_from_environment()
+    return cluster_pool
+
+
+def json_serial(obj: object) -> str:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError("Type %s not serializable" % type(obj))
+
+
+def log_and_raise(e: Exception, event: Dict[str, Any]) -> None:
+    logger.error(f"Error processing event {json.dumps(event)}")
+    logger.exception(e)
+    raise e
+
+
+# The result of the CreateCluster Task the leased Cluster replaces
+def launch_result(description: Dict[str, Any], result_shape: str) -> Dict[str, Any]:
+    cluster_id = description["Cluster"]["Id"]
+    cluster_arn = description["Cluster"].get("ClusterArn", None)
+    if result_shape == "DescribeCluster":
+        # The output of the RunJobFlow Lambda waiting for the Cluster to start
+        return cast(
+            Dict[str, Any], json.loads(json.dumps(dict(description, ClusterId=cluster_id), default=json_serial))
+        )
+    if result_shape == "RunJobFlow":
+        return {"JobFlowId": cluster_id, "ClusterArn": cluster_arn, "ClusterId": cluster_id}
+    return {"ClusterId": cluster_id, "ClusterArn": cluster_arn}
+
+
+def acquire(event: Dict[str, Any]) -> Dict[str, Any]:
+    cluster_configuration: Dict[str, Any] = event["Input"]
+    cluster = cluster_configuration["Cluster"]
+    if not cluster["Instances"].get("KeepJobFlowAliveWhenNoSteps", False):
+        logger.info("Clusters without KeepJobFlowAliveWhenNoSteps are not pooled")
+        return cluster_configuration
+
+    fingerprint = cluster_fingerprint(cluster_configuration)
+    tags = [t for t in cluster.get("Tags", None) or [] if t["Key"] not in [FINGERPRINT_TAG, IDLE_TIMEOUT_TAG]]
+    cluster["Tags"] = tags + pool_tags(fingerprint, int(event["IdleTimeout"]))
+
+    # The leased Cluster is tagged like the Cluster the launch would have created
+    lease_timeout = int(event.get("LeaseTimeout", DEFAULT_LEASE_TIMEOUT_SECONDS))
+    description = get_cluster_pool().acquire(fingerprint, event["LeaseId"], cluster["Tags"], lease_timeout)
+    if description is None:
+        logger.info(f"No pooled Cluster available: {fingerprint}")
+    else:
+        logger.info(f"Leased pooled Cluster: {description['Cluster']['Id']}")
+        cluster_configuration["PooledCluster"] = launch_result(description, event.get("ResultShape", "CreateCluster"))
+    return cluster_configuration
+
+
+# Hands a Cluster launched ahead of a scheduled pipeline to the pool, available until the Deadline (seconds
+# after the StartTime of the pre-warm execution). A Cluster that can't be pooled is terminated
+def prewarm(event: Dict[str, Any]) -> Dict[str, Any]:
+    cluster_id = event["ClusterId"]
+    start_time = datetime.fromisoformat(event["StartTime"].replace("Z", "+00:00"))
+    idle_until = int(start_time.timestamp()) + int(event["Deadline"])
+    released = get_cluster_pool().release(cluster_id, event.get("LeaseId", None), idle_until=idle_until)
+    if released:
+        logger.info(f"Pre-warmed Cluster {cluster_id} available until {idle_until}")
+    else:
+        logger.warning(f"Pre-warmed Cluster {cluster_id} could not be pooled, terminating")
+        get_cluster_pool().terminate(cluster_id)
+    return {"ClusterId": cluster_id, "Released": released, "IdleUntil": idle_until}
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+        action = event.get("Action", None)
+        if action == "Acquire":
+            return acquire(event)
+        if action == "Release":
+            cluster_id = event["ClusterId"]
+            released = get_cluster_pool().release(cluster_id, event.get("LeaseId", None))
+            logger.info(f"Released Cluster {cluster_id}: {released}")
+            return {"ClusterId": cluster_id, "Released": released}
+        if action == "Prewarm":
+            return prewarm(event)
+        if action == "Reap":
+            terminated = get_cluster_pool().reap()
+            logger.info(f"Terminated idle Clusters: {terminated}")
+            return {"TerminatedClusters": terminated}
+        raise ValueError(f"Unsupported Action: {action}")
+    except Exception as e:
+        log_and_raise(e, event)
+        raise e
@@ -0,0 +1,22 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Matches CONTENT_VERSION_LENGTH of the registry
+CONTENT_VERSION_LENGTH = 16
+
+
+# The Custom::ContentVersion resource: hashes the Value (JSON) once its deploy-time values are resolved.
+# The version is the physical id, so a new version replaces the resource
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+    if event["RequestType"] == "Delete":
+        return {"PhysicalResourceId": event["PhysicalResourceId"]}
+
+    value = event["ResourceProperties"]["Value"]
+    version = hashlib.sha256(value.encode("utf-8")).hexdigest()[:CONTENT_VERSION_LENGTH]
+    return {"PhysicalResourceId": version, "Data": {"Version": version}}
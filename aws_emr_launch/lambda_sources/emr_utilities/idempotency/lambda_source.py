@@ -0,0 +1,58 @@
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from emr_config_utils.idempotency import (
+    IdempotencyRecords,
+    IdempotentLaunchNotRecorded,
+    idempotency_key,
+    records_from_environment,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+# The records are created on first use, as they require the IDEMPOTENCY_TABLE
+records: Optional[IdempotencyRecords] = None
+
+
+def get_records() -> IdempotencyRecords:
+    global records
+    if records is None:
+        records = records_from_environment()
+    return records
+
+
+def log_and_raise(e: Exception, event: Dict[str, Any]) -> None:
+    logger.error(f"Error processing event {json.dumps(event)}")
+    logger.exception(e)
+    raise e
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+        action = event.get("Action", None)
+        if action not in ["Claim", "Complete"]:
+            raise ValueError(f"Unsupported Action: {action}")
+
+        # Launches without an IdempotencyKey aren't deduplicated
+        key = idempotency_key(event["ExecutionInput"])
+        if key is None:
+            return {"Status": "NONE"}
+
+        key = f"{event['KeyPrefix']}/{key}"
+        if action == "Claim":
+            result: Dict[str, Any] = get_records().claim(key, event["ExecutionId"], int(event["Window"]))
+            logger.info(f"Claim of {key}: {result['Status']}")
+            return result
+        else:
+            # The key was claimed by another execution, which could launch a second Cluster
+            if not get_records().complete(key, event["ExecutionId"], event["LaunchClusterResult"]):
+                raise IdempotentLaunchNotRecorded(f"The launch of {key} is no longer claimed by the execution")
+            logger.info(f"Recorded launch of {key}")
+            return {"Status": "RECORDED"}
+    except Exception as e:
+        log_and_raise(e, event)
+        raise e
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, cast
+
+from emr_config_utils.clients import LazyClient
+from emr_config_utils.launch_checks import fail_if_cluster_running, override_cluster_configs, update_cluster_tags
+from emr_config_utils.parameters import ParameterCache, load_cluster_request
+from emr_config_utils.registry import Registry
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Parameters are served from the warm container cache for PARAMETER_CACHE_TTL_SECONDS, then
+# revalidated with GetParameters and only decoded again if their Version has changed. Pinned
+# versions are cached for the life of the container
+PARAMETER_CACHE_TTL_SECONDS = int(os.environ.get("PARAMETER_CACHE_TTL_SECONDS", "60"))
+PARAMETER_CACHE_MAX_SIZE = int(os.environ.get("PARAMETER_CACHE_MAX_SIZE", "32"))
+
+
+emr = LazyClient("emr")
+ssm = LazyClient("ssm")
+# Profiles and Configurations are read from the registry backend of their namespace (SSM by default)
+registry = Registry.from_environment(ssm)
+
+parameter_cache = ParameterCache(PARAMETER_CACHE_TTL_SECONDS, PARAMETER_CACHE_MAX_SIZE)
+
+
+def log_exception(e: Exception, event: Dict[str, Any]) -> None:
+    logger.error(f"Error processing event {json.dumps(event)}")
+    logger.exception(e)
+
+
+def load_cluster_configuration(event: Dict[str, Any]) -> Dict[str, Any]:
+    # Launch Functions with inline_configuration pass the request built when the App was synthesized
+    cluster_request = event.get("ClusterRequest", None)
+    if cluster_request is not None:
+        return cast(Dict[str, Any], json.loads(cluster_request))
+    cluster: Dict[str, Any] = load_cluster_request(event, registry, parameter_cache)
+    return cluster
+
+
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
+
+    try:
+        cluster = load_cluster_configuration(event)
+        cluster["Cluster"] = override_cluster_configs(event, cluster["Cluster"])
+        cluster["Cluster"] = fail_if_cluster_running(emr, event, cluster["Cluster"])
+        cluster["Cluster"] = update_cluster_tags(event, cluster["Cluster"])
+        logger.info(f"ClusterConfiguration: {json.dumps(cluster)}")
+
+        return cluster
+
+    except Exception as e:
+        log_exception(e, event)
+        raise e
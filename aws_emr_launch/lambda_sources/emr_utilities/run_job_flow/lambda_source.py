@@ -2,36 +2,33 @@ import base64
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
-import botocore
 from botocore.exceptions import ClientError
+from emr_config_utils.clients import LazyClient
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def _get_botocore_config() -> botocore.config.Config:
-    product = os.environ.get("AWS_EMR_LAUNCH_PRODUCT", "")
-    version = os.environ.get("AWS_EMR_LAUNCH_VERSION", "")
-    return botocore.config.Config(
-        retries={"max_attempts": 5},
-        connect_timeout=10,
-        max_pool_connections=10,
-        user_agent_extra=f"{product}/{version}",
-    )
-
-
-def _boto3_client(service_name: str) -> boto3.client:
-    return boto3.Session().client(service_name=service_name, use_ssl=True, config=_get_botocore_config())
+emr = LazyClient("emr")
+sfn = LazyClient("stepfunctions")
+events = LazyClient("events")
+dynamodb = LazyClient("dynamodb")
+secretsmanager = LazyClient("secretsmanager")
 
+# Pending launches are expired by the PendingLaunchesTable TTL if they are never swept
+PENDING_LAUNCH_TTL_SECONDS = 7 * 24 * 60 * 60
 
-emr = _boto3_client("emr")
-sfn = _boto3_client("stepfunctions")
-events = _boto3_client("events")
-secretsmanager = _boto3_client("secretsmanager")
+# Secrets are fetched concurrently, bounded by the botocore max_pool_connections. Caching the
+# secret values in warm containers is disabled unless SECRET_CACHE_TTL_SECONDS is set
+SECRETS_MAX_WORKERS = 10
+SECRET_CACHE_TTL_SECONDS = int(os.environ.get("SECRET_CACHE_TTL_SECONDS", "0"))
+SECRET_VERSION_STAGE = "AWSCURRENT"
 
 
 class SecretNotFoundError(Exception):
@@ -48,9 +45,43 @@ def json_serial(obj: object) -> str:
     raise TypeError("Type %s not serializable" % type(obj))
 
 
+class SecretCache:
+    def __init__(self, ttl_seconds: int) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_id: str, version_stage: str) -> Optional[Dict[str, Any]]:
+        if self._ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get((secret_id, version_stage), None)
+        if entry is None or time.monotonic() - entry[0] > self._ttl_seconds:
+            return None
+        return entry[1]
+
+    def put(self, secret_id: str, version_stage: str, value: Dict[str, Any]) -> None:
+        if self._ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[(secret_id, version_stage)] = (time.monotonic(), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+secret_cache = SecretCache(SECRET_CACHE_TTL_SECONDS)
+
+
 def get_secret_value(secret_id: str) -> Dict[str, Any]:
+    cached_val = secret_cache.get(secret_id, SECRET_VERSION_STAGE)
+    if cached_val is not None:
+        logger.info(f"SecretFound (cached): {secret_id}")
+        return cached_val
+
     try:
-        secret_response = secretsmanager.get_secret_value(SecretId=secret_id)
+        secret_response = secretsmanager.get_secret_value(SecretId=secret_id, VersionStage=SECRET_VERSION_STAGE)
     except ClientError as e:
         if e.response["Error"]["Code"] == "DecryptionFailureException":
             raise SecretDecryptionFailureError(f"SecretDecryptionFailure: {secret_id}")
@@ -64,10 +95,22 @@ def get_secret_value(secret_id: str) -> Dict[str, Any]:
         if "SecretString" in secret_response
         else json.loads(base64.b64decode(secret_response.pop("SecretBinary")))
     )
+    secret_cache.put(secret_id, SECRET_VERSION_STAGE, val)
     logger.info(f"SecretFound: {secret_id}")
     return val
 
 
+def get_secret_values(secret_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    # Repeated secrets are only fetched once, errors are raised in the order of the secret_ids
+    unique_secret_ids = list(dict.fromkeys(secret_ids))
+    if not unique_secret_ids:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(SECRETS_MAX_WORKERS, len(unique_secret_ids))) as executor:
+        values = list(executor.map(get_secret_value, unique_secret_ids))
+    return dict(zip(unique_secret_ids, values))
+
+
 def log_and_raise(e: Exception, event: Dict[str, Any]) -> None:
     logger.error(f"Error processing event {json.dumps(event)}")
     logger.exception(e)
@@ -90,12 +133,26 @@ def update_configurations(
     return configurations
 
 
+def put_pending_launch(cluster_id: str, task_token: str, rule_name: str, expected_state: str) -> None:
+    now = int(time.time())
+    dynamodb.put_item(
+        TableName=os.environ["PENDING_LAUNCHES_TABLE"],
+        Item={
+            "ClusterId": {"S": cluster_id},
+            "TaskToken": {"S": task_token},
+            "RuleName": {"S": rule_name},
+            "ExpectedState": {"S": expected_state},
+            "CreatedAt": {"N": str(now)},
+            "ExpiresAt": {"N": str(now + PENDING_LAUNCH_TTL_SECONDS)},
+        },
+    )
+
+
 def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
     try:
         logger.info(f"Lambda metadata: {json.dumps(event)} (type = {type(event)})")
         cluster_configuration = event["Input"]["Cluster"]
         task_token = event.get("TaskToken", None)
-        cluster_status_lambda = event.get("CheckStatusLambda", None)
         fire_and_forget = event.get("FireAndForget", False)
         secret_configurations = event["Input"].get("SecretConfigurations", None)
         kerberos_attributes_secret = event["Input"].get("KerberosAttributesSecret", None)
@@ -109,17 +166,23 @@ def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
         }
         logger.info(f"Removed NoneType values from ClusterConfiguration: {json.dumps(cluster_configuration)}")
 
+        secret_ids = list(secret_configurations.values()) if secret_configurations else []
+        if kerberos_attributes_secret:
+            secret_ids.append(kerberos_attributes_secret)
+        secret_values = get_secret_values(secret_ids)
+
         if secret_configurations:
             logger.info(f"Getting SecretConfigurations: {json.dumps(secret_configurations)}")
             for classification, secret_id in secret_configurations.items():
-                properties = get_secret_value(secret_id)
+                # Copy the properties, the same secret can be used by several classifications
+                properties = dict(secret_values[secret_id])
                 cluster_configuration["Configurations"] = update_configurations(
                     cluster_configuration["Configurations"], classification, properties
                 )
 
         if kerberos_attributes_secret:
             logger.info(f"Getting KerberosAttributesSecret: {json.dumps(kerberos_attributes_secret)}")
-            kerberos_attributes = get_secret_value(kerberos_attributes_secret)
+            kerberos_attributes = secret_values[kerberos_attributes_secret]
             cluster_configuration["KerberosAttributes"] = {
                 k: v
                 for k, v in kerberos_attributes.items()
@@ -147,23 +210,8 @@ def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> None:
             )
             sfn.send_task_success(taskToken=task_token, output=json.dumps(response, default=json_serial))
         else:
-            target_input = {
-                "Id": cluster_id,
-                "Arn": cluster_status_lambda,
-                "Input": json.dumps(
-                    {
-                        "ClusterId": cluster_id,
-                        "TaskToken": task_token,
-                        "RuleName": rule_name,
-                        "ExpectedState": "WAITING",
-                    }
-                ),
-            }
-            logger.info(f"Putting Rule Targets: {json.dumps(target_input)}")
-            failed_targets = events.put_targets(Rule=rule_name, Targets=[target_input])
-            if failed_targets["FailedEntryCount"] > 0:
-                failed_entries = failed_targets["FailedEntries"]
-                raise Exception(f"Failed Putting Targets: {json.dumps(failed_entries)}")
+            logger.info(f"Putting Pending Launch: {cluster_id}")
+            put_pending_launch(cluster_id, event["TaskToken"], event["RuleName"], "WAITING")
 
             logger.info(f"Enabling Rule: {rule_name}")
             events.enable_rule(Name=rule_name)
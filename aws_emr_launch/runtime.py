@@ -0,0 +1,283 @@
+import base64
+import gzip
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generator, Iterator, List, Optional, TypeVar, cast
+
+import boto3
+
+from aws_emr_launch.clients import boto3_client
+from aws_emr_launch.emr_config_utils.registry import Registry, version_name
+
+# The stored value codec is shared with the Lambda Functions
+from aws_emr_launch.emr_config_utils.stored_values import GZIP_MAGIC as GZIP_MAGIC  # noqa: F401
+from aws_emr_launch.emr_config_utils.stored_values import STORAGE_FORMAT_KEY as STORAGE_FORMAT_KEY  # noqa: F401
+from aws_emr_launch.emr_config_utils.stored_values import StoredValueError as StoredValueError  # noqa: F401
+from aws_emr_launch.emr_config_utils.stored_values import decode_stored_value as decode_stored_value  # noqa: F401
+
+# Reads the stored EMR Profiles, Cluster Configurations and Launch Functions without importing aws_cdk,
+# for CLIs, scripts and Lambda Functions that don't synthesize an App. The EMRProfile, ClusterConfiguration
+# and EMRLaunchFunction get_* and iter_* methods are implemented with these functions.
+EMR_PROFILES_PREFIX = "/emr_launch/emr_profiles"
+CLUSTER_CONFIGURATIONS_PREFIX = "/emr_launch/cluster_configurations"
+EMR_LAUNCH_FUNCTIONS_PREFIX = "/emr_launch/emr_launch_functions"
+
+# get_parameters_by_path returns at most 10 Parameters per page
+MAX_PAGE_SIZE = 10
+
+T = TypeVar("T")
+
+
+def compress_value(value_json: str) -> str:
+    # A fixed mtime keeps the compressed value, and so the Parameter, unchanged when the value is unchanged
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as f:
+        f.write(value_json.encode("utf-8"))
+    return json.dumps({STORAGE_FORMAT_KEY: "gzip", "Value": base64.b64encode(buffer.getvalue()).decode("ascii")})
+
+
+def parameter_item(parameter: Dict[str, Any], ssm_parameter_prefix: str, names_only: bool = False) -> Dict[str, Any]:
+    if not names_only:
+        return decode_stored_value(parameter["Value"])
+
+    # Summary projection from the Parameter metadata, without decoding the stored JSON
+    namespace, _, name = parameter["Name"][len(ssm_parameter_prefix) + 1 :].rpartition("/")
+    return {"Namespace": namespace, "Name": name, "Version": parameter.get("Version")}
+
+
+# The Registry configured by the AWS_EMR_LAUNCH_REGISTRY environment variable, SSM for every namespace by default
+def get_registry(ssm_client: Optional[boto3.client] = None) -> Registry:
+    return Registry.from_environment(boto3_client("ssm") if ssm_client is None else ssm_client)
+
+
+def get_stored_value(
+    name: str, ssm_client: Optional[boto3.client] = None, version: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    item = get_registry(ssm_client).get(name if version is None else version_name(name, version))
+    return None if item is None else decode_stored_value(item["Value"])
+
+
+def _parameter_pages(
+    ssm_client: boto3.client,
+    path: str,
+    recursive: bool,
+    page_size: int = MAX_PAGE_SIZE,
+    max_results: Optional[int] = None,
+    next_token: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    if max_results is not None and max_results < 1:
+        raise ValueError(f"max_results must be a positive integer: {max_results}")
+
+    registry = get_registry(ssm_client)
+    remaining = max_results
+    while remaining is None or remaining > 0:
+        # Never request more than remain, so the NextToken of the last page resumes exactly after it
+        parameters, next_token = registry.list(
+            path,
+            recursive,
+            max_results=min(page_size, MAX_PAGE_SIZE) if remaining is None else min(page_size, remaining),
+            next_token=next_token,
+        )
+        if remaining is not None:
+            remaining -= len(parameters)
+        yield {"Parameters": parameters, "NextToken": next_token}
+        if not next_token:
+            break
+
+
+def _path(ssm_parameter_prefix: str, namespace: str, recursive: bool) -> str:
+    return f"{ssm_parameter_prefix}/" if recursive else f"{ssm_parameter_prefix}/{namespace}/"
+
+
+def get_parameter_values(
+    ssm_client: boto3.client,
+    ssm_parameter_prefix: str,
+    top_level_return: str,
+    namespace: str = "default",
+    next_token: Optional[str] = None,
+    max_results: Optional[int] = None,
+    recursive: bool = False,
+    names_only: bool = False,
+) -> Dict[str, Any]:
+    items: List[Dict[str, Any]] = []
+    last_token = None
+    for page in _parameter_pages(
+        ssm_client,
+        _path(ssm_parameter_prefix, namespace, recursive),
+        recursive,
+        max_results=max_results,
+        next_token=next_token,
+    ):
+        items.extend(parameter_item(p, ssm_parameter_prefix, names_only) for p in page["Parameters"])
+        last_token = page.get("NextToken", None)
+
+    return_val: Dict[str, Any] = {top_level_return: items}
+    if last_token:
+        return_val["NextToken"] = last_token
+    return return_val
+
+
+def prefetch(iterator: Iterator[T]) -> Generator[T, None, None]:
+    # Fetches the next item on a background thread while the caller consumes the current one
+    sentinel = object()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(next, iterator, sentinel)
+        while True:
+            item = future.result()
+            if item is sentinel:
+                return
+            future = executor.submit(next, iterator, sentinel)
+            yield cast(T, item)
+
+
+def iter_parameter_values(
+    ssm_client: boto3.client,
+    ssm_parameter_prefix: str,
+    namespace: str = "default",
+    recursive: bool = False,
+    names_only: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    pages = _parameter_pages(ssm_client, _path(ssm_parameter_prefix, namespace, recursive), recursive, page_size)
+    for page in prefetch(pages):
+        for parameter in page["Parameters"]:
+            yield parameter_item(parameter, ssm_parameter_prefix, names_only)
+
+
+def get_profiles(
+    namespace: str = "default",
+    next_token: Optional[str] = None,
+    ssm_client: Optional[boto3.client] = None,
+    max_results: Optional[int] = None,
+    recursive: bool = False,
+    names_only: bool = False,
+) -> Dict[str, Any]:
+    return get_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        EMR_PROFILES_PREFIX,
+        "EMRProfiles",
+        namespace,
+        next_token=next_token,
+        max_results=max_results,
+        recursive=recursive,
+        names_only=names_only,
+    )
+
+
+def iter_profiles(
+    namespace: str = "default",
+    recursive: bool = False,
+    names_only: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+    ssm_client: Optional[boto3.client] = None,
+) -> Iterator[Dict[str, Any]]:
+    return iter_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        EMR_PROFILES_PREFIX,
+        namespace,
+        recursive=recursive,
+        names_only=names_only,
+        page_size=page_size,
+    )
+
+
+def get_profile(
+    profile_name: str,
+    namespace: str = "default",
+    ssm_client: Optional[boto3.client] = None,
+    version: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    return get_stored_value(f"{EMR_PROFILES_PREFIX}/{namespace}/{profile_name}", ssm_client, version)
+
+
+def get_configurations(
+    namespace: str = "default",
+    next_token: Optional[str] = None,
+    ssm_client: Optional[boto3.client] = None,
+    max_results: Optional[int] = None,
+    recursive: bool = False,
+    names_only: bool = False,
+) -> Dict[str, Any]:
+    return get_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        CLUSTER_CONFIGURATIONS_PREFIX,
+        "ClusterConfigurations",
+        namespace,
+        next_token=next_token,
+        max_results=max_results,
+        recursive=recursive,
+        names_only=names_only,
+    )
+
+
+def iter_configurations(
+    namespace: str = "default",
+    recursive: bool = False,
+    names_only: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+    ssm_client: Optional[boto3.client] = None,
+) -> Iterator[Dict[str, Any]]:
+    return iter_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        CLUSTER_CONFIGURATIONS_PREFIX,
+        namespace,
+        recursive=recursive,
+        names_only=names_only,
+        page_size=page_size,
+    )
+
+
+def get_configuration(
+    configuration_name: str,
+    namespace: str = "default",
+    ssm_client: Optional[boto3.client] = None,
+    version: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    return get_stored_value(f"{CLUSTER_CONFIGURATIONS_PREFIX}/{namespace}/{configuration_name}", ssm_client, version)
+
+
+def get_functions(
+    namespace: str = "default",
+    next_token: Optional[str] = None,
+    ssm_client: Optional[boto3.client] = None,
+    max_results: Optional[int] = None,
+    recursive: bool = False,
+    names_only: bool = False,
+) -> Dict[str, Any]:
+    return get_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        EMR_LAUNCH_FUNCTIONS_PREFIX,
+        "EMRLaunchFunctions",
+        namespace,
+        next_token=next_token,
+        max_results=max_results,
+        recursive=recursive,
+        names_only=names_only,
+    )
+
+
+def iter_functions(
+    namespace: str = "default",
+    recursive: bool = False,
+    names_only: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+    ssm_client: Optional[boto3.client] = None,
+) -> Iterator[Dict[str, Any]]:
+    return iter_parameter_values(
+        boto3_client("ssm") if ssm_client is None else ssm_client,
+        EMR_LAUNCH_FUNCTIONS_PREFIX,
+        namespace,
+        recursive=recursive,
+        names_only=names_only,
+        page_size=page_size,
+    )
+
+
+def get_function(
+    launch_function_name: str,
+    namespace: str = "default",
+    ssm_client: Optional[boto3.client] = None,
+    version: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    return get_stored_value(f"{EMR_LAUNCH_FUNCTIONS_PREFIX}/{namespace}/{launch_function_name}", ssm_client, version)
@@ -0,0 +1,65 @@
+# Measures the time to import aws_emr_launch modules in a fresh interpreter, and the heavy packages
+# (boto3, aws_cdk) each import pulls in. `import aws_emr_launch` and aws_emr_launch.runtime don't
+# import aws_cdk; the construct modules do.
+#
+#   python extras/benchmarks/import_time.py [--runs 10] [--module aws_emr_launch.runtime] [--budget-ms 200]
+#
+# With --budget-ms the exit status is 1 when the median import time of a module exceeds the budget.
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+MODULES = [
+    "aws_emr_launch",
+    "aws_emr_launch.runtime",
+    "aws_emr_launch.constructs.emr_constructs.emr_profile",
+]
+HEAVY_PACKAGES = ["boto3", "aws_cdk"]
+
+MEASURE = """
+import sys
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(p for p in {heavy_packages!r} if p in sys.modules))
+"""
+
+
+def measure(module: str, runs: int) -> Tuple[List[float], str]:
+    durations = []
+    imported = ""
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(module=module, heavy_packages=HEAVY_PACKAGES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        lines = output.splitlines()
+        durations.append(float(lines[-2]) * 1000)
+        imported = lines[-1]
+    return durations, imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", action="append", help="defaults to " + ", ".join(MODULES))
+    parser.add_argument("--budget-ms", type=float)
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'module':<55} {'median ms':>10} {'min ms':>10}  imports")
+    for module in args.module or MODULES:
+        durations, imported = measure(module, args.runs)
+        median = statistics.median(durations)
+        print(f"{module:<55} {median:>10.1f} {min(durations):>10.1f}  {imported}")
+        over_budget = over_budget or (args.budget_ms is not None and median > args.budget_ms)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
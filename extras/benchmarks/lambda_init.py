@@ -0,0 +1,75 @@
+# Measures the cold start init duration of the emr_utilities Lambda handlers: the time to
+# import each lambda_source module in a fresh interpreter, with the EMRConfigUtilsLayer on
+# the path as it is in the Lambda runtime (ahead of the runtime's own packages).
+#
+#   python extras/benchmarks/lambda_init.py [--runs 20] [--layer DIR] [--emr-utilities DIR] [--with-clients]
+#
+# AWS clients are created on first use, --with-clients adds their creation to the measurement.
+# --layer and --emr-utilities measure another build of the layer (the directory containing
+# python/) or of the Lambda sources, e.g. from an older checkout.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+from layer_size import stage_layer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+EMR_UTILITIES = os.path.join(ROOT, "aws_emr_launch", "lambda_sources", "emr_utilities")
+
+MEASURE = """
+import time
+start = time.perf_counter()
+import lambda_source
+if {with_clients}:
+    from emr_config_utils.clients import LazyClient
+    for value in list(vars(lambda_source).values()):
+        if isinstance(value, LazyClient):
+            value.meta
+print(time.perf_counter() - start)
+"""
+
+
+def measure(emr_utilities: str, layer: str, function: str, runs: int, with_clients: bool) -> List[float]:
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([os.path.join(emr_utilities, function), os.path.join(layer, "python")]),
+        AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+    )
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(with_clients=with_clients)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        durations.append(float(output.strip().splitlines()[-1]) * 1000)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--layer", default=None)
+    parser.add_argument("--emr-utilities", default=EMR_UTILITIES)
+    parser.add_argument("--with-clients", action="store_true", help="include creating the AWS clients")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layer = stage_layer(os.path.join(tmp, "layer")) if args.layer is None else args.layer
+
+        print(f"{'function':<30} {'median ms':>10} {'min ms':>10}")
+        for function in sorted(os.listdir(args.emr_utilities)):
+            if not os.path.exists(os.path.join(args.emr_utilities, function, "lambda_source.py")):
+                continue
+            durations = measure(args.emr_utilities, layer, function, args.runs, args.with_clients)
+            print(f"{function:<30} {statistics.median(durations):>10.1f} {min(durations):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
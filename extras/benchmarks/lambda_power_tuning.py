@@ -0,0 +1,156 @@
+# Power-tunes deployed EMR Launch Lambda Functions. For each memory size and architecture the
+# function is reconfigured (forcing a cold start), invoked once cold and then --invocations times
+# warm, and the Init Duration and Duration are read from the REPORT line of the log tail. The
+# original configuration is restored afterwards.
+#
+#   python extras/benchmarks/lambda_power_tuning.py \
+#       --function EMRLaunch_APIs_GetProfiles --function MyFunction=payload.json \
+#       [--memory-sizes 128,256,512,1024] [--architectures x86_64,arm64] [--invocations 5]
+#
+# Payloads default to {}. Only tune functions with payloads that are safe to repeat: RunJobFlow,
+# for example, launches a Cluster on every invocation.
+import argparse
+import base64
+import json
+import re
+import statistics
+import urllib.request
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import boto3
+
+# USD per GB-second, us-east-1
+PRICES = {"x86_64": 0.0000166667, "arm64": 0.0000133334}
+
+REPORT_VALUES = {
+    "duration": re.compile(r"\tDuration: ([\d.]+) ms"),
+    "billed_duration": re.compile(r"Billed Duration: ([\d.]+) ms"),
+    "init_duration": re.compile(r"Init Duration: ([\d.]+) ms"),
+    "max_memory_used": re.compile(r"Max Memory Used: (\d+) MB"),
+}
+
+lambda_client = boto3.client("lambda")
+
+
+def parse_report(log_result: str) -> Dict[str, float]:
+    log = base64.b64decode(log_result).decode("utf-8")
+    report = [line for line in log.splitlines() if line.startswith("REPORT")][-1]
+    values = {}
+    for name, pattern in REPORT_VALUES.items():
+        match = pattern.search(report)
+        if match:
+            values[name] = float(match.group(1))
+    return values
+
+
+def invoke(function_name: str, payload: bytes) -> Dict[str, Any]:
+    response = lambda_client.invoke(FunctionName=function_name, Payload=payload, LogType="Tail")
+    report: Dict[str, Any] = parse_report(response["LogResult"])
+    report["error"] = response.get("FunctionError")
+    return report
+
+
+def wait_for_update(function_name: str) -> None:
+    lambda_client.get_waiter("function_updated").wait(FunctionName=function_name)
+
+
+def set_architecture(function_name: str, architecture: str) -> None:
+    function = lambda_client.get_function(FunctionName=function_name)
+    if function["Configuration"].get("Architectures", ["x86_64"]) == [architecture]:
+        return
+    with urllib.request.urlopen(function["Code"]["Location"]) as code:
+        lambda_client.update_function_code(
+            FunctionName=function_name, ZipFile=code.read(), Architectures=[architecture]
+        )
+    wait_for_update(function_name)
+
+
+def configure(function_name: str, memory_size: int, environment: Dict[str, str]) -> None:
+    # A new environment variable value guarantees the next invocation is a cold start
+    variables = dict(environment, AWS_EMR_LAUNCH_POWER_TUNING=str(uuid.uuid4()))
+    lambda_client.update_function_configuration(
+        FunctionName=function_name, MemorySize=memory_size, Environment={"Variables": variables}
+    )
+    wait_for_update(function_name)
+
+
+def tune(
+    function_name: str, payload: bytes, memory_sizes: List[int], architectures: List[str], invocations: int
+) -> List[Tuple[str, int, Dict[str, Any]]]:
+    configuration = lambda_client.get_function_configuration(FunctionName=function_name)
+    environment = configuration.get("Environment", {}).get("Variables", {})
+    original_architecture = configuration.get("Architectures", ["x86_64"])[0]
+
+    results = []
+    try:
+        for architecture in architectures:
+            set_architecture(function_name, architecture)
+            for memory_size in memory_sizes:
+                configure(function_name, memory_size, environment)
+                cold = invoke(function_name, payload)
+                warm = [invoke(function_name, payload) for _ in range(invocations)]
+                results.append((architecture, memory_size, summarize(architecture, memory_size, cold, warm)))
+    finally:
+        set_architecture(function_name, original_architecture)
+        lambda_client.update_function_configuration(
+            FunctionName=function_name,
+            MemorySize=configuration["MemorySize"],
+            Environment={"Variables": environment},
+        )
+        wait_for_update(function_name)
+    return results
+
+
+def summarize(architecture: str, memory_size: int, cold: Dict[str, Any], warm: List[Dict[str, Any]]) -> Dict[str, Any]:
+    billed = statistics.median([w["billed_duration"] for w in warm]) if warm else cold["billed_duration"]
+    return {
+        "init_ms": cold.get("init_duration", 0.0),
+        "cold_ms": cold["duration"],
+        "warm_ms": statistics.median([w["duration"] for w in warm]) if warm else None,
+        "max_memory_mb": max([cold["max_memory_used"]] + [w["max_memory_used"] for w in warm]),
+        "cost_per_million": billed / 1000 * memory_size / 1024 * PRICES[architecture] * 1000000,
+        "errors": sum(1 for r in [cold] + warm if r["error"]),
+    }
+
+
+def parse_function(value: str) -> Tuple[str, bytes]:
+    function_name, _, payload_file = value.partition("=")
+    if not payload_file:
+        return function_name, b"{}"
+    with open(payload_file, "rb") as f:
+        payload = f.read()
+    json.loads(payload)
+    return function_name, payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--function", action="append", required=True, help="NAME or NAME=payload.json")
+    parser.add_argument("--memory-sizes", default="128,256,512,1024")
+    parser.add_argument("--architectures", default="x86_64")
+    parser.add_argument("--invocations", type=int, default=5)
+    args = parser.parse_args()
+
+    memory_sizes = [int(m) for m in args.memory_sizes.split(",")]
+    architectures = args.architectures.split(",")
+
+    print(
+        f"{'function':<40} {'arch':<7} {'memory':>6} {'init ms':>8} {'cold ms':>8} {'warm ms':>8} "
+        f"{'max MB':>6} {'$/1M':>8} {'errors':>6}"
+    )
+    for value in args.function:
+        function_name, payload = parse_function(value)
+        for architecture, memory_size, result in tune(
+            function_name, payload, memory_sizes, architectures, args.invocations
+        ):
+            warm_ms = f"{result['warm_ms']:>8.1f}" if result["warm_ms"] is not None else f"{'-':>8}"
+            print(
+                f"{function_name:<40} {architecture:<7} {memory_size:>6} {result['init_ms']:>8.1f} "
+                f"{result['cold_ms']:>8.1f} {warm_ms} {result['max_memory_mb']:>6.0f} "
+                f"{result['cost_per_million']:>8.2f} {result['errors']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
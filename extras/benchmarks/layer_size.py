@@ -0,0 +1,77 @@
+# Reports the size of the EMRConfigUtilsLayer: files, unzipped bytes and deployment package
+# (zip) bytes. See lambda_init.py for the init duration of the handlers using the layer.
+#
+#   python extras/benchmarks/layer_size.py [--layer DIR] [--requirements requirements.txt]
+#
+# --layer measures another build of the layer (the directory containing python/), by default
+# the emr_config_utils package is laid out as the EMRConfigUtilsLayer bundles it.
+# --requirements pip installs packages into a copy of the layer first, to compare a layer
+# that bundles dependencies (e.g. boto3) with the slim one.
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from typing import Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+EMR_CONFIG_UTILS = os.path.join(ROOT, "aws_emr_launch", "emr_config_utils")
+
+
+# Lays the emr_config_utils package out as the EMRConfigUtilsLayer bundles it
+def stage_layer(layer: str) -> str:
+    shutil.copytree(
+        EMR_CONFIG_UTILS,
+        os.path.join(layer, "python", "emr_config_utils"),
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    return layer
+
+
+def layer_size(layer: str) -> Tuple[int, int, int]:
+    files = 0
+    size = 0
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        for root, dirs, names in os.walk(layer):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in names:
+                path = os.path.join(root, name)
+                files += 1
+                size += os.path.getsize(path)
+                package.write(path, os.path.relpath(path, layer))
+    return files, size, len(buffer.getvalue())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--layer", default=None)
+    parser.add_argument("--requirements", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.layer is None:
+            layer = stage_layer(os.path.join(tmp, "layer"))
+        elif args.requirements:
+            layer = os.path.join(tmp, "layer")
+            shutil.copytree(args.layer, layer)
+        else:
+            layer = args.layer
+        if args.requirements:
+            subprocess.run(
+                [sys.executable, "-m", "pip", "install", "-q", "-t", os.path.join(layer, "python")]
+                + ["-r", args.requirements],
+                check=True,
+            )
+
+        files, size, zipped = layer_size(layer)
+        print(f"files:        {files}")
+        print(f"unzipped:     {size / 1024:.1f} KiB")
+        print(f"zipped:       {zipped / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Compares the registry backends (SSM, DynamoDB and S3) on the operations the EMR Launch
+# Lambdas and the Control Plane APIs perform: reading one item, the Profile and Configuration
+# of a launch (get_many of 2), and listing a namespace. The backends run against local
+# moto stand-ins, so the numbers compare the client side work and the number of calls of each
+# backend, not the service latencies.
+#
+#   python extras/benchmarks/registry_backends.py [--items 100] [--runs 20] [--value-size 2048]
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+import boto3
+from moto import mock_dynamodb, mock_s3, mock_ssm
+
+from aws_emr_launch.emr_config_utils.registry import DynamoDBBackend, RegistryBackend, S3Backend, SSMBackend
+
+PREFIX = "/emr_launch/cluster_configurations"
+
+
+def build_backends() -> Dict[str, RegistryBackend]:
+    boto3.client("dynamodb").create_table(
+        TableName="registry",
+        KeySchema=[{"AttributeName": "Kind", "KeyType": "HASH"}, {"AttributeName": "Name", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "Kind", "AttributeType": "S"},
+            {"AttributeName": "Name", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    boto3.client("s3").create_bucket(Bucket="registry")
+    return {
+        "ssm": SSMBackend(boto3.client("ssm")),
+        "dynamodb": DynamoDBBackend("registry", boto3.client("dynamodb")),
+        "s3": S3Backend("registry", "emr_launch/", boto3.client("s3")),
+    }
+
+
+def measure(operation: Callable[[], Any], runs: int) -> List[float]:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def list_namespace(backend: RegistryBackend) -> int:
+    count = 0
+    next_token = None
+    while True:
+        items, next_token = backend.list(f"{PREFIX}/default/", max_results=10, next_token=next_token)
+        count += len(items)
+        if not next_token:
+            return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--value-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    with mock_ssm(), mock_dynamodb(), mock_s3():
+        backends = build_backends()
+        names = [f"{PREFIX}/default/configuration-{i:04d}" for i in range(args.items)]
+        value = json.dumps({"ClusterConfiguration": {"Padding": "x" * args.value_size}})
+
+        print(f"{'backend':<10} {'operation':<12} {'median ms':>10} {'p90 ms':>10}")
+        for backend_name, backend in backends.items():
+            operations: Dict[str, Callable[[], Any]] = {
+                "put": lambda: backend.put(names[0], value),
+                "get": lambda: backend.get(names[0]),
+                "get_many(2)": lambda: backend.get_many(names[:2]),
+                "list": lambda: list_namespace(backend),
+            }
+            for name in names:
+                backend.put(name, value)
+            for operation_name, operation in operations.items():
+                durations = measure(operation, args.runs)
+                p90 = statistics.quantiles(durations, n=10)[-1] if len(durations) > 1 else durations[0]
+                print(f"{backend_name:<10} {operation_name:<12} {statistics.median(durations):>10.2f} {p90:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
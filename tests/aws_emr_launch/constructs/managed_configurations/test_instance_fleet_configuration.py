@@ -1,6 +1,7 @@
 import copy
 
 import aws_cdk
+import pytest
 from aws_cdk import aws_ec2 as ec2
 
 from aws_emr_launch.constructs.managed_configurations import instance_fleet_configuration
@@ -105,6 +106,23 @@ default_config = {
                 "Default": 2,
             },
             "CoreInstanceSpotCount": {"JsonPath": "Instances.InstanceFleets.1.TargetSpotCapacity", "Default": 0},
+            "CoreInstanceTypeConfigs": {
+                "JsonPath": "Instances.InstanceFleets.1.InstanceTypeConfigs",
+                "Default": [
+                    {
+                        "InstanceType": "m5.xlarge",
+                        "EbsConfiguration": {
+                            "EbsBlockDeviceConfigs": [
+                                {
+                                    "VolumeSpecification": {"SizeInGB": 500, "VolumeType": "st1"},
+                                    "VolumesPerInstance": 1,
+                                }
+                            ],
+                            "EbsOptimized": True,
+                        },
+                    }
+                ],
+            },
         }
     },
     "ConfigurationArtifacts": [],
@@ -125,3 +143,85 @@ def test_default_configuration() -> None:
     print(config)
     print(resolved_config)
     assert resolved_config == config
+
+
+def test_weighted_fleets_configuration() -> None:
+    ebs = {"EbsBlockDeviceConfigs": [{"VolumeSpecification": {"SizeInGB": 100, "VolumeType": "gp3"}}]}
+    cluster_config = instance_fleet_configuration.ManagedScalingConfiguration(
+        stack,
+        "test-weighted-fleets-config",
+        configuration_name="test-weighted-cluster",
+        subnets=vpc.private_subnets,
+        core_instance_on_demand_count=2,
+        core_instance_spot_count=4,
+        core_instance_types=[
+            instance_fleet_configuration.FleetInstanceType("m5.xlarge", weighted_capacity=1),
+            instance_fleet_configuration.FleetInstanceType(
+                "m5.2xlarge", weighted_capacity=2, bid_price_as_percentage_of_on_demand_price=60, ebs_configuration=ebs
+            ),
+        ],
+        task_instance_types=[
+            instance_fleet_configuration.FleetInstanceType("r5.xlarge", weighted_capacity=1),
+            instance_fleet_configuration.FleetInstanceType("r5a.xlarge", weighted_capacity=1),
+        ],
+        task_instance_spot_count=8,
+        spot_allocation_strategy=instance_fleet_configuration.SpotAllocationStrategy.PRICE_CAPACITY_OPTIMIZED,
+        spot_timeout=aws_cdk.Duration.minutes(10),
+    )
+
+    resolved_config = stack.resolve(cluster_config.to_json())
+    fleets = resolved_config["ClusterConfiguration"]["Instances"]["InstanceFleets"]
+    assert [f["InstanceFleetType"] for f in fleets] == ["MASTER", "CORE", "TASK"]
+    assert fleets[1]["InstanceTypeConfigs"][1] == {
+        "InstanceType": "m5.2xlarge",
+        "EbsConfiguration": ebs,
+        "WeightedCapacity": 2,
+        "BidPriceAsPercentageOfOnDemandPrice": 60,
+    }
+    assert [t["InstanceType"] for t in fleets[2]["InstanceTypeConfigs"]] == ["r5.xlarge", "r5a.xlarge"]
+    assert (fleets[2]["TargetOnDemandCapacity"], fleets[2]["TargetSpotCapacity"]) == (0, 8)
+    spot_specification = {
+        "TimeoutDurationMinutes": 10,
+        "TimeoutAction": "SWITCH_TO_ON_DEMAND",
+        "AllocationStrategy": "price-capacity-optimized",
+    }
+    assert "LaunchSpecifications" not in fleets[0]
+    assert fleets[1]["LaunchSpecifications"] == {"SpotSpecification": spot_specification}
+    assert fleets[2]["LaunchSpecifications"] == {"SpotSpecification": spot_specification}
+
+    overrides = resolved_config["OverrideInterfaces"]["default"]
+    assert overrides["CoreInstanceTypeConfigs"]["Default"] == fleets[1]["InstanceTypeConfigs"]
+    assert overrides["TaskInstanceTypeConfigs"]["JsonPath"] == "Instances.InstanceFleets.2.InstanceTypeConfigs"
+    assert overrides["TaskInstanceSpotCount"] == {
+        "JsonPath": "Instances.InstanceFleets.2.TargetSpotCapacity",
+        "Default": 8,
+    }
+    assert overrides["CoreSpotAllocationStrategy"] == {
+        "JsonPath": "Instances.InstanceFleets.1.LaunchSpecifications.SpotSpecification.AllocationStrategy",
+        "Default": "price-capacity-optimized",
+    }
+    assert overrides["TaskSpotTimeoutMinutes"]["Default"] == 10
+    assert overrides["TaskSpotTimeoutAction"]["Default"] == "SWITCH_TO_ON_DEMAND"
+    assert overrides["MaximumCapacity"]["Default"] == 10
+
+
+def test_invalid_fleets_configuration() -> None:
+    instance_types = [instance_fleet_configuration.FleetInstanceType(f"m5.{i}xlarge") for i in range(6)]
+    with pytest.raises(ValueError):
+        instance_fleet_configuration.InstanceFleetConfiguration(
+            stack,
+            "test-too-many-types-config",
+            configuration_name="test-cluster",
+            subnets=vpc.private_subnets,
+            core_instance_types=instance_types,
+        )
+    with pytest.raises(ValueError):
+        instance_fleet_configuration.InstanceFleetConfiguration(
+            stack,
+            "test-spot-timeout-config",
+            configuration_name="test-cluster",
+            subnets=vpc.private_subnets,
+            spot_timeout=aws_cdk.Duration.minutes(1),
+        )
+    with pytest.raises(ValueError):
+        instance_fleet_configuration.FleetInstanceType("m5.xlarge", bid_price_as_percentage_of_on_demand_price=120)
@@ -4,12 +4,17 @@ from typing import Any, Dict, cast
 
 import aws_cdk
 import boto3
+from aws_cdk import assertions
 from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_kms as kms
+from aws_cdk import aws_lambda
+from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_secretsmanager as secretsmanager
 from aws_cdk import aws_sns as sns
 from moto import mock_ssm
 
 from aws_emr_launch import __product__, __version__
+from aws_emr_launch.constructs.admission import AdmissionLimits, AdmissionPolicy, AdmissionPolicyError
 from aws_emr_launch.constructs.emr_constructs import cluster_configuration, emr_profile
 from aws_emr_launch.constructs.step_functions import emr_launch_function
 
@@ -122,6 +127,382 @@ class TestControlPlaneApis(unittest.TestCase):
 
         self.print_and_assert(self.default_function, function)
 
+    def test_emr_launch_function_with_prepare_cluster_launch(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_prepare_cluster_launch=True,
+        )
+
+        # Versions are only published when pinned
+        for scope in [profile, configuration, function]:
+            self.assertIsNone(scope.node.try_find_child("SSMParameterVersion"))
+        self.assertIsNotNone(function.node.try_find_child("PrepareClusterLaunchTask"))
+        for task_id in [
+            "LoadClusterConfigurationTask",
+            "OverrideClusterConfigsTask",
+            "FailIfClusterRunningTask",
+            "UpdateClusterTagsTask",
+        ]:
+            self.assertIsNone(function.node.try_find_child(task_id))
+
+    def test_emr_launch_function_with_prepare_cluster_launch_and_override_lambda(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack, "test-configuration", configuration_name="test-configuration"
+        )
+        override_lambda = aws_lambda.Function(
+            stack,
+            "OverrideLambda",
+            code=aws_lambda.Code.from_inline("def handler(event, context): return event"),
+            handler="index.handler",
+            runtime=aws_lambda.Runtime.PYTHON_3_7,
+        )
+
+        with self.assertRaises(ValueError):
+            emr_launch_function.EMRLaunchFunction(
+                stack,
+                "test-function",
+                launch_function_name="test-function",
+                emr_profile=profile,
+                cluster_configuration=configuration,
+                cluster_name="test-cluster",
+                override_cluster_configs_lambda=override_lambda,
+                use_prepare_cluster_launch=True,
+            )
+
+    def test_emr_launch_function_with_pinned_versions(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_prepare_cluster_launch=True,
+            pin_versions=True,
+            emr_profile_version="0123456789abcdef",
+        )
+
+        self.assertEqual(function.emr_profile_version, "0123456789abcdef")
+        self.assertEqual(function.cluster_configuration_version, configuration.content_version)
+        # The pinned ClusterConfiguration and the Launch Function are published, the Profile pinned at an earlier
+        # version is not
+        self.assertIsNone(profile.node.try_find_child("SSMParameterVersion"))
+        self.assertIsNotNone(configuration.node.try_find_child("SSMParameterVersion"))
+        self.assertIsNotNone(function.node.try_find_child("SSMParameterVersion"))
+        function_json = stack.resolve(function.to_json())
+        self.assertEqual(function_json["EMRProfileVersion"], "0123456789abcdef")
+        # The ClusterConfiguration holds deploy-time values, so its version is hashed once they are resolved
+        self.assertEqual(function_json["ClusterConfigurationVersion"], stack.resolve(configuration.content_version))
+        self.assertIn("Fn::GetAtt", function_json["ClusterConfigurationVersion"])
+        self.assertEqual(function.node.validate(), [])
+
+        # Modifying the ClusterConfiguration after it was pinned invalidates the pin
+        profile.authorize_input_key(kms.Key(stack, "Key"))
+        configuration.update_config({"ReleaseLabel": "emr-6.9.0"})
+        errors = function.node.validate()
+        self.assertEqual(len(errors), 1)
+        self.assertIn("ClusterConfiguration test-configuration", errors[0])
+
+    def test_emr_launch_function_with_inline_configuration(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(
+            stack, "test-profile", profile_name="test-profile", vpc=vpc, logs_bucket=s3.Bucket(stack, "LogsBucket")
+        )
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            inline_configuration=True,
+        )
+        # Changes made after the EMRLaunchFunction is created are inlined
+        profile.set_tls_certificate("s3://test-bucket/certificates.zip")
+        # Number Tokens are encoded as CloudFormation expressions
+        level = aws_cdk.CfnParameter(stack, "StepConcurrencyLevel", type="Number")
+        configuration.update_config(dict(configuration.config, StepConcurrencyLevel=level.value_as_number))
+
+        self.assertTrue(function.inline_configuration)
+        self.assertIsNone(function.node.try_find_child("LoadClusterConfigurationTask"))
+        self.assertIsNotNone(function.node.try_find_child("InlineClusterConfiguration"))
+
+        cluster_request = stack.resolve(function.cluster_request())
+        self.assertEqual(cluster_request["Cluster"]["Name"], "test-cluster")
+        self.assertEqual(cluster_request["Cluster"]["ReleaseLabel"], "emr-5.29.0")
+        self.assertEqual(
+            cluster_request["Cluster"]["JobFlowRole"], stack.resolve(profile.roles.instance_role.role_name)
+        )
+        self.assertIn("LogsBucket", json.dumps(cluster_request["Cluster"]["LogUri"]))
+        self.assertIsNotNone(cluster_request["Cluster"]["SecurityConfiguration"])
+        self.assertIn("Secret", json.dumps(cluster_request["SecretConfigurations"]))
+
+        template = assertions.Template.from_stack(stack)
+        definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+        self.assertIn("Inline Cluster Configuration", definition)
+        self.assertIn("States.StringToJson($.ClusterConfiguration.Cluster)", definition)
+        self.assertNotIn("Load Cluster Configuration", definition)
+        self.assertNotIn("e+289", definition)
+        self.assertIn('StepConcurrencyLevel\\\\\\":", {"Ref": "StepConcurrencyLevel"}', definition)
+
+    @mock_ssm
+    def test_inline_configuration_with_rehydrated_configuration(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=ec2.Vpc(stack, "Vpc"))
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack, "test-configuration", configuration_name="test-configuration"
+        )
+        boto3.client("ssm").put_parameter(
+            Name=f"{cluster_configuration.SSM_PARAMETER_PREFIX}/default/test-configuration",
+            Value=json.dumps(stack.resolve(configuration.to_json())),
+            Type="String",
+        )
+        restored = cluster_configuration.ClusterConfiguration.from_stored_configuration(
+            stack, "test-restored", "test-configuration"
+        )
+
+        with self.assertRaises(ValueError):
+            emr_launch_function.EMRLaunchFunction(
+                stack,
+                "test-function",
+                launch_function_name="test-function",
+                emr_profile=profile,
+                cluster_configuration=restored,
+                cluster_name="test-cluster",
+                inline_configuration=True,
+            )
+
+    def test_emr_launch_function_with_inline_prepare_cluster_launch(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_prepare_cluster_launch=True,
+            inline_configuration=True,
+        )
+
+        template = assertions.Template.from_stack(stack)
+        definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+        self.assertIn("ClusterRequest", definition)
+        self.assertIn("test-cluster", definition)
+
+    def test_emr_launch_function_with_cluster_pool(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_cluster_pool=True,
+        )
+
+        self.assertEqual(
+            function.cluster_pool_idle_timeout.to_seconds(),  # type: ignore
+            emr_launch_function.DEFAULT_CLUSTER_POOL_IDLE_TIMEOUT.to_seconds(),
+        )
+        self.assertEqual(stack.resolve(function.to_json())["ClusterPool"], {"IdleTimeout": 1800, "LeaseTimeout": 86400})
+
+        template = assertions.Template.from_stack(stack)
+        definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+        self.assertIn("Acquire Pooled Cluster", definition)
+        self.assertIn("Pooled Cluster Leased?", definition)
+        self.assertIn("$.ClusterConfiguration.PooledCluster", definition)
+        self.assertIn('\\"ResultShape\\":\\"DescribeCluster\\"', definition)
+        self.assertIn('\\"LeaseTimeout\\":86400', definition)
+        self.assertIn('\\"UseClusterPool\\":true', definition)
+        template.has_resource_properties(
+            "AWS::Events::Rule", {"ScheduleExpression": "rate(5 minutes)", "Targets": [{"Input": '{"Action":"Reap"}'}]}
+        )
+
+        # Pooled Clusters share the Name of the launch, and would always be found running
+        with self.assertRaises(ValueError):
+            emr_launch_function.EMRLaunchFunction(
+                stack,
+                "test-failing-function",
+                launch_function_name="test-failing-function",
+                emr_profile=profile,
+                cluster_configuration=configuration,
+                cluster_name="test-cluster",
+                use_cluster_pool=True,
+                default_fail_if_cluster_running=True,
+            )
+
+    def test_emr_launch_function_with_admission_control(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+        AdmissionPolicy(namespaces={"default": AdmissionLimits(max_concurrent_launches=2, max_vcpus=256)}).apply_to(
+            stack
+        )
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_admission_control=True,
+            launch_priority=5,
+        )
+
+        self.assertEqual(function.launch_priority, 5)
+        self.assertEqual(stack.resolve(function.to_json())["AdmissionControl"], {"LaunchPriority": 5})
+
+        template = assertions.Template.from_stack(stack)
+        definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+        self.assertIn("Admit Cluster Launch", definition)
+        self.assertIn("Complete Cluster Launch", definition)
+        self.assertIn("Cluster Launch Failed?", definition)
+        self.assertIn('\\"TimeoutSeconds\\":21600', definition)
+        self.assertIn('\\"HeartbeatSeconds\\":600', definition)
+
+        functions = template.find_resources("AWS::Lambda::Function")
+        environment = [
+            f["Properties"]["Environment"]["Variables"]
+            for f in functions.values()
+            if "ADMISSION_POLICY" in f["Properties"].get("Environment", {}).get("Variables", {})
+        ]
+        self.assertEqual(len(environment), 1)
+        admission_policy = json.loads(environment[0]["ADMISSION_POLICY"])
+        self.assertEqual(admission_policy["Namespaces"]["default"], {"MaxConcurrentLaunches": 2, "MaxVCpus": 256})
+        template.has_resource_properties(
+            "AWS::Events::Rule",
+            {"ScheduleExpression": "rate(1 minute)", "Targets": [{"Input": '{"Action":"Dispatch"}'}]},
+        )
+
+        with self.assertRaises(AdmissionPolicyError):
+            AdmissionPolicy().apply_to(stack)
+
+        # Launches not waiting for the Cluster to start would stop counting against the limits once launched
+        with self.assertRaises(ValueError):
+            emr_launch_function.EMRLaunchFunction(
+                stack,
+                "test-not-waiting-function",
+                launch_function_name="test-not-waiting-function",
+                emr_profile=profile,
+                cluster_configuration=configuration,
+                cluster_name="test-cluster",
+                use_admission_control=True,
+                wait_for_cluster_start=False,
+            )
+
+    def test_emr_launch_function_with_idempotency_keys(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        vpc = ec2.Vpc(stack, "Vpc")
+
+        profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=vpc)
+        configuration = cluster_configuration.ClusterConfiguration(
+            stack,
+            "test-configuration",
+            configuration_name="test-configuration",
+            secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+        )
+
+        function = emr_launch_function.EMRLaunchFunction(
+            stack,
+            "test-function",
+            launch_function_name="test-function",
+            emr_profile=profile,
+            cluster_configuration=configuration,
+            cluster_name="test-cluster",
+            use_idempotency_keys=True,
+            idempotency_window=aws_cdk.Duration.hours(2),
+        )
+
+        self.assertEqual(function.idempotency_window.to_seconds(), 7200)  # type: ignore
+        self.assertEqual(stack.resolve(function.to_json())["Idempotency"], {"Window": 7200})
+
+        template = assertions.Template.from_stack(stack)
+        definition = json.dumps(template.find_resources("AWS::StepFunctions::StateMachine"))
+        self.assertIn("Claim Idempotency Key", definition)
+        self.assertIn("Duplicate Launch?", definition)
+        self.assertIn("Use Existing Cluster", definition)
+        self.assertIn("Record Idempotent Launch", definition)
+        self.assertIn('\\"Error\\":\\"IdempotentLaunchNotRecorded\\"', definition)
+        self.assertIn('{\\"ErrorEquals\\":[\\"IdempotentLaunchNotRecorded\\"],\\"MaxAttempts\\":0}', definition)
+        self.assertIn('\\"KeyPrefix\\":\\"default/test-function\\"', definition)
+        template.has_resource_properties(
+            "AWS::DynamoDB::Table",
+            {
+                "KeySchema": [{"AttributeName": "IdempotencyKey", "KeyType": "HASH"}],
+                "TimeToLiveSpecification": {"AttributeName": "ExpiresAt", "Enabled": True},
+            },
+        )
+
     @mock_ssm
     def test_get_function(self) -> None:
         stack = aws_cdk.Stack(
@@ -0,0 +1,113 @@
+import json
+import unittest
+from unittest import mock
+
+import aws_cdk
+from aws_cdk import assertions
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_events as events
+from aws_cdk import aws_secretsmanager as secretsmanager
+
+from aws_emr_launch.constructs.emr_constructs import cluster_configuration, emr_profile
+from aws_emr_launch.constructs.step_functions import emr_launch_function, emr_prewarm
+
+
+def launch_function(stack: aws_cdk.Stack, use_cluster_pool: bool = True) -> emr_launch_function.EMRLaunchFunction:
+    profile = emr_profile.EMRProfile(stack, "test-profile", profile_name="test-profile", vpc=ec2.Vpc(stack, "Vpc"))
+    configuration = cluster_configuration.ClusterConfiguration(
+        stack,
+        "test-configuration",
+        configuration_name="test-configuration",
+        secret_configurations={"SecretConfiguration": secretsmanager.Secret(stack, "Secret")},
+    )
+    return emr_launch_function.EMRLaunchFunction(
+        stack,
+        "test-function",
+        launch_function_name="test-function",
+        emr_profile=profile,
+        cluster_configuration=configuration,
+        cluster_name="test-cluster",
+        use_cluster_pool=use_cluster_pool,
+    )
+
+
+class TestEMRClusterPrewarm(unittest.TestCase):
+    def test_prewarm_schedule(self) -> None:
+        schedule = emr_prewarm.prewarm_schedule(
+            events.CronOptions(minute="15", hour="2", week_day="MON-FRI"), aws_cdk.Duration.minutes(30)
+        )
+        self.assertEqual((schedule.minute, schedule.hour, schedule.week_day), ("45", "1", "MON-FRI"))
+
+        schedule = emr_prewarm.prewarm_schedule(events.CronOptions(minute="0", hour="0"), aws_cdk.Duration.minutes(20))
+        self.assertEqual((schedule.minute, schedule.hour), ("40", "23"))
+
+        with self.assertRaises(ValueError):
+            emr_prewarm.prewarm_schedule(events.CronOptions(minute="0", hour="*"), aws_cdk.Duration.minutes(20))
+        with self.assertRaises(ValueError):
+            emr_prewarm.prewarm_schedule(
+                events.CronOptions(minute="0", hour="0", week_day="MON"), aws_cdk.Duration.minutes(20)
+            )
+        with self.assertRaises(ValueError):
+            emr_prewarm.prewarm_schedule(events.CronOptions(minute="0", hour="4"), aws_cdk.Duration.days(1))
+
+    def test_emr_cluster_prewarm(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        prewarm = emr_prewarm.EMRClusterPrewarm(
+            stack,
+            "test-prewarm",
+            launch_function=launch_function(stack),
+            pipeline_schedule=events.CronOptions(minute="0", hour="3"),
+            lead_time=aws_cdk.Duration.minutes(20),
+            input={"ClusterConfigOverrides": {"ReleaseLabel": "emr-6.9.0"}},
+        )
+        self.assertEqual(prewarm.deadline.to_seconds(), emr_prewarm.DEFAULT_PREWARM_DEADLINE.to_seconds())
+
+        template = assertions.Template.from_stack(stack)
+        template.has_resource_properties(
+            "AWS::Events::Rule",
+            {
+                "ScheduleExpression": "cron(40 2 * * ? *)",
+                "Targets": [{"Input": '{"ClusterConfigOverrides":{"ReleaseLabel":"emr-6.9.0"}}'}],
+            },
+        )
+        state_machine = prewarm.state_machine.node.default_child
+        definition = json.dumps(stack.resolve(state_machine.definition_string))  # type: ignore
+        self.assertIn("Hand Off Pre-warmed Cluster", definition)
+        self.assertIn("$.Output.LaunchClusterResult.ClusterId", definition)
+        # The pre-warmed Cluster is pooled until an hour after the pipeline starts
+        self.assertIn('\\"Deadline\\":4800', definition)
+
+    def test_emr_cluster_prewarm_requires_cluster_pool(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        with self.assertRaises(ValueError):
+            emr_prewarm.EMRClusterPrewarm(
+                stack,
+                "test-prewarm",
+                launch_function=launch_function(stack, use_cluster_pool=False),
+                pipeline_schedule=events.CronOptions(minute="0", hour="3"),
+                lead_time=aws_cdk.Duration.minutes(20),
+            )
+
+    def test_emr_cluster_prewarm_requires_no_fail_if_cluster_running(self) -> None:
+        stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+        function = launch_function(stack)
+        with self.assertRaises(ValueError):
+            emr_prewarm.EMRClusterPrewarm(
+                stack,
+                "test-prewarm",
+                launch_function=function,
+                pipeline_schedule=events.CronOptions(minute="0", hour="3"),
+                lead_time=aws_cdk.Duration.minutes(20),
+                input={"FailIfClusterRunning": True},
+            )
+
+        # Rehydrated Launch Functions are only checked by the pre-warm
+        with mock.patch.object(function, "_default_fail_if_cluster_running", True):
+            with self.assertRaises(ValueError):
+                emr_prewarm.EMRClusterPrewarm(
+                    stack,
+                    "test-rehydrated-prewarm",
+                    launch_function=function,
+                    pipeline_schedule=events.CronOptions(minute="0", hour="3"),
+                    lead_time=aws_cdk.Duration.minutes(20),
+                )
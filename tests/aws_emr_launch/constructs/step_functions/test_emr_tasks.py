@@ -1,6 +1,8 @@
 from typing import Any, Dict
 
 import aws_cdk
+import pytest
+from aws_cdk import assertions
 from aws_cdk import aws_secretsmanager as secretsmanager
 from aws_cdk import aws_stepfunctions as sfn
 
@@ -341,7 +343,6 @@ def test_run_job_flow_builder() -> None:
                 "ExecutionInput.$": "$$.Execution.Input",
                 "Input.$": "$",
                 "TaskToken.$": "$$.Task.Token",
-                "CheckStatusLambda": {"Fn::GetAtt": ["CheckClusterStatusA7C1019E", "Arn"]},
                 "RuleName": {"Ref": "testtaskEventRule9A04A93E"},
                 "FireAndForget": False,
             },
@@ -361,6 +362,54 @@ def test_run_job_flow_builder() -> None:
     print_and_assert(default_task_json, task)
 
 
+def test_run_job_flow_builder_with_cluster_state_change_events() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+
+    emr_tasks.RunJobFlowBuilder.build(
+        stack,
+        "test-task",
+        roles=emr_profile.EMRRoles(stack, "test-emr-roles", role_name_prefix="test-roles"),
+        secret_configurations={"Secret": secretsmanager.Secret(stack, "test-secret-configurations-secret")},
+        use_cluster_state_change_events=True,
+    )
+
+    template = assertions.Template.from_stack(stack)
+    template.has_resource_properties(
+        "AWS::Events::Rule",
+        {
+            "EventPattern": {
+                "source": ["aws.emr"],
+                "detail-type": ["EMR Cluster State Change"],
+                "detail": {"state": ["WAITING", "TERMINATED", "TERMINATED_WITH_ERRORS"]},
+            },
+            "State": "ENABLED",
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Events::Rule", {"ScheduleExpression": "rate(10 minutes)", "State": "DISABLED"}
+    )
+
+
+def test_run_job_flow_builder_with_secret_cache() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    roles = emr_profile.EMRRoles(stack, "test-emr-roles", role_name_prefix="test-roles")
+
+    for task_id in ["test-task", "test-other-task"]:
+        emr_tasks.RunJobFlowBuilder.build(stack, task_id, roles=roles, secret_cache_ttl=aws_cdk.Duration.minutes(5))
+
+    template = assertions.Template.from_stack(stack)
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {"Environment": {"Variables": assertions.Match.object_like({"SECRET_CACHE_TTL_SECONDS": "300"})}},
+    )
+
+    # The RunJobFlow Lambda is shared, so a different TTL can't be applied
+    with pytest.raises(ValueError):
+        emr_tasks.RunJobFlowBuilder.build(
+            stack, "test-conflicting-task", roles=roles, secret_cache_ttl=aws_cdk.Duration.minutes(1)
+        )
+
+
 def test_add_step_builder() -> None:
     default_task_json = {
         "Resource": {"Fn::Join": ["", ["arn:", {"Ref": "AWS::Partition"}, ":states:::elasticmapreduce:addStep.sync"]]},
@@ -0,0 +1,93 @@
+from typing import Any
+
+import aws_cdk
+import pytest
+from aws_cdk import aws_lambda
+from aws_cdk.assertions import Template
+
+from aws_emr_launch.constructs.lambdas import emr_lambdas
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile, LambdaRuntimeProfileError
+
+
+def _stack() -> aws_cdk.Stack:
+    return aws_cdk.Stack(aws_cdk.App(), "test-lambdas-stack")
+
+
+def test_default_runtime_profile() -> None:
+    stack = _stack()
+    emr_lambdas.FailIfClusterRunningBuilder.get_or_build(stack)
+
+    template = Template.from_stack(stack)
+    properties = list(template.find_resources("AWS::Lambda::Function").values())[0]["Properties"]
+    assert properties["Runtime"] == "python3.7"
+    assert properties["Timeout"] == 60
+    assert "Architectures" not in properties
+    assert "MemorySize" not in properties
+    assert "EphemeralStorage" not in properties
+
+    layer_properties = list(template.find_resources("AWS::Lambda::LayerVersion").values())[0]["Properties"]
+    assert layer_properties["CompatibleRuntimes"] == ["python3.7"]
+    assert "CompatibleArchitectures" not in layer_properties
+
+
+def test_runtime_profile() -> None:
+    stack = _stack()
+    LambdaRuntimeProfile(
+        runtime=aws_lambda.Runtime.PYTHON_3_11,
+        architecture=aws_lambda.Architecture.ARM_64,
+        memory_size=512,
+        ephemeral_storage_size=aws_cdk.Size.mebibytes(1024),
+        timeout=aws_cdk.Duration.minutes(2),
+    ).apply_to(stack)
+    emr_lambdas.FailIfClusterRunningBuilder.get_or_build(stack)
+    emr_lambdas.OverrideClusterConfigsBuilder.get_or_build(stack)
+
+    template = Template.from_stack(stack)
+    functions = template.find_resources("AWS::Lambda::Function")
+    assert len(functions) == 2
+    for function in functions.values():
+        properties = function["Properties"]
+        assert properties["Runtime"] == "python3.11"
+        assert properties["Architectures"] == ["arm64"]
+        assert properties["MemorySize"] == 512
+        assert properties["EphemeralStorage"] == {"Size": 1024}
+        assert properties["Timeout"] == 120
+
+    layer_properties = list(template.find_resources("AWS::Lambda::LayerVersion").values())[0]["Properties"]
+    assert layer_properties["CompatibleRuntimes"] == ["python3.11"]
+    assert layer_properties["CompatibleArchitectures"] == ["arm64"]
+
+
+def test_shared_emr_config_utils_layer() -> None:
+    layer_arn = "arn:aws:lambda:us-east-1:123456789012:layer:EMRLaunch_EMRUtilities_EMRConfigUtilsLayer:3"
+    stack = _stack()
+    LambdaRuntimeProfile(emr_config_utils_layer_arn=layer_arn).apply_to(stack)
+    emr_lambdas.FailIfClusterRunningBuilder.get_or_build(stack)
+    emr_lambdas.OverrideClusterConfigsBuilder.get_or_build(stack)
+
+    template = Template.from_stack(stack)
+    template.resource_count_is("AWS::Lambda::LayerVersion", 0)
+    for function in template.find_resources("AWS::Lambda::Function").values():
+        assert function["Properties"]["Layers"] == [layer_arn]
+
+
+def test_runtime_profile_applied_after_build() -> None:
+    stack = _stack()
+    emr_lambdas.ParseJsonStringBuilder.get_or_build(stack)
+
+    with pytest.raises(LambdaRuntimeProfileError):
+        LambdaRuntimeProfile(memory_size=256).apply_to(stack)
+
+
+def test_runtime_profile_requires_python() -> None:
+    with pytest.raises(LambdaRuntimeProfileError):
+        LambdaRuntimeProfile(runtime=aws_lambda.Runtime.NODEJS_18_X)
+
+
+def test_emr_config_utils_layer_bundling(tmp_path: Any) -> None:
+    bundling = emr_lambdas._LayerPackageBundling()
+    assert bundling.try_bundle(str(tmp_path), image=aws_lambda.Runtime.PYTHON_3_11.bundling_image)
+
+    # The package is bundled without Docker, where the Lambda runtime imports it
+    assert (tmp_path / emr_lambdas.LAYER_PACKAGE_PATH / "registry.py").is_file()
+    assert not list(tmp_path.glob("**/__pycache__"))
@@ -0,0 +1,194 @@
+import gzip
+import json
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List
+
+import aws_cdk
+import boto3
+import pytest
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_ssm as ssm
+from moto import mock_s3, mock_ssm
+
+from aws_emr_launch.constructs import parameter_store
+from aws_emr_launch.constructs.emr_constructs.cluster_configuration import ClusterConfiguration
+from aws_emr_launch.constructs.emr_constructs.emr_profile import EMRProfile
+from aws_emr_launch.constructs.step_functions.emr_launch_function import EMRLaunchFunction
+
+PREFIX = "/emr_launch/emr_profiles"
+
+
+def _put_parameters(namespace: str, count: int) -> None:
+    ssm = boto3.client("ssm")
+    for i in range(count):
+        ssm.put_parameter(
+            Name=f"{PREFIX}/{namespace}/profile-{i:02d}",
+            Value=json.dumps({"ProfileName": f"profile-{i:02d}", "Namespace": namespace}),
+            Type="String",
+        )
+
+
+@mock_ssm
+def test_get_parameter_values() -> None:
+    _put_parameters("test", 23)
+    ssm = boto3.client("ssm")
+
+    result = parameter_store.get_parameter_values(ssm, PREFIX, "EMRProfiles", "test")
+    assert len(result["EMRProfiles"]) == 23
+    assert "NextToken" not in result
+
+    first = parameter_store.get_parameter_values(ssm, PREFIX, "EMRProfiles", "test", max_results=15)
+    second = parameter_store.get_parameter_values(
+        ssm, PREFIX, "EMRProfiles", "test", next_token=first["NextToken"], max_results=15
+    )
+    assert len(first["EMRProfiles"]) == 15
+    assert len(second["EMRProfiles"]) == 8
+    assert "NextToken" not in second
+    assert sorted(p["ProfileName"] for p in first["EMRProfiles"] + second["EMRProfiles"]) == [
+        f"profile-{i:02d}" for i in range(23)
+    ]
+
+    with pytest.raises(ValueError):
+        parameter_store.get_parameter_values(ssm, PREFIX, "EMRProfiles", "test", max_results=0)
+
+
+@mock_ssm
+def test_iter_profiles() -> None:
+    _put_parameters("test", 12)
+    _put_parameters("other", 3)
+
+    profiles = EMRProfile.iter_profiles("test", page_size=5)
+    assert isinstance(profiles, Iterator)
+    assert len(list(profiles)) == 12
+
+    names = list(EMRProfile.iter_profiles(recursive=True, names_only=True))
+    assert sorted((n["Namespace"], n["Name"]) for n in names) == sorted(
+        [("test", f"profile-{i:02d}") for i in range(12)] + [("other", f"profile-{i:02d}") for i in range(3)]
+    )
+
+    assert EMRProfile.get_profiles(recursive=True, names_only=True, max_results=4)["NextToken"]
+    assert ClusterConfiguration.get_configurations("test") == {"ClusterConfigurations": []}
+    assert list(EMRLaunchFunction.iter_functions("test")) == []
+
+
+def test_prefetch() -> None:
+    second_page_requested = threading.Event()
+
+    def pages() -> Iterator[int]:
+        for i in range(3):
+            if i == 1:
+                second_page_requested.set()
+            yield i
+
+    iterator = parameter_store.prefetch(pages())
+    assert next(iterator) == 0
+    # The next page is requested while the caller still holds the first
+    assert second_page_requested.wait(5)
+    assert list(iterator) == [1, 2]
+
+    iterator = parameter_store.prefetch(pages())
+    next(iterator)
+    iterator.close()
+
+
+def _large_configurations(count: int) -> List[Dict[str, Any]]:
+    # Random values, so compression can't shrink them much
+    return [{"Classification": f"classification-{i}", "Properties": {"value": uuid.uuid4().hex}} for i in range(count)]
+
+
+def _stored_value(stack: aws_cdk.Stack, configuration: ClusterConfiguration) -> Any:
+    parameter = configuration.node.find_child("SSMParameter")
+    return stack.resolve(parameter.value)  # type: ignore
+
+
+def test_stored_value_compressed() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    parameter_store.ParameterStorage(compression_threshold=parameter_store.STANDARD_TIER_MAX_SIZE).apply_to(stack)
+    small = ClusterConfiguration(stack, "Small", configuration_name="small")
+    configurations = [{"Classification": "spark-defaults", "Properties": {f"key.{i}": "value"}} for i in range(200)]
+    large = ClusterConfiguration(stack, "Large", configuration_name="large", configurations=configurations)
+    small.update_config()
+    large.update_config()
+
+    assert json.loads(_stored_value(stack, small)) == dict(small.to_json(), ContentVersion=small.content_version)
+
+    stored_value = _stored_value(stack, large)
+    assert json.loads(stored_value)["StorageFormat"] == "gzip"
+    assert len(stored_value) <= parameter_store.ADVANCED_TIER_MAX_SIZE
+    assert parameter_store.decode_stored_value(stored_value) == dict(
+        large.to_json(), ContentVersion=large.content_version
+    )
+
+
+def test_stored_value_uncompressed() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    configurations = [{"Classification": "spark-defaults", "Properties": {f"key.{i}": "value"}} for i in range(200)]
+    configuration = ClusterConfiguration(stack, "Large", configuration_name="large", configurations=configurations)
+
+    # Compression is opt-in
+    assert parameter_store.ParameterStorage.of(stack).compression_threshold is None
+    assert "StorageFormat" not in json.loads(_stored_value(stack, configuration))
+
+
+def test_stored_value_offloaded() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    bucket = s3.Bucket(stack, "Bucket")
+    parameter_store.ParameterStorage(offload_bucket=bucket).apply_to(stack)
+    configuration = ClusterConfiguration(
+        stack, "Configuration", configuration_name="large", configurations=_large_configurations(300)
+    )
+
+    # The pointer references the Bucket name, a deploy-time value
+    stored_value = json.dumps(_stored_value(stack, configuration))
+    assert '\\"StorageFormat\\": \\"s3\\"' in stored_value
+    assert "/emr_launch/cluster_configurations/default/large/" in stored_value
+
+    deployment = configuration.node.find_child("StoredValue")
+    assert deployment in configuration.node.find_child("SSMParameter").node.dependencies
+
+    # Later updates add their object to the same deployment
+    configuration.update_config()
+    assert len([c for c in configuration.node.children if c.node.id == "StoredValue"]) == 1
+
+
+def test_parameter_storage_applied_once() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    ssm.StringParameter(stack, "Parameter", string_value="value")
+    parameter_store.ParameterStorage.of(stack)
+
+    try:
+        parameter_store.ParameterStorage().apply_to(stack)
+        assert False
+    except parameter_store.ParameterStorageError:
+        pass
+
+
+@mock_s3
+@mock_ssm
+def test_decode_stored_value() -> None:
+    value = {"ConfigurationName": "test", "Namespace": "default"}
+    s3_client = boto3.client("s3")
+    s3_client.create_bucket(Bucket="stored-values")
+    s3_client.put_object(Bucket="stored-values", Key="plain.json", Body=json.dumps(value).encode("utf-8"))
+    s3_client.put_object(Bucket="stored-values", Key="gzip.json", Body=gzip.compress(json.dumps(value).encode("utf-8")))
+
+    assert parameter_store.decode_stored_value(json.dumps(value)) == value
+    assert parameter_store.decode_stored_value(parameter_store.compress_value(json.dumps(value))) == value
+    for key in ["plain.json", "gzip.json"]:
+        pointer = json.dumps({"StorageFormat": "s3", "Bucket": "stored-values", "Key": key})
+        assert parameter_store.decode_stored_value(pointer, s3_client) == value
+
+    try:
+        parameter_store.decode_stored_value(json.dumps({"StorageFormat": "zstd"}))
+        assert False
+    except parameter_store.StoredValueError:
+        pass
+
+    boto3.client("ssm").put_parameter(
+        Name="/emr_launch/cluster_configurations/default/test",
+        Value=parameter_store.compress_value(json.dumps(value)),
+        Type="String",
+    )
+    assert ClusterConfiguration.get_configuration("test") == value
+    assert ClusterConfiguration.get_configurations()["ClusterConfigurations"] == [value]
@@ -0,0 +1,170 @@
+import json
+from typing import Any
+
+import aws_cdk
+import boto3
+from aws_cdk import assertions
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda
+from aws_cdk import aws_s3 as s3
+from moto import mock_dynamodb, mock_ssm
+
+from aws_emr_launch.constructs import registry
+from aws_emr_launch.constructs.emr_constructs.cluster_configuration import (
+    ClusterConfiguration,
+    ClusterConfigurationNotFoundError,
+)
+from aws_emr_launch.emr_config_utils import clients
+
+
+def _stack_with_registry() -> aws_cdk.Stack:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    table = registry.DynamoDBRegistryBackend.build_table(stack, "RegistryTable")
+    bucket = s3.Bucket(stack, "RegistryBucket")
+    registry.RegistryConfiguration(
+        namespaces={
+            "team-a": registry.DynamoDBRegistryBackend(table),
+            "team-b": registry.S3RegistryBackend(bucket, "registry/"),
+        }
+    ).apply_to(stack)
+    return stack
+
+
+def test_default_registry() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    configuration = ClusterConfiguration(stack, "Configuration", configuration_name="test")
+
+    assert configuration.node.try_find_child("SSMParameter") is not None
+    assert configuration.node.try_find_child("RegistryItem") is None
+    assert registry.RegistryConfiguration.of(stack).is_default()
+
+
+def test_namespace_backends() -> None:
+    stack = _stack_with_registry()
+    default = ClusterConfiguration(stack, "Default", configuration_name="test")
+    team_a = ClusterConfiguration(stack, "TeamA", configuration_name="test", namespace="team-a")
+    team_b = ClusterConfiguration(stack, "TeamB", configuration_name="test", namespace="team-b")
+
+    assert default.node.try_find_child("SSMParameter") is not None
+    assert team_a.node.try_find_child("SSMParameter") is None
+    assert team_b.node.try_find_child("SSMParameter") is None
+
+    # Versions are only published when pinned
+    template = assertions.Template.from_stack(stack)
+    template.resource_count_is("Custom::AWS", 2)
+    template.resource_count_is("AWS::SSM::Parameter", 1)
+
+
+def test_registry_item_replaced_on_update() -> None:
+    stack = _stack_with_registry()
+    configuration = ClusterConfiguration(stack, "TeamA", configuration_name="test", namespace="team-a")
+    configuration.update_config({"ReleaseLabel": "emr-6.9.0"})
+    configuration.publish_version()
+    configuration.publish_version()
+
+    assert len([c for c in configuration.node.children if c.node.id == "RegistryItem"]) == 1
+    assert len([c for c in configuration.node.children if c.node.id == "RegistryItemVersion"]) == 1
+    template = assertions.Template.from_stack(stack)
+    template.resource_count_is("Custom::AWS", 2)
+    # Published versions are never replaced
+    assert "attribute_not_exists(#value)" in json.dumps(template.find_resources("Custom::AWS"))
+
+
+def test_published_versions() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    configuration = ClusterConfiguration(stack, "Configuration", configuration_name="test")
+    first_version = configuration.content_version
+    configuration.update_config({"ReleaseLabel": "emr-6.9.0"})
+    assert configuration.node.try_find_child("SSMParameterVersion") is None
+
+    assert configuration.publish_version() == configuration.content_version
+    assert configuration.content_version != first_version
+    template = assertions.Template.from_stack(stack)
+    versions = template.find_resources("Custom::AWS")
+    assert len(versions) == 1
+    version = json.dumps(list(versions.values())[0])
+    assert f"/emr_launch/cluster_configuration_versions/default/test/{configuration.content_version}" in version
+    # Published versions are never deleted or overwritten
+    assert "deleteParameter" not in version
+    assert '\\"Overwrite\\":false' in version
+
+
+def test_published_versions_of_deploy_time_values() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    configuration = ClusterConfiguration(stack, "Configuration", configuration_name="test")
+    configuration.update_config({"LogUri": s3.Bucket(stack, "Bucket").s3_url_for_object()})
+    configuration.publish_version()
+    configuration.publish_version()
+
+    # Deploy-time values are hashed once they are resolved
+    version = stack.resolve(configuration.content_version)
+    assert list(version) == ["Fn::GetAtt"] and version["Fn::GetAtt"][1] == "Version"
+    template = assertions.Template.from_stack(stack)
+    template.resource_count_is("Custom::ContentVersion", 1)
+    versions = template.find_resources("Custom::ContentVersion")
+    assert "Bucket" in json.dumps(versions)
+    assert "Fn::GetAtt" in json.dumps(template.find_resources("Custom::AWS"))
+
+
+def test_configure_function() -> None:
+    stack = _stack_with_registry()
+    function = aws_lambda.Function(
+        stack,
+        "Function",
+        code=aws_lambda.Code.from_inline("def handler(event, context): pass"),
+        handler="index.handler",
+        runtime=aws_lambda.Runtime.PYTHON_3_9,
+    )
+    registry.RegistryConfiguration.of(stack).configure_function(function)
+
+    template = assertions.Template.from_stack(stack)
+    functions = template.find_resources("AWS::Lambda::Function")
+    environment = json.dumps(functions[stack.get_logical_id(function.node.default_child)])  # type: ignore
+    assert registry.REGISTRY_CONFIGURATION_ENV in environment
+    assert "team-a" in environment
+    assert "registry/" in environment
+
+    policies = json.dumps(template.find_resources("AWS::IAM::Policy"))
+    assert "dynamodb:BatchGetItem" in policies
+    assert "s3:GetObject*" in policies
+
+
+def test_registry_applied_once() -> None:
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    iam.Role(stack, "Role", assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"))
+    registry.RegistryConfiguration.of(stack)
+
+    try:
+        registry.RegistryConfiguration().apply_to(stack)
+        assert False
+    except registry.RegistryConfigurationError:
+        pass
+
+
+@mock_dynamodb
+@mock_ssm
+def test_get_configuration_from_registry(monkeypatch: Any) -> None:
+    clients.reset_clients()
+    boto3.client("dynamodb").create_table(
+        TableName="registry",
+        KeySchema=[{"AttributeName": "Kind", "KeyType": "HASH"}, {"AttributeName": "Name", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "Kind", "AttributeType": "S"},
+            {"AttributeName": "Name", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    monkeypatch.setenv(
+        registry.REGISTRY_CONFIGURATION_ENV,
+        json.dumps({"Namespaces": {"team-a": {"Backend": "dynamodb", "TableName": "registry"}}}),
+    )
+    value = {"ConfigurationName": "test", "Namespace": "team-a"}
+    registry.Registry.from_environment().put("/emr_launch/cluster_configurations/team-a/test", json.dumps(value))
+
+    assert ClusterConfiguration.get_configuration("test", "team-a") == value
+    assert ClusterConfiguration.get_configurations("team-a") == {"ClusterConfigurations": [value]}
+    try:
+        ClusterConfiguration.get_configuration("test")
+        assert False
+    except ClusterConfigurationNotFoundError:
+        pass
@@ -0,0 +1,124 @@
+import json
+import os
+from typing import Any, Dict
+
+import aws_cdk
+import boto3
+from moto import mock_ssm, mock_sts
+
+from aws_emr_launch.constructs import synth_cache
+from aws_emr_launch.constructs.emr_constructs.cluster_configuration import ClusterConfiguration
+
+PROFILE = "/emr_launch/emr_profiles/default/test-profile"
+CONFIGURATION = "/emr_launch/cluster_configurations/default/test-configuration"
+FUNCTION = "/emr_launch/emr_launch_functions/default/test-function"
+ENVIRONMENT = "account=123456789012:region=us-east-1"
+
+
+def _put(name: str, value: Dict[str, Any]) -> None:
+    boto3.client("ssm").put_parameter(Name=name, Value=json.dumps(value), Type="String", Overwrite=True)
+
+
+@mock_sts
+@mock_ssm
+def test_lookup(tmpdir) -> None:  # type: ignore
+    path = os.path.join(str(tmpdir), "emr-launch.context.json")
+    _put(PROFILE, {"ProfileName": "test-profile"})
+
+    cache = synth_cache.SynthCache(path)
+    assert cache.lookup(PROFILE) == {"ProfileName": "test-profile"}
+    assert cache.lookup(CONFIGURATION) is None
+    assert cache.names == [PROFILE]
+
+    # Later synths read the file, not the registry
+    boto3.client("ssm").delete_parameter(Name=PROFILE)
+    with open(path) as f:
+        assert json.load(f)[f"{PROFILE}:{ENVIRONMENT}"] == {"Version": 1, "Value": {"ProfileName": "test-profile"}}
+    assert synth_cache.SynthCache(path).lookup(PROFILE) == {"ProfileName": "test-profile"}
+
+
+@mock_sts
+@mock_ssm
+def test_prefetch_and_refresh(tmpdir) -> None:  # type: ignore
+    path = os.path.join(str(tmpdir), "emr-launch.context.json")
+    _put(PROFILE, {"ProfileName": "test-profile"})
+    _put("/emr_launch/cluster_configuration_versions/default/test-configuration/v1", {"Version": "v1"})
+    _put(
+        FUNCTION,
+        {
+            "EMRProfile": "default/test-profile",
+            "ClusterConfiguration": "default/test-configuration",
+            "ClusterConfigurationVersion": "v1",
+        },
+    )
+
+    cache = synth_cache.SynthCache(path)
+    cache.prefetch([FUNCTION])
+    assert cache.names == sorted(
+        [FUNCTION, PROFILE, "/emr_launch/cluster_configuration_versions/default/test-configuration/v1"]
+    )
+
+    _put(PROFILE, {"ProfileName": "test-profile", "Description": "updated"})
+    assert cache.get(PROFILE) == {"ProfileName": "test-profile"}
+    assert cache.refresh() == [PROFILE]
+    assert synth_cache.SynthCache(path).get(PROFILE) == {"ProfileName": "test-profile", "Description": "updated"}
+
+    boto3.client("ssm").delete_parameter(Name=FUNCTION)
+    assert cache.refresh() == [FUNCTION]
+    assert cache.get(FUNCTION) is None
+
+
+@mock_sts
+@mock_ssm
+def test_from_stored_configuration(tmpdir) -> None:  # type: ignore
+    path = os.path.join(str(tmpdir), "emr-launch.context.json")
+    stack = aws_cdk.Stack(aws_cdk.App(), "test-stack")
+    configuration = ClusterConfiguration(stack, "test-configuration", configuration_name="test-configuration")
+    _put(CONFIGURATION, stack.resolve(configuration.to_json()))
+
+    app = aws_cdk.App(context={synth_cache.SYNTH_CACHE_CONTEXT_KEY: path})
+    stack = aws_cdk.Stack(app, "test-stack")
+    assert synth_cache.SynthCache.of(stack) is synth_cache.SynthCache.from_file(path)
+    ClusterConfiguration.from_stored_configuration(stack, "test-restored", "test-configuration")
+
+    boto3.client("ssm").delete_parameter(Name=CONFIGURATION)
+    restored = ClusterConfiguration.from_stored_configuration(stack, "test-cached", "test-configuration")
+    assert stack.resolve(restored.to_json()) == stack.resolve(configuration.to_json())
+
+    assert synth_cache.SynthCache.of(aws_cdk.Stack(aws_cdk.App(), "test-stack")) is None
+
+
+@mock_sts
+@mock_ssm
+def test_environments(tmpdir) -> None:  # type: ignore
+    path = os.path.join(str(tmpdir), "emr-launch.context.json")
+    _put(PROFILE, {"ProfileName": "test-profile"})
+
+    app = aws_cdk.App(context={synth_cache.SYNTH_CACHE_CONTEXT_KEY: path})
+    stack = aws_cdk.Stack(app, "test-stack", env=aws_cdk.Environment(account="111111111111", region="us-east-1"))
+    other = aws_cdk.Stack(app, "other-stack", env=aws_cdk.Environment(account="222222222222", region="us-east-1"))
+    cache = synth_cache.SynthCache.of(stack)
+    assert cache is not None and cache.environment == "account=111111111111:region=us-east-1"
+    assert cache.lookup(PROFILE) == {"ProfileName": "test-profile"}
+
+    # Entries read for another account or region are not shared
+    boto3.client("ssm").delete_parameter(Name=PROFILE)
+    other_cache = synth_cache.SynthCache.of(other)
+    assert other_cache is not None and other_cache.lookup(PROFILE) is None
+    assert synth_cache.SynthCache.of(stack) is cache and cache.get(PROFILE) == {"ProfileName": "test-profile"}
+
+    other_cache.clear()
+    with open(path) as f:
+        assert list(json.load(f)) == [f"{PROFILE}:account=111111111111:region=us-east-1"]
+
+
+@mock_sts
+@mock_ssm
+def test_main_default_file(tmpdir, monkeypatch) -> None:  # type: ignore
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setenv(synth_cache.SYNTH_CACHE_ENV, "true")
+    _put(PROFILE, {"ProfileName": "test-profile"})
+
+    synth_cache.main(["prefetch", PROFILE])
+    assert sorted(os.listdir(str(tmpdir))) == [synth_cache.DEFAULT_SYNTH_CACHE_FILE]
+    assert synth_cache.SynthCache(synth_cache.DEFAULT_SYNTH_CACHE_FILE).names == [PROFILE]
@@ -14,3 +14,8 @@ def test_emr_lambdas() -> None:
     assert apis.get_configurations
     assert apis.get_function
     assert apis.get_functions
+    assert apis.describe_function
+    assert apis.find_profiles
+    assert apis.find_configurations
+    assert apis.find_functions
+    assert apis.registry_index.table
@@ -1,12 +1,15 @@
 import json
 import logging
 import unittest
+from typing import Any, Dict, List
+from unittest import mock
 
 import boto3
 from moto import mock_ssm
 
 from aws_emr_launch.control_plane.lambda_sources.apis import get_list_apis
 from aws_emr_launch.control_plane.lambda_sources.apis.get_list_apis import (
+    BadRequestError,
     ClusterConfigurationNotFoundError,
     EMRLaunchFunctionNotFoundError,
     EMRProfileNotFoundError,
@@ -92,3 +95,142 @@ class TestControlPlaneApis(unittest.TestCase):
 
         with self.assertRaises(EMRLaunchFunctionNotFoundError):
             get_list_apis.get_function_handler(event, None)
+
+
+class TestControlPlaneListApis(unittest.TestCase):
+    def create_profiles(self, namespace: str, count: int) -> None:
+        ssm = boto3.client("ssm")
+        for i in range(count):
+            ssm.put_parameter(
+                Name=f"{get_list_apis.PROFILES_SSM_PARAMETER_PREFIX}/{namespace}/profile-{i:02d}",
+                Value=json.dumps({"ProfileName": f"profile-{i:02d}", "Namespace": namespace}),
+                Type="String",
+            )
+
+    @mock_ssm
+    def test_all_pages(self) -> None:
+        self.create_profiles("test", 25)
+
+        result = get_list_apis.get_profiles_handler({"Namespace": "test"}, None)
+        self.assertEqual(len(result["EMRProfiles"]), 25)
+        self.assertNotIn("NextToken", result)
+
+    @mock_ssm
+    def test_max_results(self) -> None:
+        self.create_profiles("test", 25)
+
+        names: List[str] = []
+        event: Dict[str, Any] = {"Namespace": "test", "MaxResults": 12}
+        while True:
+            result = get_list_apis.get_profiles_handler(event, None)
+            self.assertLessEqual(len(result["EMRProfiles"]), 12)
+            names.extend(p["ProfileName"] for p in result["EMRProfiles"])
+            if "NextToken" not in result:
+                break
+            event["NextToken"] = result["NextToken"]
+
+        self.assertEqual(sorted(names), [f"profile-{i:02d}" for i in range(25)])
+
+    @mock_ssm
+    def test_default_max_results(self) -> None:
+        self.create_profiles("test", 25)
+
+        with mock.patch.object(get_list_apis, "DEFAULT_MAX_RESULTS", 20):
+            result = get_list_apis.get_profiles_handler({"Namespace": "test"}, None)
+        self.assertEqual(len(result["EMRProfiles"]), 20)
+        self.assertIn("NextToken", result)
+
+    @mock_ssm
+    def test_invalid_max_results(self) -> None:
+        for max_results in [0, -1, "10", True]:
+            with self.assertRaises(BadRequestError):
+                get_list_apis.get_configurations_handler({"MaxResults": max_results}, None)
+
+    @mock_ssm
+    def test_recursive_names_only(self) -> None:
+        self.create_profiles("test", 3)
+        self.create_profiles("other", 2)
+
+        result = get_list_apis.get_profiles_handler({"Recursive": True, "NamesOnly": True}, None)
+        self.assertEqual(
+            sorted((p["Namespace"], p["Name"], p["Version"]) for p in result["EMRProfiles"]),
+            [("other", "profile-00", 1), ("other", "profile-01", 1)]
+            + [("test", f"profile-{i:02d}", 1) for i in range(3)],
+        )
+
+
+class TestControlPlaneDescribeFunction(unittest.TestCase):
+    profile = {"ProfileName": "test-profile", "Namespace": "default"}
+    configuration = {"ConfigurationName": "test-configuration", "Namespace": "default"}
+    function = {
+        "LaunchFunctionName": "test-function",
+        "Namespace": "default",
+        "EMRProfile": "default/test-profile",
+        "ClusterConfiguration": "default/test-configuration",
+    }
+
+    def create_parameters(self, profile: bool = True, configuration: bool = True) -> None:
+        ssm = boto3.client("ssm")
+        ssm.put_parameter(
+            Name=f"{get_list_apis.FUNCTIONS_SSM_PARAMETER_PREFIX}/default/test-function",
+            Value=json.dumps(self.function),
+            Type="String",
+        )
+        if profile:
+            ssm.put_parameter(
+                Name=f"{get_list_apis.PROFILES_SSM_PARAMETER_PREFIX}/default/test-profile",
+                Value=json.dumps(self.profile),
+                Type="String",
+            )
+        if configuration:
+            ssm.put_parameter(
+                Name=f"{get_list_apis.CONFIGURATIONS_SSM_PARAMETER_PREFIX}/default/test-configuration",
+                Value=json.dumps(self.configuration),
+                Type="String",
+            )
+
+    @mock_ssm
+    def test_describe_function(self) -> None:
+        self.create_parameters()
+
+        result = get_list_apis.describe_function_handler({"FunctionName": "test-function"}, None)
+        self.assertEqual(result["EMRLaunchFunction"], self.function)
+        self.assertEqual(result["EMRProfile"], self.profile)
+        self.assertEqual(result["ClusterConfiguration"], self.configuration)
+        self.assertFalse(result["NotModified"])
+
+        event = {"FunctionName": "test-function", "IfNoneMatch": result["ETag"]}
+        self.assertEqual(
+            get_list_apis.describe_function_handler(event, None), {"ETag": result["ETag"], "NotModified": True}
+        )
+
+        boto3.client("ssm").put_parameter(
+            Name=f"{get_list_apis.PROFILES_SSM_PARAMETER_PREFIX}/default/test-profile",
+            Value=json.dumps(dict(self.profile, Description="updated")),
+            Type="String",
+            Overwrite=True,
+        )
+        updated = get_list_apis.describe_function_handler(event, None)
+        self.assertNotEqual(updated["ETag"], result["ETag"])
+        self.assertEqual(updated["EMRProfile"]["Description"], "updated")
+
+    @mock_ssm
+    def test_describe_function_batches_references(self) -> None:
+        self.create_parameters()
+
+        with mock.patch.object(get_list_apis, "ssm", wraps=get_list_apis.ssm) as ssm:
+            get_list_apis.describe_function_handler({"FunctionName": "test-function"}, None)
+
+        ssm.get_parameter.assert_called_once()
+        ssm.get_parameters.assert_called_once()
+
+    @mock_ssm
+    def test_describe_function_not_found(self) -> None:
+        with self.assertRaises(EMRLaunchFunctionNotFoundError):
+            get_list_apis.describe_function_handler({"FunctionName": "test-function"}, None)
+
+    @mock_ssm
+    def test_describe_function_references_not_found(self) -> None:
+        self.create_parameters(profile=False)
+        with self.assertRaises(EMRProfileNotFoundError):
+            get_list_apis.describe_function_handler({"FunctionName": "test-function"}, None)
@@ -0,0 +1,175 @@
+import json
+import logging
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb, mock_ssm
+
+from aws_emr_launch.control_plane.lambda_sources.apis import get_list_apis
+from aws_emr_launch.control_plane.lambda_sources.registry_index import registry_index
+
+# Turn the LOGGERs off for the tests
+registry_index.LOGGER.setLevel(logging.WARN)
+get_list_apis.LOGGER.setLevel(logging.WARN)
+
+TABLE_NAME = "RegistryIndex"
+
+
+def create_table() -> None:
+    boto3.client("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "IndexKey", "KeyType": "HASH"},
+            {"AttributeName": "IndexValue", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "IndexKey", "AttributeType": "S"},
+            {"AttributeName": "IndexValue", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def put_configuration(namespace: str, name: str, release_label: str, applications: List[str]) -> str:
+    parameter_name = f"/emr_launch/cluster_configurations/{namespace}/{name}"
+    configuration = {
+        "ConfigurationName": name,
+        "Namespace": namespace,
+        "ClusterConfiguration": {"ReleaseLabel": release_label, "Applications": [{"Name": a} for a in applications]},
+    }
+    boto3.client("ssm").put_parameter(
+        Name=parameter_name, Value=json.dumps(configuration), Type="String", Overwrite=True
+    )
+    return parameter_name
+
+
+def change_event(parameter_name: str, operation: str) -> Dict[str, Any]:
+    return {
+        "source": "aws.ssm",
+        "detail-type": "Parameter Store Change",
+        "detail": {"name": parameter_name, "type": "String", "operation": operation},
+    }
+
+
+def index_items(index_key: str) -> List[str]:
+    items = boto3.client("dynamodb").query(
+        TableName=TABLE_NAME,
+        KeyConditionExpression="IndexKey = :index_key",
+        ExpressionAttributeValues={":index_key": {"S": index_key}},
+    )["Items"]
+    return [i["IndexValue"]["S"] for i in items]
+
+
+@mock.patch.object(registry_index, "REGISTRY_INDEX_TABLE", TABLE_NAME)
+@mock.patch.object(get_list_apis, "REGISTRY_INDEX_TABLE", TABLE_NAME)
+class TestRegistryIndex(unittest.TestCase):
+    @mock_ssm
+    @mock_dynamodb
+    def test_index_parameter_changes(self) -> None:
+        create_table()
+        name = put_configuration("default", "spark", "emr-6.2.0", ["Hadoop", "Spark"])
+
+        self.assertEqual(registry_index.handler(change_event(name, "Create"), None), {"IndexedParameters": 1})
+        self.assertEqual(index_items("cluster_configurations#ReleaseLabel"), ["emr-6.2.0#default/spark"])
+        self.assertEqual(
+            index_items("cluster_configurations#Application"), ["Hadoop#default/spark", "Spark#default/spark"]
+        )
+
+        put_configuration("default", "spark", "emr-6.3.0", ["Spark"])
+        registry_index.handler(change_event(name, "Update"), None)
+        self.assertEqual(index_items("cluster_configurations#ReleaseLabel"), ["emr-6.3.0#default/spark"])
+        self.assertEqual(index_items("cluster_configurations#Application"), ["Spark#default/spark"])
+
+        # A redelivered event for an already indexed version changes nothing
+        with mock.patch.object(registry_index, "dynamodb", wraps=registry_index.dynamodb) as dynamodb:
+            registry_index.handler(change_event(name, "Update"), None)
+            dynamodb.transact_write_items.assert_not_called()
+
+        boto3.client("ssm").delete_parameter(Name=name)
+        registry_index.handler(change_event(name, "Delete"), None)
+        self.assertEqual(index_items("cluster_configurations#ReleaseLabel"), [])
+        self.assertEqual(index_items("cluster_configurations#Application"), [])
+        self.assertEqual(index_items(registry_index.PARAMETER_INDEX_KEY), [])
+
+    @mock_ssm
+    @mock_dynamodb
+    def test_ignores_other_parameters(self) -> None:
+        create_table()
+        event = change_event("/emr_launch/control_plane/version", "Create")
+
+        self.assertEqual(registry_index.handler(event, None), {"IndexedParameters": 0})
+
+    @mock_ssm
+    @mock_dynamodb
+    def test_rebuild_and_find(self) -> None:
+        create_table()
+        put_configuration("default", "spark-6", "emr-6.2.0", ["Spark"])
+        put_configuration("default", "hive-6", "emr-6.2.0", ["Hive"])
+        put_configuration("team", "spark-5", "emr-5.30.0", ["Spark"])
+        boto3.client("ssm").put_parameter(
+            Name="/emr_launch/emr_launch_functions/default/launch",
+            Value=json.dumps({"EMRProfile": "default/profile", "ClusterConfiguration": "default/spark-6"}),
+            Type="String",
+        )
+
+        self.assertEqual(registry_index.handler({"Rebuild": True}, None), {"IndexedParameters": 4})
+
+        event = {"Filters": {"ReleaseLabel": "emr-6.*", "Application": "Spark"}}
+        self.assertEqual(
+            get_list_apis.find_configurations_handler(event, None),
+            {"ClusterConfigurations": [{"Namespace": "default", "Name": "spark-6"}]},
+        )
+
+        event = {"Filters": {"Application": "Spark"}}
+        self.assertEqual(
+            get_list_apis.find_configurations_handler(event, None),
+            {
+                "ClusterConfigurations": [
+                    {"Namespace": "default", "Name": "spark-6"},
+                    {"Namespace": "team", "Name": "spark-5"},
+                ]
+            },
+        )
+
+        event = {"Filters": {"ClusterConfiguration": "default/spark-6"}}
+        self.assertEqual(
+            get_list_apis.find_functions_handler(event, None),
+            {"EMRLaunchFunctions": [{"Namespace": "default", "Name": "launch"}]},
+        )
+
+        event = {"Filters": {"Vpc": "vpc-0123"}}
+        self.assertEqual(get_list_apis.find_profiles_handler(event, None), {"EMRProfiles": []})
+
+        with self.assertRaises(ValueError):
+            get_list_apis.find_profiles_handler({"Filters": {}}, None)
+
+    @mock_ssm
+    @mock_dynamodb
+    def test_index_parameter_in_batches(self) -> None:
+        create_table()
+        applications = [f"Application{i:03}" for i in range(150)]
+        name = put_configuration("default", "large", "emr-6.2.0", applications)
+
+        with mock.patch.object(registry_index, "dynamodb", wraps=registry_index.dynamodb) as dynamodb:
+            registry_index.handler(change_event(name, "Create"), None)
+            batches = [c.kwargs["TransactItems"] for c in dynamodb.transact_write_items.call_args_list]
+        self.assertEqual([len(b) for b in batches], [100, 52])
+        self.assertEqual(len(index_items("cluster_configurations#Application")), 150)
+
+    @mock_ssm
+    @mock_dynamodb
+    def test_rebuild_continuation(self) -> None:
+        create_table()
+        for i in range(12):
+            put_configuration("default", f"spark-{i}", "emr-6.2.0", ["Spark"])
+        context = mock.Mock()
+        context.get_remaining_time_in_millis.return_value = 1000
+
+        response = registry_index.handler({"Rebuild": True}, context)
+        self.assertEqual(response["IndexedParameters"], 10)
+        self.assertEqual(response["Continuation"]["Kind"], "cluster_configurations")
+
+        self.assertEqual(registry_index.handler(response["Continuation"], context), {"IndexedParameters": 2})
+        self.assertEqual(len(index_items("cluster_configurations#ReleaseLabel")), 12)
@@ -1,5 +1,8 @@
 import aws_cdk
+from aws_cdk import aws_lambda
+from aws_cdk.assertions import Template
 
+from aws_emr_launch.constructs.lambdas.runtime_profile import LambdaRuntimeProfile
 from aws_emr_launch.control_plane import ControlPlaneStack
 
 
@@ -7,3 +10,19 @@ def test_control_plane_stack() -> None:
     stack = ControlPlaneStack(aws_cdk.App())
 
     assert stack.apis
+
+
+def test_control_plane_lambda_runtime_profile() -> None:
+    stack = ControlPlaneStack(
+        aws_cdk.App(),
+        lambda_runtime_profile=LambdaRuntimeProfile(
+            runtime=aws_lambda.Runtime.PYTHON_3_11, architecture=aws_lambda.Architecture.ARM_64, memory_size=256
+        ),
+    )
+
+    functions = Template.from_stack(stack).find_resources("AWS::Lambda::Function")
+    assert len(functions) == 11
+    for function in functions.values():
+        assert function["Properties"]["Runtime"] == "python3.11"
+        assert function["Properties"]["Architectures"] == ["arm64"]
+        assert function["Properties"]["MemorySize"] == 256
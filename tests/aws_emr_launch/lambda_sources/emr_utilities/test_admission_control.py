@@ -0,0 +1,329 @@
+import json
+import logging
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+import boto3
+from emr_config_utils import clients
+from emr_config_utils.admission import (
+    ADMITTED,
+    QUEUED,
+    AdmissionError,
+    AdmissionScheduler,
+    AdmissionStore,
+    DynamoDBAdmissionStore,
+    LocalAdmissionStore,
+    load_policy,
+    requested_vcpus,
+    store_from_environment,
+)
+from moto import mock_dynamodb, mock_ec2
+
+from aws_emr_launch.lambda_sources.emr_utilities.admission_control import lambda_source as admission_control
+
+# Turn the logger off for the tests
+admission_control.logger.setLevel(logging.WARN)
+
+TABLE_NAME = "test-launch-admission"
+NOW = 1700000000.0
+
+
+def policy(**limits: Any) -> Dict[str, Any]:
+    loaded: Dict[str, Any] = load_policy(
+        json.dumps(
+            {
+                "LaunchRate": 1,
+                "LaunchBurst": 100,
+                "StartupTimeout": 600,
+                "Default": {"MaxConcurrentLaunches": 2, "MaxVCpus": None},
+                "Namespaces": {"limited": limits},
+            }
+        )
+    )
+    return loaded
+
+
+def create_table() -> None:
+    boto3.client("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "RequestId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "RequestId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def set_exceptions(sfn: mock.MagicMock) -> None:
+    sfn.exceptions.TaskDoesNotExist = type("TaskDoesNotExist", (Exception,), {})
+    sfn.exceptions.TaskTimedOut = type("TaskTimedOut", (Exception,), {})
+    sfn.exceptions.InvalidToken = type("InvalidToken", (Exception,), {})
+
+
+def admitted_ids(admitted: List[Dict[str, Any]]) -> List[str]:
+    return [r["RequestId"] for r in admitted]
+
+
+# The DynamoDB store and its local stand-in must behave the same
+class AdmissionConformance:
+    store: AdmissionStore
+
+    def scheduler(self, **limits: Any) -> AdmissionScheduler:
+        return AdmissionScheduler(self.store, policy(**limits))
+
+    def test_concurrency_limit(self) -> None:
+        scheduler = self.scheduler()
+        for i in range(3):
+            scheduler.enqueue(f"a-{i}", "default", f"token-a-{i}", 4, now=NOW + i)
+        admitted = scheduler.dispatch(now=NOW + 10)
+        assert admitted_ids(admitted) == ["a-0", "a-1"]
+        assert admitted[0]["TaskToken"] == "token-a-0"
+        assert scheduler.dispatch(now=NOW + 11) == []
+
+        # Completed launches make room for the queued launches
+        scheduler.complete("a-0")
+        assert admitted_ids(scheduler.dispatch(now=NOW + 12)) == ["a-2"]
+
+        states = {r["RequestId"]: r["State"] for r in self.store.list_requests()}
+        assert states == {"a-1": ADMITTED, "a-2": ADMITTED}
+
+    def test_startup_timeout(self) -> None:
+        scheduler = self.scheduler()
+        for i in range(3):
+            scheduler.enqueue(f"a-{i}", "default", f"token-a-{i}", 4, now=NOW + i)
+        assert len(scheduler.dispatch(now=NOW + 10)) == 2
+        assert admitted_ids(scheduler.dispatch(now=NOW + 611)) == ["a-2"]
+        assert [r["RequestId"] for r in self.store.list_requests()] == ["a-2"]
+
+    def test_vcpu_limit(self) -> None:
+        scheduler = self.scheduler(MaxConcurrentLaunches=10, MaxVCpus=16)
+        scheduler.enqueue("big", "limited", "token-big", 12, now=NOW)
+        scheduler.enqueue("small", "limited", "token-small", 8, now=NOW + 1)
+        with self.assertRaises(AdmissionError):  # type: ignore
+            scheduler.enqueue("too-big", "limited", "token-too-big", 32, now=NOW + 2)
+
+        # Launches are admitted in order, a smaller launch doesn't jump the queue
+        assert admitted_ids(scheduler.dispatch(now=NOW + 10)) == ["big"]
+        assert scheduler.dispatch(now=NOW + 11) == []
+        scheduler.complete("big")
+        assert admitted_ids(scheduler.dispatch(now=NOW + 12)) == ["small"]
+
+    def test_priority_and_fair_share(self) -> None:
+        scheduler = AdmissionScheduler(self.store, dict(policy(), Default={"MaxConcurrentLaunches": 10}))
+        scheduler.enqueue("a-0", "team-a", "token", 4, now=NOW)
+        scheduler.enqueue("a-1", "team-a", "token", 4, now=NOW + 1)
+        scheduler.enqueue("a-2", "team-a", "token", 4, now=NOW + 2)
+        scheduler.enqueue("b-0", "team-b", "token", 4, now=NOW + 3)
+        scheduler.enqueue("b-1", "team-b", "token", 4, now=NOW + 4)
+        scheduler.enqueue("urgent", "team-b", "token", 4, priority=10, now=NOW + 5)
+
+        # The highest priority first, then the namespaces alternate
+        admitted = scheduler.dispatch(now=NOW + 10)
+        assert admitted_ids(admitted) == ["urgent", "a-0", "a-1", "b-0", "a-2", "b-1"]
+
+    def test_launch_rate(self) -> None:
+        scheduler = AdmissionScheduler(self.store, dict(policy(), LaunchBurst=2, LaunchRate=0.5))
+        for i in range(5):
+            scheduler.enqueue(f"a-{i}", "other", f"token-a-{i}", 4, now=NOW + i)
+        assert admitted_ids(scheduler.dispatch(now=NOW + 10)) == ["a-0", "a-1"]
+        assert scheduler.dispatch(now=NOW + 11) == []
+        for i in range(2):
+            scheduler.complete(f"a-{i}")
+        assert admitted_ids(scheduler.dispatch(now=NOW + 14)) == ["a-2", "a-3"]
+
+    def test_dispatcher_lease(self) -> None:
+        scheduler = self.scheduler()
+        scheduler.enqueue("a-0", "default", "token-a-0", 4, now=NOW)
+        assert self.store.lease_dispatcher("other", NOW) is not None
+        assert scheduler.dispatch(now=NOW + 10) == []
+
+        # The lease of a dispatcher that didn't release it expires
+        assert admitted_ids(scheduler.dispatch(now=NOW + 61)) == ["a-0"]
+
+    def test_notify(self) -> None:
+        scheduler = AdmissionScheduler(self.store, dict(policy(), LaunchBurst=2, LaunchRate=0.5))
+        for i in range(3):
+            scheduler.enqueue(f"a-{i}", "other", f"token-a-{i}", 4, now=NOW + i)
+
+        # Launches no longer waiting are removed without taking a launch rate token
+        admitted = scheduler.dispatch(now=NOW + 10, notify=lambda r: bool(r["RequestId"] != "a-0"))
+        assert admitted_ids(admitted) == ["a-1", "a-2"]
+        assert sorted(r["RequestId"] for r in self.store.list_requests()) == ["a-1", "a-2"]
+
+    def test_notify_failure(self) -> None:
+        scheduler = self.scheduler()
+        scheduler.enqueue("a-0", "default", "token-a-0", 4, now=NOW)
+        scheduler.enqueue("a-1", "default", "token-a-1", 4, now=NOW + 1)
+
+        def notify(request: Dict[str, Any]) -> bool:
+            if request["RequestId"] == "a-1":
+                raise RuntimeError("Throttled")
+            return True
+
+        # The launches that failed to be notified stay queued, and the dispatcher is released
+        with self.assertRaises(RuntimeError):  # type: ignore
+            scheduler.dispatch(now=NOW + 10, notify=notify)
+        states = {r["RequestId"]: r["State"] for r in self.store.list_requests()}
+        assert states == {"a-0": ADMITTED, "a-1": QUEUED}
+        assert admitted_ids(scheduler.dispatch(now=NOW + 11, notify=lambda r: True)) == ["a-1"]
+
+    def test_heartbeat(self) -> None:
+        scheduler = self.scheduler()
+        for i in range(4):
+            scheduler.enqueue(f"a-{i}", "default", f"token-a-{i}", 4, now=NOW + i)
+        heartbeats: List[str] = []
+
+        def heartbeat(request: Dict[str, Any]) -> bool:
+            heartbeats.append(request["RequestId"])
+            return bool(request["RequestId"] != "a-3")
+
+        assert admitted_ids(scheduler.dispatch(now=NOW + 10, heartbeat=heartbeat)) == ["a-0", "a-1"]
+        assert heartbeats == ["a-2", "a-3"]
+        assert sorted(r["RequestId"] for r in self.store.list_requests()) == ["a-0", "a-1", "a-2"]
+
+
+class TestLocalAdmissionStore(AdmissionConformance, unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = LocalAdmissionStore()
+
+
+class TestDynamoDBAdmissionStore(AdmissionConformance, unittest.TestCase):
+    def setUp(self) -> None:
+        clients.reset_clients()
+        mock_dynamo = mock_dynamodb()
+        mock_dynamo.start()
+        self.addCleanup(mock_dynamo.stop)
+        create_table()
+        self.store = DynamoDBAdmissionStore(TABLE_NAME)
+
+
+class TestStoreFromEnvironment(unittest.TestCase):
+    def test_store_from_environment(self) -> None:
+        with mock.patch.dict("os.environ", {"LAUNCH_ADMISSION_TABLE": TABLE_NAME}):
+            self.assertIsInstance(store_from_environment(), DynamoDBAdmissionStore)
+        with mock.patch.dict("os.environ", {}, clear=True):
+            with self.assertRaises(AdmissionError):
+                store_from_environment()
+
+
+class TestRequestedVCpus(unittest.TestCase):
+    def test_requested_vcpus(self) -> None:
+        vcpus = {"m5.xlarge": 4, "m5.2xlarge": 8, "r5.4xlarge": 16}.__getitem__
+
+        instances: Dict[str, Any] = {"MasterInstanceType": "m5.xlarge", "SlaveInstanceType": "m5.2xlarge"}
+        self.assertEqual(requested_vcpus({"Instances": dict(instances, InstanceCount=3)}, vcpus), 20)
+        self.assertEqual(requested_vcpus({"Instances": dict(instances, InstanceCount=1)}, vcpus), 4)
+
+        groups = [
+            {"InstanceRole": "MASTER", "InstanceType": "m5.xlarge", "InstanceCount": 1},
+            {"InstanceRole": "CORE", "InstanceType": "r5.4xlarge", "InstanceCount": 2},
+        ]
+        self.assertEqual(requested_vcpus({"Instances": {"InstanceGroups": groups}}, vcpus), 36)
+
+        fleets = [
+            {"TargetOnDemandCapacity": 1, "InstanceTypeConfigs": [{"InstanceType": "m5.xlarge"}]},
+            {
+                "TargetOnDemandCapacity": 2,
+                "TargetSpotCapacity": 4,
+                "InstanceTypeConfigs": [
+                    {"InstanceType": "m5.2xlarge", "WeightedCapacity": 1},
+                    {"InstanceType": "r5.4xlarge", "WeightedCapacity": 4},
+                ],
+            },
+        ]
+        self.assertEqual(requested_vcpus({"Instances": {"InstanceFleets": fleets}}, vcpus), 52)
+
+
+class TestAdmissionControl(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = LocalAdmissionStore()
+        self.scheduler = AdmissionScheduler(self.store, policy(MaxConcurrentLaunches=1))
+        patcher = mock.patch.object(admission_control, "scheduler", self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue_event(self, request_id: str, namespace: str = "limited") -> Dict[str, Any]:
+        return {
+            "Action": "Enqueue",
+            "ExecutionInput": {},
+            "Input": {
+                "Cluster": {
+                    "Name": "test-cluster",
+                    "Instances": {
+                        "MasterInstanceType": "m5.xlarge",
+                        "SlaveInstanceType": "m5.2xlarge",
+                        "InstanceCount": 3,
+                    },
+                }
+            },
+            "RequestId": request_id,
+            "TaskToken": f"token-{request_id}",
+            "Namespace": namespace,
+            "Priority": 0,
+        }
+
+    @mock_ec2
+    def test_enqueue_and_complete(self) -> None:
+        with mock.patch.object(admission_control, "sfn") as sfn:
+            result = admission_control.handler(self.enqueue_event("launch-1"), None)
+            self.assertEqual(result, {"RequestId": "launch-1", "VCpus": 20, "Priority": 0})
+            sfn.send_task_success.assert_called_once()
+            self.assertEqual(sfn.send_task_success.call_args[1]["taskToken"], "token-launch-1")
+
+            # The namespace is at its limit, so the second launch waits in the queue
+            sfn.send_task_success.reset_mock()
+            event = self.enqueue_event("launch-2")
+            event["ExecutionInput"] = {"LaunchPriority": 5}
+            self.assertEqual(admission_control.handler(event, None)["Priority"], 5)
+            sfn.send_task_success.assert_not_called()
+
+            result = admission_control.handler({"Action": "Complete", "RequestId": "launch-1"}, None)
+            self.assertEqual(result, {"RequestId": "launch-1", "Admitted": ["launch-2"]})
+            self.assertEqual(sfn.send_task_success.call_args[1]["taskToken"], "token-launch-2")
+
+    @mock_ec2
+    def test_dispatch_removes_stopped_executions(self) -> None:
+        self.scheduler.enqueue("launch-1", "limited", "token-launch-1", 4)
+        with mock.patch.object(admission_control, "sfn") as sfn:
+            set_exceptions(sfn)
+            sfn.send_task_success.side_effect = sfn.exceptions.TaskTimedOut()
+
+            self.assertEqual(admission_control.handler({"Action": "Dispatch"}, None), {"Admitted": []})
+        self.assertEqual(self.store.list_requests(), [])
+
+    @mock_ec2
+    def test_failed_dispatch_keeps_launches_queued(self) -> None:
+        with mock.patch.object(admission_control, "sfn") as sfn:
+            set_exceptions(sfn)
+            sfn.send_task_success.side_effect = RuntimeError("Throttled")
+
+            # The Enqueue succeeds, and the scheduled Dispatch fails
+            result = admission_control.handler(self.enqueue_event("launch-1"), None)
+            self.assertEqual(result["RequestId"], "launch-1")
+            with self.assertRaises(RuntimeError):
+                admission_control.handler({"Action": "Dispatch"}, None)
+        self.assertEqual([r["State"] for r in self.store.list_requests()], [QUEUED])
+
+    def test_dispatch_heartbeats(self) -> None:
+        self.scheduler.enqueue("launch-1", "limited", "token-launch-1", 4)
+        self.scheduler.enqueue("launch-2", "limited", "token-launch-2", 4)
+        with mock.patch.object(admission_control, "sfn") as sfn:
+            set_exceptions(sfn)
+
+            self.assertEqual(admission_control.handler({"Action": "Dispatch"}, None), {"Admitted": ["launch-1"]})
+            sfn.send_task_heartbeat.assert_called_once_with(taskToken="token-launch-2")
+
+            # Queued launches whose execution stopped are removed
+            sfn.send_task_heartbeat.side_effect = sfn.exceptions.TaskDoesNotExist()
+            self.assertEqual(admission_control.handler({"Action": "Dispatch"}, None), {"Admitted": []})
+        self.assertEqual([r["RequestId"] for r in self.store.list_requests()], ["launch-1"])
+
+    def test_unsupported_action(self) -> None:
+        with self.assertRaises(ValueError):
+            admission_control.handler({"Action": "Admit"}, None)
+
+    def test_queued_state(self) -> None:
+        self.scheduler.enqueue("launch-1", "limited", "token-launch-1", 4)
+        self.scheduler.enqueue("launch-2", "limited", "token-launch-2", 4)
+        self.scheduler.dispatch()
+        states = sorted(r["State"] for r in self.store.list_requests())
+        self.assertEqual(states, [ADMITTED, QUEUED])
@@ -0,0 +1,197 @@
+import logging
+import os
+import time
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb, mock_emr, mock_events
+from moto.emr.models import emr_backends
+
+from aws_emr_launch.lambda_sources.emr_utilities.check_cluster_status import lambda_source as check_cluster_status
+
+# Turn the logger off for the tests
+check_cluster_status.logger.setLevel(logging.WARN)
+
+TABLE_NAME = "test-pending-launches"
+RULE_NAME = "test-rule"
+ACCOUNT_ID = "123456789012"
+
+
+@mock.patch.dict(os.environ, {"PENDING_LAUNCHES_TABLE": TABLE_NAME})
+class TestCheckClusterStatus(unittest.TestCase):
+    def create_resources(self) -> None:
+        self.rule_arn = boto3.client("events").put_rule(
+            Name=RULE_NAME, ScheduleExpression="rate(1 minute)", State="ENABLED"
+        )["RuleArn"]
+        boto3.client("dynamodb").create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "RuleName", "KeyType": "HASH"},
+                {"AttributeName": "ClusterId", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "RuleName", "AttributeType": "S"},
+                {"AttributeName": "ClusterId", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "ClusterId",
+                    "KeySchema": [{"AttributeName": "ClusterId", "KeyType": "HASH"}],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+    def create_pending_launch(self, state: str, rule_name: str = RULE_NAME) -> str:
+        cluster_id: str = boto3.client("emr").run_job_flow(
+            Name="test-cluster",
+            ReleaseLabel="emr-6.2.0",
+            JobFlowRole="test-instance-role",
+            ServiceRole="test-service-role",
+            Instances={"InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+        )["JobFlowId"]
+        emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_id].state = state
+
+        boto3.client("dynamodb").put_item(
+            TableName=TABLE_NAME,
+            Item={
+                "ClusterId": {"S": cluster_id},
+                "TaskToken": {"S": f"token-{cluster_id}"},
+                "RuleName": {"S": rule_name},
+                "ExpectedState": {"S": "WAITING"},
+                "CreatedAt": {"N": str(int(time.time()))},
+            },
+        )
+        return cluster_id
+
+    def pending_launches(self) -> int:
+        count: int = boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"]
+        return count
+
+    def rule_state(self) -> str:
+        state: str = boto3.client("events").describe_rule(Name=RULE_NAME)["State"]
+        return state
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_sweep(self) -> None:
+        self.create_resources()
+        waiting_cluster_id = self.create_pending_launch("WAITING")
+        terminated_cluster_id = self.create_pending_launch("TERMINATED_WITH_ERRORS")
+        starting_cluster_id = self.create_pending_launch("STARTING")
+
+        with mock.patch.object(check_cluster_status, "sfn") as sfn:
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [self.rule_arn]}, None)
+            sfn.send_task_success.assert_called_once()
+            self.assertEqual(sfn.send_task_success.call_args.kwargs["taskToken"], f"token-{waiting_cluster_id}")
+            sfn.send_task_failure.assert_called_once()
+            self.assertEqual(sfn.send_task_failure.call_args.kwargs["taskToken"], f"token-{terminated_cluster_id}")
+            sfn.send_task_heartbeat.assert_called_once_with(taskToken=f"token-{starting_cluster_id}")
+
+        self.assertEqual(self.pending_launches(), 1)
+        self.assertEqual(self.rule_state(), "ENABLED")
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_sweep_describes_changed_clusters(self) -> None:
+        self.create_resources()
+        cluster_ids = [self.create_pending_launch("STARTING") for _ in range(3)]
+
+        emr = check_cluster_status.emr
+        with mock.patch.object(check_cluster_status, "sfn") as sfn, mock.patch.object(
+            emr, "describe_cluster", wraps=emr.describe_cluster
+        ) as describe_cluster:
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [self.rule_arn]}, None)
+            describe_cluster.assert_not_called()
+            self.assertEqual(sfn.send_task_heartbeat.call_count, 3)
+
+            emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_ids[0]].state = "WAITING"
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [self.rule_arn]}, None)
+            describe_cluster.assert_called_once_with(ClusterId=cluster_ids[0])
+            sfn.send_task_success.assert_called_once()
+
+        pending_launch = check_cluster_status.get_pending_launch(TABLE_NAME, cluster_ids[1])
+        assert pending_launch is not None
+        self.assertEqual(pending_launch["LastState"], "STARTING")
+        self.assertEqual(self.pending_launches(), 2)
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_sweep_queries_its_rule(self) -> None:
+        self.create_resources()
+        self.create_pending_launch("WAITING")
+        other_cluster_id = self.create_pending_launch("WAITING", rule_name="other-rule")
+
+        dynamodb = check_cluster_status.dynamodb
+        with mock.patch.object(check_cluster_status, "sfn") as sfn, mock.patch.object(
+            dynamodb, "get_paginator", wraps=dynamodb.get_paginator
+        ) as get_paginator:
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [self.rule_arn]}, None)
+            sfn.send_task_success.assert_called_once()
+            self.assertEqual({c.args[0] for c in get_paginator.call_args_list}, {"query"})
+
+        # The pending launches of other Rules are left to their own sweep
+        pending_launch = check_cluster_status.get_pending_launch(TABLE_NAME, other_cluster_id)
+        assert pending_launch is not None
+        self.assertEqual(pending_launch["RuleName"], "other-rule")
+        self.assertEqual(self.pending_launches(), 1)
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_sweep_disables_rule(self) -> None:
+        self.create_resources()
+        self.create_pending_launch("WAITING")
+
+        with mock.patch.object(check_cluster_status, "sfn"):
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [self.rule_arn]}, None)
+
+        self.assertEqual(self.pending_launches(), 0)
+        self.assertEqual(self.rule_state(), "DISABLED")
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_cluster_state_change_event(self) -> None:
+        self.create_resources()
+        cluster_id = self.create_pending_launch("WAITING")
+
+        with mock.patch.object(check_cluster_status, "sfn") as sfn:
+            check_cluster_status.handler({"ClusterId": cluster_id}, None)
+            sfn.send_task_success.assert_called_once()
+
+            # The Cluster has already been claimed, so a second event is ignored
+            check_cluster_status.handler({"ClusterId": cluster_id}, None)
+            sfn.send_task_success.assert_called_once()
+
+        self.assertEqual(self.pending_launches(), 0)
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_cluster_state_change_event_without_pending_launch(self) -> None:
+        self.create_resources()
+
+        with mock.patch.object(check_cluster_status, "sfn") as sfn:
+            check_cluster_status.handler({"ClusterId": "j-UNKNOWN"}, None)
+            sfn.send_task_success.assert_not_called()
+            sfn.send_task_failure.assert_not_called()
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_claimed_pending_launch(self) -> None:
+        self.create_resources()
+        cluster_id = self.create_pending_launch("WAITING")
+        pending_launch = check_cluster_status.get_pending_launch(TABLE_NAME, cluster_id)
+        assert pending_launch is not None
+
+        self.assertTrue(check_cluster_status.claim_pending_launch(TABLE_NAME, pending_launch))
+        with mock.patch.object(check_cluster_status, "sfn") as sfn:
+            check_cluster_status.check_pending_launch(TABLE_NAME, pending_launch)
+            sfn.send_task_success.assert_not_called()
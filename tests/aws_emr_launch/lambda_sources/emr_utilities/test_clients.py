@@ -0,0 +1,50 @@
+import os
+import unittest
+from unittest import mock
+
+from emr_config_utils import clients
+
+
+class TestClients(unittest.TestCase):
+    def setUp(self) -> None:
+        clients.reset_clients()
+
+    def tearDown(self) -> None:
+        clients.reset_clients()
+
+    def test_lazy_client(self) -> None:
+        emr = clients.LazyClient("emr")
+        self.assertNotIn("emr", clients._clients)
+
+        self.assertEqual(emr.meta.service_model.service_name, "emr")
+        self.assertIs(clients._clients["emr"], clients.get_client("emr"))
+
+    def test_shared_clients(self) -> None:
+        self.assertIs(clients.LazyClient("ssm").meta, clients.LazyClient("ssm").meta)
+        self.assertIsNot(clients.get_client("ssm"), clients.get_client("emr"))
+
+    def test_botocore_config(self) -> None:
+        with mock.patch.dict(
+            os.environ,
+            {
+                "AWS_EMR_LAUNCH_MAX_ATTEMPTS": "3",
+                "AWS_EMR_LAUNCH_RETRY_MODE": "standard",
+                "AWS_EMR_LAUNCH_MAX_POOL_CONNECTIONS": "50",
+                "AWS_EMR_LAUNCH_PRODUCT": "test-product",
+                "AWS_EMR_LAUNCH_VERSION": "1.0.0",
+            },
+        ):
+            config = clients.get_botocore_config()
+
+        self.assertEqual(config.retries, {"max_attempts": 3, "mode": "standard"})
+        self.assertEqual(config.max_pool_connections, 50)
+        self.assertEqual(config.connect_timeout, 10)
+        self.assertEqual(config.read_timeout, 60)
+        self.assertTrue(config.user_agent_extra.endswith("test-product/1.0.0"))
+
+    def test_default_retry_mode(self) -> None:
+        # botocore resolves the retry mode (e.g. from AWS_RETRY_MODE) unless AWS_EMR_LAUNCH_RETRY_MODE is set
+        with mock.patch.dict(os.environ, {"AWS_RETRY_MODE": "standard"}):
+            os.environ.pop("AWS_EMR_LAUNCH_RETRY_MODE", None)
+            self.assertNotIn("mode", clients.get_botocore_config().retries)
+            self.assertEqual(clients.get_client("ssm").meta.config.retries["mode"], "standard")
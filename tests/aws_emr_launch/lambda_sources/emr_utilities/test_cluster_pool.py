@@ -0,0 +1,287 @@
+import logging
+import time
+import unittest
+from typing import Any, Dict
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+from emr_config_utils.cluster_pool import (
+    FINGERPRINT_TAG,
+    IDLE_TIMEOUT_TAG,
+    TERMINATE_RETRY_SECONDS,
+    TERMINATING,
+    ClusterPool,
+    ClusterPoolError,
+    cluster_fingerprint,
+    pool_from_environment,
+)
+from moto import mock_dynamodb, mock_emr
+from moto.emr.models import emr_backends
+
+from aws_emr_launch.lambda_sources.emr_utilities.cluster_pool import lambda_source as cluster_pool
+
+# Turn the logger off for the tests
+cluster_pool.logger.setLevel(logging.WARN)
+
+TABLE_NAME = "test-cluster-pool"
+ACCOUNT_ID = "123456789012"
+
+
+def cluster_configuration(cluster_name: str = "test-cluster") -> Dict[str, Any]:
+    return {
+        "Cluster": {
+            "Name": cluster_name,
+            "ReleaseLabel": "emr-6.2.0",
+            "JobFlowRole": "test-instance-role",
+            "ServiceRole": "test-service-role",
+            "LogUri": None,
+            "Instances": {"InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+            "Tags": [{"Key": "deployment", "Value": "test"}],
+        }
+    }
+
+
+def acquire_event(lease_id: str, result_shape: str = "CreateCluster") -> Dict[str, Any]:
+    return {
+        "Action": "Acquire",
+        "LeaseId": lease_id,
+        "IdleTimeout": 1800,
+        "ResultShape": result_shape,
+        "Input": cluster_configuration(),
+    }
+
+
+class TestClusterPool(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(cluster_pool, "cluster_pool", ClusterPool(TABLE_NAME))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_resources(self) -> None:
+        boto3.client("dynamodb").create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "ClusterId", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "ClusterId", "AttributeType": "S"},
+                {"AttributeName": "Fingerprint", "AttributeType": "S"},
+                {"AttributeName": "ReleasedAt", "AttributeType": "N"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "Fingerprint",
+                    "KeySchema": [
+                        {"AttributeName": "Fingerprint", "KeyType": "HASH"},
+                        {"AttributeName": "ReleasedAt", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+    # Launches a Cluster from the request tagged by an Acquire that found no pooled Cluster
+    def launch_cluster(self, lease_id: str) -> str:
+        result = cluster_pool.handler(acquire_event(lease_id), None)
+        self.assertNotIn("PooledCluster", result)
+        cluster = result["Cluster"]
+        cluster_id: str = boto3.client("emr").run_job_flow(
+            Name=cluster["Name"],
+            ReleaseLabel=cluster["ReleaseLabel"],
+            JobFlowRole=cluster["JobFlowRole"],
+            ServiceRole=cluster["ServiceRole"],
+            Instances=cluster["Instances"],
+            Tags=cluster["Tags"],
+        )["JobFlowId"]
+        emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_id].state = "WAITING"
+        return cluster_id
+
+    def test_fingerprint(self) -> None:
+        configuration = cluster_configuration()
+        fingerprint = cluster_fingerprint(configuration)
+
+        retagged = cluster_configuration()
+        retagged["Cluster"]["Tags"] = [{"Key": "deployment", "Value": "other"}]
+        del retagged["Cluster"]["LogUri"]
+        self.assertEqual(cluster_fingerprint(retagged), fingerprint)
+        self.assertNotEqual(cluster_fingerprint(cluster_configuration("other-cluster")), fingerprint)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_acquire_tags_the_request(self) -> None:
+        self.create_resources()
+        result = cluster_pool.handler(acquire_event("lease-1"), None)
+
+        tags = {t["Key"]: t["Value"] for t in result["Cluster"]["Tags"]}
+        self.assertEqual(tags["deployment"], "test")
+        self.assertEqual(tags[FINGERPRINT_TAG], cluster_fingerprint(cluster_configuration()))
+        self.assertEqual(tags[IDLE_TIMEOUT_TAG], "1800")
+
+        event = acquire_event("lease-1")
+        event["Input"]["Cluster"]["Instances"]["KeepJobFlowAliveWhenNoSteps"] = False
+        result = cluster_pool.handler(event, None)
+        self.assertEqual(len(result["Cluster"]["Tags"]), 1)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_release_and_acquire(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("lease-1")
+
+        release = cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id, "LeaseId": "lease-1"}, None)
+        self.assertEqual(release, {"ClusterId": cluster_id, "Released": True})
+
+        event = acquire_event("lease-2")
+        event["Input"]["Cluster"]["Tags"] = [{"Key": "pipeline", "Value": "test"}]
+        result = cluster_pool.handler(event, None)
+        self.assertEqual(result["PooledCluster"]["ClusterId"], cluster_id)
+        self.assertIn("ClusterArn", result["PooledCluster"])
+
+        # The leased Cluster is tagged like the Cluster the launch would have created
+        tags = boto3.client("emr").describe_cluster(ClusterId=cluster_id)["Cluster"]["Tags"]
+        self.assertEqual(
+            {t["Key"]: t["Value"] for t in tags}, {t["Key"]: t["Value"] for t in result["Cluster"]["Tags"]}
+        )
+        self.assertNotIn("deployment", {t["Key"] for t in tags})
+
+        # A leased Cluster is leased once, and only released by its lease holder
+        self.assertNotIn("PooledCluster", cluster_pool.handler(acquire_event("lease-3"), None))
+        release = cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id, "LeaseId": "lease-1"}, None)
+        self.assertFalse(release["Released"])
+        release = cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id, "LeaseId": "lease-2"}, None)
+        self.assertTrue(release["Released"])
+
+        result = cluster_pool.handler(acquire_event("lease-4", "RunJobFlow"), None)
+        self.assertEqual(result["PooledCluster"]["JobFlowId"], cluster_id)
+        cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+
+        result = cluster_pool.handler(acquire_event("lease-5", "DescribeCluster"), None)
+        self.assertEqual(result["PooledCluster"]["ClusterId"], cluster_id)
+        self.assertEqual(result["PooledCluster"]["Cluster"]["Status"]["State"], "WAITING")
+
+    @mock_dynamodb
+    @mock_emr
+    def test_acquire_skips_busy_clusters(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("lease-1")
+        cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+        emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_id].state = "TERMINATED"
+
+        self.assertNotIn("PooledCluster", cluster_pool.handler(acquire_event("lease-2"), None))
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], 0)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_release_requires_a_pooled_cluster(self) -> None:
+        self.create_resources()
+        cluster_id: str = boto3.client("emr").run_job_flow(
+            Name="test-cluster",
+            ReleaseLabel="emr-6.2.0",
+            JobFlowRole="test-instance-role",
+            ServiceRole="test-service-role",
+            Instances={"InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+        )["JobFlowId"]
+        emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_id].state = "WAITING"
+
+        release = cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+        self.assertFalse(release["Released"])
+
+    @mock_dynamodb
+    @mock_emr
+    def test_reap(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("lease-1")
+        cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+
+        self.assertEqual(cluster_pool.handler({"Action": "Reap"}, None), {"TerminatedClusters": []})
+        with mock.patch("time.time", return_value=4102444800):
+            self.assertEqual(cluster_pool.handler({"Action": "Reap"}, None), {"TerminatedClusters": [cluster_id]})
+
+        state = boto3.client("emr").describe_cluster(ClusterId=cluster_id)["Cluster"]["Status"]["State"]
+        self.assertIn(state, ["TERMINATING", "TERMINATED"])
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], 0)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_reap_expired_leases(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("lease-1")
+        cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+        event = dict(acquire_event("lease-2"), LeaseTimeout=3600)
+        self.assertEqual(cluster_pool.handler(event, None)["PooledCluster"]["ClusterId"], cluster_id)
+
+        # Leased Clusters that are never released are terminated after the lease timeout
+        now = int(time.time())
+        self.assertEqual(cluster_pool.get_cluster_pool().reap(now + 1800), [])
+        self.assertEqual(cluster_pool.get_cluster_pool().reap(now + 7200), [cluster_id])
+        state = boto3.client("emr").describe_cluster(ClusterId=cluster_id)["Cluster"]["Status"]["State"]
+        self.assertIn(state, ["TERMINATING", "TERMINATED"])
+
+    @mock_dynamodb
+    @mock_emr
+    def test_reap_retries_failed_terminations(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("lease-1")
+        cluster_pool.handler({"Action": "Release", "ClusterId": cluster_id}, None)
+
+        now = int(time.time()) + 3600
+        error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "TerminateJobFlows")
+        with mock.patch.object(cluster_pool.get_cluster_pool(), "terminate", side_effect=error):
+            self.assertEqual(cluster_pool.get_cluster_pool().reap(now), [])
+        item = boto3.client("dynamodb").get_item(TableName=TABLE_NAME, Key={"ClusterId": {"S": cluster_id}})["Item"]
+        self.assertEqual(item["PoolState"]["S"], TERMINATING)
+
+        # The Cluster is no longer leased, and is terminated by a reap after the retry delay
+        self.assertIsNone(cluster_pool.handler(acquire_event("lease-2"), None).get("PooledCluster", None))
+        self.assertEqual(cluster_pool.get_cluster_pool().reap(now + 60), [])
+        self.assertEqual(cluster_pool.get_cluster_pool().reap(now + TERMINATE_RETRY_SECONDS + 1), [cluster_id])
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], 0)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_prewarm(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("prewarm-launch")
+
+        event = {
+            "Action": "Prewarm",
+            "ClusterId": cluster_id,
+            "LeaseId": "prewarm-launch",
+            "StartTime": "2100-01-01T01:40:00.000Z",
+            "Deadline": 4800,
+        }
+        result = cluster_pool.handler(event, None)
+        self.assertEqual(result, {"ClusterId": cluster_id, "Released": True, "IdleUntil": 4102455600})
+
+        # The pipeline leases the pre-warmed Cluster, until the deadline has passed
+        self.assertEqual(cluster_pool.handler({"Action": "Reap"}, None), {"TerminatedClusters": []})
+        result = cluster_pool.handler(acquire_event("pipeline"), None)
+        self.assertEqual(result["PooledCluster"]["ClusterId"], cluster_id)
+
+    @mock_dynamodb
+    @mock_emr
+    def test_prewarm_terminates_unpooled_clusters(self) -> None:
+        self.create_resources()
+        cluster_id = self.launch_cluster("prewarm-launch")
+        emr_backends[ACCOUNT_ID]["us-east-1"].clusters[cluster_id].state = "STARTING"
+
+        event = {
+            "Action": "Prewarm",
+            "ClusterId": cluster_id,
+            "StartTime": "2100-01-01T01:40:00.000Z",
+            "Deadline": 4800,
+        }
+        self.assertFalse(cluster_pool.handler(event, None)["Released"])
+        state = boto3.client("emr").describe_cluster(ClusterId=cluster_id)["Cluster"]["Status"]["State"]
+        self.assertIn(state, ["TERMINATING", "TERMINATED"])
+
+    def test_pool_from_environment(self) -> None:
+        with mock.patch.dict("os.environ", {"CLUSTER_POOL_TABLE": TABLE_NAME}):
+            self.assertIsInstance(pool_from_environment(), ClusterPool)
+        with mock.patch.dict("os.environ", {}, clear=True):
+            with self.assertRaises(ClusterPoolError):
+                pool_from_environment()
+
+    def test_unsupported_action(self) -> None:
+        with self.assertRaises(ValueError):
+            cluster_pool.handler({"Action": "Resize"}, None)
@@ -0,0 +1,25 @@
+import hashlib
+import unittest
+
+from aws_emr_launch.lambda_sources.emr_utilities.content_version import lambda_source as content_version
+
+
+class TestContentVersion(unittest.TestCase):
+    def test_version(self) -> None:
+        value = '{"ReleaseLabel":"emr-6.9.0"}'
+        version = hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+        response = content_version.handler({"RequestType": "Create", "ResourceProperties": {"Value": value}}, None)
+        self.assertEqual(response, {"PhysicalResourceId": version, "Data": {"Version": version}})
+
+        # An updated Value replaces the resource with the new version
+        response = content_version.handler(
+            {"RequestType": "Update", "PhysicalResourceId": version, "ResourceProperties": {"Value": "{}"}}, None
+        )
+        self.assertNotEqual(response["PhysicalResourceId"], version)
+
+    def test_delete(self) -> None:
+        response = content_version.handler(
+            {"RequestType": "Delete", "PhysicalResourceId": "0123456789abcdef", "ResourceProperties": {"Value": "{}"}},
+            None,
+        )
+        self.assertEqual(response, {"PhysicalResourceId": "0123456789abcdef"})
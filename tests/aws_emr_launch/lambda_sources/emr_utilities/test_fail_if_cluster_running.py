@@ -0,0 +1,67 @@
+import logging
+import unittest
+from typing import Any, Dict
+
+import boto3
+from emr_config_utils.launch_checks import ClusterRunningError, InvalidOverrideError
+from moto import mock_emr
+
+from aws_emr_launch.lambda_sources.emr_utilities.fail_if_cluster_running import lambda_source as fail_if_cluster_running
+
+# Turn the logger off for the tests
+fail_if_cluster_running.logger.setLevel(logging.CRITICAL)
+
+
+def run_cluster(name: str) -> str:
+    cluster_id: str = boto3.client("emr").run_job_flow(
+        Name=name,
+        ReleaseLabel="emr-6.2.0",
+        JobFlowRole="test-instance-role",
+        ServiceRole="test-service-role",
+        Instances={"InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+    )["JobFlowId"]
+    return cluster_id
+
+
+def fail_if_cluster_running_event(cluster_name: str, **kwargs: Any) -> Dict[str, Any]:
+    return dict({"ExecutionInput": {"FailIfClusterRunning": True}, "Input": {"Name": cluster_name}}, **kwargs)
+
+
+class TestFailIfClusterRunning(unittest.TestCase):
+    @mock_emr
+    def test_paginated_lookup(self) -> None:
+        # More Clusters than a single ListClusters page
+        for i in range(120):
+            run_cluster(f"test-cluster-{i}")
+
+        for i in range(120):
+            with self.assertRaises(ClusterRunningError):
+                fail_if_cluster_running.handler(fail_if_cluster_running_event(f"test-cluster-{i}"), None)
+
+        event = fail_if_cluster_running_event("test-other-cluster")
+        self.assertEqual(fail_if_cluster_running.handler(event, None), {"Name": "test-other-cluster"})
+
+    @mock_emr
+    def test_created_after_window(self) -> None:
+        run_cluster("test-cluster")
+
+        event = fail_if_cluster_running_event("test-cluster", FailIfClusterRunningWindowSeconds=3600)
+        with self.assertRaises(ClusterRunningError):
+            fail_if_cluster_running.handler(event, None)
+
+    @mock_emr
+    def test_not_requested(self) -> None:
+        run_cluster("test-cluster")
+
+        event = {"ExecutionInput": {}, "Input": {"Name": "test-cluster"}}
+        self.assertEqual(fail_if_cluster_running.handler(event, None), {"Name": "test-cluster"})
+
+    @mock_emr
+    def test_cluster_pool(self) -> None:
+        run_cluster("test-cluster")
+
+        # Pooled Clusters share the Name of the launch
+        with self.assertRaises(InvalidOverrideError):
+            fail_if_cluster_running.handler(fail_if_cluster_running_event("test-cluster", UseClusterPool=True), None)
+        event = {"ExecutionInput": {}, "Input": {"Name": "test-cluster"}, "UseClusterPool": True}
+        self.assertEqual(fail_if_cluster_running.handler(event, None), {"Name": "test-cluster"})
@@ -0,0 +1,147 @@
+import logging
+import time
+import unittest
+from typing import Any, Dict
+from unittest import mock
+
+import boto3
+from emr_config_utils import clients
+from emr_config_utils.idempotency import (
+    CLAIMED,
+    DUPLICATE,
+    IN_PROGRESS,
+    LAUNCH_NOT_RECORDED_ERROR,
+    MAX_CLAIM_ATTEMPTS,
+    IdempotencyClaimError,
+    IdempotencyError,
+    IdempotencyKeyError,
+    IdempotencyRecords,
+    IdempotentLaunchNotRecorded,
+    records_from_environment,
+)
+from moto import mock_dynamodb
+
+from aws_emr_launch.lambda_sources.emr_utilities.idempotency import lambda_source as idempotency
+
+# Turn the logger off for the tests
+idempotency.logger.setLevel(logging.WARN)
+
+TABLE_NAME = "test-idempotency"
+NOW = 1700000000
+WINDOW = 3600
+RESULT = {"ClusterId": "j-12345678", "ClusterArn": "arn:aws:elasticmapreduce:us-east-1:123456789012:cluster/j-1"}
+
+
+class TestIdempotency(unittest.TestCase):
+    def setUp(self) -> None:
+        clients.reset_clients()
+        mock_dynamo = mock_dynamodb()
+        mock_dynamo.start()
+        self.addCleanup(mock_dynamo.stop)
+        boto3.client("dynamodb").create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "IdempotencyKey", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "IdempotencyKey", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        self.sfn = mock.MagicMock()
+        self.sfn.exceptions.ExecutionDoesNotExist = type("ExecutionDoesNotExist", (Exception,), {})
+        self.sfn.describe_execution.return_value = {"status": "RUNNING"}
+        self.records = IdempotencyRecords(TABLE_NAME, sfn_client=self.sfn)
+        patcher = mock.patch.object(idempotency, "records", self.records)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def event(self, action: str, execution_id: str, key: Any = "nightly-2023-07-01") -> Dict[str, Any]:
+        return {
+            "Action": action,
+            "ExecutionInput": {"IdempotencyKey": key} if key is not None else {},
+            "ExecutionId": execution_id,
+            "KeyPrefix": "default/test-function",
+            "Window": WINDOW,
+            "LaunchClusterResult": RESULT,
+        }
+
+    def test_duplicate_launch(self) -> None:
+        self.assertEqual(idempotency.handler(self.event("Claim", "execution-1"), None), {"Status": CLAIMED})
+        # Retries of the claiming execution keep the claim
+        self.assertEqual(idempotency.handler(self.event("Claim", "execution-1"), None), {"Status": CLAIMED})
+        self.assertEqual(
+            idempotency.handler(self.event("Claim", "execution-2"), None),
+            {"Status": IN_PROGRESS, "ExecutionId": "execution-1"},
+        )
+
+        self.assertEqual(idempotency.handler(self.event("Complete", "execution-1"), None), {"Status": "RECORDED"})
+        self.assertEqual(
+            idempotency.handler(self.event("Claim", "execution-2"), None),
+            {"Status": DUPLICATE, "ExecutionId": "execution-1", "LaunchClusterResult": RESULT},
+        )
+
+        # Keys are scoped to the launch function
+        event = dict(self.event("Claim", "execution-3"), KeyPrefix="default/other-function")
+        self.assertEqual(idempotency.handler(event, None), {"Status": CLAIMED})
+
+    def test_window_expired(self) -> None:
+        self.assertEqual(self.records.claim("key", "execution-1", WINDOW, now=NOW), {"Status": CLAIMED})
+        self.assertTrue(self.records.complete("key", "execution-1", RESULT))
+        self.assertEqual(self.records.claim("key", "execution-2", WINDOW, now=NOW + WINDOW - 1)["Status"], DUPLICATE)
+        self.assertEqual(self.records.claim("key", "execution-2", WINDOW, now=NOW + WINDOW), {"Status": CLAIMED})
+
+        # The result of the first launch no longer belongs to the key
+        self.assertFalse(self.records.complete("key", "execution-1", RESULT))
+
+    def test_stopped_launch(self) -> None:
+        self.assertEqual(self.records.claim("key", "execution-1", WINDOW, now=NOW), {"Status": CLAIMED})
+        self.sfn.describe_execution.return_value = {"status": "FAILED"}
+        self.assertEqual(self.records.claim("key", "execution-2", WINDOW, now=NOW + 60), {"Status": CLAIMED})
+        self.sfn.describe_execution.assert_called_once_with(executionArn="execution-1")
+
+        self.sfn.describe_execution.side_effect = self.sfn.exceptions.ExecutionDoesNotExist()
+        self.assertEqual(self.records.claim("key", "execution-3", WINDOW, now=NOW + 120), {"Status": CLAIMED})
+
+    def test_unrecorded_launch(self) -> None:
+        self.assertEqual(self.records.claim("key", "execution-1", WINDOW, now=NOW), {"Status": CLAIMED})
+        self.sfn.describe_execution.return_value = {"status": "FAILED", "error": LAUNCH_NOT_RECORDED_ERROR}
+        with self.assertRaises(IdempotencyClaimError):
+            self.records.claim("key", "execution-2", WINDOW, now=NOW + 60)
+        self.assertEqual(self.records.claim("key", "execution-2", WINDOW, now=NOW + WINDOW), {"Status": CLAIMED})
+
+    def test_lost_claim(self) -> None:
+        self.assertEqual(idempotency.handler(self.event("Claim", "execution-1"), None), {"Status": CLAIMED})
+        # The window of the claim expired, and another execution claimed the key
+        key = "default/test-function/nightly-2023-07-01"
+        self.records.claim(key, "execution-2", WINDOW, now=int(time.time()) + WINDOW + 1)
+
+        # The launch fails with LAUNCH_NOT_RECORDED_ERROR rather than succeed unrecorded
+        with self.assertRaises(IdempotentLaunchNotRecorded):
+            idempotency.handler(self.event("Complete", "execution-1"), None)
+        self.assertEqual(IdempotentLaunchNotRecorded.__name__, LAUNCH_NOT_RECORDED_ERROR)
+
+    def test_claim_attempts(self) -> None:
+        # The record disappears between every failed write and the read
+        with mock.patch.object(self.records, "_put", return_value=False) as put:
+            with self.assertRaises(IdempotencyClaimError):
+                self.records.claim("key", "execution-1", WINDOW, now=NOW)
+        self.assertEqual(put.call_count, MAX_CLAIM_ATTEMPTS)
+
+    def test_no_key(self) -> None:
+        self.assertEqual(idempotency.handler(self.event("Claim", "execution-1", key=None), None), {"Status": "NONE"})
+        self.assertEqual(idempotency.handler(self.event("Complete", "execution-1", key=None), None), {"Status": "NONE"})
+
+    def test_invalid_key(self) -> None:
+        with self.assertRaises(IdempotencyKeyError):
+            idempotency.handler(self.event("Claim", "execution-1", key=""), None)
+        with self.assertRaises(IdempotencyKeyError):
+            idempotency.handler(self.event("Claim", "execution-1", key=12345), None)
+
+    def test_records_from_environment(self) -> None:
+        with mock.patch.dict("os.environ", {"IDEMPOTENCY_TABLE": TABLE_NAME}):
+            self.assertIsInstance(records_from_environment(), IdempotencyRecords)
+        with mock.patch.dict("os.environ", {}, clear=True):
+            with self.assertRaises(IdempotencyError):
+                records_from_environment()
+
+    def test_unsupported_action(self) -> None:
+        with self.assertRaises(ValueError):
+            idempotency.handler(self.event("Release", "execution-1"), None)
@@ -0,0 +1,167 @@
+import json
+import logging
+import unittest
+from typing import Any, Dict
+from unittest import mock
+
+import boto3
+from emr_config_utils.parameters import (
+    CONFIGURATIONS_SSM_PARAMETER_PREFIX,
+    PROFILES_SSM_PARAMETER_PREFIX,
+    ClusterConfigurationNotFoundError,
+    EMRProfileNotFoundError,
+    ParameterCache,
+)
+from emr_config_utils.registry import version_name
+from moto import mock_ssm
+
+from aws_emr_launch.constructs import parameter_store
+from aws_emr_launch.lambda_sources.emr_utilities.load_cluster_configuration import (
+    lambda_source as load_cluster_configuration,
+)
+
+# Turn the logger off for the tests
+load_cluster_configuration.logger.setLevel(logging.CRITICAL)
+
+PROFILE_PARAMETER = f"{PROFILES_SSM_PARAMETER_PREFIX}/default/test-profile"
+CONFIGURATION_PARAMETER = f"{CONFIGURATIONS_SSM_PARAMETER_PREFIX}/default/test-configuration"
+
+PROFILE = {
+    "Roles": {
+        "InstanceRole": "arn:aws:iam::123456789012:role/test-instance-role",
+        "ServiceRole": "arn:aws:iam::123456789012:role/test-service-role",
+        "AutoScalingRole": "arn:aws:iam::123456789012:role/test-autoscaling-role",
+    },
+    "SecurityGroups": {"MasterGroup": "sg-master", "WorkersGroup": "sg-workers"},
+}
+
+
+def configuration(release_label: str) -> Dict[str, Any]:
+    return {
+        "ClusterConfiguration": {
+            "ReleaseLabel": release_label,
+            "Instances": {"MasterInstanceType": "m5.xlarge", "InstanceCount": 1},
+        },
+    }
+
+
+EVENT = {
+    "ClusterName": "test-cluster",
+    "ClusterTags": [],
+    "ProfileNamespace": "default",
+    "ProfileName": "test-profile",
+    "ConfigurationNamespace": "default",
+    "ConfigurationName": "test-configuration",
+}
+
+
+class TestLoadClusterConfiguration(unittest.TestCase):
+    def setUp(self) -> None:
+        load_cluster_configuration.parameter_cache.clear()
+
+    def put_parameters(self, release_label: str = "emr-6.2.0") -> None:
+        ssm = boto3.client("ssm")
+        ssm.put_parameter(Name=PROFILE_PARAMETER, Value=json.dumps(PROFILE), Type="String", Overwrite=True)
+        ssm.put_parameter(
+            Name=CONFIGURATION_PARAMETER, Value=json.dumps(configuration(release_label)), Type="String", Overwrite=True
+        )
+
+    @mock_ssm
+    def test_load_cluster_configuration(self) -> None:
+        self.put_parameters()
+
+        ssm = load_cluster_configuration.ssm
+        with mock.patch.object(ssm, "get_parameters", wraps=ssm.get_parameters) as get_parameters:
+            cluster = load_cluster_configuration.handler(dict(EVENT), None)["Cluster"]
+            get_parameters.assert_called_once_with(Names=[PROFILE_PARAMETER, CONFIGURATION_PARAMETER])
+
+            # Warm invocations within the TTL are served from the cache
+            cached_cluster = load_cluster_configuration.handler(dict(EVENT), None)["Cluster"]
+            get_parameters.assert_called_once()
+
+        self.assertEqual(cluster["Name"], "test-cluster")
+        self.assertEqual(cluster["ReleaseLabel"], "emr-6.2.0")
+        self.assertEqual(cluster["JobFlowRole"], "test-instance-role")
+        self.assertEqual(cluster, cached_cluster)
+
+    @mock_ssm
+    def test_compressed_configuration(self) -> None:
+        self.put_parameters()
+        boto3.client("ssm").put_parameter(
+            Name=CONFIGURATION_PARAMETER,
+            Value=parameter_store.compress_value(json.dumps(configuration("emr-6.4.0"))),
+            Type="String",
+            Overwrite=True,
+        )
+
+        cluster = load_cluster_configuration.handler(dict(EVENT), None)["Cluster"]
+        self.assertEqual(cluster["ReleaseLabel"], "emr-6.4.0")
+
+    @mock_ssm
+    def test_revalidate_version(self) -> None:
+        self.put_parameters()
+        parameter_cache = load_cluster_configuration.parameter_cache
+
+        with mock.patch.object(parameter_cache, "_ttl_seconds", -1):
+            load_cluster_configuration.handler(dict(EVENT), None)
+            decoded = parameter_cache.get_version(CONFIGURATION_PARAMETER, 1)
+
+            # An unchanged Version reuses the decoded value
+            load_cluster_configuration.handler(dict(EVENT), None)
+            self.assertIs(parameter_cache.get_version(CONFIGURATION_PARAMETER, 1), decoded)
+
+            self.put_parameters("emr-6.3.0")
+            cluster = load_cluster_configuration.handler(dict(EVENT), None)["Cluster"]
+            self.assertIsNone(parameter_cache.get_version(CONFIGURATION_PARAMETER, 1))
+            self.assertIsNotNone(parameter_cache.get_version(CONFIGURATION_PARAMETER, 2))
+
+        self.assertEqual(cluster["ReleaseLabel"], "emr-6.3.0")
+
+    @mock_ssm
+    def test_pinned_versions(self) -> None:
+        self.put_parameters("emr-6.2.0")
+        ssm = boto3.client("ssm")
+        ssm.put_parameter(Name=version_name(PROFILE_PARAMETER, "p1"), Value=json.dumps(PROFILE), Type="String")
+        ssm.put_parameter(
+            Name=version_name(CONFIGURATION_PARAMETER, "c1"),
+            Value=json.dumps(configuration("emr-6.1.0")),
+            Type="String",
+        )
+        event = dict(EVENT, ProfileVersion="p1", ConfigurationVersion="c1")
+
+        ssm = load_cluster_configuration.ssm
+        with mock.patch.object(ssm, "get_parameters", wraps=ssm.get_parameters) as get_parameters:
+            with mock.patch.object(load_cluster_configuration.parameter_cache, "_ttl_seconds", -1):
+                cluster = load_cluster_configuration.handler(dict(event), None)["Cluster"]
+                # Pinned versions are immutable and never revalidated
+                load_cluster_configuration.handler(dict(event), None)
+            get_parameters.assert_called_once()
+
+        self.assertEqual(cluster["ReleaseLabel"], "emr-6.1.0")
+        self.assertEqual(load_cluster_configuration.handler(dict(EVENT), None)["Cluster"]["ReleaseLabel"], "emr-6.2.0")
+
+        with self.assertRaises(ClusterConfigurationNotFoundError):
+            load_cluster_configuration.handler(dict(EVENT, ConfigurationVersion="c2"), None)
+
+    @mock_ssm
+    def test_profile_not_found(self) -> None:
+        with self.assertRaises(EMRProfileNotFoundError):
+            load_cluster_configuration.handler(dict(EVENT), None)
+
+    @mock_ssm
+    def test_configuration_not_found(self) -> None:
+        boto3.client("ssm").put_parameter(Name=PROFILE_PARAMETER, Value=json.dumps(PROFILE), Type="String")
+
+        with self.assertRaises(ClusterConfigurationNotFoundError):
+            load_cluster_configuration.handler(dict(EVENT), None)
+
+    def test_parameter_cache_max_size(self) -> None:
+        cache = ParameterCache(ttl_seconds=60, max_size=2)
+        cache.put("a", 1, {"a": 1})
+        cache.put("b", 1, {"b": 1})
+        cache.put("c", 1, {"c": 1})
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), {"c": 1})
+        self.assertEqual(cache.get_version("b", 1), {"b": 1})
+        self.assertIsNone(cache.get_version("b", 2))
@@ -0,0 +1,25 @@
+import unittest
+from typing import Any, Dict
+
+from emr_config_utils.paths import resolve_path
+
+
+class TestPaths(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data: Dict[str, Any] = {
+            "Instances": {"InstanceGroups": [{"Name": "Master"}, {"Name": "Core", "InstanceCount": 2}]},
+            "Configurations": {"spark.executor.memory": "4g"},
+        }
+
+    def test_resolve_path(self) -> None:
+        self.assertEqual(resolve_path(self.data, "Instances.InstanceGroups.1.InstanceCount"), 2)
+        self.assertIs(
+            resolve_path(self.data, "Instances.InstanceGroups.1"), self.data["Instances"]["InstanceGroups"][1]
+        )
+        self.assertEqual(resolve_path(self.data, "Configurations.spark\\.executor\\.memory"), "4g")
+
+    def test_missing_path(self) -> None:
+        self.assertIsNone(resolve_path(self.data, "Instances.Missing.InstanceCount"))
+        self.assertIsNone(resolve_path(self.data, "Instances.InstanceGroups.5.Name"))
+        self.assertIsNone(resolve_path(self.data, "Instances.InstanceGroups.Name"))
+        self.assertEqual(resolve_path(self.data, "Instances.Missing", "default"), "default")
@@ -0,0 +1,141 @@
+import copy
+import json
+import logging
+import unittest
+from typing import Any, Dict
+
+import boto3
+from emr_config_utils.cluster_requests import build_cluster_request
+from emr_config_utils.launch_checks import ClusterRunningError, InvalidOverrideError
+from emr_config_utils.parameters import (
+    CONFIGURATIONS_SSM_PARAMETER_PREFIX,
+    PROFILES_SSM_PARAMETER_PREFIX,
+    EMRProfileNotFoundError,
+)
+from moto import mock_emr, mock_ssm
+
+from aws_emr_launch.lambda_sources.emr_utilities.prepare_cluster_launch import lambda_source as prepare_cluster_launch
+
+# Turn the logger off for the tests
+prepare_cluster_launch.logger.setLevel(logging.CRITICAL)
+
+PROFILE = {
+    "Roles": {
+        "InstanceRole": "arn:aws:iam::123456789012:role/test-instance-role",
+        "ServiceRole": "arn:aws:iam::123456789012:role/test-service-role",
+        "AutoScalingRole": "arn:aws:iam::123456789012:role/test-autoscaling-role",
+    },
+    "SecurityGroups": {"MasterGroup": "sg-master", "WorkersGroup": "sg-workers", "ServiceGroup": "sg-service"},
+    "LogsBucket": "test-logs-bucket",
+    "LogsPath": "logs",
+}
+
+CONFIGURATION = {
+    "ClusterConfiguration": {
+        "ReleaseLabel": "emr-6.2.0",
+        "Instances": {"MasterInstanceType": "m5.xlarge", "InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+        "Configurations": [],
+    },
+    "SecretConfigurations": None,
+}
+
+
+def prepare_cluster_launch_event(execution_input: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ExecutionInput": execution_input,
+        "ClusterName": "test-cluster",
+        "ClusterTags": [{"Key": "deployment:product:name", "Value": "test"}],
+        "ProfileNamespace": "default",
+        "ProfileName": "test-profile",
+        "ConfigurationNamespace": "default",
+        "ConfigurationName": "test-configuration",
+        "AllowedClusterConfigOverrides": {"ReleaseLabel": {"JsonPath": "ReleaseLabel", "Default": "emr-6.2.0"}},
+        "DefaultFailIfClusterRunning": False,
+    }
+
+
+class TestPrepareClusterLaunch(unittest.TestCase):
+    def setUp(self) -> None:
+        prepare_cluster_launch.parameter_cache.clear()
+
+    def put_parameters(self) -> None:
+        ssm = boto3.client("ssm")
+        ssm.put_parameter(
+            Name=f"{PROFILES_SSM_PARAMETER_PREFIX}/default/test-profile",
+            Value=json.dumps(PROFILE),
+            Type="String",
+        )
+        ssm.put_parameter(
+            Name=f"{CONFIGURATIONS_SSM_PARAMETER_PREFIX}/default/test-configuration",
+            Value=json.dumps(CONFIGURATION),
+            Type="String",
+        )
+
+    @mock_emr
+    @mock_ssm
+    def test_prepare_cluster_launch(self) -> None:
+        self.put_parameters()
+
+        event = prepare_cluster_launch_event(
+            {"ClusterConfigurationOverrides": {"ReleaseLabel": "emr-6.3.0"}, "Tags": [{"Key": "k", "Value": "v"}]}
+        )
+        cluster = prepare_cluster_launch.handler(event, None)["Cluster"]
+
+        self.assertEqual(cluster["Name"], "test-cluster")
+        self.assertEqual(cluster["ReleaseLabel"], "emr-6.3.0")
+        self.assertEqual(cluster["JobFlowRole"], "test-instance-role")
+        self.assertEqual(cluster["LogUri"], "s3://test-logs-bucket/logs/test-cluster")
+        self.assertEqual(cluster["Instances"]["EmrManagedMasterSecurityGroup"], "sg-master")
+        self.assertEqual(
+            cluster["Tags"], [{"Key": "deployment:product:name", "Value": "test"}, {"Key": "k", "Value": "v"}]
+        )
+
+    @mock_emr
+    @mock_ssm
+    def test_invalid_override(self) -> None:
+        self.put_parameters()
+
+        event = prepare_cluster_launch_event({"ClusterConfigurationOverrides": {"Name": "other-cluster"}})
+        with self.assertRaises(InvalidOverrideError):
+            prepare_cluster_launch.handler(event, None)
+
+    @mock_emr
+    @mock_ssm
+    def test_cluster_running(self) -> None:
+        self.put_parameters()
+        boto3.client("emr").run_job_flow(
+            Name="test-cluster",
+            ReleaseLabel="emr-6.2.0",
+            JobFlowRole="test-instance-role",
+            ServiceRole="test-service-role",
+            Instances={"InstanceCount": 1, "KeepJobFlowAliveWhenNoSteps": True},
+        )
+
+        with self.assertRaises(ClusterRunningError):
+            prepare_cluster_launch.handler(prepare_cluster_launch_event({"FailIfClusterRunning": True}), None)
+
+        prepare_cluster_launch.handler(prepare_cluster_launch_event({}), None)
+
+    @mock_emr
+    @mock_ssm
+    def test_profile_not_found(self) -> None:
+        with self.assertRaises(EMRProfileNotFoundError):
+            prepare_cluster_launch.handler(prepare_cluster_launch_event({}), None)
+
+    @mock_emr
+    @mock_ssm
+    def test_inline_cluster_request(self) -> None:
+        # No Profile or Configuration is stored, the request built at synth time is used
+        cluster_request = build_cluster_request(
+            copy.deepcopy(PROFILE), copy.deepcopy(CONFIGURATION), "test-cluster", [{"Key": "k", "Value": "v"}]
+        )
+        event = dict(
+            prepare_cluster_launch_event({"ClusterConfigurationOverrides": {"ReleaseLabel": "emr-6.3.0"}}),
+            ClusterRequest=json.dumps(cluster_request),
+        )
+        cluster = prepare_cluster_launch.handler(event, None)
+
+        self.assertEqual(cluster["Cluster"]["ReleaseLabel"], "emr-6.3.0")
+        self.assertEqual(cluster["Cluster"]["JobFlowRole"], "test-instance-role")
+        self.assertEqual(cluster["Cluster"]["LogUri"], "s3://test-logs-bucket/logs/test-cluster")
+        self.assertIsNone(cluster["KerberosAttributesSecret"])
@@ -0,0 +1,230 @@
+import json
+import unittest
+from typing import Any, Dict, List
+
+import boto3
+from emr_config_utils import clients
+from emr_config_utils.registry import (
+    DynamoDBBackend,
+    ParameterNotFoundError,
+    Registry,
+    RegistryBackend,
+    RegistryError,
+    S3Backend,
+    SSMBackend,
+    split_name,
+    version_name,
+)
+from moto import mock_dynamodb, mock_s3, mock_ssm
+
+PREFIX = "/emr_launch/cluster_configurations"
+
+
+def create_table(table_name: str = "registry") -> None:
+    boto3.client("dynamodb").create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "Kind", "KeyType": "HASH"}, {"AttributeName": "Name", "KeyType": "RANGE"}],
+        AttributeDefinitions=[
+            {"AttributeName": "Kind", "AttributeType": "S"},
+            {"AttributeName": "Name", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def create_bucket(bucket: str = "registry") -> None:
+    boto3.client("s3").create_bucket(Bucket=bucket)
+
+
+def value(name: str, version: int = 1) -> str:
+    return json.dumps({"ConfigurationName": name, "Revision": version})
+
+
+def list_all(backend: RegistryBackend, path: str, recursive: bool = False, max_results: int = 3) -> List[str]:
+    names: List[str] = []
+    next_token = None
+    while True:
+        items, next_token = backend.list(path, recursive, max_results, next_token)
+        assert len(items) <= max_results
+        names.extend(i["Name"] for i in items)
+        if not next_token:
+            return sorted(names)
+
+
+# Every backend (and the Registry routing between them) must behave the same. The conformance
+# tests run against moto stand-ins for SSM, DynamoDB and S3.
+class RegistryConformance:
+    backend: RegistryBackend
+
+    def setUp(self) -> None:
+        clients.reset_clients()
+        self._mocks = [mock_ssm(), mock_dynamodb(), mock_s3()]
+        for m in self._mocks:
+            m.start()
+        self.backend = self.build_backend()
+
+    def tearDown(self) -> None:
+        for m in self._mocks:
+            m.stop()
+        clients.reset_clients()
+
+    def build_backend(self) -> RegistryBackend:
+        raise NotImplementedError()
+
+    def test_put_get(self) -> None:
+        case: Any = self
+        item = self.backend.put(f"{PREFIX}/default/test", value("test"))
+        case.assertEqual(item["Name"], f"{PREFIX}/default/test")
+
+        stored = self.backend.get(f"{PREFIX}/default/test")
+        case.assertEqual(stored["Name"], f"{PREFIX}/default/test")
+        case.assertEqual(json.loads(stored["Value"]), json.loads(value("test")))
+        case.assertEqual(stored["Version"], item["Version"])
+
+    def test_get_missing(self) -> None:
+        case: Any = self
+        case.assertIsNone(self.backend.get(f"{PREFIX}/default/missing"))
+        case.assertEqual(self.backend.get_many([f"{PREFIX}/default/missing"]), {})
+
+    def test_version_changes(self) -> None:
+        case: Any = self
+        first = self.backend.put(f"{PREFIX}/default/test", value("test", 1))
+        second = self.backend.put(f"{PREFIX}/default/test", value("test", 2))
+        case.assertNotEqual(first["Version"], second["Version"])
+
+        stored = self.backend.get(f"{PREFIX}/default/test")
+        case.assertEqual(stored["Version"], second["Version"])
+        case.assertEqual(json.loads(stored["Value"])["Revision"], 2)
+
+    def test_get_many(self) -> None:
+        case: Any = self
+        names = [f"{PREFIX}/{ns}/test{i}" for ns in ["default", "team-a", "team-b"] for i in range(12)]
+        for name in names:
+            self.backend.put(name, value(split_name(name)[2]))
+
+        items = self.backend.get_many(names + [f"{PREFIX}/default/missing"])
+        case.assertEqual(sorted(items), sorted(names))
+        for name, item in items.items():
+            case.assertEqual(json.loads(item["Value"])["ConfigurationName"], split_name(name)[2])
+
+    def test_list_namespace(self) -> None:
+        case: Any = self
+        expected: Dict[str, List[str]] = {}
+        for ns in ["default", "team-a", "team-b"]:
+            expected[ns] = sorted(f"{PREFIX}/{ns}/test{i}" for i in range(7))
+            for name in expected[ns]:
+                self.backend.put(name, value(split_name(name)[2]))
+        # Other kinds are never listed
+        self.backend.put("/emr_launch/emr_profiles/default/test0", value("test0"))
+
+        for ns, names in expected.items():
+            case.assertEqual(list_all(self.backend, f"{PREFIX}/{ns}/"), names)
+        case.assertEqual(list_all(self.backend, f"{PREFIX}/team-c/"), [])
+
+    def test_list_recursive(self) -> None:
+        case: Any = self
+        names = sorted(f"{PREFIX}/{ns}/test{i}" for ns in ["default", "team-a", "team-b"] for i in range(5))
+        for name in names:
+            self.backend.put(name, value(split_name(name)[2]))
+        self.backend.put("/emr_launch/emr_profiles/default/test0", value("test0"))
+
+        case.assertEqual(list_all(self.backend, f"{PREFIX}/", recursive=True), names)
+        case.assertEqual(list_all(self.backend, f"{PREFIX}/", recursive=True, max_results=10), names)
+
+    def test_delete(self) -> None:
+        case: Any = self
+        self.backend.put(f"{PREFIX}/default/test", value("test"))
+        self.backend.delete(f"{PREFIX}/default/test")
+        case.assertIsNone(self.backend.get(f"{PREFIX}/default/test"))
+        case.assertEqual(list_all(self.backend, f"{PREFIX}/default/"), [])
+        # Deleting a missing name is not an error
+        self.backend.delete(f"{PREFIX}/default/test")
+
+    def test_versions(self) -> None:
+        case: Any = self
+        name = version_name(f"{PREFIX}/default/test", "0123456789abcdef")
+        case.assertEqual(name, "/emr_launch/cluster_configuration_versions/default/test/0123456789abcdef")
+        case.assertEqual(split_name(name), ("cluster_configuration_versions", "default", "test/0123456789abcdef"))
+        with case.assertRaises(RegistryError):
+            version_name(name, "0123456789abcdef")
+
+        self.backend.put(f"{PREFIX}/default/test", value("test", 2))
+        self.backend.put(name, value("test", 1))
+        case.assertEqual(json.loads(self.backend.get(name)["Value"])["Revision"], 1)
+        case.assertEqual(list(self.backend.get_many([name])), [name])
+        # Versions are not listed with the latest values
+        case.assertEqual(list_all(self.backend, f"{PREFIX}/default/"), [f"{PREFIX}/default/test"])
+
+    def test_invalid_name(self) -> None:
+        case: Any = self
+        with case.assertRaises(RegistryError):
+            self.backend.get("/emr_launch/cluster_configurations/test")
+        with case.assertRaises(RegistryError):
+            self.backend.list("/other/cluster_configurations/")
+
+
+class TestSSMBackend(RegistryConformance, unittest.TestCase):
+    def build_backend(self) -> RegistryBackend:
+        return SSMBackend(boto3.client("ssm"))
+
+
+class TestDynamoDBBackend(RegistryConformance, unittest.TestCase):
+    def build_backend(self) -> RegistryBackend:
+        create_table()
+        return DynamoDBBackend("registry", boto3.client("dynamodb"))
+
+
+class TestS3Backend(RegistryConformance, unittest.TestCase):
+    def build_backend(self) -> RegistryBackend:
+        create_bucket()
+        return S3Backend("registry", "emr_launch/", boto3.client("s3"))
+
+
+class TestMixedRegistry(RegistryConformance, unittest.TestCase):
+    def build_backend(self) -> RegistryBackend:
+        create_table()
+        create_bucket()
+        return Registry.from_configuration(
+            {
+                "Default": {"Backend": "ssm"},
+                "Namespaces": {
+                    "team-a": {"Backend": "dynamodb", "TableName": "registry"},
+                    "team-b": {"Backend": "s3", "Bucket": "registry", "Prefix": "emr_launch/"},
+                },
+            },
+            boto3.client("ssm"),
+        )
+
+    def test_routing(self) -> None:
+        registry = self.backend
+        registry.put(f"{PREFIX}/default/test", value("test"))
+        registry.put(f"{PREFIX}/team-a/test", value("test"))
+        registry.put(f"{PREFIX}/team-b/test", value("test"))
+
+        parameters = boto3.client("ssm").get_parameters_by_path(Path="/emr_launch/", Recursive=True)["Parameters"]
+        self.assertEqual([p["Name"] for p in parameters], [f"{PREFIX}/default/test"])
+        items = boto3.client("dynamodb").scan(TableName="registry")["Items"]
+        self.assertEqual([i["Name"]["S"] for i in items], ["team-a/test"])
+        objects = boto3.client("s3").list_objects_v2(Bucket="registry")["Contents"]
+        self.assertEqual([o["Key"] for o in objects], ["emr_launch/cluster_configurations/team-b/test.json"])
+
+    def test_get_item(self) -> None:
+        registry = Registry.from_configuration(None, boto3.client("ssm"))
+        with self.assertRaises(ParameterNotFoundError):
+            registry.get_item(f"{PREFIX}/default/missing")
+
+    def test_shared_backends(self) -> None:
+        registry = Registry.from_configuration(
+            {
+                "Namespaces": {
+                    "team-a": {"Backend": "dynamodb", "TableName": "registry"},
+                    "team-b": {"Backend": "dynamodb", "TableName": "registry"},
+                }
+            }
+        )
+        self.assertIs(registry.backend("team-a"), registry.backend("team-b"))
+        self.assertIsInstance(registry.backend("default"), SSMBackend)
+
+    def test_unsupported_backend(self) -> None:
+        with self.assertRaises(RegistryError):
+            Registry.from_configuration({"Default": {"Backend": "etcd"}})
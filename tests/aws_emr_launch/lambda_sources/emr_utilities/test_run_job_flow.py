@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb, mock_emr, mock_events, mock_secretsmanager
+
+from aws_emr_launch.lambda_sources.emr_utilities.check_cluster_status import lambda_source as check_cluster_status
+from aws_emr_launch.lambda_sources.emr_utilities.run_job_flow import lambda_source as run_job_flow
+from aws_emr_launch.lambda_sources.emr_utilities.run_job_flow.lambda_source import SecretNotFoundError
+
+# Turn the loggers off for the tests
+logging.getLogger().setLevel(logging.WARN)
+run_job_flow.logger.setLevel(logging.WARN)
+check_cluster_status.logger.setLevel(logging.WARN)
+
+TABLE_NAME = "test-pending-launches"
+RULE_NAME = "test-rule"
+
+
+def create_pending_launches_table() -> None:
+    boto3.client("dynamodb").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "RuleName", "KeyType": "HASH"},
+            {"AttributeName": "ClusterId", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "RuleName", "AttributeType": "S"},
+            {"AttributeName": "ClusterId", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "ClusterId",
+                "KeySchema": [{"AttributeName": "ClusterId", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def run_job_flow_event(cluster_name: str, fire_and_forget: bool = False) -> Dict[str, Any]:
+    return {
+        "ExecutionInput": {},
+        "Input": {
+            "Cluster": {
+                "Name": cluster_name,
+                "ReleaseLabel": "emr-6.2.0",
+                "JobFlowRole": "test-instance-role",
+                "ServiceRole": "test-service-role",
+                "LogUri": None,
+                "Configurations": [],
+                "Instances": {
+                    "MasterInstanceType": "m5.xlarge",
+                    "SlaveInstanceType": "m5.xlarge",
+                    "InstanceCount": 1,
+                    "KeepJobFlowAliveWhenNoSteps": True,
+                    "Ec2SubnetId": None,
+                },
+            }
+        },
+        "TaskToken": f"token-{cluster_name}",
+        "RuleName": RULE_NAME,
+        "FireAndForget": fire_and_forget,
+    }
+
+
+@mock.patch.dict(os.environ, {"PENDING_LAUNCHES_TABLE": TABLE_NAME})
+class TestRunJobFlow(unittest.TestCase):
+    def create_resources(self) -> None:
+        boto3.client("events").put_rule(Name=RULE_NAME, ScheduleExpression="rate(1 minute)", State="DISABLED")
+        create_pending_launches_table()
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_registers_pending_launch(self) -> None:
+        self.create_resources()
+        with mock.patch.object(run_job_flow, "sfn") as sfn:
+            run_job_flow.handler(run_job_flow_event("test-cluster"), None)
+            sfn.send_task_success.assert_not_called()
+
+        items = boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Items"]
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["TaskToken"], {"S": "token-test-cluster"})
+        self.assertEqual(items[0]["RuleName"], {"S": RULE_NAME})
+        self.assertEqual(items[0]["ExpectedState"], {"S": "WAITING"})
+        self.assertEqual(boto3.client("events").describe_rule(Name=RULE_NAME)["State"], "ENABLED")
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_fire_and_forget(self) -> None:
+        self.create_resources()
+        with mock.patch.object(run_job_flow, "sfn") as sfn:
+            run_job_flow.handler(run_job_flow_event("test-cluster", fire_and_forget=True), None)
+            sfn.send_task_success.assert_called_once()
+            self.assertIn("ClusterId", json.loads(sfn.send_task_success.call_args.kwargs["output"]))
+
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], 0)
+        self.assertEqual(boto3.client("events").describe_rule(Name=RULE_NAME)["State"], "DISABLED")
+
+    @mock_dynamodb
+    @mock_emr
+    @mock_events
+    def test_concurrent_launches(self) -> None:
+        self.create_resources()
+        launches = 500
+
+        with mock.patch.object(run_job_flow, "sfn"):
+            with ThreadPoolExecutor(max_workers=launches) as executor:
+                futures = [
+                    executor.submit(run_job_flow.handler, run_job_flow_event(f"test-cluster-{i}"), None)
+                    for i in range(launches)
+                ]
+                for future in futures:
+                    future.result()
+
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], launches)
+        self.assertEqual(boto3.client("events").describe_rule(Name=RULE_NAME)["State"], "ENABLED")
+
+        rule_arn = boto3.client("events").describe_rule(Name=RULE_NAME)["Arn"]
+        with mock.patch.object(check_cluster_status, "sfn") as sfn:
+            check_cluster_status.handler({"detail-type": "Scheduled Event", "resources": [rule_arn]}, None)
+            self.assertEqual(sfn.send_task_success.call_count, launches)
+            self.assertEqual(
+                {c.kwargs["taskToken"] for c in sfn.send_task_success.call_args_list},
+                {f"token-test-cluster-{i}" for i in range(launches)},
+            )
+
+        self.assertEqual(boto3.client("dynamodb").scan(TableName=TABLE_NAME)["Count"], 0)
+        self.assertEqual(boto3.client("events").describe_rule(Name=RULE_NAME)["State"], "DISABLED")
+
+
+class TestRunJobFlowSecrets(unittest.TestCase):
+    def setUp(self) -> None:
+        run_job_flow.secret_cache.clear()
+
+    def secret_event(self, secret_arn: str, kerberos_arn: str) -> Dict[str, Any]:
+        event = run_job_flow_event("test-cluster", fire_and_forget=True)
+        event["Input"]["SecretConfigurations"] = {"hive-site": secret_arn, "spark-hive-site": secret_arn}
+        event["Input"]["KerberosAttributesSecret"] = kerberos_arn
+        return event
+
+    @mock_secretsmanager
+    def test_secrets(self) -> None:
+        secretsmanager = boto3.client("secretsmanager")
+        secret_arn = secretsmanager.create_secret(Name="test-secret", SecretString=json.dumps({"Key": "Value"}))["ARN"]
+        kerberos_arn = secretsmanager.create_secret(
+            Name="test-kerberos", SecretString=json.dumps({"Realm": "EC2.INTERNAL", "Other": "Ignored"})
+        )["ARN"]
+
+        client = run_job_flow.secretsmanager
+        with mock.patch.object(run_job_flow, "emr") as emr, mock.patch.object(run_job_flow, "sfn"), mock.patch.object(
+            client, "get_secret_value", wraps=client.get_secret_value
+        ) as get_secret_value:
+            emr.run_job_flow.return_value = {"JobFlowId": "j-TEST"}
+            run_job_flow.handler(self.secret_event(secret_arn, kerberos_arn), None)
+
+            # The secret shared by both classifications is only fetched once
+            self.assertEqual(get_secret_value.call_count, 2)
+
+            cluster_configuration = emr.run_job_flow.call_args.kwargs
+            self.assertEqual(
+                cluster_configuration["Configurations"],
+                [
+                    {"Classification": "hive-site", "Properties": {"Key": "Value"}},
+                    {"Classification": "spark-hive-site", "Properties": {"Key": "Value"}},
+                ],
+            )
+            self.assertEqual(cluster_configuration["KerberosAttributes"], {"Realm": "EC2.INTERNAL"})
+
+    @mock_secretsmanager
+    def test_secret_cache(self) -> None:
+        secretsmanager = boto3.client("secretsmanager")
+        secret_arn = secretsmanager.create_secret(Name="test-secret", SecretString=json.dumps({"Key": "Value"}))["ARN"]
+
+        client = run_job_flow.secretsmanager
+        with mock.patch.object(run_job_flow.secret_cache, "_ttl_seconds", 60), mock.patch.object(
+            client, "get_secret_value", wraps=client.get_secret_value
+        ) as get_secret_value:
+            run_job_flow.get_secret_values([secret_arn])
+            run_job_flow.get_secret_values([secret_arn])
+            get_secret_value.assert_called_once_with(SecretId=secret_arn, VersionStage="AWSCURRENT")
+
+    @mock_secretsmanager
+    def test_secret_not_found(self) -> None:
+        with self.assertRaises(SecretNotFoundError):
+            run_job_flow.get_secret_values(["test-missing-secret", "test-missing-secret"])
@@ -0,0 +1,39 @@
+import gzip
+import json
+import unittest
+
+import boto3
+from emr_config_utils import clients
+from emr_config_utils.stored_values import StoredValueError, decode_stored_value
+from moto import mock_s3
+
+from aws_emr_launch.constructs import parameter_store
+
+VALUE = {"ConfigurationName": "test", "Namespace": "default", "ClusterConfiguration": {"ReleaseLabel": "emr-6.2.0"}}
+
+
+class TestStoredValues(unittest.TestCase):
+    def setUp(self) -> None:
+        clients.reset_clients()
+
+    def test_plain(self) -> None:
+        self.assertEqual(decode_stored_value(json.dumps(VALUE)), VALUE)
+
+    def test_gzip(self) -> None:
+        # Values compressed at synth time by the ParameterStorage
+        self.assertEqual(decode_stored_value(parameter_store.compress_value(json.dumps(VALUE))), VALUE)
+
+    @mock_s3
+    def test_s3(self) -> None:
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket="stored-values")
+        s3.put_object(Bucket="stored-values", Key="plain.json", Body=json.dumps(VALUE).encode("utf-8"))
+        s3.put_object(Bucket="stored-values", Key="gzip.json", Body=gzip.compress(json.dumps(VALUE).encode("utf-8")))
+
+        for key in ["plain.json", "gzip.json"]:
+            pointer = {"StorageFormat": "s3", "Bucket": "stored-values", "Key": key}
+            self.assertEqual(decode_stored_value(json.dumps(pointer)), VALUE)
+
+    def test_unsupported_format(self) -> None:
+        with self.assertRaises(StoredValueError):
+            decode_stored_value(json.dumps({"StorageFormat": "zstd", "Value": ""}))
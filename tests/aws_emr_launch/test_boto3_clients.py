@@ -0,0 +1,57 @@
+import threading
+from typing import Any, List
+
+import boto3
+import pytest
+
+from aws_emr_launch import boto3_client, boto3_resource, reset_boto3_clients
+
+
+def test_boto3_client_is_shared() -> None:
+    reset_boto3_clients()
+    clients: List[boto3.client] = []
+    threads = [threading.Thread(target=lambda: clients.append(boto3_client("ssm"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(clients) == 8
+    assert all(c is clients[0] for c in clients)
+    assert boto3_client("ssm", region_name="eu-west-1") is not clients[0]
+    assert boto3_client("ssm", region_name="eu-west-1").meta.region_name == "eu-west-1"
+
+    reset_boto3_clients()
+    assert boto3_client("ssm") is not clients[0]
+
+
+def test_boto3_client_options() -> None:
+    client = boto3_client("ssm", endpoint_url="http://localhost:4566", retry_mode="adaptive")
+    assert client.meta.endpoint_url == "http://localhost:4566"
+    assert client.meta.config.retries["mode"] == "adaptive"
+    assert boto3_client("ssm").meta.endpoint_url != "http://localhost:4566"
+
+    with pytest.raises(ValueError):
+        boto3_client("ssm", retry_mode="exponential")
+
+
+def test_boto3_client_default_retry_mode(monkeypatch: Any) -> None:
+    # Without a retry mode, botocore's resolution (e.g. AWS_RETRY_MODE) applies
+    monkeypatch.delenv("AWS_EMR_LAUNCH_RETRY_MODE", raising=False)
+    monkeypatch.setenv("AWS_RETRY_MODE", "standard")
+    reset_boto3_clients()
+    assert boto3_client("ssm").meta.config.retries["mode"] == "standard"
+
+    monkeypatch.setenv("AWS_EMR_LAUNCH_RETRY_MODE", "adaptive")
+    assert boto3_client("ssm").meta.config.retries["mode"] == "adaptive"
+
+
+def test_boto3_resource_is_shared_per_thread() -> None:
+    resource = boto3_resource("s3")
+    assert boto3_resource("s3") is resource
+
+    resources: List[boto3.client] = []
+    thread = threading.Thread(target=lambda: resources.append(boto3_resource("s3")))
+    thread.start()
+    thread.join()
+    assert resources[0] is not resource
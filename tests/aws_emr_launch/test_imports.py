@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+# `import aws_emr_launch` must stay cheap: it doesn't import boto3 or aws_cdk. Its import time is measured by
+# extras/benchmarks/import_time.py (e.g. with --budget-ms 250) rather than asserted here, where it depends on
+# the machine running the tests
+MEASURE = """
+import sys
+import {module}
+print(",".join(sorted(p for p in ["aws_cdk", "boto3", "constructs", "jsii", "pkg_resources"] if p in sys.modules)))
+"""
+
+
+def _import(module: str) -> str:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(module=module)], check=True, capture_output=True, text=True
+    ).stdout
+    return output.splitlines()[-1]
+
+
+def test_package_import_is_light() -> None:
+    assert _import("aws_emr_launch") == ""
+
+
+def test_runtime_is_cdk_free() -> None:
+    imported = _import("aws_emr_launch.runtime")
+    assert imported == "boto3"
@@ -0,0 +1,6 @@
+import importlib
+import sys
+
+# The emr_utilities Lambda sources import the emr_config_utils package from the EMRConfigUtilsLayer, where it is
+# a top-level package on the Lambda runtime path
+sys.modules.setdefault("emr_config_utils", importlib.import_module("aws_emr_launch.emr_config_utils"))